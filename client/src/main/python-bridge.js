@@ -1,7 +1,7 @@
 const path = require('path');
 const fs = require('fs');
 const log = require('electron-log');
-const { ipcMain } = require('electron');
+const { ipcMain, BrowserWindow } = require('electron');
 const { PythonShell } = require('python-shell');
 
 // Python进程
@@ -65,6 +65,11 @@ const startPythonProcess = () => {
                 log.info('Python进程已就绪');
                 isProcessReady = true;
                 processQueue();
+            } else if (message && message.event) {
+                // Python主动推送的事件（如镜像拉取进度），转发给所有渲染进程
+                BrowserWindow.getAllWindows().forEach(win => {
+                    win.webContents.send('python-event', message);
+                });
             } else if (message && message.requestId && message.result !== undefined) {
                 // 找到对应的等待回调
                 const pendingRequest = requestQueue.find(req => req.requestId === message.requestId);
@@ -0,0 +1,2 @@
+# -*- coding: utf-8 -*-
+"""CryptoGrid Python引擎核心模块"""
@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+"""区间外自动暂停
+
+网格策略的市场价格离开 [lower_price, upper_price] 超过阈值时间后暂停容器，
+价格回到区间内立即恢复。离开区间的判定带有滞回余量，避免在边界附近频繁切换。
+暂停/恢复区间记录在SQLite中。
+
+只恢复由本控制器暂停的策略：策略已被其他途径暂停（如风控规则）时不记录暂停，
+存在未解除的风控触发时既不暂停也不恢复，由风控的手动恢复流程处理。
+"""
+
+import json
+import threading
+
+from loguru import logger
+
+from core.market_feed import to_ccxt_symbol
+
+
+class PauseState:
+    """单个策略的暂停状态"""
+
+    __slots__ = ("exchange", "symbol", "lower", "upper", "out_since", "paused")
+
+    def __init__(self, exchange, symbol, lower, upper):
+        self.exchange = exchange
+        self.symbol = symbol
+        self.lower = lower
+        self.upper = upper
+        self.out_since = None
+        self.paused = False
+
+
+class AutoPauseController:
+    """区间外自动暂停控制器"""
+
+    def __init__(
+        self,
+        conn,
+        db_lock,
+        feed,
+        pause_fn,
+        resume_fn,
+        threshold_seconds=900,
+        hysteresis_pct=0.005,
+        sync_interval=30,
+        blocked_fn=None,
+    ):
+        """初始化控制器
+
+        Args:
+            conn: SQLite连接
+            db_lock: 数据库锁
+            feed: MarketFeed 实例
+            pause_fn: 暂停回调 strategy_id -> bool，只在本次确实暂停了运行中的策略时返回 True
+            resume_fn: 恢复回调 strategy_id -> bool
+            threshold_seconds: 价格离开区间超过该时间（秒）后暂停
+            hysteresis_pct: 离开区间的判定余量，价格需超出边界该比例才开始计时
+            sync_interval: 从数据库同步运行中策略的间隔（秒）
+            blocked_fn: 策略是否有未解除的风控触发 strategy_id -> bool，为真时不暂停也不恢复
+        """
+        self.conn = conn
+        self.db_lock = db_lock
+        self.feed = feed
+        self.pause_fn = pause_fn
+        self.resume_fn = resume_fn
+        self.threshold_seconds = threshold_seconds
+        self.hysteresis_pct = hysteresis_pct
+        self.sync_interval = sync_interval
+        self.blocked_fn = blocked_fn
+        self._states = {}
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._init_db()
+        self._restore()
+        feed.add_listener(self.on_price)
+
+    def _init_db(self):
+        """初始化暂停记录表"""
+        with self.db_lock:
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS strategy_pauses (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    strategy_id TEXT,
+                    reason TEXT,
+                    pause_price REAL,
+                    resume_price REAL,
+                    paused_at TIMESTAMP,
+                    resumed_at TIMESTAMP
+                )
+                """
+            )
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_strategy_pauses_strategy ON strategy_pauses (strategy_id)"
+            )
+            self.conn.commit()
+
+    def _restore(self):
+        """恢复上次运行时未结束的暂停状态"""
+        with self.db_lock:
+            rows = self.conn.execute(
+                "SELECT DISTINCT strategy_id FROM strategy_pauses WHERE resumed_at IS NULL"
+            ).fetchall()
+        self._open_pauses = {row[0] for row in rows}
+
+    def start(self):
+        """启动定期同步线程"""
+        threading.Thread(target=self._run, name="auto-pause", daemon=True).start()
+
+    def stop(self):
+        self._stopping.set()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                self.sync()
+            except Exception as e:
+                logger.error(f"同步自动暂停策略列表失败: {e}")
+            self._stopping.wait(self.sync_interval)
+
+    def sync(self):
+        """根据数据库中运行中的策略刷新监控列表和行情订阅"""
+        with self.db_lock:
+            rows = self.conn.execute(
+                "SELECT id, exchange, trading_pair, config FROM strategies WHERE status = 'running'"
+            ).fetchall()
+
+        states = {}
+        for strategy_id, exchange, pair, config_json in rows:
+            try:
+                config = json.loads(config_json) if config_json else {}
+                lower = float(config["lower_price"])
+                upper = float(config["upper_price"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            symbol = to_ccxt_symbol(pair)
+            with self._lock:
+                state = self._states.get(strategy_id)
+            if state is None:
+                state = PauseState(exchange, symbol, lower, upper)
+                state.paused = strategy_id in self._open_pauses
+            else:
+                state.lower, state.upper = lower, upper
+            states[strategy_id] = state
+
+        with self._lock:
+            self._states = states
+        self.feed.set_subscriptions(
+            "auto_pause", {(s.exchange, s.symbol) for s in states.values()}
+        )
+
+    def on_price(self, exchange_id, symbol, price, timestamp):
+        """处理价格更新"""
+        with self._lock:
+            targets = [
+                (strategy_id, state)
+                for strategy_id, state in self._states.items()
+                if state.exchange == exchange_id and state.symbol == symbol
+            ]
+        for strategy_id, state in targets:
+            self._evaluate(strategy_id, state, price, timestamp)
+
+    def _evaluate(self, strategy_id, state, price, now):
+        """根据价格更新单个策略状态"""
+        if self.blocked_fn is not None and self.blocked_fn(strategy_id):
+            # 风控规则已接管暂停，解除前不重复暂停也不自动恢复
+            state.out_since = None
+            return
+        in_band = state.lower <= price <= state.upper
+        if state.paused:
+            if in_band and self.resume_fn(strategy_id):
+                state.paused = False
+                state.out_since = None
+                self._record_resume(strategy_id, price)
+                logger.info(f"策略{strategy_id}价格{price}回到区间内，已恢复运行")
+            return
+
+        margin = self.hysteresis_pct
+        out_of_band = price < state.lower * (1 - margin) or price > state.upper * (1 + margin)
+        if in_band:
+            state.out_since = None
+        elif out_of_band:
+            if state.out_since is None:
+                state.out_since = now
+            elif now - state.out_since >= self.threshold_seconds:
+                if self.pause_fn(strategy_id):
+                    state.paused = True
+                    self._record_pause(strategy_id, price, now - state.out_since)
+                    logger.info(
+                        f"策略{strategy_id}价格{price}离开区间[{state.lower}, {state.upper}]"
+                        f"已{now - state.out_since:.0f}秒，已暂停"
+                    )
+                else:
+                    # 暂停失败或策略已被其他途径暂停，不记录也不负责恢复，阈值时间后再检查
+                    state.out_since = now
+
+    def _record_pause(self, strategy_id, price, out_seconds):
+        with self.db_lock:
+            self.conn.execute(
+                """
+                INSERT INTO strategy_pauses (strategy_id, reason, pause_price, paused_at)
+                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+                """,
+                (strategy_id, f"价格离开区间{out_seconds:.0f}秒", price),
+            )
+            self.conn.commit()
+        self._open_pauses.add(strategy_id)
+
+    def _record_resume(self, strategy_id, price):
+        with self.db_lock:
+            self.conn.execute(
+                """
+                UPDATE strategy_pauses SET resume_price = ?, resumed_at = CURRENT_TIMESTAMP
+                WHERE strategy_id = ? AND resumed_at IS NULL
+                """,
+                (price, strategy_id),
+            )
+            self.conn.commit()
+        self._open_pauses.discard(strategy_id)
+
+    def release(self, strategy_id, price=None):
+        """策略被手动停止或删除时结束暂停记录并停止监控"""
+        with self._lock:
+            self._states.pop(strategy_id, None)
+        if strategy_id in self._open_pauses:
+            self._record_resume(strategy_id, price)
+
+    def get_all_pauses(self):
+        """获取所有策略的暂停统计
+
+        Returns:
+            dict: 策略ID -> {paused, paused_since, pause_count, paused_seconds, periods}
+        """
+        with self.db_lock:
+            rows = self.conn.execute(
+                """
+                SELECT strategy_id, reason, pause_price, resume_price, paused_at, resumed_at,
+                       (julianday(COALESCE(resumed_at, CURRENT_TIMESTAMP)) - julianday(paused_at)) * 86400
+                FROM strategy_pauses ORDER BY id
+                """
+            ).fetchall()
+        result = {}
+        for strategy_id, reason, pause_price, resume_price, paused_at, resumed_at, seconds in rows:
+            info = result.setdefault(
+                strategy_id,
+                {
+                    "paused": False,
+                    "paused_since": None,
+                    "pause_count": 0,
+                    "paused_seconds": 0.0,
+                    "periods": [],
+                },
+            )
+            info["pause_count"] += 1
+            info["paused_seconds"] += seconds or 0.0
+            if resumed_at is None:
+                info["paused"] = True
+                info["paused_since"] = paused_at
+            info["periods"].append(
+                {
+                    "reason": reason,
+                    "pause_price": pause_price,
+                    "resume_price": resume_price,
+                    "paused_at": paused_at,
+                    "resumed_at": resumed_at,
+                }
+            )
+        for info in result.values():
+            # 只返回最近的暂停区间，避免响应过大
+            info["periods"] = info["periods"][-10:]
+            info["paused_seconds"] = round(info["paused_seconds"], 1)
+        return result
+
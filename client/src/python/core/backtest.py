@@ -0,0 +1,320 @@
+# -*- coding: utf-8 -*-
+"""网格策略回测
+
+用本地K线回放与创建策略相同的网格模型（core.grid）。每根K线按
+开盘 -> 先到的极值 -> 后到的极值 -> 收盘 展开成价格路径
+（阳线先低后高，阴线先高后低），相邻路径点之间按线段计算穿越的网格价位。
+
+每个网格区间 i（价位 i 到 i+1）是一个独立的状态机：
+空仓时在价位 i 挂买单，价格向下触及价位 i 即买入；
+持仓时在价位 i+1 挂卖单，价格向上触及价位 i+1 即卖出。
+同一区间的成交必然买卖交替，因此只要把穿越事件按区间分组、
+丢弃与前一事件同向的重复触及，就能完全向量化地得到所有成交。
+
+设置了反弹开仓/回调平仓比例时，成交由 core.triggers 的触发引擎逐点产生，
+与实盘使用同一套状态机，资金和盈亏的计算方式不变。
+"""
+
+import numpy as np
+
+from core.grid import TICK_SIZE, plan_grid
+from core.triggers import trigger_fills
+
+BUY = 1
+SELL = -1
+
+# 返回给界面的权益曲线点数和成交记录上限
+MAX_CURVE_POINTS = 1000
+MAX_FILLS = 1000
+
+
+def price_path(open_, high, low, close):
+    """K线展开为价格路径
+
+    Returns:
+        (numpy.ndarray, numpy.ndarray): (路径价格, 每个路径点所属的K线序号)
+    """
+    bullish = close >= open_
+    path = np.empty((len(open_), 4), dtype=np.float64)
+    path[:, 0] = open_
+    path[:, 1] = np.where(bullish, low, high)
+    path[:, 2] = np.where(bullish, high, low)
+    path[:, 3] = close
+    bars = np.repeat(np.arange(len(open_)), 4)
+    return path.ravel(), bars
+
+
+def _expand(segments, starts, counts, descending):
+    """把每个线段穿越的价位展开为事件 (线段序号, 价位, 线段内顺序)"""
+    total = int(counts.sum())
+    seg = np.repeat(segments, counts)
+    offset = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    first = np.repeat(starts, counts)
+    level = first - offset if descending else first + offset
+    return seg, level, offset
+
+
+def crossing_events(path, levels):
+    """计算价格路径穿越网格价位产生的买卖触发事件
+
+    Returns:
+        tuple: (线段序号, 区间序号, 方向, 线段内顺序)，按时间排序
+    """
+    # 向下触及价位 j：终点 <= L[j] < 起点；向上触及价位 j：起点 < L[j] <= 终点
+    below = np.searchsorted(levels, path, side="left")
+    at_or_below = np.searchsorted(levels, path, side="right")
+    segments = np.arange(len(path) - 1)
+
+    down_counts = below[:-1] - below[1:]
+    down = down_counts > 0
+    d_seg, d_level, d_order = _expand(
+        segments[down], below[:-1][down] - 1, down_counts[down], descending=True
+    )
+
+    up_counts = at_or_below[1:] - at_or_below[:-1]
+    up = up_counts > 0
+    u_seg, u_level, u_order = _expand(
+        segments[up], at_or_below[:-1][up], up_counts[up], descending=False
+    )
+
+    # 向下触及价位 j 触发区间 j 的买单，向上触及价位 j 触发区间 j-1 的卖单
+    n_intervals = len(levels) - 1
+    d_valid = d_level < n_intervals
+    u_valid = u_level >= 1
+    seg = np.concatenate([d_seg[d_valid], u_seg[u_valid]])
+    interval = np.concatenate([d_level[d_valid], u_level[u_valid] - 1])
+    side = np.concatenate(
+        [
+            np.full(int(d_valid.sum()), BUY, np.int8),
+            np.full(int(u_valid.sum()), SELL, np.int8),
+        ]
+    )
+    order = np.concatenate([d_order[d_valid], u_order[u_valid]])
+
+    sort = np.lexsort((order, seg))
+    return seg[sort], interval[sort], side[sort], order[sort]
+
+
+def simulate_fills(levels, seg, interval, side, initial_holding):
+    """按区间状态机筛选实际成交的事件
+
+    Args:
+        levels: 网格价位
+        seg, interval, side: crossing_events 的结果（按时间排序）
+        initial_holding: 每个区间初始是否持仓
+
+    Returns:
+        (numpy.ndarray, numpy.ndarray): (成交事件下标（按时间排序）,
+            卖出成交对应的买入是否为初始持仓)
+    """
+    # 按区间分组，组内保持时间顺序
+    grouped = np.argsort(interval, kind="stable")
+    g_interval = interval[grouped]
+    g_side = side[grouped]
+
+    first_in_group = np.ones(len(grouped), dtype=bool)
+    first_in_group[1:] = g_interval[1:] != g_interval[:-1]
+    # 组内前一个事件的方向，组首取初始状态（持仓视为已买入）
+    previous = np.empty_like(g_side)
+    previous[1:] = g_side[:-1]
+    initial_side = np.where(initial_holding, BUY, SELL).astype(np.int8)
+    previous[first_in_group] = initial_side[g_interval[first_in_group]]
+    # 同向的重复触及不成交，成交必然买卖交替
+    accepted = g_side != previous
+
+    fills = grouped[accepted]
+    # 区间内第一笔成交如果是卖出，卖出的是初始持仓
+    acc_interval = g_interval[accepted]
+    acc_first = np.ones(len(fills), dtype=bool)
+    acc_first[1:] = acc_interval[1:] != acc_interval[:-1]
+    from_initial = acc_first & (g_side[accepted] == SELL)
+
+    order = np.argsort(fills, kind="stable")
+    return fills[order], from_initial[order]
+
+
+class BacktestResult:
+    """回测结果"""
+
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+    def summary(self):
+        return {
+            "bars": self.bars,
+            "start": self.start,
+            "end": self.end,
+            "initial_capital": self.initial_capital,
+            "final_equity": self.final_equity,
+            "total_return_pct": self.total_return_pct,
+            "realized_pnl": self.realized_pnl,
+            "unrealized_pnl": self.unrealized_pnl,
+            "fees_paid": self.fees_paid,
+            "max_drawdown_pct": self.max_drawdown_pct,
+            "round_trips": self.round_trips,
+            "buys": self.buys,
+            "sells": self.sells,
+            "time_in_range_pct": self.time_in_range_pct,
+        }
+
+    def to_dict(self, max_points=MAX_CURVE_POINTS, max_fills=MAX_FILLS):
+        """转换为列式结果，权益曲线降采样，成交只返回最近的记录"""
+        step = max(len(self.equity) // max_points, 1)
+        fills = slice(max(len(self.fill_time) - max_fills, 0), None)
+        return {
+            **self.summary(),
+            "equity_curve": {
+                "timestamp": self.timestamps[::step].tolist(),
+                "equity": self.equity[::step].tolist(),
+            },
+            "fills": {
+                "timestamp": self.fill_time[fills].tolist(),
+                "interval": self.fill_interval[fills].tolist(),
+                "side": np.where(self.fill_side[fills] == BUY, "buy", "sell").tolist(),
+                "price": self.fill_price[fills].tolist(),
+                "quantity": self.fill_quantity[fills].tolist(),
+                "fee": self.fill_fee[fills].tolist(),
+            },
+        }
+
+
+def _first_sells(fill_interval, fill_side):
+    """按时间排序的成交中，每个区间第一笔成交为卖出时卖出的是初始持仓"""
+    grouped = np.argsort(fill_interval, kind="stable")
+    g_interval = fill_interval[grouped]
+    first = np.ones(len(grouped), dtype=bool)
+    first[1:] = g_interval[1:] != g_interval[:-1]
+    from_initial = np.zeros(len(grouped), dtype=bool)
+    from_initial[grouped] = first & (fill_side[grouped] == SELL)
+    return from_initial
+
+
+def _entry_prices(fill_interval, fill_price, sells):
+    """每笔卖出对应的买入价（同一区间的前一笔成交，买卖交替）"""
+    grouped = np.argsort(fill_interval, kind="stable")
+    previous = np.empty(len(grouped), dtype=np.float64)
+    previous[grouped[1:]] = fill_price[grouped[:-1]]
+    if len(grouped):
+        previous[grouped[0]] = np.nan
+    return previous[sells]
+
+
+def run_backtest(
+    candles,
+    spec,
+    fee_rate=0.001,
+    slippage=0.0,
+    market=None,
+    precision_mode=TICK_SIZE,
+    rebound_pct=0.0,
+    pullback_pct=0.0,
+):
+    """回测网格策略
+
+    Args:
+        candles: 列名 -> 数组（timestamp/open/high/low/close，如 OHLCVStore.read 的结果）
+        spec: GridSpec
+        fee_rate: 手续费率
+        slippage: 滑点比例，买入按 价位*(1+滑点)，卖出按 价位*(1-滑点) 成交
+        market: ccxt市场信息（可选，用于按精度取整价位和数量）
+        precision_mode: 交易所精度模式
+        rebound_pct: 反弹开仓比例（0.005 即 0.5%），0 为触及价位即买入
+        pullback_pct: 回调平仓比例，0 为触及价位即卖出
+
+    Returns:
+        BacktestResult: 回测结果
+
+    Raises:
+        ValueError: 没有K线数据
+    """
+    timestamps = np.asarray(candles["timestamp"])
+    close = np.asarray(candles["close"], dtype=np.float64)
+    if len(close) == 0:
+        raise ValueError("回测区间内没有K线数据")
+
+    start_price = float(candles["open"][0])
+    plan = plan_grid(spec, market, precision_mode, fee_rate, start_price)
+    levels = plan.prices
+    quantities = plan.quantities[:-1]
+
+    path, path_bars = price_path(candles["open"], candles["high"], candles["low"], close)
+    # 初始状态：开盘价以上的区间预先买入基础币挂卖单，其余区间挂买单
+    initial_holding = levels[:-1] >= start_price
+
+    if rebound_pct or pullback_pct:
+        points, fill_interval, fill_side, trigger_price = trigger_fills(
+            path, levels, initial_holding, rebound_pct, pullback_pct
+        )
+        fill_interval = np.asarray(fill_interval, dtype=np.int64)
+        fill_side = np.asarray(fill_side, dtype=np.int8)
+        fill_bar = path_bars[np.asarray(points, dtype=np.int64)]
+        fill_price = np.asarray(trigger_price, dtype=np.float64)
+        from_initial = _first_sells(fill_interval, fill_side)
+    else:
+        seg, interval, side, _ = crossing_events(path, levels)
+        fills, from_initial = simulate_fills(levels, seg, interval, side, initial_holding)
+        fill_interval = interval[fills]
+        fill_side = side[fills]
+        fill_bar = path_bars[seg[fills] + 1]
+        fill_price = np.where(fill_side == BUY, levels[fill_interval], levels[fill_interval + 1])
+
+    fill_qty = quantities[fill_interval]
+    fill_price = np.where(fill_side == BUY, fill_price * (1 + slippage), fill_price * (1 - slippage))
+    notional = fill_qty * fill_price
+    fill_fee = notional * fee_rate
+
+    # 资金：空仓区间预留买入资金，持仓区间按开盘价买入基础币
+    base0 = float(quantities[initial_holding].sum())
+    initial_cost = base0 * start_price * (1 + fee_rate)
+    empty = ~initial_holding
+    reserve = quantities[empty] * levels[:-1][empty] * (1 + slippage) * (1 + fee_rate)
+    cash0 = float(reserve.sum())
+    initial_capital = cash0 + initial_cost
+
+    cash_delta = np.where(fill_side == BUY, -(notional + fill_fee), notional - fill_fee)
+    base_delta = np.where(fill_side == BUY, fill_qty, -fill_qty)
+    n = len(close)
+    cash = cash0 + np.cumsum(np.bincount(fill_bar, weights=cash_delta, minlength=n))
+    base = base0 + np.cumsum(np.bincount(fill_bar, weights=base_delta, minlength=n))
+    equity = cash + base * close
+
+    # 已实现盈亏：每笔卖出相对其买入成本（初始持仓按开盘价买入）
+    sells = fill_side == SELL
+    buy_cost = np.where(
+        from_initial[sells],
+        start_price,
+        _entry_prices(fill_interval, fill_price, sells),
+    ) * (1 + fee_rate)
+    realized = float((fill_qty[sells] * (fill_price[sells] * (1 - fee_rate) - buy_cost)).sum())
+
+    peak = np.maximum.accumulate(np.maximum(equity, initial_capital))
+    drawdown = 1 - equity / peak
+    in_range = (close >= levels[0]) & (close <= levels[-1])
+    final_equity = float(equity[-1])
+
+    return BacktestResult(
+        bars=n,
+        start=int(timestamps[0]),
+        end=int(timestamps[-1]),
+        initial_capital=initial_capital,
+        final_equity=final_equity,
+        total_return_pct=(final_equity - initial_capital) / initial_capital * 100
+        if initial_capital
+        else 0.0,
+        realized_pnl=realized,
+        unrealized_pnl=final_equity - initial_capital - realized,
+        fees_paid=float(fill_fee.sum() + base0 * start_price * fee_rate),
+        max_drawdown_pct=float(drawdown.max() * 100),
+        round_trips=int((sells & ~from_initial).sum()),
+        buys=int((~sells).sum()),
+        sells=int(sells.sum()),
+        time_in_range_pct=float(in_range.mean() * 100),
+        timestamps=timestamps,
+        equity=equity,
+        fill_time=timestamps[fill_bar],
+        fill_interval=fill_interval,
+        fill_side=fill_side,
+        fill_price=fill_price,
+        fill_quantity=fill_qty,
+        fill_fee=fill_fee,
+    )
@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+"""引擎配置加载
+
+配置文件默认位于 config/engine.yml（相对于工作目录，与 data/、strategy_files/ 一致）。
+文件不存在或缺少某些字段时使用默认值。
+"""
+
+import copy
+from pathlib import Path
+
+import yaml
+from loguru import logger
+
+DEFAULT_CONFIG_PATH = Path("config") / "engine.yml"
+
+# 默认配置
+DEFAULTS = {
+    "docker": {
+        # 放置策略: least_loaded（最少负载）或 exchange_affinity（交易所亲和）
+        "placement": "least_loaded",
+        # Docker端点列表，url 为空表示使用 docker.from_env()
+        "endpoints": [
+            {"name": "local", "url": None, "exchanges": [], "max_containers": 0}
+        ],
+        "timeout": 10,
+    },
+    "supervisor": {
+        "enabled": True,
+        # 重启退避: backoff_base * 2^(n-1)，最大 backoff_max 秒
+        "backoff_base": 5,
+        "backoff_max": 300,
+        # 容器稳定运行超过该时间后重置退避计数
+        "stable_seconds": 600,
+        # circuit_window 秒内崩溃 circuit_threshold 次则熔断
+        "circuit_threshold": 5,
+        "circuit_window": 900,
+    },
+    "images": {
+        "repository": "hummingbot/hummingbot",
+        # 启动后在后台预拉取的镜像标签
+        "prepull": True,
+        "prepull_tags": ["latest"],
+        "max_retries": 3,
+        "retry_delay": 2,
+        # 镜像源竞速，mirrors 为空且不读取守护进程配置时直接使用默认源
+        "mirrors": [],
+        "use_daemon_mirrors": True,
+        "include_direct": True,
+        "probe_timeout": 5,
+        # 超过该时间（秒）无任何进度视为停滞并切换镜像源
+        "stall_timeout": 60,
+    },
+    "market_feed": {
+        # 行情轮询间隔（秒）
+        "interval": 10,
+    },
+    "auto_pause": {
+        "enabled": True,
+        # 价格离开网格区间超过该时间（秒）后暂停容器
+        "threshold_seconds": 900,
+        # 价格需超出边界该比例才开始计时，回到区间内立即恢复
+        "hysteresis_pct": 0.005,
+        "sync_interval": 30,
+    },
+    "risk": {
+        "enabled": True,
+        # 从数据库同步运行中策略风控规则的间隔（秒）
+        "sync_interval": 30,
+        # 规则中可用的行情指标周期（K线根数，K线周期同 recenter.bar_seconds）
+        "rsi_period": 14,
+        "atr_period": 14,
+        "ema_period": 20,
+        "bollinger_period": 20,
+        "bollinger_k": 2.0,
+    },
+    "recenter": {
+        "enabled": True,
+        # 从数据库同步启用自适应调整的运行中策略的间隔（秒）
+        "sync_interval": 30,
+        # 行情推送聚合为K线的周期（秒）和指标周期（K线根数）
+        "bar_seconds": 300,
+        "atr_period": 14,
+        "ema_period": 20,
+        # 以下为默认调整参数，策略配置 recenter 中的同名参数优先
+        # EMA偏离网格中心超过半宽的该倍数时重新居中
+        "drift_trigger": 0.8,
+        # 区间宽度至少为 ATR 占价格百分比的该倍数，不足时放宽
+        "width_atr_multiple": 20.0,
+        "width_hysteresis": 0.25,
+        # 触发条件需持续的时间、两次调整最小间隔（秒）和每天调整次数上限
+        "confirm_seconds": 300,
+        "cooldown_seconds": 1800,
+        "max_per_day": 6,
+        "max_grid_count": 200,
+    },
+    "market_service": {
+        # 同时加载市场信息的交易所数量上限
+        "max_concurrency": 32,
+        # 市场信息缓存时间（秒）
+        "ttl": 3600,
+        "timeout": 30,
+        # 启动后预加载的交易所（已有策略使用的交易所会自动加入）
+        "warmup_exchanges": ["binance", "okx"],
+    },
+    "rate_limiter": {
+        # 实际使用的速率占交易所限额（ccxt rateLimit）的比例
+        "headroom": 0.9,
+        # 令牌桶容量，按多少秒的配额计算
+        "burst_seconds": 1.0,
+        # 交易所ID -> rateLimit(毫秒) 的手动覆盖
+        "overrides": {},
+        # 单个请求最长排队时间（秒）
+        "timeout": 60,
+    },
+    "order_gateway": {
+        # 不支持批量接口时并发发送单个请求的线程数
+        "workers": 16,
+        # 交易所ID -> 批量接口单批订单数上限的覆盖
+        "batch_limits": {},
+    },
+    "simulated_exchange": {
+        # 交易所ID simulated 的本地模拟交易所：每个请求的延迟、抖动（毫秒）
+        "latency_ms": 0,
+        "jitter_ms": 0,
+        # 服务端限流（次/秒），超过时返回 RateLimitExceeded，None 为不限
+        "max_requests_per_second": None,
+        # ccxt rateLimit 元数据（毫秒），限流调度器按此分配配额
+        "rate_limit_ms": 50,
+        "maker": 0.001,
+        "taker": 0.001,
+        # 交易对 -> add_market 参数（price_tick、amount_step、min_cost、price）
+        "markets": {"BTC/USDT": {"price_tick": 0.01, "amount_step": 0.00001, "min_cost": 5.0}},
+        # 默认账户初始余额
+        "balances": {"USDT": 100000.0, "BTC": 1.0},
+    },
+    "native_executor": {
+        # 进程内策略（mode 为 native）查询挂单和对账的间隔（秒），连续出错时按退避延长
+        "poll_interval": 10,
+        # 执行交易所请求的线程数，所有进程内策略共享
+        "workers": 32,
+    },
+    "paper": {
+        # 模拟盘回放行情的默认速度倍数（策略可用 replaySpeed 覆盖），0 为尽快回放
+        "replay_speed": 1.0,
+        # 默认虚拟资金在网格所需资金之外多留的比例
+        "funding_buffer": 0.01,
+    },
+    "http": {
+        # 每个会话缓存的主机连接池数量
+        "pool_connections": 10,
+        # 每个主机保留的长连接数量
+        "pool_maxsize": 20,
+        # DNS缓存时间（秒），0为不缓存
+        "dns_ttl": 300,
+    },
+    "ohlcv": {
+        # 每页请求的K线数量
+        "page_limit": 1000,
+        # 未指定起始时间时回溯的天数
+        "default_days": 30,
+    },
+    "optimizer": {
+        # 回测进程数，0为CPU核数
+        "workers": 0,
+        # 每个进程任务包含的参数组合数
+        "batch_size": 16,
+        # 最优值连续多少批未提升时提前结束，0为不提前结束
+        "patience": 50,
+    },
+    "monte_carlo": {
+        # 默认路径数
+        "paths": 10000,
+        # 单次请求的路径数上限
+        "max_paths": 100000,
+        # 默认每条路径的K线根数
+        "horizon": 720,
+        # 单次请求的 路径数×步数 上限（约 700 万格/秒，上限约 3 秒，IPC请求需在超时前返回）
+        "max_cells": 20000000,
+        # 每块处理的 路径数×步数 上限，控制内存占用
+        "chunk_cells": 2000000,
+    },
+    "range_advisor": {
+        # 参与波动率统计的最近K线根数
+        "lookback": 2000,
+        # 建议区间覆盖持有期收益分布的比例
+        "coverage": 0.9,
+    },
+}
+
+
+def _merge(base, override):
+    """递归合并配置字典"""
+    result = copy.deepcopy(base)
+    for key, value in (override or {}).items():
+        if isinstance(value, dict) and isinstance(result.get(key), dict):
+            result[key] = _merge(result[key], value)
+        else:
+            result[key] = value
+    return result
+
+
+def load_engine_config(path=None):
+    """加载引擎配置
+
+    Args:
+        path: 配置文件路径，默认为 config/engine.yml
+
+    Returns:
+        dict: 合并默认值后的配置
+    """
+    config_path = Path(path) if path else DEFAULT_CONFIG_PATH
+    if not config_path.exists():
+        return copy.deepcopy(DEFAULTS)
+
+    try:
+        with open(config_path, "r", encoding="utf-8") as f:
+            user_config = yaml.safe_load(f) or {}
+        logger.info(f"已加载引擎配置: {config_path}")
+        return _merge(DEFAULTS, user_config)
+    except Exception as e:
+        logger.error(f"加载引擎配置失败，使用默认配置: {e}")
+        return copy.deepcopy(DEFAULTS)
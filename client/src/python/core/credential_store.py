@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""策略API凭证存储
+
+native 模式的策略需要交易所 apiKey、secret（部分交易所还需要 password）。
+凭证不写入 strategies.config（该配置会原样返回给界面），而是按策略ID保存在
+data/credentials.json 中，文件权限为仅当前用户可读写，只在启动策略时读取。
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+
+from loguru import logger
+
+DEFAULT_CREDENTIALS_PATH = Path("data") / "credentials.json"
+
+# 策略配置中视为凭证的字段
+CREDENTIAL_KEYS = ("apiKey", "secret", "password")
+
+
+def split_credentials(config):
+    """把凭证字段从策略配置中分离
+
+    Returns:
+        (dict, dict): (不含凭证的配置, 凭证)
+    """
+    credentials = {key: config[key] for key in CREDENTIAL_KEYS if config.get(key)}
+    return {k: v for k, v in config.items() if k not in CREDENTIAL_KEYS}, credentials
+
+
+class CredentialStore:
+    """按策略ID保存API凭证的文件存储"""
+
+    def __init__(self, path=None):
+        """初始化存储
+
+        Args:
+            path: 存储文件路径，默认为 data/credentials.json
+        """
+        self.path = Path(path) if path else DEFAULT_CREDENTIALS_PATH
+        self._lock = threading.Lock()
+        self._entries = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.error(f"读取凭证存储失败: {e}")
+            return {}
+
+    def _save(self):
+        """原子写入，文件创建时即为 0600 权限"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self._entries, f)
+        os.replace(tmp_path, self.path)
+
+    def put(self, strategy_id, credentials):
+        """保存策略的凭证，凭证为空时删除"""
+        with self._lock:
+            if credentials:
+                self._entries[strategy_id] = dict(credentials)
+            elif self._entries.pop(strategy_id, None) is None:
+                return
+            self._save()
+
+    def get(self, strategy_id):
+        """策略的凭证，没有时返回空字典"""
+        with self._lock:
+            return dict(self._entries.get(strategy_id) or {})
+
+    def delete(self, strategy_id):
+        self.put(strategy_id, None)
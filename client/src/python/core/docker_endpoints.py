@@ -0,0 +1,300 @@
+# -*- coding: utf-8 -*-
+"""多Docker端点管理
+
+将策略容器分布到多个Docker守护进程（unix socket 或 TCP），
+并把策略与端点的对应关系保存在SQLite中。
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import docker
+from loguru import logger
+
+CONTAINER_PREFIX = "hummingbot_"
+
+
+def default_client_factory(endpoint, timeout=10):
+    """根据端点配置创建Docker客户端
+
+    Args:
+        endpoint: 端点对象
+        timeout: 超时时间（秒）
+
+    Returns:
+        docker.DockerClient: Docker客户端
+    """
+    if not endpoint.url or endpoint.url == "env":
+        return docker.from_env(timeout=timeout)
+    return docker.DockerClient(base_url=endpoint.url, timeout=timeout)
+
+
+class DockerEndpoint:
+    """单个Docker端点"""
+
+    def __init__(self, name, url=None, exchanges=None, max_containers=0):
+        self.name = name
+        self.url = url
+        self.exchanges = set(exchanges or [])
+        self.max_containers = int(max_containers or 0)
+        self.client = None
+        self.available = False
+        self.last_error = None
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "url": self.url or "env",
+            "exchanges": sorted(self.exchanges),
+            "max_containers": self.max_containers,
+            "available": self.available,
+            "last_error": self.last_error,
+        }
+
+
+class DockerEndpointPool:
+    """Docker端点池，负责策略放置和跨端点查询"""
+
+    PLACEMENT_POLICIES = ("least_loaded", "exchange_affinity")
+
+    def __init__(
+        self,
+        conn,
+        endpoints=None,
+        placement="least_loaded",
+        client_factory=None,
+        timeout=10,
+        db_lock=None,
+    ):
+        """初始化端点池
+
+        Args:
+            conn: SQLite连接
+            endpoints: 端点配置列表，每项包含 name/url/exchanges/max_containers
+            placement: 放置策略，least_loaded 或 exchange_affinity
+            client_factory: 客户端工厂函数 (endpoint, timeout) -> client，测试时可替换为假客户端
+            timeout: Docker API超时时间（秒）
+            db_lock: 数据库锁（可选）
+        """
+        if placement not in self.PLACEMENT_POLICIES:
+            raise ValueError(f"不支持的放置策略: {placement}")
+
+        self.conn = conn
+        self.db_lock = db_lock or threading.RLock()
+        self.placement = placement
+        self.timeout = timeout
+        self.client_factory = client_factory or default_client_factory
+        self.endpoints = {}
+        for item in endpoints or [{"name": "local"}]:
+            endpoint = DockerEndpoint(
+                item["name"],
+                item.get("url"),
+                item.get("exchanges"),
+                item.get("max_containers", 0),
+            )
+            self.endpoints[endpoint.name] = endpoint
+        self.default_name = next(iter(self.endpoints))
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(len(self.endpoints), 1),
+            thread_name_prefix="docker-endpoint",
+        )
+        self._init_db()
+
+    def _init_db(self):
+        """初始化端点分配表"""
+        with self.db_lock:
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS strategy_endpoints (
+                    strategy_id TEXT PRIMARY KEY,
+                    endpoint TEXT,
+                    assigned_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+                """
+            )
+            self.conn.commit()
+
+    def connect(self):
+        """连接所有端点，至少需要一个端点可用
+
+        Raises:
+            RuntimeError: 所有端点均不可用
+        """
+
+        def _connect(endpoint):
+            try:
+                endpoint.client = self.client_factory(endpoint, self.timeout)
+                endpoint.client.ping()
+                endpoint.available = True
+                endpoint.last_error = None
+                logger.info(f"Docker端点{endpoint.name}连接成功")
+            except Exception as e:
+                endpoint.available = False
+                endpoint.last_error = str(e)
+                logger.error(f"Docker端点{endpoint.name}连接失败: {e}")
+
+        list(self._executor.map(_connect, self.endpoints.values()))
+
+        if not any(ep.available for ep in self.endpoints.values()):
+            errors = "; ".join(
+                f"{ep.name}: {ep.last_error}" for ep in self.endpoints.values()
+            )
+            raise RuntimeError(f"Docker连接失败: {errors}")
+
+    @property
+    def default_client(self):
+        """默认端点的客户端（兼容单端点代码）"""
+        endpoint = self.endpoints[self.default_name]
+        if endpoint.available:
+            return endpoint.client
+        for endpoint in self.endpoints.values():
+            if endpoint.available:
+                return endpoint.client
+        return None
+
+    def available_endpoints(self):
+        return [ep for ep in self.endpoints.values() if ep.available]
+
+    def _container_load(self, endpoint):
+        """统计端点上的策略容器数量"""
+        try:
+            return len(
+                endpoint.client.containers.list(
+                    all=True, filters={"name": CONTAINER_PREFIX}
+                )
+            )
+        except Exception as e:
+            logger.warning(f"获取端点{endpoint.name}负载失败: {e}")
+            return None
+
+    def _least_loaded(self, candidates):
+        loads = dict(
+            zip(
+                [ep.name for ep in candidates],
+                self._executor.map(self._container_load, candidates),
+            )
+        )
+        best, best_ratio = None, None
+        for endpoint in candidates:
+            load = loads[endpoint.name]
+            if load is None:
+                continue
+            if endpoint.max_containers and load >= endpoint.max_containers:
+                continue
+            # 按容量比例计算负载，未设置容量的端点按绝对数量比较
+            ratio = load / endpoint.max_containers if endpoint.max_containers else load
+            if best_ratio is None or ratio < best_ratio:
+                best, best_ratio = endpoint, ratio
+        return best
+
+    def place(self, strategy_id, exchange=None):
+        """为策略选择端点并记录分配
+
+        Args:
+            strategy_id: 策略ID
+            exchange: 交易所ID，用于交易所亲和策略
+
+        Returns:
+            DockerEndpoint: 选中的端点
+
+        Raises:
+            RuntimeError: 没有可用端点
+        """
+        candidates = self.available_endpoints()
+        if not candidates:
+            raise RuntimeError("没有可用的Docker端点")
+
+        endpoint = None
+        if self.placement == "exchange_affinity" and exchange:
+            affine = [ep for ep in candidates if exchange in ep.exchanges]
+            if affine:
+                endpoint = self._least_loaded(affine)
+        if endpoint is None:
+            endpoint = self._least_loaded(candidates)
+        if endpoint is None:
+            raise RuntimeError("所有Docker端点均已达到容量上限")
+
+        with self.db_lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO strategy_endpoints (strategy_id, endpoint) VALUES (?, ?)",
+                (strategy_id, endpoint.name),
+            )
+            self.conn.commit()
+        logger.info(f"策略{strategy_id}分配到Docker端点{endpoint.name}")
+        return endpoint
+
+    def endpoint_for(self, strategy_id):
+        """获取策略所在端点，未记录分配的旧策略使用默认端点"""
+        with self.db_lock:
+            row = self.conn.execute(
+                "SELECT endpoint FROM strategy_endpoints WHERE strategy_id = ?",
+                (strategy_id,),
+            ).fetchone()
+        if row and row[0] in self.endpoints:
+            return self.endpoints[row[0]]
+        return self.endpoints[self.default_name]
+
+    def client_for(self, strategy_id):
+        """获取策略所在端点的Docker客户端
+
+        Raises:
+            RuntimeError: 端点不可用
+        """
+        endpoint = self.endpoint_for(strategy_id)
+        if not endpoint.available:
+            raise RuntimeError(f"Docker端点{endpoint.name}不可用: {endpoint.last_error}")
+        return endpoint.client
+
+    def release(self, strategy_id):
+        """删除策略的端点分配"""
+        with self.db_lock:
+            self.conn.execute(
+                "DELETE FROM strategy_endpoints WHERE strategy_id = ?", (strategy_id,)
+            )
+            self.conn.commit()
+
+    def list_containers(self):
+        """并发列出所有端点上的策略容器
+
+        Returns:
+            dict: 容器名 -> (端点名, 容器对象)
+        """
+
+        def _list(endpoint):
+            try:
+                containers = endpoint.client.containers.list(
+                    all=True, filters={"name": CONTAINER_PREFIX}
+                )
+                return endpoint.name, containers
+            except Exception as e:
+                logger.error(f"列出端点{endpoint.name}的容器失败: {e}")
+                return endpoint.name, []
+
+        result = {}
+        for name, containers in self._executor.map(_list, self.available_endpoints()):
+            for container in containers:
+                result[container.name] = (name, container)
+        return result
+
+    def describe(self):
+        """获取端点列表及负载信息"""
+        endpoints = list(self.endpoints.values())
+        loads = self._executor.map(
+            lambda ep: self._container_load(ep) if ep.available else None, endpoints
+        )
+        result = []
+        for endpoint, load in zip(endpoints, loads):
+            info = endpoint.to_dict()
+            info["containers"] = load
+            result.append(info)
+        return result
+
+    def close(self):
+        """关闭所有客户端"""
+        self._executor.shutdown(wait=False)
+        for endpoint in self.endpoints.values():
+            if endpoint.client is not None:
+                try:
+                    endpoint.client.close()
+                except Exception:
+                    pass
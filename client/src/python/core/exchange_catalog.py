@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""交易所能力目录
+
+每个ccxt版本构建一次（只实例化交易所类读取元数据，不发起网络请求），
+缓存到 data/exchange_catalog.json。交易所选择、参数校验和下单路径
+直接查询目录，不再为了了解交易所能力而创建实例或加载市场信息。
+本地模拟交易所等非ccxt交易所通过 register 加入目录（不写入缓存文件）。
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+import ccxt
+from loguru import logger
+
+DEFAULT_CATALOG_PATH = Path("data") / "exchange_catalog.json"
+
+# 目录字段变化时递增，旧缓存自动重建
+CATALOG_FORMAT = 2
+
+# 目录中记录的 has 能力
+CAPABILITIES = (
+    "fetchOHLCV",
+    "fetchTicker",
+    "fetchTickers",
+    "fetchOrderBook",
+    "createOrder",
+    "createOrders",
+    "cancelOrder",
+    "cancelOrders",
+    "editOrder",
+    "fetchOpenOrders",
+    "fetchMyTrades",
+    "fetchBalance",
+)
+
+
+def _describe(exchange):
+    """读取单个交易所实例的元数据"""
+    exchange_id = exchange.id
+    has = exchange.has or {}
+    trading_fees = (exchange.fees or {}).get("trading") or {}
+    urls = exchange.urls or {}
+    www = urls.get("www")
+    return {
+        "id": exchange_id,
+        "name": exchange.name or exchange_id.capitalize(),
+        "countries": exchange.countries or [],
+        "certified": bool(exchange.certified),
+        "pro": bool(exchange.pro),
+        "logo": urls.get("logo"),
+        "www": www[0] if isinstance(www, list) else www,
+        "sandbox": bool(urls.get("test")),
+        "spot": bool(has.get("spot")),
+        "margin": bool(has.get("margin")),
+        "swap": bool(has.get("swap")),
+        "future": bool(has.get("future")),
+        "rate_limit": exchange.rateLimit,
+        # 市场精度的含义（ccxt.TICK_SIZE / DECIMAL_PLACES / SIGNIFICANT_DIGITS）
+        "precision_mode": exchange.precisionMode,
+        "has": {name: bool(has.get(name)) for name in CAPABILITIES},
+        "timeframes": list((exchange.timeframes or {}).keys()),
+        "fees": {
+            "maker": trading_fees.get("maker"),
+            "taker": trading_fees.get("taker"),
+            "percentage": trading_fees.get("percentage", True),
+            "tier_based": bool(trading_fees.get("tierBased")),
+        },
+        # 除 apiKey/secret 外需要的凭证（如 password、uid）
+        "credentials": [
+            name
+            for name, required in (exchange.requiredCredentials or {}).items()
+            if required
+        ],
+    }
+
+
+class ExchangeCatalog:
+    """按ccxt版本缓存的交易所能力目录"""
+
+    def __init__(self, path=None):
+        """初始化目录，磁盘缓存与当前ccxt版本一致时直接加载
+
+        Args:
+            path: 缓存文件路径，默认为 data/exchange_catalog.json
+        """
+        self.path = Path(path) if path else DEFAULT_CATALOG_PATH
+        self._entries = None
+        # 通过 register 加入的交易所
+        self._extra = {}
+        self._lock = threading.Lock()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+            if (
+                cached.get("ccxt_version") == ccxt.__version__
+                and cached.get("format") == CATALOG_FORMAT
+            ):
+                return cached["exchanges"]
+            logger.info(
+                f"交易所目录版本{cached.get('ccxt_version')}与ccxt {ccxt.__version__}不一致，重新构建"
+            )
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"读取交易所目录失败，重新构建: {e}")
+        return None
+
+    def _build(self):
+        started = time.perf_counter()
+        entries = {}
+        for exchange_id in ccxt.exchanges:
+            try:
+                entries[exchange_id] = _describe(getattr(ccxt, exchange_id)())
+            except Exception as e:
+                logger.warning(f"读取{exchange_id}元数据失败: {e}")
+        logger.info(
+            f"已构建交易所目录，共{len(entries)}个交易所，耗时{time.perf_counter() - started:.2f}秒"
+        )
+
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(
+                    {
+                        "ccxt_version": ccxt.__version__,
+                        "format": CATALOG_FORMAT,
+                        "built_at": time.time(),
+                        "exchanges": entries,
+                    },
+                    f,
+                    ensure_ascii=False,
+                )
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.warning(f"保存交易所目录失败: {e}")
+        return entries
+
+    @property
+    def entries(self):
+        """交易所ID -> 能力信息（首次访问时加载或构建）"""
+        if self._entries is None:
+            with self._lock:
+                if self._entries is None:
+                    entries = self._load() or self._build()
+                    entries.update(self._extra)
+                    self._entries = entries
+        return self._entries
+
+    def register(self, exchange):
+        """把ccxt兼容的交易所实例（如本地模拟交易所）加入目录
+
+        Args:
+            exchange: 交易所实例，读取 id、has、precisionMode、fees 等元数据
+        """
+        entry = _describe(exchange)
+        with self._lock:
+            self._extra[exchange.id] = entry
+            if self._entries is not None:
+                self._entries[exchange.id] = entry
+
+    def all(self):
+        """所有交易所的能力信息列表"""
+        return list(self.entries.values())
+
+    def get(self, exchange_id):
+        """获取单个交易所的能力信息，不支持时返回None"""
+        return self.entries.get(exchange_id)
+
+    def supports(self, exchange_id):
+        return exchange_id in self.entries
+
+    def has(self, exchange_id, capability):
+        """交易所是否支持某个ccxt接口（如 createOrders、fetchOHLCV）"""
+        entry = self.entries.get(exchange_id)
+        return bool(entry and entry["has"].get(capability))
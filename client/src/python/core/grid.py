@@ -0,0 +1,323 @@
+# -*- coding: utf-8 -*-
+"""网格模型
+
+策略参数解析、网格价位计算和下单计划（按市场精度取整、最小下单额检查、
+每格数量、所需资金、扣除手续费后的单次往返利润），全部基于NumPy向量化计算。
+创建策略、预览、回测共用同一套模型。
+
+约定：gridCount 为价位数量（含上下限），相邻价位构成一个网格区间；
+amountPerGrid 为每个价位挂单的计价币金额。
+"""
+
+import numpy as np
+
+# ccxt精度模式（取值与 ccxt.TICK_SIZE 等一致，避免回测子进程导入ccxt）
+TICK_SIZE = 4
+DECIMAL_PLACES = 2
+SIGNIFICANT_DIGITS = 3
+
+GRID_TYPES = ("arithmetic", "geometric", "custom")
+
+
+class GridSpec:
+    """网格参数"""
+
+    __slots__ = (
+        "grid_type",
+        "lower_price",
+        "upper_price",
+        "grid_count",
+        "amount_per_grid",
+        "custom_prices",
+    )
+
+    def __init__(
+        self,
+        grid_type,
+        lower_price,
+        upper_price,
+        grid_count,
+        amount_per_grid,
+        custom_prices=None,
+    ):
+        self.grid_type = grid_type
+        self.lower_price = lower_price
+        self.upper_price = upper_price
+        self.grid_count = grid_count
+        self.amount_per_grid = amount_per_grid
+        self.custom_prices = custom_prices
+
+    @classmethod
+    def from_request(cls, data):
+        """从界面提交的策略数据（驼峰字段）解析并校验网格参数
+
+        Raises:
+            ValueError: 参数缺失或格式错误，消息可直接返回给界面
+        """
+        grid_type = data.get("gridType", "arithmetic")
+        if grid_type not in GRID_TYPES:
+            raise ValueError(f"网格类型错误: {grid_type}")
+
+        custom_prices = None
+        if grid_type == "custom":
+            try:
+                custom_prices = sorted(float(p) for p in data.get("customGridPrices") or [])
+            except (TypeError, ValueError):
+                raise ValueError("自定义网格价格格式错误，必须为数值")
+            if len(custom_prices) < 2:
+                raise ValueError("自定义网格至少需要2个价格")
+            if custom_prices[0] <= 0:
+                raise ValueError("价格必须大于0")
+            upper_price, lower_price = custom_prices[-1], custom_prices[0]
+            grid_count = len(custom_prices)
+        else:
+            upper_price = data.get("upperPrice")
+            lower_price = data.get("lowerPrice")
+            if not upper_price:
+                raise ValueError("缺少必要参数：上限价格")
+            if not lower_price:
+                raise ValueError("缺少必要参数：下限价格")
+            try:
+                upper_price = float(upper_price)
+                lower_price = float(lower_price)
+            except (TypeError, ValueError):
+                raise ValueError("价格格式错误，必须为数值")
+            if upper_price <= lower_price:
+                raise ValueError("上限价格必须大于下限价格")
+            if upper_price <= 0 or lower_price <= 0:
+                raise ValueError("价格必须大于0")
+
+            try:
+                grid_count = int(data.get("gridCount", 10))
+            except (TypeError, ValueError):
+                raise ValueError("网格数量格式错误，必须为整数")
+            if grid_count <= 1:
+                raise ValueError("网格数量必须大于1")
+
+        try:
+            amount_per_grid = float(data.get("amountPerGrid", 10))
+        except (TypeError, ValueError):
+            raise ValueError("每格金额格式错误，必须为数值")
+        if amount_per_grid <= 0:
+            raise ValueError("每格金额必须大于0")
+
+        return cls(grid_type, lower_price, upper_price, grid_count, amount_per_grid, custom_prices)
+
+    @classmethod
+    def from_config(cls, config):
+        """从已保存的策略配置（下划线字段）构建"""
+        return cls(
+            config.get("grid_type", "arithmetic"),
+            float(config["lower_price"]),
+            float(config["upper_price"]),
+            int(config.get("grid_count", 10)),
+            float(config.get("amount_per_grid", 10)),
+            config.get("custom_grid_prices"),
+        )
+
+    def to_config(self):
+        """转换为策略配置字段"""
+        config = {
+            "grid_type": self.grid_type,
+            "upper_price": self.upper_price,
+            "lower_price": self.lower_price,
+            "grid_count": self.grid_count,
+            "amount_per_grid": self.amount_per_grid,
+        }
+        if self.custom_prices:
+            config["custom_grid_prices"] = list(self.custom_prices)
+        return config
+
+    def levels(self):
+        """网格价位（升序，未取整）"""
+        if self.grid_type == "custom" and self.custom_prices:
+            return np.asarray(self.custom_prices, dtype=np.float64)
+        return grid_levels(self.lower_price, self.upper_price, self.grid_count, self.grid_type)
+
+
+def grid_levels(lower, upper, count, grid_type="arithmetic"):
+    """计算网格价位
+
+    Args:
+        lower: 下限价格
+        upper: 上限价格
+        count: 价位数量（含上下限）
+        grid_type: arithmetic 等差 / geometric 等比
+
+    Returns:
+        numpy.ndarray: 升序价位
+    """
+    if grid_type == "geometric":
+        return np.geomspace(lower, upper, count)
+    return np.linspace(lower, upper, count)
+
+
+def round_to_precision(values, precision, mode=TICK_SIZE, down=False):
+    """按ccxt市场精度取整
+
+    Args:
+        values: 数组
+        precision: 精度（TICK_SIZE 模式为最小变动单位，DECIMAL_PLACES 为小数位数，
+            SIGNIFICANT_DIGITS 为有效数字位数），None 时不取整
+        mode: ccxt精度模式
+        down: 是否向下取整（数量用向下取整，避免超出可用资金）
+
+    Returns:
+        numpy.ndarray: 取整后的数组
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if precision is None:
+        return values
+    op = np.floor if down else np.round
+    if mode == TICK_SIZE:
+        step = float(precision)
+    elif mode == SIGNIFICANT_DIGITS:
+        magnitude = np.floor(np.log10(np.abs(np.where(values == 0, 1, values))))
+        step = 10.0 ** (magnitude - int(precision) + 1)
+    else:
+        step = 10.0 ** -int(precision)
+    # 加上微小偏移，避免 0.3/0.1 之类的浮点误差导致向下取整少一个单位
+    scaled = values / step
+    result = op(scaled + 1e-9 if down else scaled) * step
+    if np.isscalar(step):
+        # 去掉乘法引入的尾数误差（0.00039000000000000005 -> 0.00039）
+        result = np.round(result, max(int(np.ceil(-np.log10(step))), 0) + 1)
+    return result
+
+
+class GridPlan:
+    """网格下单计划（列式数组）"""
+
+    def __init__(
+        self,
+        spec,
+        prices,
+        quantities,
+        sides,
+        fee_rate,
+        reference_price,
+        min_cost,
+        min_amount,
+    ):
+        self.spec = spec
+        self.prices = prices
+        self.quantities = quantities
+        self.sides = sides
+        self.fee_rate = fee_rate
+        self.reference_price = reference_price
+        self.notional = prices * quantities
+
+        # 区间 i：在价位 i 买入、价位 i+1 卖出同样数量
+        buy_qty = quantities[:-1]
+        gross = buy_qty * (prices[1:] - prices[:-1])
+        self.trip_profit = gross - fee_rate * buy_qty * (prices[1:] + prices[:-1])
+        buy_cost = buy_qty * prices[:-1]
+        self.trip_profit_pct = np.divide(
+            self.trip_profit, buy_cost, out=np.zeros_like(self.trip_profit), where=buy_cost > 0
+        )
+
+        self.below_min = np.zeros(len(prices), dtype=bool)
+        if min_cost:
+            self.below_min |= self.notional < min_cost
+        if min_amount:
+            self.below_min |= quantities < min_amount
+
+        # 参考价以下挂买单需要计价币，以上挂卖单需要预先持有基础币
+        self.quote_required = float(self.notional[sides == 1].sum())
+        self.base_required = float(quantities[sides == -1].sum())
+        self.capital_required = self.quote_required + self.base_required * reference_price
+
+        # errors 会导致交易所拒单，warnings 只提示
+        self.errors = []
+        self.warnings = []
+        if np.any(prices <= 0):
+            self.errors.append("价格按精度取整后为0")
+        if len(prices) > 1 and np.any(np.diff(prices) <= 0):
+            self.errors.append("网格间距小于价格精度，取整后存在重复价位")
+        if np.any(quantities <= 0):
+            self.errors.append("每格金额过小，按数量精度取整后为0")
+        if self.below_min.any():
+            self.errors.append(
+                f"{int(self.below_min.sum())}个价位的下单额低于交易所最小下单额"
+                + (f"{min_cost}" if min_cost else "")
+            )
+        if np.any(self.trip_profit <= 0):
+            self.warnings.append("部分网格间距不足以覆盖手续费，单次往返利润为负")
+
+    @property
+    def valid(self):
+        return not self.errors
+
+    def to_dict(self):
+        """转换为列式结果"""
+        has_trips = len(self.trip_profit_pct) > 0
+        sides = np.where(self.sides == 1, "buy", np.where(self.sides == -1, "sell", "none"))
+        return {
+            "valid": self.valid,
+            "errors": self.errors,
+            "warnings": self.warnings,
+            "level_count": int(len(self.prices)),
+            "reference_price": self.reference_price,
+            "fee_rate": self.fee_rate,
+            "quote_required": self.quote_required,
+            "base_required": self.base_required,
+            "capital_required": self.capital_required,
+            "min_trip_profit_pct": float(self.trip_profit_pct.min()) if has_trips else 0.0,
+            "max_trip_profit_pct": float(self.trip_profit_pct.max()) if has_trips else 0.0,
+            "levels": {
+                "price": self.prices.tolist(),
+                "quantity": self.quantities.tolist(),
+                "notional": self.notional.tolist(),
+                "side": sides.tolist(),
+                "below_min": self.below_min.tolist(),
+            },
+            "trips": {
+                "profit": self.trip_profit.tolist(),
+                "profit_pct": self.trip_profit_pct.tolist(),
+            },
+        }
+
+
+def plan_grid(
+    spec, market=None, precision_mode=TICK_SIZE, fee_rate=None, reference_price=None
+):
+    """计算网格下单计划
+
+    Args:
+        spec: GridSpec
+        market: ccxt市场信息（用于精度、最小下单额和手续费），None 时不取整
+        precision_mode: 交易所精度模式
+        fee_rate: 手续费率，默认取市场的 maker 费率
+        reference_price: 参考价（当前价），决定各价位挂买单还是卖单，默认为区间中点
+
+    Returns:
+        GridPlan: 下单计划
+    """
+    market = market or {}
+    precision = market.get("precision") or {}
+    limits = market.get("limits") or {}
+    if fee_rate is None:
+        fee_rate = market.get("maker") or 0.001
+    if not reference_price:
+        reference_price = (spec.lower_price + spec.upper_price) / 2
+
+    prices = round_to_precision(spec.levels(), precision.get("price"), precision_mode)
+    raw_quantities = np.divide(
+        spec.amount_per_grid, prices, out=np.zeros_like(prices), where=prices > 0
+    )
+    quantities = round_to_precision(
+        raw_quantities, precision.get("amount"), precision_mode, down=True
+    )
+    # 参考价以下挂买单，以上挂卖单，与参考价相等的价位不挂单
+    sides = np.sign(reference_price - prices).astype(np.int8)
+
+    return GridPlan(
+        spec,
+        prices,
+        quantities,
+        sides,
+        float(fee_rate),
+        float(reference_price),
+        (limits.get("cost") or {}).get("min"),
+        (limits.get("amount") or {}).get("min"),
+    )
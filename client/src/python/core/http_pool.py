@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+"""共享HTTP传输层
+
+按用途（交易所ID、探测等）复用长连接的 requests 会话，注入到所有同步ccxt实例，
+避免每个临时实例重新建立TCP/TLS连接；共享会话新建连接时使用带TTL的DNS缓存
+（只作用于本传输层的连接池，不影响Docker SDK、aiohttp等其他库的解析）。
+统计每个会话的连接复用率和建连（TCP+TLS握手）耗时。
+"""
+
+import socket
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+from urllib3.util.connection import allowed_gai_family
+from loguru import logger
+
+
+class _Metrics:
+    """单个会话的连接统计"""
+
+    __slots__ = ("requests", "connections", "connect_seconds", "lock")
+
+    def __init__(self):
+        self.requests = 0
+        self.connections = 0
+        self.connect_seconds = 0.0
+        self.lock = threading.Lock()
+
+    def record_request(self):
+        with self.lock:
+            self.requests += 1
+
+    def record_connect(self, seconds):
+        with self.lock:
+            self.connections += 1
+            self.connect_seconds += seconds
+
+    def snapshot(self):
+        with self.lock:
+            reused = max(self.requests - self.connections, 0)
+            return {
+                "requests": self.requests,
+                "connections": self.connections,
+                "reuse_ratio": round(reused / self.requests, 4) if self.requests else 0.0,
+                "avg_handshake_ms": round(self.connect_seconds * 1000 / self.connections, 2)
+                if self.connections
+                else 0.0,
+            }
+
+
+def _open_socket(connection, dns):
+    """按DNS缓存的解析结果依次尝试建立TCP连接（对应 urllib3 create_connection）"""
+    host = connection._dns_host.strip("[]")
+    timeout = connection.timeout
+    err = None
+    try:
+        addresses = dns.getaddrinfo(
+            host, connection.port, allowed_gai_family(), socket.SOCK_STREAM
+        )
+    except socket.gaierror as e:
+        raise NewConnectionError(connection, f"Failed to resolve {host}: {e}") from e
+    for family, socktype, proto, _, address in addresses:
+        sock = None
+        try:
+            sock = socket.socket(family, socktype, proto)
+            for option in connection.socket_options or []:
+                sock.setsockopt(*option)
+            if timeout is None or isinstance(timeout, (int, float)):
+                sock.settimeout(timeout)
+            if connection.source_address:
+                sock.bind(connection.source_address)
+            sock.connect(address)
+            return sock
+        except socket.timeout as e:
+            err = ConnectTimeoutError(
+                connection,
+                f"Connection to {connection.host} timed out. (connect timeout={timeout})",
+            )
+            err.__cause__ = e
+        except OSError as e:
+            err = NewConnectionError(connection, f"Failed to establish a new connection: {e}")
+            err.__cause__ = e
+        if sock is not None:
+            sock.close()
+    raise err or NewConnectionError(connection, "getaddrinfo returns an empty list")
+
+
+def _metered_pool_classes(metrics, dns):
+    """生成记录建连耗时、使用DNS缓存的连接池类"""
+
+    class MeteredHTTPConnection(HTTPConnection):
+        def _new_conn(self):
+            return _open_socket(self, dns)
+
+        def connect(self):
+            started = time.perf_counter()
+            super().connect()
+            metrics.record_connect(time.perf_counter() - started)
+
+    class MeteredHTTPSConnection(HTTPSConnection):
+        def _new_conn(self):
+            return _open_socket(self, dns)
+
+        def connect(self):
+            started = time.perf_counter()
+            super().connect()
+            metrics.record_connect(time.perf_counter() - started)
+
+    class MeteredHTTPConnectionPool(HTTPConnectionPool):
+        ConnectionCls = MeteredHTTPConnection
+
+    class MeteredHTTPSConnectionPool(HTTPSConnectionPool):
+        ConnectionCls = MeteredHTTPSConnection
+
+    return {"http": MeteredHTTPConnectionPool, "https": MeteredHTTPSConnectionPool}
+
+
+class _MeteredAdapter(HTTPAdapter):
+    """统计请求数和新建连接的适配器"""
+
+    def __init__(self, metrics, dns, **kwargs):
+        self.metrics = metrics
+        self.dns = dns
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = _metered_pool_classes(self.metrics, self.dns)
+
+    def send(self, request, *args, **kwargs):
+        self.metrics.record_request()
+        return super().send(request, *args, **kwargs)
+
+
+class PooledSession(requests.Session):
+    """共享会话
+
+    ccxt实例在 close()/__del__ 时会关闭自己的会话，共享会话忽略这些调用，
+    连接池只在传输层关闭时释放。
+    """
+
+    def close(self):
+        pass
+
+    def _shutdown(self):
+        super().close()
+
+
+class DnsCache:
+    """带TTL的 getaddrinfo 缓存（供共享会话的连接使用），解析失败时使用过期结果"""
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def getaddrinfo(self, host, port, *args, **kwargs):
+        if self.ttl <= 0:
+            return socket.getaddrinfo(host, port, *args, **kwargs)
+        key = (host, port, args, tuple(sorted(kwargs.items())))
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry and now < entry[1]:
+            self.hits += 1
+            return entry[0]
+        self.misses += 1
+        try:
+            result = socket.getaddrinfo(host, port, *args, **kwargs)
+        except socket.gaierror:
+            if entry:
+                logger.warning(f"DNS解析{host}失败，使用缓存结果")
+                return entry[0]
+            raise
+        with self._lock:
+            self._entries[key] = (result, now + self.ttl)
+        return result
+
+    def stats(self):
+        with self._lock:
+            entries = len(self._entries)
+        return {"ttl": self.ttl, "entries": entries, "hits": self.hits, "misses": self.misses}
+
+
+class HttpTransport:
+    """共享HTTP传输层"""
+
+    def __init__(self, pool_connections=10, pool_maxsize=20, dns_ttl=300):
+        """初始化传输层
+
+        Args:
+            pool_connections: 每个会话缓存的主机连接池数量
+            pool_maxsize: 每个主机连接池保留的长连接数量
+            dns_ttl: DNS缓存时间（秒），0为不缓存
+        """
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.dns = DnsCache(dns_ttl)
+        self._sessions = {}
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def session(self, name):
+        """获取（或创建）指定用途的共享会话
+
+        Args:
+            name: 会话名称，交易所使用交易所ID，其他用途如 probe、registry
+
+        Returns:
+            PooledSession: 长连接会话
+        """
+        session = self._sessions.get(name)
+        if session is not None:
+            return session
+        with self._lock:
+            session = self._sessions.get(name)
+            if session is None:
+                metrics = self._metrics[name] = _Metrics()
+                session = PooledSession()
+                for prefix in ("https://", "http://"):
+                    session.mount(
+                        prefix,
+                        _MeteredAdapter(
+                            metrics,
+                            self.dns,
+                            pool_connections=self.pool_connections,
+                            pool_maxsize=self.pool_maxsize,
+                        ),
+                    )
+                self._sessions[name] = session
+        return session
+
+    def get(self, url, name="probe", **kwargs):
+        """通过共享会话发起GET请求（用于连通性检查等探测）"""
+        return self.session(name).get(url, **kwargs)
+
+    def stats(self):
+        """获取连接复用统计
+
+        Returns:
+            dict: {sessions: 会话名称 -> 统计, dns: DNS缓存统计}
+        """
+        return {
+            "sessions": {name: metrics.snapshot() for name, metrics in list(self._metrics.items())},
+            "dns": self.dns.stats(),
+        }
+
+    def close(self):
+        """关闭所有会话的连接池"""
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            session._shutdown()
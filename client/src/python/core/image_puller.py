@@ -0,0 +1,441 @@
+# -*- coding: utf-8 -*-
+"""Hummingbot镜像拉取
+
+使用Docker低级API的流式拉取接口逐层汇报进度，拉取完成后固定镜像摘要，
+创建容器时使用 repository@sha256:... 引用，避免重复解析 :latest。
+"""
+
+import socket
+import threading
+import time
+
+from docker import auth
+from docker import errors as docker_errors
+from loguru import logger
+
+from core.mirror_racer import DIRECT, mirror_host
+
+# 可重试的网络错误关键字
+RETRYABLE_ERRORS = (
+    "connection",
+    "timeout",
+    "forcibly closed",
+    "reset",
+    "eof",
+    "tls",
+    "stalled",
+)
+
+
+class PullStalled(Exception):
+    """拉取在规定时间内没有任何进度"""
+
+
+def _abort(response):
+    """中断拉取连接
+
+    只调用 response.close() 不能打断另一个线程中阻塞的读取，先关闭底层socket，
+    让读取线程立即返回。
+    """
+    try:
+        response.raw._fp.fp.raw._sock.shutdown(socket.SHUT_RDWR)
+    except Exception as e:
+        logger.debug(f"关闭拉取连接的socket失败: {e}")
+    response.close()
+
+
+class PullJob:
+    """单个端点上的一次镜像拉取任务"""
+
+    def __init__(self, endpoint_name, repository, tag):
+        self.endpoint_name = endpoint_name
+        self.repository = repository
+        self.tag = tag
+        self.status = "pending"
+        self.layers = {}
+        self.attempt = 0
+        self.error = None
+        self.digest = None
+        self.mirror = None
+        self.started_at = time.time()
+        self.last_progress = time.time()
+        self.done = threading.Event()
+
+    @property
+    def reference(self):
+        return f"{self.repository}:{self.tag}"
+
+    def progress(self):
+        """汇总各层进度
+
+        Returns:
+            dict: 进度信息
+        """
+        current = sum(layer["current"] for layer in self.layers.values())
+        total = sum(layer["total"] for layer in self.layers.values())
+        finished = sum(
+            1
+            for layer in self.layers.values()
+            if layer["status"] in ("Pull complete", "Already exists")
+        )
+        return {
+            "endpoint": self.endpoint_name,
+            "image": self.reference,
+            "status": self.status,
+            "attempt": self.attempt,
+            "layers_total": len(self.layers),
+            "layers_done": finished,
+            "bytes_current": current,
+            "bytes_total": total,
+            "percent": round(current * 100.0 / total, 1) if total else None,
+            "digest": self.digest,
+            "mirror": self.mirror,
+            "error": self.error,
+        }
+
+
+class ImagePuller:
+    """镜像拉取子系统"""
+
+    def __init__(
+        self,
+        endpoints,
+        conn,
+        db_lock,
+        notify=None,
+        max_retries=3,
+        retry_delay=2,
+        progress_interval=0.5,
+        racer=None,
+        stall_timeout=60,
+    ):
+        """初始化镜像拉取器
+
+        Args:
+            endpoints: DockerEndpointPool 实例
+            conn: SQLite连接
+            db_lock: 数据库锁
+            notify: 进度回调 (event, data)，IPC模式下推送给Electron
+            max_retries: 最大重试次数
+            retry_delay: 初始重试延迟（秒），指数退避
+            progress_interval: 进度推送最小间隔（秒）
+            racer: MirrorRacer 实例（可选），配置后从最快的镜像源拉取
+            stall_timeout: 无任何进度超过该时间（秒）视为停滞，切换镜像源
+        """
+        self.endpoints = endpoints
+        self.conn = conn
+        self.db_lock = db_lock
+        self.notify = notify
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.progress_interval = progress_interval
+        self.racer = racer
+        self.stall_timeout = stall_timeout
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._init_db()
+
+    def _init_db(self):
+        """初始化镜像摘要表"""
+        with self.db_lock:
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS image_pins (
+                    repository TEXT,
+                    tag TEXT,
+                    digest TEXT,
+                    image_id TEXT,
+                    pinned_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (repository, tag)
+                )
+                """
+            )
+            self.conn.commit()
+
+    def _emit(self, job):
+        if self.notify:
+            try:
+                self.notify("image_pull_progress", job.progress())
+            except Exception as e:
+                logger.debug(f"推送拉取进度失败: {e}")
+
+    def get_pin(self, repository, tag):
+        """获取已固定的镜像摘要
+
+        Returns:
+            (str, str): (仓库摘要, 镜像ID)，未固定时为 (None, None)
+        """
+        with self.db_lock:
+            row = self.conn.execute(
+                "SELECT digest, image_id FROM image_pins WHERE repository = ? AND tag = ?",
+                (repository, tag),
+            ).fetchone()
+        return (row[0], row[1]) if row else (None, None)
+
+    def _pin(self, client, repository, tag):
+        """读取本地镜像的仓库摘要并固定"""
+        image = client.images.get(f"{repository}:{tag}")
+        digest = None
+        for repo_digest in image.attrs.get("RepoDigests", []):
+            name, _, value = repo_digest.partition("@")
+            if name == repository or name.endswith("/" + repository):
+                digest = value
+                break
+        if not digest:
+            return None
+        with self.db_lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO image_pins (repository, tag, digest, image_id) VALUES (?, ?, ?, ?)",
+                (repository, tag, digest, image.attrs.get("Id")),
+            )
+            self.conn.commit()
+        logger.info(f"镜像{repository}:{tag}已固定为{digest}")
+        return digest
+
+    def resolve(self, client, repository, tag):
+        """解析可用于创建容器的镜像引用
+
+        优先使用已固定的摘要，从镜像源拉取的镜像摘要记录在镜像源仓库名下，
+        此时使用固定的镜像ID；端点上没有固定的镜像但有标签镜像时，固定当前标签镜像。
+
+        Args:
+            client: Docker客户端
+            repository: 镜像仓库
+            tag: 镜像标签
+
+        Returns:
+            str: 镜像引用，端点上不存在该镜像时返回None
+        """
+        digest, image_id = self.get_pin(repository, tag)
+        if digest:
+            try:
+                client.images.get(f"{repository}@{digest}")
+                return f"{repository}@{digest}"
+            except docker_errors.ImageNotFound:
+                pass
+        if image_id:
+            try:
+                client.images.get(image_id)
+                return image_id
+            except docker_errors.ImageNotFound:
+                pass
+        try:
+            client.images.get(f"{repository}:{tag}")
+        except docker_errors.ImageNotFound:
+            return None
+        if digest:
+            # 端点上的标签镜像与固定摘要不一致，保持使用标签以免创建失败
+            return f"{repository}:{tag}"
+        digest = self._pin(client, repository, tag)
+        return f"{repository}@{digest}" if digest else f"{repository}:{tag}"
+
+    @staticmethod
+    def _open_stream(client, reference, tag):
+        """打开拉取事件流
+
+        直接发起 /images/create 请求以便在停滞时关闭底层连接。
+
+        Returns:
+            (Response, generator): (HTTP响应, 解码后的事件流)
+        """
+        api = client.api
+        headers = {}
+        registry, _ = auth.resolve_repository_name(reference)
+        header = auth.get_config_header(api, registry)
+        if header:
+            headers["X-Registry-Auth"] = header
+        response = api._post(
+            api._url("/images/create"),
+            params={"fromImage": reference, "tag": tag},
+            headers=headers,
+            stream=True,
+            timeout=None,
+        )
+        api._raise_for_status(response)
+        return response, api._stream_helper(response, decode=True)
+
+    def _consume(self, job, stream):
+        """消费拉取事件流，逐层记录进度"""
+        last_emit = 0.0
+        for event in stream:
+            if "error" in event:
+                raise docker_errors.APIError(event["error"])
+            layer_id = event.get("id")
+            status = event.get("status", "")
+            if layer_id and layer_id != job.tag:
+                layer = job.layers.setdefault(
+                    layer_id, {"status": "", "current": 0, "total": 0}
+                )
+                if status != layer["status"] or status == "Downloading":
+                    job.last_progress = time.time()
+                layer["status"] = status
+                detail = event.get("progressDetail") or {}
+                if status == "Downloading" and detail.get("total"):
+                    layer["current"] = detail.get("current", 0)
+                    layer["total"] = detail["total"]
+                elif status in ("Download complete", "Pull complete", "Already exists"):
+                    layer["current"] = layer["total"]
+            now = time.time()
+            if now - last_emit >= self.progress_interval:
+                last_emit = now
+                self._emit(job)
+
+    def _pull_from(self, job, client, mirror):
+        """从指定镜像源拉取一次，停滞时关闭连接并抛出 PullStalled"""
+        host = mirror_host(mirror) if mirror else None
+        reference = f"{host}/{job.repository}" if host else job.repository
+        response, stream = self._open_stream(client, reference, job.tag)
+
+        job.last_progress = time.time()
+        finished = threading.Event()
+        stalled = threading.Event()
+
+        def _watchdog():
+            while not finished.wait(1):
+                if time.time() - job.last_progress > self.stall_timeout:
+                    stalled.set()
+                    _abort(response)
+                    return
+
+        watchdog = threading.Thread(target=_watchdog, daemon=True)
+        watchdog.start()
+        started = time.time()
+        try:
+            self._consume(job, stream)
+        except Exception:
+            if stalled.is_set():
+                raise PullStalled(f"镜像源{mirror or DIRECT}超过{self.stall_timeout}秒无进度(stalled)")
+            raise
+        finally:
+            finished.set()
+        if stalled.is_set():
+            raise PullStalled(f"镜像源{mirror or DIRECT}超过{self.stall_timeout}秒无进度(stalled)")
+
+        # 从镜像源拉取的镜像需要打上原始仓库标签
+        if host:
+            client.images.get(f"{reference}:{job.tag}").tag(job.repository, job.tag)
+        elapsed = time.time() - started
+        downloaded = sum(
+            layer["total"]
+            for layer in job.layers.values()
+            if layer["status"] != "Already exists"
+        )
+        return downloaded / elapsed if elapsed > 0 and downloaded else None
+
+    def _run(self, job, client):
+        """执行拉取任务（带重试）
+
+        失败后重试时Docker守护进程会复用已下载完成的层，只拉取缺失部分；
+        配置了镜像源时按探测结果依次尝试，停滞或网络错误时切换到下一个镜像源。
+        """
+        candidates = [None]
+        if self.racer:
+            try:
+                job.status = "probing"
+                self._emit(job)
+                candidates = self.racer.rank(job.repository, job.tag)
+            except Exception as e:
+                logger.warning(f"镜像源探测失败，使用默认源: {e}")
+
+        delay = self.retry_delay
+        for attempt in range(1, self.max_retries + 1):
+            mirror = candidates[(attempt - 1) % len(candidates)]
+            job.attempt = attempt
+            job.mirror = mirror
+            job.status = "pulling"
+            job.error = None
+            try:
+                logger.info(
+                    f"正在拉取镜像 {job.reference}（端点{job.endpoint_name}，"
+                    f"镜像源{mirror or '默认'}），尝试 {attempt}/{self.max_retries}"
+                )
+                throughput = self._pull_from(job, client, mirror)
+                if self.racer and mirror:
+                    self.racer.record_pull(mirror, throughput)
+                job.digest = self._pin(client, job.repository, job.tag)
+                job.status = "done"
+                logger.info(f"成功拉取镜像{job.reference}")
+                break
+            except Exception as e:
+                job.error = str(e)
+                if self.racer and mirror:
+                    self.racer.record_failure(mirror, stalled=isinstance(e, PullStalled))
+                retryable = any(key in str(e).lower() for key in RETRYABLE_ERRORS)
+                if not retryable or attempt == self.max_retries:
+                    job.status = "failed"
+                    logger.error(f"拉取镜像{job.reference}失败: {e}")
+                    break
+                job.status = "retrying"
+                # 切换镜像源时无需等待
+                wait = 0 if len(candidates) > 1 else delay
+                logger.warning(f"拉取镜像{job.reference}出错，{wait}秒后重试: {e}")
+                self._emit(job)
+                time.sleep(wait)
+                delay *= 2
+        self._emit(job)
+        job.done.set()
+
+    def start_pull(self, endpoint, repository, tag):
+        """在后台启动拉取任务，同一端点同一镜像只会有一个进行中的任务
+
+        Args:
+            endpoint: Docker端点
+            repository: 镜像仓库
+            tag: 镜像标签
+
+        Returns:
+            PullJob: 拉取任务
+        """
+        key = (endpoint.name, repository, tag)
+        with self._lock:
+            job = self._jobs.get(key)
+            if job and not job.done.is_set():
+                return job
+            job = PullJob(endpoint.name, repository, tag)
+            self._jobs[key] = job
+        thread = threading.Thread(
+            target=self._run,
+            args=(job, endpoint.client),
+            name=f"image-pull-{endpoint.name}",
+            daemon=True,
+        )
+        thread.start()
+        return job
+
+    def ensure(self, endpoint, repository, tag, timeout=0):
+        """确保端点上存在镜像，不存在则启动拉取并最多等待timeout秒
+
+        Args:
+            endpoint: Docker端点
+            repository: 镜像仓库
+            tag: 镜像标签
+            timeout: 等待时间（秒），0为不等待（进度通过 image_pull_progress 推送），None表示一直等待
+
+        Returns:
+            (str, PullJob): (镜像引用，不可用时为None, 拉取任务，镜像已存在时为None)
+        """
+        reference = self.resolve(endpoint.client, repository, tag)
+        if reference:
+            return reference, None
+        job = self.start_pull(endpoint, repository, tag)
+        job.done.wait(timeout)
+        if job.status == "done":
+            return self.resolve(endpoint.client, repository, tag), job
+        return None, job
+
+    def prepull(self, repository, tags):
+        """启动后在后台为所有可用端点预拉取配置的镜像标签"""
+        for endpoint in self.endpoints.available_endpoints():
+            for tag in tags:
+                try:
+                    if self.resolve(endpoint.client, repository, tag):
+                        continue
+                    self.start_pull(endpoint, repository, tag)
+                except Exception as e:
+                    logger.error(f"预拉取镜像{repository}:{tag}失败: {e}")
+
+    def get_jobs(self):
+        """获取所有拉取任务的进度"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [job.progress() for job in jobs]
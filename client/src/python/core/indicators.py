@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+"""技术指标
+
+每个指标有两种形式：
+- 流式对象（EMA、ATR、RSI、Bollinger）：__slots__ 紧凑状态，每次更新 O(1)，
+  适合在每个行情推送时同时维护成千上万个 交易对×指标；
+- 批量函数（ema、atr、rsi、bollinger）：对历史数组向量化计算，供回测使用。
+
+两种形式的初始化方式和递推公式一致，结果在浮点误差范围内相同；
+预热期（数据不足一个周期）的输出为 NaN。
+"""
+
+import math
+
+import numpy as np
+
+# 批量递推时的分块长度，块内用下三角权重矩阵一次算完
+_BLOCK = 64
+
+
+def _recursive(values, alpha, initial):
+    """批量计算 y[t] = (1-alpha)*y[t-1] + alpha*x[t]，y[-1] = initial
+
+    分块后块内展开为加权和（权重都不大于1，数值稳定），块间只递推块末的值。
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    if n == 0:
+        return values.copy()
+    decay = 1.0 - alpha
+    blocks = -(-n // _BLOCK)
+    padded = np.zeros(blocks * _BLOCK)
+    padded[:n] = values
+    steps = np.arange(_BLOCK)
+    lag = steps[:, None] - steps[None, :]
+    weights = np.where(lag >= 0, alpha * decay ** np.maximum(lag, 0), 0.0)
+    partial = padded.reshape(blocks, _BLOCK) @ weights.T
+    carry_decay = decay ** (steps + 1)
+
+    result = np.empty_like(partial)
+    carry = initial
+    for k in range(blocks):
+        result[k] = partial[k] + carry_decay * carry
+        carry = result[k, -1]
+    return result.ravel()[:n]
+
+
+class EMA:
+    """指数移动平均（以前 period 个值的简单平均作为初值）"""
+
+    __slots__ = ("period", "alpha", "value", "_count", "_sum")
+
+    def __init__(self, period, alpha=None):
+        self.period = period
+        self.alpha = alpha if alpha is not None else 2.0 / (period + 1)
+        self.value = math.nan
+        self._count = 0
+        self._sum = 0.0
+
+    @property
+    def ready(self):
+        return self._count >= self.period
+
+    def update(self, x):
+        if self._count >= self.period:
+            self.value += self.alpha * (x - self.value)
+        else:
+            self._count += 1
+            self._sum += x
+            if self._count == self.period:
+                self.value = self._sum / self.period
+        return self.value
+
+
+def ema(values, period, alpha=None):
+    """批量指数移动平均，与 EMA 逐个更新的结果一致"""
+    values = np.asarray(values, dtype=np.float64)
+    alpha = alpha if alpha is not None else 2.0 / (period + 1)
+    result = np.full(len(values), np.nan)
+    if len(values) < period:
+        return result
+    seed = math.fsum(values[:period]) / period
+    result[period - 1] = seed
+    result[period:] = _recursive(values[period:], alpha, seed)
+    return result
+
+
+class ATR:
+    """平均真实波幅（Wilder 平滑，alpha = 1/period）"""
+
+    __slots__ = ("value", "_previous", "_average")
+
+    def __init__(self, period=14):
+        self._previous = math.nan
+        self._average = EMA(period, 1.0 / period)
+        self.value = math.nan
+
+    @property
+    def ready(self):
+        return self._average.ready
+
+    def update(self, high, low, close):
+        previous = self._previous
+        if previous != previous:
+            true_range = high - low
+        else:
+            true_range = max(high, previous) - min(low, previous)
+        self._previous = close
+        self.value = self._average.update(true_range)
+        return self.value
+
+
+def true_range(high, low, close):
+    """批量真实波幅，第一根K线为最高价减最低价"""
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+    previous = np.empty_like(close)
+    previous[0] = np.nan
+    previous[1:] = close[:-1]
+    return np.fmax(high, previous) - np.fmin(low, previous)
+
+
+def atr(high, low, close, period=14):
+    """批量平均真实波幅，与 ATR 逐根更新的结果一致"""
+    if len(close) == 0:
+        return np.empty(0)
+    return ema(true_range(high, low, close), period, 1.0 / period)
+
+
+class RSI:
+    """相对强弱指数（Wilder 平滑）"""
+
+    __slots__ = ("value", "_previous", "_gain", "_loss")
+
+    def __init__(self, period=14):
+        self._previous = math.nan
+        self._gain = EMA(period, 1.0 / period)
+        self._loss = EMA(period, 1.0 / period)
+        self.value = math.nan
+
+    @property
+    def ready(self):
+        return self._gain.ready
+
+    def update(self, close):
+        previous = self._previous
+        self._previous = close
+        if previous != previous:
+            return self.value
+        change = close - previous
+        gain = self._gain.update(change if change > 0 else 0.0)
+        loss = self._loss.update(-change if change < 0 else 0.0)
+        if gain == gain:
+            self.value = _rsi_value(gain, loss)
+        return self.value
+
+
+def _rsi_value(gain, loss):
+    if loss == 0:
+        return 100.0 if gain > 0 else 50.0
+    return 100.0 - 100.0 / (1.0 + gain / loss)
+
+
+def rsi(close, period=14):
+    """批量相对强弱指数，与 RSI 逐个更新的结果一致"""
+    close = np.asarray(close, dtype=np.float64)
+    result = np.full(len(close), np.nan)
+    if len(close) < 2:
+        return result
+    change = np.diff(close)
+    gain = ema(np.maximum(change, 0.0), period, 1.0 / period)
+    loss = ema(np.maximum(-change, 0.0), period, 1.0 / period)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        value = 100.0 - 100.0 / (1.0 + gain / loss)
+    value = np.where(loss == 0, np.where(gain > 0, 100.0, 50.0), value)
+    value[np.isnan(gain)] = np.nan
+    result[1:] = value
+    return result
+
+
+class Bollinger:
+    """布林带（简单移动平均 ± k 倍总体标准差）
+
+    环形缓冲区保存最近 period 个值，窗口和与平方和增量维护；
+    每满一轮按缓冲区重新求和，避免长期累积误差。
+    """
+
+    __slots__ = (
+        "period",
+        "k",
+        "middle",
+        "upper",
+        "lower",
+        "_buffer",
+        "_index",
+        "_count",
+        "_shift",
+        "_sum",
+        "_sumsq",
+    )
+
+    def __init__(self, period=20, k=2.0):
+        self.period = period
+        self.k = k
+        self.middle = self.upper = self.lower = math.nan
+        self._buffer = [0.0] * period
+        self._index = 0
+        self._count = 0
+        self._shift = 0.0
+        self._sum = 0.0
+        self._sumsq = 0.0
+
+    @property
+    def ready(self):
+        return self._count >= self.period
+
+    def update(self, x):
+        period = self.period
+        if self._count == 0:
+            # 以第一个值为偏移量累加，减小大数平方和的舍入误差
+            self._shift = x
+        d = x - self._shift
+        if self._count >= period:
+            old = self._buffer[self._index] - self._shift
+            self._sum += d - old
+            self._sumsq += d * d - old * old
+        else:
+            self._sum += d
+            self._sumsq += d * d
+            self._count += 1
+        self._buffer[self._index] = x
+        self._index += 1
+        if self._index == period:
+            self._index = 0
+            if self._count >= period:
+                self._shift = math.fsum(self._buffer) / period
+                shifted = [v - self._shift for v in self._buffer]
+                self._sum = math.fsum(shifted)
+                self._sumsq = math.fsum(v * v for v in shifted)
+
+        if self._count >= period:
+            mean = self._sum / period
+            std = math.sqrt(max(self._sumsq / period - mean * mean, 0.0))
+            self.middle = mean + self._shift
+            self.upper = self.middle + self.k * std
+            self.lower = self.middle - self.k * std
+        return self.middle, self.upper, self.lower
+
+
+def bollinger(values, period=20, k=2.0):
+    """批量布林带，与 Bollinger 逐个更新的结果一致
+
+    Returns:
+        (numpy.ndarray, numpy.ndarray, numpy.ndarray): (中轨, 上轨, 下轨)
+    """
+    values = np.asarray(values, dtype=np.float64)
+    middle = np.full(len(values), np.nan)
+    std = np.full(len(values), np.nan)
+    if len(values) >= period:
+        windows = np.lib.stride_tricks.sliding_window_view(values, period)
+        middle[period - 1 :] = windows.mean(axis=1)
+        std[period - 1 :] = windows.std(axis=1)
+    return middle, middle + k * std, middle - k * std
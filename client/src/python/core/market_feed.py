@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""行情缓存
+
+后台线程按交易所批量轮询订阅交易对的最新价格并缓存，
+价格更新时通知监听者（如区间外自动暂停控制器）。
+"""
+
+import threading
+import time
+from collections import defaultdict
+
+from loguru import logger
+
+
+def to_ccxt_symbol(pair):
+    """策略交易对格式（BTC-USDT）转换为ccxt格式（BTC/USDT）"""
+    return pair.replace("-", "/")
+
+
+class MarketFeed:
+    """按交易所批量轮询的行情缓存"""
+
+    def __init__(self, exchange_factory, interval=10):
+        """初始化行情缓存
+
+        Args:
+            exchange_factory: 交易所工厂函数 exchange_id -> ccxt实例
+            interval: 轮询间隔（秒）
+        """
+        self.exchange_factory = exchange_factory
+        self.interval = interval
+        self._exchanges = {}
+        self._subscriptions = {}
+        self._prices = {}
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def set_subscriptions(self, owner, subscriptions):
+        """整体替换某个订阅者的订阅列表
+
+        Args:
+            owner: 订阅者名称，不同订阅者的订阅取并集
+            subscriptions: 可迭代的 (exchange_id, symbol)
+        """
+        with self._lock:
+            self._subscriptions[owner] = set(subscriptions)
+
+    def _grouped_subscriptions(self):
+        """按交易所分组所有订阅者的交易对"""
+        grouped = defaultdict(set)
+        with self._lock:
+            for subscriptions in self._subscriptions.values():
+                for exchange_id, symbol in subscriptions:
+                    grouped[exchange_id].add(symbol)
+        return grouped
+
+    def add_listener(self, listener):
+        """添加价格监听者 listener(exchange_id, symbol, price, timestamp)"""
+        self._listeners.append(listener)
+
+    def get_price(self, exchange_id, symbol, max_age=None):
+        """获取缓存价格
+
+        Args:
+            exchange_id: 交易所ID
+            symbol: ccxt格式交易对
+            max_age: 最大缓存时间（秒），超过则视为无效
+
+        Returns:
+            (float, float): (价格, 时间戳)，不存在时返回None
+        """
+        cached = self._prices.get((exchange_id, symbol))
+        if cached and max_age is not None and time.time() - cached[1] > max_age:
+            return None
+        return cached
+
+    def start(self):
+        """启动轮询线程"""
+        self._thread = threading.Thread(
+            target=self._run, name="market-feed", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+
+    def _exchange(self, exchange_id):
+        exchange = self._exchanges.get(exchange_id)
+        if exchange is None:
+            exchange = self._exchanges[exchange_id] = self.exchange_factory(exchange_id)
+        return exchange
+
+    def _fetch(self, exchange_id, symbols):
+        """批量获取一个交易所的最新价格"""
+        exchange = self._exchange(exchange_id)
+        if len(symbols) > 1 and exchange.has.get("fetchTickers"):
+            return exchange.fetch_tickers(list(symbols))
+        return {symbol: exchange.fetch_ticker(symbol) for symbol in symbols}
+
+    def poll(self):
+        """执行一轮轮询"""
+        for exchange_id, symbols in self._grouped_subscriptions().items():
+            try:
+                tickers = self._fetch(exchange_id, symbols)
+            except Exception as e:
+                logger.warning(f"获取{exchange_id}行情失败: {e}")
+                continue
+            now = time.time()
+            for symbol in symbols:
+                ticker = tickers.get(symbol)
+                price = ticker and (ticker.get("last") or ticker.get("close"))
+                if not price:
+                    continue
+                self._prices[(exchange_id, symbol)] = (price, now)
+                for listener in self._listeners:
+                    try:
+                        listener(exchange_id, symbol, price, now)
+                    except Exception as e:
+                        logger.error(f"行情监听处理失败: {e}")
+
+    def _run(self):
+        while not self._stopping.is_set():
+            started = time.time()
+            self.poll()
+            self._stopping.wait(max(self.interval - (time.time() - started), 0))
@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""异步市场数据服务
+
+基于 ccxt.async_support，在后台线程的单个事件循环中并发加载多个交易所的市场信息，
+所有交易所实例共享一个aiohttp会话，并限制同时进行的请求数量。
+加载结果按交易所缓存，供交易对查询、搜索和精度处理复用。
+本地模拟交易所等进程内交易所通过 register_local 提供市场信息，不经过网络。
+"""
+
+import asyncio
+import threading
+import time
+
+import aiohttp
+import ccxt.async_support as ccxt_async
+from loguru import logger
+
+from core.rate_limiter import PRIORITY_UI
+
+
+class AsyncMarketService:
+    """多交易所市场信息加载服务"""
+
+    def __init__(self, max_concurrency=32, ttl=3600, timeout=30, scheduler=None):
+        """初始化服务并启动事件循环线程
+
+        Args:
+            max_concurrency: 同时进行的加载请求上限
+            ttl: 市场信息缓存时间（秒）
+            timeout: 单个交易所加载超时（秒）
+            scheduler: RateLimitScheduler 实例，所有请求经过全局限流
+        """
+        self.scheduler = scheduler
+        self.max_concurrency = max_concurrency
+        self.ttl = ttl
+        self.timeout = timeout
+        self._exchanges = {}
+        self._markets = {}
+        self._inflight = {}
+        # 交易所ID -> 返回市场信息的函数（进程内交易所）
+        self._local = {}
+        self._version = 0
+        self._session = None
+        self._semaphore = None
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="market-service", daemon=True
+        )
+        self._thread.start()
+        self._call(self._setup())
+
+    @property
+    def version(self):
+        """缓存版本号，每次有交易所市场信息更新时递增"""
+        return self._version
+
+    def _call(self, coro, timeout=None):
+        """在服务事件循环中执行协程并等待结果"""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result(timeout)
+
+    async def _setup(self):
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.max_concurrency * 4, ttl_dns_cache=300),
+            trust_env=True,
+        )
+
+    def register_local(self, exchange_id, loader):
+        """注册进程内交易所，市场信息由 loader() 直接返回，始终为最新
+
+        Args:
+            exchange_id: 交易所ID
+            loader: 返回市场信息字典的函数
+        """
+        self._local[exchange_id] = loader
+        self._version += 1
+
+    def _exchange(self, exchange_id, testnet):
+        """获取（或创建）共享会话的异步交易所实例"""
+        key = (exchange_id, testnet)
+        exchange = self._exchanges.get(key)
+        if exchange is None:
+            exchange_class = getattr(ccxt_async, exchange_id)
+            exchange = exchange_class(
+                {
+                    "enableRateLimit": True,
+                    "session": self._session,
+                    "timeout": self.timeout * 1000,
+                    "options": {"defaultType": "spot"},
+                }
+            )
+            if testnet and hasattr(exchange, "set_sandbox_mode"):
+                exchange.set_sandbox_mode(True)
+            if self.scheduler:
+                self.scheduler.attach(exchange, PRIORITY_UI)
+            self._exchanges[key] = exchange
+        return exchange
+
+    async def _load(self, exchange_id, testnet=False, reload=False):
+        """加载单个交易所的市场信息，同一交易所的并发请求合并为一次"""
+        local = self._local.get(exchange_id)
+        if local is not None:
+            return local()
+        key = (exchange_id, testnet)
+        cached = self._markets.get(key)
+        if cached and not reload and time.time() - cached[1] < self.ttl:
+            return cached[0]
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(exchange_id, testnet))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await task
+
+    async def _fetch(self, exchange_id, testnet):
+        async with self._semaphore:
+            started = time.perf_counter()
+            exchange = self._exchange(exchange_id, testnet)
+            markets = await asyncio.wait_for(
+                exchange.load_markets(reload=True), self.timeout
+            )
+            self._markets[(exchange_id, testnet)] = (markets, time.time())
+            self._version += 1
+            logger.info(
+                f"已加载{exchange_id}市场信息{len(markets)}个，耗时{time.perf_counter() - started:.2f}秒"
+            )
+            return markets
+
+    async def _load_many(self, exchange_ids, testnet, reload):
+        results = await asyncio.gather(
+            *(self._load(exchange_id, testnet, reload) for exchange_id in exchange_ids),
+            return_exceptions=True,
+        )
+        return dict(zip(exchange_ids, results))
+
+    def load_markets_multi(self, exchange_ids, testnet=False, reload=False, timeout=None):
+        """并发加载多个交易所的市场信息
+
+        Args:
+            exchange_ids: 交易所ID列表
+            testnet: 是否使用测试网
+            reload: 是否忽略缓存重新加载
+            timeout: 整体等待时间（秒）
+
+        Returns:
+            dict: 交易所ID -> 市场信息字典，失败时为异常对象
+        """
+        exchange_ids = list(dict.fromkeys(exchange_ids))
+        return self._call(self._load_many(exchange_ids, testnet, reload), timeout)
+
+    def load_markets(self, exchange_id, testnet=False, reload=False):
+        """加载单个交易所的市场信息
+
+        Raises:
+            Exception: 加载失败
+        """
+        result = self.load_markets_multi([exchange_id], testnet, reload)[exchange_id]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def get_cached_markets(self, exchange_id, testnet=False):
+        """获取已缓存的市场信息（不发起网络请求）
+
+        Returns:
+            dict: 市场信息，未缓存时返回None
+        """
+        local = self._local.get(exchange_id)
+        if local is not None:
+            return local()
+        cached = self._markets.get((exchange_id, testnet))
+        return cached[0] if cached else None
+
+    def cached_exchanges(self, testnet=False):
+        """已缓存市场信息的交易所列表"""
+        return list(self._local) + [key[0] for key in list(self._markets) if key[1] == testnet]
+
+    def warm_up(self, exchange_ids, testnet=False):
+        """在后台预加载市场信息，不等待结果"""
+        exchange_ids = list(dict.fromkeys(exchange_ids))
+        if not exchange_ids:
+            return
+        logger.info(f"预加载交易所市场信息: {', '.join(exchange_ids)}")
+        asyncio.run_coroutine_threadsafe(
+            self._load_many(exchange_ids, testnet, False), self._loop
+        )
+
+    async def _close(self):
+        for exchange in self._exchanges.values():
+            try:
+                await exchange.close()
+            except Exception:
+                pass
+        if self._session:
+            await self._session.close()
+
+    def close(self):
+        """关闭所有交易所实例和共享会话，停止事件循环"""
+        try:
+            self._call(self._close(), timeout=10)
+        except Exception as e:
+            logger.warning(f"关闭市场数据服务失败: {e}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
@@ -0,0 +1,342 @@
+# -*- coding: utf-8 -*-
+"""镜像源竞速
+
+并发探测配置的镜像源（manifest延迟和blob吞吐），结合历史表现排序，
+镜像拉取时优先使用最快的镜像源。
+"""
+
+import json
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import requests
+from loguru import logger
+
+# 直连Docker Hub（不经过镜像源）
+DIRECT = "docker.io"
+
+MANIFEST_ACCEPT = ", ".join(
+    [
+        "application/vnd.docker.distribution.manifest.list.v2+json",
+        "application/vnd.oci.image.index.v1+json",
+        "application/vnd.docker.distribution.manifest.v2+json",
+        "application/vnd.oci.image.manifest.v1+json",
+    ]
+)
+
+
+def read_daemon_mirrors(path="/etc/docker/daemon.json"):
+    """读取Docker守护进程配置中的registry-mirrors（scripts/fix-docker-registry.sh 写入）"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return list(json.load(f).get("registry-mirrors", []))
+    except Exception:
+        return []
+
+
+def mirror_host(mirror):
+    """镜像源URL对应的镜像名前缀（host[:port]）"""
+    if mirror == DIRECT:
+        return None
+    return urlparse(mirror).netloc or mirror
+
+
+class MirrorRacer:
+    """镜像源探测与排序"""
+
+    def __init__(
+        self,
+        conn,
+        db_lock,
+        mirrors,
+        include_direct=True,
+        probe_timeout=5,
+        probe_bytes=1 << 20,
+        history_weight=0.5,
+        session=None,
+    ):
+        """初始化镜像源竞速器
+
+        Args:
+            conn: SQLite连接
+            db_lock: 数据库锁
+            mirrors: 镜像源URL列表（如 https://mirror.baidubce.com）
+            include_direct: 是否包含直连Docker Hub
+            probe_timeout: 单次探测超时（秒）
+            probe_bytes: 吞吐探测下载的字节数
+            history_weight: 历史表现在评分中的权重（0-1）
+            session: requests会话（可选）
+        """
+        self.conn = conn
+        self.db_lock = db_lock
+        self.mirrors = [m.rstrip("/") for m in mirrors]
+        if include_direct:
+            self.mirrors.append(DIRECT)
+        self.probe_timeout = probe_timeout
+        self.probe_bytes = probe_bytes
+        self.history_weight = history_weight
+        self.session = session or requests.Session()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(len(self.mirrors), 1), thread_name_prefix="mirror-probe"
+        )
+        self._lock = threading.Lock()
+        self._init_db()
+
+    def _init_db(self):
+        """初始化镜像源历史表"""
+        with self.db_lock:
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS mirror_stats (
+                    mirror TEXT PRIMARY KEY,
+                    latency_ms REAL,
+                    throughput_bps REAL,
+                    pulls INTEGER DEFAULT 0,
+                    failures INTEGER DEFAULT 0,
+                    stalls INTEGER DEFAULT 0,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+                """
+            )
+            self.conn.commit()
+
+    @staticmethod
+    def _registry_url(mirror):
+        return "https://registry-1.docker.io" if mirror == DIRECT else mirror
+
+    @staticmethod
+    def _repo_path(repository):
+        # Docker Hub官方镜像需要 library/ 前缀
+        return repository if "/" in repository else f"library/{repository}"
+
+    def _get(self, url, token=None, **kwargs):
+        headers = kwargs.pop("headers", {})
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        return self.session.get(
+            url, headers=headers, timeout=self.probe_timeout, **kwargs
+        )
+
+    def _token(self, response, repo_path):
+        """处理Bearer认证质询，获取匿名拉取令牌"""
+        challenge = response.headers.get("WWW-Authenticate", "")
+        params = dict(re.findall(r'(\w+)="([^"]*)"', challenge))
+        if not challenge.lower().startswith("bearer") or "realm" not in params:
+            return None
+        query = {"scope": f"repository:{repo_path}:pull"}
+        if "service" in params:
+            query["service"] = params["service"]
+        result = self.session.get(
+            params["realm"], params=query, timeout=self.probe_timeout
+        )
+        result.raise_for_status()
+        body = result.json()
+        return body.get("token") or body.get("access_token")
+
+    def probe(self, mirror, repository, tag):
+        """探测单个镜像源
+
+        Args:
+            mirror: 镜像源URL或 docker.io
+            repository: 镜像仓库
+            tag: 镜像标签
+
+        Returns:
+            dict: 探测结果，包含 latency_ms、throughput_bps、error
+        """
+        base = self._registry_url(mirror)
+        repo_path = self._repo_path(repository)
+        manifest_url = f"{base}/v2/{repo_path}/manifests/{tag}"
+        result = {"mirror": mirror, "latency_ms": None, "throughput_bps": None, "error": None}
+        try:
+            headers = {"Accept": MANIFEST_ACCEPT}
+            started = time.perf_counter()
+            response = self._get(manifest_url, headers=dict(headers))
+            token = None
+            if response.status_code == 401:
+                token = self._token(response, repo_path)
+                started = time.perf_counter()
+                response = self._get(manifest_url, token, headers=dict(headers))
+            response.raise_for_status()
+            result["latency_ms"] = (time.perf_counter() - started) * 1000
+            manifest = response.json()
+
+            # 多架构清单，取linux/amd64（或第一个）平台清单
+            if "manifests" in manifest:
+                entries = manifest["manifests"]
+                chosen = next(
+                    (
+                        m
+                        for m in entries
+                        if m.get("platform", {}).get("architecture") == "amd64"
+                        and m.get("platform", {}).get("os") == "linux"
+                    ),
+                    entries[0],
+                )
+                response = self._get(
+                    f"{base}/v2/{repo_path}/manifests/{chosen['digest']}",
+                    token,
+                    headers=dict(headers),
+                )
+                response.raise_for_status()
+                manifest = response.json()
+
+            layers = manifest.get("layers") or []
+            if not layers:
+                return result
+
+            # 下载最大层的开头部分测量吞吐
+            layer = max(layers, key=lambda item: item.get("size", 0))
+            started = time.perf_counter()
+            received = 0
+            with self._get(
+                f"{base}/v2/{repo_path}/blobs/{layer['digest']}",
+                token,
+                headers={"Range": f"bytes=0-{self.probe_bytes - 1}"},
+                stream=True,
+            ) as blob:
+                blob.raise_for_status()
+                for chunk in blob.iter_content(chunk_size=65536):
+                    received += len(chunk)
+                    if received >= self.probe_bytes:
+                        break
+            elapsed = time.perf_counter() - started
+            if received and elapsed > 0:
+                result["throughput_bps"] = received / elapsed
+        except Exception as e:
+            result["error"] = str(e)
+        return result
+
+    def history(self):
+        """读取所有镜像源的历史表现"""
+        with self.db_lock:
+            rows = self.conn.execute(
+                "SELECT mirror, latency_ms, throughput_bps, pulls, failures, stalls, updated_at FROM mirror_stats"
+            ).fetchall()
+        return {
+            row[0]: {
+                "latency_ms": row[1],
+                "throughput_bps": row[2],
+                "pulls": row[3],
+                "failures": row[4],
+                "stalls": row[5],
+                "updated_at": row[6],
+            }
+            for row in rows
+        }
+
+    def _update(self, mirror, latency_ms=None, throughput_bps=None, pulls=0, failures=0, stalls=0, alpha=0.3):
+        """以指数加权平均更新镜像源历史"""
+        with self._lock, self.db_lock:
+            row = self.conn.execute(
+                "SELECT latency_ms, throughput_bps FROM mirror_stats WHERE mirror = ?",
+                (mirror,),
+            ).fetchone()
+
+            def _ewma(old, new):
+                if new is None:
+                    return old
+                return new if old is None else old * (1 - alpha) + new * alpha
+
+            old_latency, old_throughput = row if row else (None, None)
+            self.conn.execute(
+                """
+                INSERT INTO mirror_stats (mirror, latency_ms, throughput_bps, pulls, failures, stalls, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(mirror) DO UPDATE SET
+                    latency_ms = excluded.latency_ms,
+                    throughput_bps = excluded.throughput_bps,
+                    pulls = pulls + excluded.pulls,
+                    failures = failures + excluded.failures,
+                    stalls = stalls + excluded.stalls,
+                    updated_at = CURRENT_TIMESTAMP
+                """,
+                (
+                    mirror,
+                    _ewma(old_latency, latency_ms),
+                    _ewma(old_throughput, throughput_bps),
+                    pulls,
+                    failures,
+                    stalls,
+                ),
+            )
+            self.conn.commit()
+
+    def record_pull(self, mirror, throughput_bps):
+        """记录一次成功拉取的实际吞吐"""
+        self._update(mirror, throughput_bps=throughput_bps, pulls=1)
+
+    def record_failure(self, mirror, stalled=False):
+        """记录一次拉取失败或停滞"""
+        self._update(mirror, failures=0 if stalled else 1, stalls=1 if stalled else 0)
+
+    def rank(self, repository, tag, expected_bytes=500 << 20):
+        """并发探测所有镜像源并按预计下载时间排序
+
+        评分 = 延迟 + 预计大小 / 吞吐，吞吐取本次探测与历史吞吐的加权值，
+        历史停滞和失败次数会增加惩罚。
+
+        Args:
+            repository: 镜像仓库
+            tag: 镜像标签
+            expected_bytes: 预计镜像大小（字节），用于换算吞吐对评分的影响
+
+        Returns:
+            list: 按评分从快到慢排序的镜像源列表
+        """
+        probes = list(
+            self._executor.map(lambda m: self.probe(m, repository, tag), self.mirrors)
+        )
+        history = self.history()
+        scored = []
+        for probe in probes:
+            mirror = probe["mirror"]
+            past = history.get(mirror, {})
+            if probe["error"]:
+                logger.warning(f"镜像源{mirror}探测失败: {probe['error']}")
+                self._update(mirror, failures=1)
+                continue
+            self._update(mirror, latency_ms=probe["latency_ms"], throughput_bps=probe["throughput_bps"])
+
+            throughput = probe["throughput_bps"]
+            if past.get("throughput_bps"):
+                throughput = (
+                    past["throughput_bps"]
+                    if throughput is None
+                    else throughput * (1 - self.history_weight)
+                    + past["throughput_bps"] * self.history_weight
+                )
+            seconds = probe["latency_ms"] / 1000.0
+            seconds += expected_bytes / throughput if throughput else 3600
+            pulls = past.get("pulls", 0)
+            penalty = 1 + (past.get("stalls", 0) + past.get("failures", 0)) / (pulls + 1)
+            scored.append((seconds * penalty, mirror))
+            logger.info(
+                f"镜像源{mirror}: 延迟{probe['latency_ms']:.0f}ms，"
+                f"吞吐{(throughput or 0) / 1024:.0f}KB/s，评分{seconds * penalty:.1f}"
+            )
+        scored.sort()
+        ranked = [mirror for _, mirror in scored]
+        # 探测失败的镜像源排在最后，仍可作为备选
+        ranked.extend(m for m in self.mirrors if m not in ranked)
+        return ranked
+
+
+def build_mirror_list(config):
+    """根据配置生成镜像源列表
+
+    Args:
+        config: images 配置段
+
+    Returns:
+        list: 镜像源URL列表
+    """
+    mirrors = list(config.get("mirrors") or [])
+    if config.get("use_daemon_mirrors"):
+        for mirror in read_daemon_mirrors():
+            if mirror not in mirrors:
+                mirrors.append(mirror)
+    return mirrors
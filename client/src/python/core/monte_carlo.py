@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+"""网格策略蒙特卡洛压力测试
+
+单一历史路径的回测容易过拟合。这里从本地K线估计收益分布，生成大量模拟价格路径
+（几何布朗运动，或按块重采样历史收益），以 路径数 × 步数 的二维数组表示，
+在所有路径上一次性向量化地运行与回测相同的网格状态机，得到收益、回撤和
+超出网格区间时间的分布。路径按块处理，内存占用与总路径数无关。
+
+模拟路径只有逐根收盘价，K线内部的高低点不参与撮合，成交次数相对回测偏保守。
+"""
+
+import numpy as np
+
+from core.backtest import SELL, crossing_events, simulate_fills
+from core.grid import TICK_SIZE, plan_grid
+
+METHODS = ("bootstrap", "gbm")
+
+# 每块处理的 路径数×步数 上限
+DEFAULT_CHUNK_CELLS = 2_000_000
+
+PERCENTILES = (5, 25, 50, 75, 95)
+HISTOGRAM_BINS = 50
+
+
+def log_returns(close):
+    """逐根对数收益"""
+    close = np.asarray(close, dtype=np.float64)
+    return np.diff(np.log(close))
+
+
+def gbm_paths(start_price, mu, sigma, n_paths, n_steps, rng):
+    """几何布朗运动价格路径
+
+    Args:
+        start_price: 起始价格
+        mu, sigma: 每步对数收益的均值和标准差
+        n_paths: 路径数
+        n_steps: 步数
+        rng: numpy.random.Generator
+
+    Returns:
+        numpy.ndarray: (n_paths, n_steps + 1)，第0列为起始价格
+    """
+    steps = rng.standard_normal((n_paths, n_steps))
+    steps *= sigma
+    steps += mu - 0.5 * sigma * sigma
+    return _to_prices(start_price, steps)
+
+
+def bootstrap_paths(start_price, returns, n_paths, n_steps, block, rng):
+    """按块重采样历史对数收益生成价格路径，保留块内的波动聚集和自相关
+
+    Args:
+        start_price: 起始价格
+        returns: 历史对数收益
+        n_paths: 路径数
+        n_steps: 步数
+        block: 块长度（步数）
+        rng: numpy.random.Generator
+
+    Returns:
+        numpy.ndarray: (n_paths, n_steps + 1)，第0列为起始价格
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    block = max(1, min(int(block), len(returns)))
+    n_blocks = -(-n_steps // block)
+    starts = rng.integers(0, len(returns) - block + 1, size=(n_paths, n_blocks))
+    index = (starts[:, :, None] + np.arange(block)).reshape(n_paths, -1)[:, :n_steps]
+    return _to_prices(start_price, returns[index])
+
+
+def _to_prices(start_price, steps):
+    paths = np.empty((steps.shape[0], steps.shape[1] + 1), dtype=np.float64)
+    paths[:, 0] = 0.0
+    np.cumsum(steps, axis=1, out=paths[:, 1:])
+    np.exp(paths, out=paths)
+    paths *= start_price
+    return paths
+
+
+def evaluate_paths(paths, plan, fee_rate, slippage=0.0):
+    """在所有路径上运行网格状态机
+
+    把二维路径展平后复用回测的穿越事件计算，丢弃跨路径的线段，
+    再按 (路径, 区间) 分组筛选成交。
+
+    Args:
+        paths: (路径数, 步数+1) 价格路径，所有路径起始价格相同
+        plan: GridPlan（参考价为起始价格）
+        fee_rate: 手续费率
+        slippage: 滑点比例
+
+    Returns:
+        dict: 每条路径的 pnl、return_pct、max_drawdown_pct、out_of_range_pct、round_trips
+    """
+    n_paths, width = paths.shape
+    levels = plan.prices
+    quantities = plan.quantities[:-1]
+    n_intervals = len(levels) - 1
+    start_price = float(paths[0, 0])
+
+    seg, interval, side, _ = crossing_events(paths.ravel(), levels)
+    # 每条路径最后一个点到下一条路径第一个点的线段不存在
+    keep = (seg + 1) % width != 0
+    seg, interval, side = seg[keep], interval[keep], side[keep]
+    path_id = seg // width
+
+    initial_holding = levels[:-1] >= start_price
+    fills, from_initial = simulate_fills(
+        levels,
+        seg,
+        path_id * n_intervals + interval,
+        side,
+        np.tile(initial_holding, n_paths),
+    )
+
+    fill_interval = interval[fills]
+    fill_side = side[fills]
+    fill_path = path_id[fills]
+    # 成交记在线段终点
+    fill_cell = seg[fills] + 1
+    fill_qty = quantities[fill_interval]
+    sells = fill_side == SELL
+    fill_price = np.where(
+        sells,
+        levels[fill_interval + 1] * (1 - slippage),
+        levels[fill_interval] * (1 + slippage),
+    )
+    notional = fill_qty * fill_price
+    fill_fee = notional * fee_rate
+
+    # 资金与回测一致：空仓区间预留买入资金，持仓区间按起始价格买入基础币
+    base0 = float(quantities[initial_holding].sum())
+    empty = ~initial_holding
+    cash0 = float(
+        (quantities[empty] * levels[:-1][empty] * (1 + slippage) * (1 + fee_rate)).sum()
+    )
+    initial_capital = cash0 + base0 * start_price * (1 + fee_rate)
+
+    size = n_paths * width
+    cash_delta = np.where(sells, notional - fill_fee, -(notional + fill_fee))
+    base_delta = np.where(sells, -fill_qty, fill_qty)
+    # 没有成交时 bincount 返回整数数组，统一转换为浮点
+    cash = np.bincount(fill_cell, weights=cash_delta, minlength=size).astype(np.float64, copy=False)
+    base = np.bincount(fill_cell, weights=base_delta, minlength=size).astype(np.float64, copy=False)
+    cash = cash.reshape(n_paths, width)
+    base = base.reshape(n_paths, width)
+    np.cumsum(cash, axis=1, out=cash)
+    np.cumsum(base, axis=1, out=base)
+    cash += cash0
+    base += base0
+    equity = cash
+    equity += base * paths
+    del base
+
+    peak = np.maximum.accumulate(np.maximum(equity, initial_capital), axis=1)
+    max_drawdown = (1 - equity / peak).max(axis=1)
+    final_equity = equity[:, -1]
+    out_of_range = ((paths[:, 1:] < levels[0]) | (paths[:, 1:] > levels[-1])).mean(axis=1)
+    trips = np.bincount(fill_path[sells & ~from_initial], minlength=n_paths)
+
+    pnl = final_equity - initial_capital
+    return {
+        "initial_capital": initial_capital,
+        "pnl": pnl,
+        "return_pct": pnl / initial_capital * 100 if initial_capital else np.zeros(n_paths),
+        "max_drawdown_pct": max_drawdown * 100,
+        "out_of_range_pct": out_of_range * 100,
+        "round_trips": trips,
+    }
+
+
+def _distribution(values, bins=HISTOGRAM_BINS):
+    """分布统计和直方图"""
+    values = np.asarray(values, dtype=np.float64)
+    counts, edges = np.histogram(values, bins=bins)
+    return {
+        "mean": float(values.mean()),
+        "std": float(values.std()),
+        "min": float(values.min()),
+        "max": float(values.max()),
+        "percentiles": {
+            f"p{q}": float(v) for q, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))
+        },
+        "histogram": {"counts": counts.tolist(), "edges": edges.tolist()},
+    }
+
+
+def run_monte_carlo(
+    candles,
+    spec,
+    n_paths=10000,
+    horizon=None,
+    method="bootstrap",
+    block=24,
+    fee_rate=0.001,
+    slippage=0.0,
+    market=None,
+    precision_mode=TICK_SIZE,
+    start_price=None,
+    seed=None,
+    chunk_cells=DEFAULT_CHUNK_CELLS,
+):
+    """蒙特卡洛压力测试
+
+    Args:
+        candles: 列名 -> 数组（至少包含 close），用于估计收益分布
+        spec: GridSpec
+        n_paths: 路径数
+        horizon: 每条路径的步数（K线根数），默认与历史数据长度相同
+        method: bootstrap 按块重采样历史收益 / gbm 几何布朗运动
+        block: 重采样的块长度
+        fee_rate: 手续费率
+        slippage: 滑点比例
+        market: ccxt市场信息（可选）
+        precision_mode: 交易所精度模式
+        start_price: 起始价格，默认为最新收盘价
+        seed: 随机种子
+        chunk_cells: 每块处理的 路径数×步数 上限
+
+    Returns:
+        dict: 各指标的分布统计
+
+    Raises:
+        ValueError: 参数错误或历史数据不足
+    """
+    if method not in METHODS:
+        raise ValueError(f"不支持的模拟方法: {method}")
+    returns = log_returns(candles["close"])
+    returns = returns[np.isfinite(returns)]
+    if len(returns) < 2:
+        raise ValueError("历史K线不足，无法估计收益分布")
+    n_paths = int(n_paths)
+    n_steps = int(horizon or len(returns))
+    if n_paths <= 0 or n_steps <= 0:
+        raise ValueError("路径数和步数必须大于0")
+
+    start_price = float(start_price or candles["close"][-1])
+    plan = plan_grid(spec, market, precision_mode, fee_rate, start_price)
+    if not plan.valid:
+        raise ValueError("；".join(plan.errors))
+    mu = float(returns.mean())
+    sigma = float(returns.std())
+    rng = np.random.default_rng(seed)
+
+    chunk = max(1, int(chunk_cells) // (n_steps + 1))
+    parts = []
+    for offset in range(0, n_paths, chunk):
+        count = min(chunk, n_paths - offset)
+        if method == "gbm":
+            paths = gbm_paths(start_price, mu, sigma, count, n_steps, rng)
+        else:
+            paths = bootstrap_paths(start_price, returns, count, n_steps, block, rng)
+        parts.append(evaluate_paths(paths, plan, fee_rate, slippage))
+
+    metrics = {
+        name: np.concatenate([part[name] for part in parts])
+        for name in ("pnl", "return_pct", "max_drawdown_pct", "out_of_range_pct", "round_trips")
+    }
+    return {
+        "method": method,
+        "paths": n_paths,
+        "steps": n_steps,
+        "start_price": start_price,
+        "initial_capital": parts[0]["initial_capital"],
+        "drift": mu,
+        "volatility": sigma,
+        "probability_of_loss": float((metrics["pnl"] < 0).mean()),
+        **{name: _distribution(values) for name, values in metrics.items()},
+    }
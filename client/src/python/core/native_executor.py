@@ -0,0 +1,875 @@
+# -*- coding: utf-8 -*-
+"""进程内网格执行器
+
+简单的网格策略不需要为每个策略运行一个 Hummingbot 容器（每个数百MB内存）。
+执行器在一个 asyncio 事件循环中运行所有进程内策略，每个策略一个协程，
+阻塞的交易所请求放到共享的有限线程池中执行，经过全局限流调度器和批量下单网关。
+
+每个策略的状态保存在紧凑数组中（价位、数量、每个区间是否持仓、买入价和持仓数量），
+与回测的网格模型一致：区间 i 未持仓时在价位 i 挂买单，持仓时在价位 i+1 挂卖单。
+每轮循环：
+1. 查询挂单，跟踪的订单消失时查询订单结果，成交则翻转区间状态并写入成交记录；
+2. 按区间状态得到目标挂单，用 core.reconcile 与当前挂单对账，只发送有差异的请求。
+
+设置了反弹开仓/回调平仓比例（reboundPct、pullbackPct）时，区间不再在价位上预先挂单，
+行情价格（native 为行情缓存推送，paper 为撮合场所的实时或回放价格）交给 core.triggers 的
+触发状态机，触发后下市价单，与回测使用同一套触发逻辑。
+
+新启动时启动价格以上的区间需要持有基础币：native 按市价买入并写入成交记录，
+模拟盘的虚拟账户已按所需基础币注资。价位调整后原持仓沿用到新的持仓区间，多退少补。
+重启后从 native_state 表恢复区间状态，已有挂单按对账结果直接沿用。
+策略的订单带有以策略ID为前缀的 clientOrderId，对账、撤单只处理策略自己的订单，
+同一账户上其他策略或手动下的订单不受影响。
+"""
+
+import array
+import asyncio
+import json
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from loguru import logger
+
+from core.reconcile import BUY, SELL, reconcile
+from core.triggers import TriggerBook, TriggerEngine
+
+# 策略订单 clientOrderId 的前缀，后接策略ID（只保留字母和数字，兼容各交易所的格式限制）
+CLIENT_ID_PREFIX = "cg"
+
+
+def client_prefix(strategy_id):
+    """策略订单的 clientOrderId 前缀"""
+    return CLIENT_ID_PREFIX + "".join(c for c in strategy_id if c.isalnum())
+
+
+RUNNING = "running"
+PAUSED = "paused"
+STOPPED = "stopped"
+
+
+class NativeGrid:
+    """单个进程内策略的状态"""
+
+    __slots__ = (
+        "strategy_id",
+        "mode",
+        "exchange",
+        "symbol",
+        "prices",
+        "quantities",
+        "start_price",
+        "client_prefix",
+        "holding",
+        "entry",
+        "size",
+        "entry_fee",
+        "amount_step",
+        "rebound_pct",
+        "pullback_pct",
+        "price_source",
+        "triggers",
+        "pending",
+        "signals",
+        "orders",
+        "known",
+        "status",
+        "fills",
+        "realized",
+        "fees",
+        "error",
+        "last_cycle",
+        "wake",
+        "lock",
+    )
+
+    def __init__(
+        self,
+        strategy_id,
+        mode,
+        exchange,
+        symbol,
+        prices,
+        quantities,
+        start_price,
+        rebound_pct=0.0,
+        pullback_pct=0.0,
+        price_source=None,
+    ):
+        """初始化
+
+        Args:
+            strategy_id: 策略ID
+            mode: 运行模式（native、paper）
+            exchange: ccxt 同步交易所实例（已接入限流调度器）
+            symbol: ccxt格式交易对
+            prices: 按精度取整后的网格价位（升序）
+            quantities: 各价位的下单数量
+            start_price: 启动价格，价位不低于该价格的区间视为已持仓
+            rebound_pct: 反弹开仓比例（0.005 即 0.5%），与 pullback_pct 都为0时按价位挂单
+            pullback_pct: 回调平仓比例
+            price_source: 驱动触发状态机的行情来源（交易所ID或回放撮合场所ID）
+        """
+        self.strategy_id = strategy_id
+        self.mode = mode
+        self.exchange = exchange
+        self.symbol = symbol
+        self.prices = array.array("d", prices)
+        self.quantities = array.array("d", quantities)
+        self.start_price = float(start_price)
+        self.client_prefix = client_prefix(strategy_id)
+        n_intervals = max(len(self.prices) - 1, 0)
+        self.holding = bytearray(
+            1 if self.prices[i] >= start_price else 0 for i in range(n_intervals)
+        )
+        # 持仓区间的买入价、持仓数量（扣除手续费后）和买入手续费（计价币）
+        self.entry = array.array("d", (start_price if h else 0.0 for h in self.holding))
+        self.size = array.array(
+            "d", (self.quantities[i] if h else 0.0 for i, h in enumerate(self.holding))
+        )
+        self.entry_fee = array.array("d", bytes(8 * n_intervals))
+        self.amount_step = None
+        self.rebound_pct = rebound_pct
+        self.pullback_pct = pullback_pct
+        self.price_source = price_source
+        # 已触发、等待成交的区间的触发价（0为无），方向由区间是否持仓决定
+        self.pending = array.array("d", bytes(8 * n_intervals))
+        # 行情线程产生、等待下一轮处理的触发信号
+        self.signals = deque()
+        self.triggers = None
+        self._build_triggers()
+        # 订单ID -> (区间序号, 方向)
+        self.orders = {}
+        # 上一个实例跟踪过的订单ID（价位重置后区间对应关系失效，只用于识别自己的订单）
+        self.known = set()
+        self.status = RUNNING
+        self.fills = 0
+        self.realized = 0.0
+        self.fees = 0.0
+        self.error = None
+        self.last_cycle = None
+        self.wake = None
+        # 执行一轮和停止撤单互斥，停止后不会再有新的下单
+        self.lock = threading.Lock()
+
+    def client_order_id(self):
+        """新订单的 clientOrderId（不超过32个字符）"""
+        return self.client_prefix + uuid.uuid4().hex[: 32 - len(self.client_prefix)]
+
+    def own_orders(self, orders):
+        """从交易所的挂单中取出策略自己的订单（带策略前缀或正在跟踪）"""
+        prefix = self.client_prefix
+        return [
+            order
+            for order in orders
+            if order["id"] in self.orders
+            or order["id"] in self.known
+            or (order.get("clientOrderId") or "").startswith(prefix)
+        ]
+
+    def _build_triggers(self):
+        """按当前区间状态重建触发状态机
+
+        等待成交的买单对应状态机中的持仓，等待成交的卖单对应空仓。
+        """
+        if not (self.rebound_pct or self.pullback_pct):
+            self.triggers = None
+            return
+        self.triggers = TriggerBook(
+            self.prices,
+            self.rebound_pct,
+            self.pullback_pct,
+            holding=[bool(h) != (p > 0) for h, p in zip(self.holding, self.pending)],
+        )
+
+    def apply_signals(self):
+        """处理行情线程产生的触发信号"""
+        signals = self.signals
+        while signals:
+            interval, side, price = signals.popleft()
+            # 与区间状态一致的信号下单；相反的信号说明上一次触发的订单未成交，撤回
+            wanted = (side == BUY) != bool(self.holding[interval])
+            self.pending[interval] = price if wanted else 0.0
+
+    def _amounts(self):
+        holding = np.frombuffer(bytes(self.holding), dtype=np.uint8).astype(bool)
+        quantities = np.frombuffer(self.quantities, dtype=np.float64)[:-1]
+        size = np.frombuffer(self.size, dtype=np.float64)
+        amounts = np.where(holding & (size > 0), size, quantities)
+        if self.amount_step:
+            amounts = np.floor(amounts / self.amount_step + 1e-9) * self.amount_step
+        return holding, amounts
+
+    def required_balances(self):
+        """按区间模型运行网格所需的资金
+
+        未持仓区间在下沿价位买入，需要计价币；持仓区间持有该区间的数量并在上沿卖出，需要基础币。
+
+        Returns:
+            (float, float): (计价币, 基础币)
+        """
+        holding = np.frombuffer(bytes(self.holding), dtype=np.uint8).astype(bool)
+        prices = np.frombuffer(self.prices, dtype=np.float64)[:-1]
+        quantities = np.frombuffer(self.quantities, dtype=np.float64)[:-1]
+        quote = float((prices[~holding] * quantities[~holding]).sum())
+        return quote, float(quantities[holding].sum())
+
+    def desired(self):
+        """目标挂单 (区间序号, 方向, 价格, 数量)，使用触发状态机时没有预先挂单"""
+        holding, amounts = self._amounts()
+        intervals = np.arange(len(holding))
+        if self.triggers is not None:
+            intervals = intervals[:0]
+            holding, amounts = holding[intervals], amounts[intervals]
+        prices = np.frombuffer(self.prices, dtype=np.float64)
+        sides = np.where(holding, SELL, BUY)
+        order_prices = np.where(holding, prices[intervals + 1], prices[intervals])
+        valid = amounts > 0
+        return intervals[valid], sides[valid], order_prices[valid], amounts[valid]
+
+    def triggered(self):
+        """已触发、尚无进行中订单的区间 (区间序号, 方向, 触发价, 数量)"""
+        holding, amounts = self._amounts()
+        pending = np.frombuffer(self.pending, dtype=np.float64)
+        active = pending > 0
+        for interval, _ in self.orders.values():
+            active[interval] = False
+        active &= amounts > 0
+        intervals = np.flatnonzero(active)
+        sides = np.where(holding[intervals], SELL, BUY)
+        return intervals, sides, pending[intervals], amounts[intervals]
+
+    def snapshot(self):
+        """可持久化的状态"""
+        return {
+            "holding": bytes(self.holding).hex(),
+            "entry": self.entry.tolist(),
+            "size": self.size.tolist(),
+            "entry_fee": self.entry_fee.tolist(),
+            "pending": self.pending.tolist(),
+            "orders": {order_id: list(value) for order_id, value in self.orders.items()},
+            "fills": self.fills,
+            "realized": self.realized,
+            "fees": self.fees,
+        }
+
+    def restore(self, state, positions=True):
+        """恢复持久化的状态
+
+        Args:
+            state: snapshot() 的结果
+            positions: 是否恢复区间状态，为 False 或价位数量变化时只恢复累计成交和收益
+
+        Returns:
+            bool: 是否恢复了区间状态
+        """
+        self.fills = state.get("fills", 0)
+        self.realized = state.get("realized", 0.0)
+        self.fees = state.get("fees", 0.0)
+        orders = state.get("orders") or {}
+        self.known = set(orders)
+        holding = bytes.fromhex(state.get("holding", ""))
+        if not positions or len(holding) != len(self.holding):
+            return False
+        self.holding = bytearray(holding)
+        self.entry = array.array("d", state["entry"])
+        self.size = array.array("d", state["size"])
+        self.entry_fee = array.array("d", state["entry_fee"])
+        if len(state.get("pending") or ()) == len(self.holding):
+            self.pending = array.array("d", state["pending"])
+        # 跟踪的订单（改单后交易所可能不保留 clientOrderId，按订单ID识别）
+        self.orders = {order_id: (interval, side) for order_id, (interval, side) in orders.items()}
+        self._build_triggers()
+        return True
+
+    def describe(self):
+        return {
+            "mode": self.mode,
+            "status": self.status,
+            "symbol": self.symbol,
+            "levels": len(self.prices),
+            "holding": int(sum(self.holding)),
+            "open_orders": len(self.orders),
+            "triggered": int(sum(1 for p in self.pending if p > 0)),
+            "fills": self.fills,
+            "realized_profit": self.realized,
+            "fees": self.fees,
+            "error": self.error,
+            "last_cycle": self.last_cycle,
+        }
+
+
+class NativeExecutor:
+    """进程内网格执行器"""
+
+    def __init__(
+        self,
+        conn,
+        db_lock,
+        gateway,
+        ledger,
+        feed=None,
+        notify=None,
+        poll_interval=10,
+        workers=32,
+    ):
+        """初始化
+
+        Args:
+            conn: SQLite连接
+            db_lock: 数据库锁
+            gateway: OrderGateway 实例
+            ledger: TradeLedger 实例
+            feed: MarketFeed 实例，native 策略触发状态机的行情来源
+            notify: 事件回调 (event, data)
+            poll_interval: 每个策略查询挂单的间隔（秒）
+            workers: 执行交易所请求的线程数（所有策略共享）
+        """
+        self.conn = conn
+        self.db_lock = db_lock
+        self.gateway = gateway
+        self.ledger = ledger
+        self.feed = feed
+        self.notify = notify
+        self.poll_interval = poll_interval
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="native-grid")
+        self._grids = {}
+        self._tasks = {}
+        # 使用反弹/回调触发的策略，按行情来源和交易对分发价格
+        self.triggers = TriggerEngine()
+        self._subscriptions = {}
+        self._trigger_lock = threading.Lock()
+        if feed is not None:
+            feed.add_listener(self.on_price)
+        self._loop = None
+        self._ready = threading.Event()
+        self._init_db()
+
+    def _init_db(self):
+        with self.db_lock:
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS native_state (
+                    strategy_id TEXT PRIMARY KEY,
+                    state TEXT,
+                    updated_at TIMESTAMP
+                )
+                """
+            )
+            self.conn.commit()
+
+    def start(self):
+        threading.Thread(target=self._run_loop, name="native-executor", daemon=True).start()
+        self._ready.wait()
+
+    def _run_loop(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._ready.set()
+        self._loop.run_forever()
+
+    def _submit(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+
+    # ---- 策略管理 ----
+
+    def has(self, strategy_id):
+        return strategy_id in self._grids
+
+    def launch(self, grid, amount_step=None, reset=False):
+        """启动策略，策略已在运行时替换运行中的实例
+
+        Args:
+            grid: NativeGrid
+            amount_step: 数量步长，下单数量按步长向下取整
+            reset: 网格价位已调整，按启动价格重新计算区间状态，只沿用累计成交和收益
+        """
+        grid.amount_step = amount_step
+        old = self._grids.get(grid.strategy_id)
+        if old is not None:
+            # 等待进行中的一轮结束，之后旧实例不再处理成交
+            with old.lock:
+                if old.status == PAUSED:
+                    grid.status = PAUSED
+                old.status = STOPPED
+                state = old.snapshot()
+        else:
+            state = self._load_state(grid.strategy_id)
+        if state and grid.restore(state, positions=not reset):
+            logger.info(f"策略{grid.strategy_id}已恢复进程内执行状态")
+        else:
+            self._open_positions(grid, state)
+        self._save_state(grid)
+        self._set_triggers(grid.strategy_id, grid)
+        self._submit(self._start(grid)).result()
+
+    def _open_positions(self, grid, state=None):
+        """为启动价格以上的持仓区间建立实际持仓（新启动或价位重置时）
+
+        原网格（state）持仓区间的基础币和成本沿用到新的持仓区间，多出的部分按市价卖出；
+        不足的部分 native 按市价买入，模拟盘的虚拟账户已按所需基础币注资，按启动价格计入。
+        买卖都写入成交记录，各持仓区间按数量分摊总成本。
+
+        Raises:
+            RuntimeError: 买入或卖出失败
+        """
+        held = [i for i, h in enumerate(grid.holding) if h]
+        size = cost = fee = 0.0
+        if state:
+            for h, entry, lot, lot_fee in zip(
+                bytes.fromhex(state.get("holding", "")),
+                state.get("entry") or (),
+                state.get("size") or (),
+                state.get("entry_fee") or (),
+            ):
+                if h and lot > 0:
+                    size += lot
+                    cost += entry * lot
+                    fee += lot_fee
+        required = sum(grid.quantities[i] for i in held)
+        step = grid.amount_step or 0.0
+
+        excess = size - required
+        if excess > step and excess > 1e-12:
+            amount = float(np.floor(excess / step + 1e-9) * step) if step else excess
+            order, price, filled, fee_quote, _ = self._market_order(grid, SELL, amount)
+            share = filled / size
+            profit = (price - cost / size) * filled - fee_quote - fee * share
+            grid.realized += profit
+            self._record(grid, SELL, price, filled, fee_quote, profit, order)
+            size -= filled
+            cost *= 1 - share
+            fee *= 1 - share
+
+        shortfall = required - size
+        if held and shortfall > max(step, 1e-12):
+            if grid.mode == "native":
+                amount = float(np.ceil(shortfall / step - 1e-9) * step) if step else shortfall
+                order, price, filled, fee_quote, received = self._market_order(grid, BUY, amount)
+                self._record(grid, BUY, price, filled, fee_quote, None, order)
+            else:
+                price, received, fee_quote = grid.start_price, shortfall, 0.0
+            size += received
+            cost += price * received
+            fee += fee_quote
+
+        if not held or size <= 0:
+            return
+        for i in held:
+            share = grid.quantities[i] / required
+            grid.entry[i] = cost / size
+            grid.size[i] = size * share
+            grid.entry_fee[i] = fee * share
+        logger.info(
+            f"策略{grid.strategy_id}持仓区间{len(held)}个，持仓{size:.8g}，均价{cost / size:.8g}"
+        )
+
+    def _market_order(self, grid, side, amount):
+        """下市价单并查询成交结果，可用余额不足时先撤销策略同方向的挂单释放资金
+
+        Returns:
+            tuple: (订单, 成交均价, 成交数量, 手续费（计价币）,
+                实际得到的数量（买入时扣除基础币手续费）)
+        """
+        self._release_funds(grid, side, amount)
+        result = self.gateway.create_orders(
+            grid.exchange,
+            [
+                {
+                    "symbol": grid.symbol,
+                    "type": "market",
+                    "side": "buy" if side == BUY else "sell",
+                    "amount": amount,
+                    # 部分交易所的市价买单按价格计算金额
+                    "price": grid.start_price,
+                    "params": {"clientOrderId": grid.client_order_id()},
+                }
+            ],
+            grid.strategy_id,
+        )
+        item = result["results"][0]
+        if not item["success"]:
+            action = "买入" if side == BUY else "卖出"
+            raise RuntimeError(f"市价{action}初始持仓失败: {item.get('error')}")
+        order = item["order"]
+        if order.get("status") != "closed" or not order.get("filled"):
+            order = grid.exchange.fetch_order(order["id"], grid.symbol)
+        price = order.get("average") or order.get("price") or grid.start_price
+        filled = order.get("filled") or amount
+        fee_cost, fee_quote, in_base = self._fee(grid, order, price)
+        received = filled - fee_cost if in_base else filled
+        grid.fills += 1
+        grid.fees += fee_quote
+        return order, price, filled, fee_quote, received
+
+    def _release_funds(self, grid, side, amount):
+        """可用余额不够下单时撤销策略同方向的挂单（下一轮对账时重新挂出）"""
+        market = grid.exchange.market(grid.symbol)
+        if side == BUY:
+            currency, needed = market["quote"], amount * grid.start_price
+        else:
+            currency, needed = market["base"], amount
+        free = (grid.exchange.fetch_balance().get("free") or {}).get(currency) or 0.0
+        if free >= needed:
+            return
+        name = "buy" if side == BUY else "sell"
+        open_orders = grid.own_orders(grid.exchange.fetch_open_orders(grid.symbol))
+        ids = [o["id"] for o in open_orders if o["side"] == name]
+        if ids:
+            self.gateway.cancel_orders(grid.exchange, ids, grid.symbol, grid.strategy_id)
+
+    def _fee(self, grid, order, price):
+        """订单手续费 (数量, 折算为计价币, 是否以基础币收取)"""
+        fee = order.get("fee") or {}
+        fee_cost = fee.get("cost") or 0.0
+        market = (getattr(grid.exchange, "markets", None) or {}).get(grid.symbol) or {}
+        in_base = fee.get("currency") == market.get("base")
+        return fee_cost, fee_cost * price if in_base else fee_cost, in_base
+
+    def _record(self, grid, side, price, amount, fee_quote, profit, order=None):
+        """写入成交记录并推送事件"""
+        order = order or {}
+        trade = {
+            "order_id": order.get("id"),
+            "symbol": grid.symbol,
+            "side": "buy" if side == BUY else "sell",
+            "price": price,
+            "amount": amount,
+            "fee": fee_quote,
+            "profit": profit,
+            "timestamp": order.get("lastTradeTimestamp")
+            or order.get("timestamp")
+            or int(time.time() * 1000),
+        }
+        self.ledger.record(grid.strategy_id, grid.mode, trade)
+        if self.notify:
+            self.notify("strategy_trade", {"strategy_id": grid.strategy_id, **trade})
+
+    def _set_triggers(self, strategy_id, grid=None):
+        """注册（grid 为 None 时移除）策略的触发状态机，并更新 native 策略的行情订阅"""
+        with self._trigger_lock:
+            self.triggers.remove(strategy_id)
+            self._subscriptions.pop(strategy_id, None)
+            if grid is not None and grid.triggers is not None:
+                self.triggers.add(strategy_id, grid.price_source, grid.symbol, grid.triggers)
+                # 模拟盘的行情来源由 PaperTrading 管理
+                if grid.mode == "native":
+                    self._subscriptions[strategy_id] = (grid.price_source, grid.symbol)
+            subscriptions = set(self._subscriptions.values())
+        if self.feed is not None:
+            self.feed.set_subscriptions("native", subscriptions)
+
+    def on_price(self, source, symbol, price, timestamp=None):
+        """行情价格监听：更新触发状态机，有信号的策略立即执行一轮"""
+        with self._trigger_lock:
+            fired = self.triggers.on_price(source, symbol, price)
+        for strategy_id, signals in fired.items():
+            grid = self._grids.get(strategy_id)
+            if grid is not None:
+                grid.signals.extend(signals)
+                self.poke(strategy_id)
+
+    async def _start(self, grid):
+        old = self._tasks.pop(grid.strategy_id, None)
+        if old:
+            self._grids[grid.strategy_id].status = STOPPED
+            old.cancel()
+        grid.wake = asyncio.Event()
+        self._grids[grid.strategy_id] = grid
+        self._tasks[grid.strategy_id] = asyncio.create_task(self._run(grid))
+
+    def pause(self, strategy_id):
+        """暂停（保留挂单，不再处理成交和对账）"""
+        grid = self._grids.get(strategy_id)
+        if grid is None:
+            return False
+        if grid.status == RUNNING:
+            grid.status = PAUSED
+        return True
+
+    def resume(self, strategy_id):
+        grid = self._grids.get(strategy_id)
+        if grid is None:
+            return False
+        if grid.status == PAUSED:
+            grid.status = RUNNING
+            self.poke(strategy_id)
+        return True
+
+    def poke(self, strategy_id):
+        """立即执行一轮（如模拟交易所有成交时）"""
+        grid = self._grids.get(strategy_id)
+        if grid is not None and grid.wake is not None and self._loop is not None:
+            self._loop.call_soon_threadsafe(grid.wake.set)
+
+    def stop(self, strategy_id, cancel_orders=True):
+        """停止策略
+
+        Args:
+            cancel_orders: 是否撤销策略的挂单
+
+        Returns:
+            dict: 撤单结果，策略不存在时为 None
+        """
+        grid = self._grids.get(strategy_id)
+        if grid is None:
+            return None
+        grid.status = STOPPED
+        self._set_triggers(strategy_id)
+        self._submit(self._stop(strategy_id)).result()
+        result = None
+        with grid.lock:
+            if cancel_orders:
+                try:
+                    open_orders = grid.own_orders(grid.exchange.fetch_open_orders(grid.symbol))
+                    result = self.gateway.cancel_orders(
+                        grid.exchange, [o["id"] for o in open_orders], grid.symbol, strategy_id
+                    )
+                except Exception as e:
+                    logger.error(f"撤销策略{strategy_id}挂单失败: {e}")
+                    result = {"success": False, "message": str(e)}
+            self._save_state(grid)
+        return result
+
+    async def _stop(self, strategy_id):
+        task = self._tasks.pop(strategy_id, None)
+        self._grids.pop(strategy_id, None)
+        if task:
+            task.cancel()
+
+    def cancel_orders(self, strategy_id, exchange, symbol):
+        """撤销未在执行器中运行的策略留在交易所上的挂单
+
+        按 clientOrderId 前缀和持久化状态中跟踪的订单ID识别策略自己的订单。
+
+        Returns:
+            dict: 撤单结果
+        """
+        state = self._load_state(strategy_id) or {}
+        known = set(state.get("orders") or ())
+        prefix = client_prefix(strategy_id)
+        ids = [
+            order["id"]
+            for order in exchange.fetch_open_orders(symbol)
+            if order["id"] in known or (order.get("clientOrderId") or "").startswith(prefix)
+        ]
+        return self.gateway.cancel_orders(exchange, ids, symbol, strategy_id)
+
+    def forget(self, strategy_id):
+        """删除策略的持久化状态"""
+        with self.db_lock:
+            self.conn.execute("DELETE FROM native_state WHERE strategy_id = ?", (strategy_id,))
+            self.conn.commit()
+
+    def positions(self, strategy_id):
+        """运行中策略各区间的实际持仓（供风控计算持仓类指标），策略不在执行器中时返回None
+
+        Returns:
+            dict: levels 价位、holding 是否持仓、entry 买入价、size 持仓数量（数组），
+                realized 已实现收益
+        """
+        grid = self._grids.get(strategy_id)
+        if grid is None:
+            return None
+        return {
+            "levels": np.frombuffer(grid.prices, dtype=np.float64),
+            "holding": np.frombuffer(bytes(grid.holding), dtype=np.uint8).astype(bool),
+            "entry": np.array(grid.entry, dtype=np.float64),
+            "size": np.array(grid.size, dtype=np.float64),
+            "realized": grid.realized,
+        }
+
+    def get_status(self, strategy_id):
+        grid = self._grids.get(strategy_id)
+        return grid.describe() if grid else None
+
+    def get_all_status(self):
+        return {strategy_id: grid.describe() for strategy_id, grid in list(self._grids.items())}
+
+    def close(self):
+        """停止所有策略（保留挂单）并保存状态"""
+        if self._loop is not None:
+            self._submit(self._close()).result()
+        for grid in list(self._grids.values()):
+            # 等待进行中的一轮结束后保存
+            with grid.lock:
+                self._save_state(grid)
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        self._pool.shutdown(wait=False)
+
+    async def _close(self):
+        for grid in self._grids.values():
+            grid.status = STOPPED
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    # ---- 执行循环 ----
+
+    async def _run(self, grid):
+        loop = asyncio.get_running_loop()
+        failures = 0
+        # 错开各策略的首次查询，避免同时发出大量请求
+        await asyncio.sleep(random.uniform(0, min(self.poll_interval, 1.0)))
+        while grid.status != STOPPED:
+            if grid.status == RUNNING:
+                try:
+                    await loop.run_in_executor(self._pool, self._cycle, grid)
+                    grid.error = None
+                    failures = 0
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    failures += 1
+                    grid.error = str(e)
+                    logger.warning(f"策略{grid.strategy_id}执行失败（第{failures}次）: {e}")
+            delay = self.poll_interval * min(2**failures, 16)
+            grid.wake.clear()
+            try:
+                await asyncio.wait_for(grid.wake.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def _cycle(self, grid):
+        with grid.lock:
+            if grid.status == RUNNING:
+                self._sync_orders(grid)
+
+    def _sync_orders(self, grid):
+        exchange = grid.exchange
+        grid.apply_signals()
+        open_orders = grid.own_orders(exchange.fetch_open_orders(grid.symbol))
+        open_ids = {order["id"] for order in open_orders}
+
+        filled = False
+        for order_id, (interval, side) in list(grid.orders.items()):
+            if order_id in open_ids:
+                continue
+            del grid.orders[order_id]
+            order = exchange.fetch_order(order_id, grid.symbol)
+            amount = order.get("amount") or 0.0
+            if order.get("status") == "closed" or (
+                amount and (order.get("filled") or 0.0) >= amount * 0.999
+            ):
+                self._on_fill(grid, interval, side, order)
+                filled = True
+        if filled:
+            self._save_state(grid)
+
+        intervals, sides, prices, amounts = grid.desired()
+        diff = reconcile(
+            open_orders,
+            intervals,
+            sides,
+            prices,
+            amounts,
+            allow_amend=bool((exchange.has or {}).get("editOrder")),
+        )
+        # 沿用的挂单（包括重启后仍在交易所上的挂单）继续跟踪
+        for order, interval in diff.keep:
+            grid.orders[order["id"]] = (interval, BUY if order["side"] == "buy" else SELL)
+        if diff.operations:
+            result = self.gateway.apply(
+                exchange, grid.symbol, diff, grid.strategy_id, client_id=grid.client_order_id
+            )
+            for (order, interval, _, _), item in zip(diff.amend, result["amend"]["results"]):
+                grid.orders.pop(order["id"], None)
+                if item["success"]:
+                    side = BUY if order["side"] == "buy" else SELL
+                    grid.orders[item["order"]["id"]] = (interval, side)
+            for (interval, side, _, _), item in zip(diff.place, result["place"]["results"]):
+                if item["success"]:
+                    grid.orders[item["order"]["id"]] = (interval, side)
+            for order in diff.cancel:
+                grid.orders.pop(order["id"], None)
+            if not result["success"]:
+                failed = [
+                    item.get("error")
+                    for part in ("cancel", "amend", "place")
+                    for item in result[part]["results"]
+                    if not item["success"]
+                ]
+                grid.error = f"{len(failed)}个请求失败: {failed[0]}"
+                logger.warning(f"策略{grid.strategy_id}部分订单失败: {grid.error}")
+        if grid.triggers is not None:
+            self._place_triggered(grid)
+        grid.last_cycle = time.time()
+
+    def _place_triggered(self, grid):
+        """触发的区间下市价单，未成交的在下一轮重试"""
+        intervals, sides, prices, amounts = grid.triggered()
+        if not len(intervals):
+            return
+        orders = [
+            {
+                "symbol": grid.symbol,
+                "type": "market",
+                "side": "buy" if side == BUY else "sell",
+                "amount": float(amount),
+                # 部分交易所的市价买单按价格计算金额
+                "price": float(price),
+                "params": {"clientOrderId": grid.client_order_id()},
+            }
+            for side, price, amount in zip(sides.tolist(), prices.tolist(), amounts.tolist())
+        ]
+        result = self.gateway.create_orders(grid.exchange, orders, grid.strategy_id)
+        for interval, side, item in zip(intervals.tolist(), sides.tolist(), result["results"]):
+            if item["success"]:
+                grid.orders[item["order"]["id"]] = (interval, side)
+        if not result["success"]:
+            failed = [item.get("error") for item in result["results"] if not item["success"]]
+            grid.error = f"{len(failed)}个触发订单失败: {failed[0]}"
+            logger.warning(f"策略{grid.strategy_id}触发订单失败: {grid.error}")
+
+    def _on_fill(self, grid, interval, side, order):
+        price = order.get("average") or order.get("price")
+        amount = order.get("filled") or order.get("amount")
+        # 手续费统一折算为计价币
+        fee_cost, fee_quote, in_base = self._fee(grid, order, price)
+
+        profit = None
+        grid.pending[interval] = 0.0
+        if side == BUY:
+            grid.holding[interval] = 1
+            grid.entry[interval] = price
+            received = amount - (fee_cost if in_base else 0.0)
+            grid.size[interval] = received
+            grid.entry_fee[interval] = fee_quote
+        else:
+            grid.holding[interval] = 0
+            profit = (price - grid.entry[interval]) * amount - fee_quote - grid.entry_fee[interval]
+            grid.realized += profit
+            grid.size[interval] = 0.0
+            grid.entry_fee[interval] = 0.0
+        grid.fills += 1
+        grid.fees += fee_quote
+        self._record(grid, side, price, amount, fee_quote, profit, order)
+
+    # ---- 持久化 ----
+
+    def _load_state(self, strategy_id):
+        with self.db_lock:
+            row = self.conn.execute(
+                "SELECT state FROM native_state WHERE strategy_id = ?", (strategy_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row and row[0] else None
+
+    def _save_state(self, grid):
+        try:
+            with self.db_lock:
+                self.conn.execute(
+                    """
+                    INSERT OR REPLACE INTO native_state (strategy_id, state, updated_at)
+                    VALUES (?, ?, CURRENT_TIMESTAMP)
+                    """,
+                    (grid.strategy_id, json.dumps(grid.snapshot())),
+                )
+                self.conn.commit()
+        except Exception as e:
+            logger.error(f"保存策略{grid.strategy_id}执行状态失败: {e}")
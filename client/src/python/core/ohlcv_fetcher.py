@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+"""K线增量同步
+
+只请求本地存储尚未覆盖的时间范围（更早的历史或最新的K线），
+通过 fetch_ohlcv 分页拉取；交易所实例由管理器创建，请求经过全局限流调度器。
+只保存已收盘的K线。
+"""
+
+import threading
+import time
+
+import ccxt
+from loguru import logger
+
+
+def timeframe_to_ms(timeframe):
+    """K线周期转毫秒（1m -> 60000）"""
+    return int(ccxt.Exchange.parse_timeframe(timeframe) * 1000)
+
+
+class SyncJob:
+    """一次K线同步任务"""
+
+    def __init__(self, exchange_id, symbol, timeframe, since, until):
+        self.exchange_id = exchange_id
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.since = since
+        self.until = until
+        self.status = "running"
+        self.error = None
+        self.added = 0
+        self.fraction = 0.0
+        self.started_at = time.time()
+        self.finished_at = None
+        self.done = threading.Event()
+
+    def progress(self):
+        return {
+            "exchange": self.exchange_id,
+            "symbol": self.symbol,
+            "timeframe": self.timeframe,
+            "since": self.since,
+            "until": self.until,
+            "status": self.status,
+            "error": self.error,
+            "added": self.added,
+            "progress": round(self.fraction, 4),
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class OHLCVFetcher:
+    """按缺失范围增量同步K线"""
+
+    def __init__(self, store, exchange_factory, catalog, notify=None, page_limit=1000):
+        """初始化同步器
+
+        Args:
+            store: OHLCVStore 实例
+            exchange_factory: 交易所工厂函数 exchange_id -> ccxt实例（已接入限流）
+            catalog: ExchangeCatalog 实例，用于检查K线接口和周期支持
+            notify: 进度回调 (event, data)
+            page_limit: 每页请求的K线数量
+        """
+        self.store = store
+        self.exchange_factory = exchange_factory
+        self.catalog = catalog
+        self.notify = notify
+        self.page_limit = page_limit
+        self._exchanges = {}
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def _exchange(self, exchange_id):
+        exchange = self._exchanges.get(exchange_id)
+        if exchange is None:
+            exchange = self._exchanges[exchange_id] = self.exchange_factory(exchange_id)
+        return exchange
+
+    def _check(self, exchange_id, timeframe):
+        entry = self.catalog.get(exchange_id)
+        if entry is None:
+            raise ValueError(f"不支持的交易所: {exchange_id}")
+        if not entry["has"].get("fetchOHLCV"):
+            raise ValueError(f"{exchange_id}不支持获取K线")
+        if entry["timeframes"] and timeframe not in entry["timeframes"]:
+            raise ValueError(f"{exchange_id}不支持K线周期{timeframe}")
+
+    def missing_ranges(self, series, since, until):
+        """本地未覆盖的时间范围 [(start, end, 是否在已有数据之前)]"""
+        start, end = series.coverage
+        if start is None:
+            return [(since, until, False)] if since < until else []
+        ranges = []
+        if since < start:
+            ranges.append((since, min(start, until), True))
+        if until > end:
+            ranges.append((max(end, since), until, False))
+        return ranges
+
+    def _pages(self, exchange, symbol, timeframe, timeframe_ms, start, end):
+        """分页拉取 [start, end) 内的K线，逐页产出 (rows, 已覆盖到的时间)"""
+        cursor = start
+        while cursor < end:
+            raw = exchange.fetch_ohlcv(symbol, timeframe, since=cursor, limit=self.page_limit)
+            rows = [row for row in raw if cursor <= row[0] < end]
+            if not rows:
+                # 该时间之后没有数据，或交易所忽略 since 只返回最近的K线：
+                # 无法确认范围内没有数据，停止且不推进覆盖范围
+                return
+            covered = int(rows[-1][0]) + timeframe_ms
+            yield rows, covered
+            cursor = covered
+
+    def sync(self, exchange_id, symbol, timeframe, since, until=None, job=None):
+        """同步K线到本地存储
+
+        Args:
+            exchange_id: 交易所ID
+            symbol: ccxt格式交易对
+            timeframe: K线周期
+            since: 起始时间（毫秒）
+            until: 结束时间（毫秒，默认为当前时间）
+            job: 进度记录（可选）
+
+        Returns:
+            int: 新增的K线数量
+        """
+        self._check(exchange_id, timeframe)
+        timeframe_ms = timeframe_to_ms(timeframe)
+        # 对齐到周期边界，只保存已收盘的K线
+        closed = int(time.time() * 1000) // timeframe_ms * timeframe_ms
+        until = closed if until is None else min(int(until), closed)
+        since = int(since) // timeframe_ms * timeframe_ms
+
+        series = self.store.series(exchange_id, symbol, timeframe, timeframe_ms)
+        ranges = self.missing_ranges(series, since, until)
+        total = sum(end - start for start, end, _ in ranges) or 1
+        done = 0
+        added = 0
+        exchange = self._exchange(exchange_id)
+
+        for start, end, before in ranges:
+            backfill = []
+            for rows, covered in self._pages(exchange, symbol, timeframe, timeframe_ms, start, end):
+                if before:
+                    backfill.extend(rows)
+                else:
+                    added += series.append(rows, start, covered)
+                if job:
+                    job.fraction = (done + covered - start) / total
+                    job.added = added + len(backfill)
+                    self._notify(job)
+            if before and backfill:
+                # 覆盖范围只推进到实际返回的最早K线
+                added += series.prepend(backfill, int(backfill[0][0]))
+            done += end - start
+
+        logger.info(f"已同步{exchange_id} {symbol} {timeframe} K线，新增{added}条，共{series.count}条")
+        return added
+
+    def _notify(self, job):
+        if self.notify:
+            try:
+                self.notify("ohlcv_progress", job.progress())
+            except Exception as e:
+                logger.debug(f"推送K线同步进度失败: {e}")
+
+    def start_sync(self, exchange_id, symbol, timeframe, since, until=None):
+        """在后台线程同步K线，同一序列已有任务在运行时返回该任务
+
+        Returns:
+            SyncJob: 同步任务
+        """
+        key = (exchange_id, symbol, timeframe)
+        with self._lock:
+            job = self._jobs.get(key)
+            if job and job.status == "running":
+                return job
+            # 参数错误立即返回给调用方
+            self._check(exchange_id, timeframe)
+            job = self._jobs[key] = SyncJob(exchange_id, symbol, timeframe, since, until)
+
+        def run():
+            try:
+                self.sync(exchange_id, symbol, timeframe, since, until, job)
+                job.status = "done"
+                job.fraction = 1.0
+            except Exception as e:
+                logger.error(f"同步{exchange_id} {symbol} {timeframe} K线失败: {e}")
+                job.status = "failed"
+                job.error = str(e)
+            job.finished_at = time.time()
+            job.done.set()
+            self._notify(job)
+
+        threading.Thread(target=run, name=f"ohlcv-{exchange_id}", daemon=True).start()
+        return job
+
+    def get_jobs(self):
+        """获取所有同步任务进度"""
+        with self._lock:
+            return [job.progress() for job in self._jobs.values()]
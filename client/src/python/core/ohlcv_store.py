@@ -0,0 +1,309 @@
+# -*- coding: utf-8 -*-
+"""本地K线存储
+
+每个 交易所/交易对/周期 一个目录，按列存放只追加的二进制数组
+（timestamp 为 int64 毫秒，open/high/low/close/volume 为 float64），
+meta.json 记录条数、文件代数和已覆盖的时间范围。读取时通过 numpy.memmap 返回零拷贝视图。
+向前补充更早数据时写入新一代文件，已有视图继续指向旧文件。
+
+目录结构:
+    data/ohlcv/<exchange>/<BASE-QUOTE>/<timeframe>/
+        meta.json  timestamp.<代数>.i8  open.<代数>.f8  ...  volume.<代数>.f8
+"""
+
+import json
+import os
+import re
+import shutil
+import threading
+from pathlib import Path
+
+import numpy as np
+from loguru import logger
+
+DEFAULT_STORE_PATH = Path("data") / "ohlcv"
+
+COLUMNS = (
+    ("timestamp", np.int64, "i8"),
+    ("open", np.float64, "f8"),
+    ("high", np.float64, "f8"),
+    ("low", np.float64, "f8"),
+    ("close", np.float64, "f8"),
+    ("volume", np.float64, "f8"),
+)
+
+
+def _safe_name(value):
+    """交易对等名称转为目录名（BTC/USDT:USDT -> BTC-USDT_USDT）"""
+    return re.sub(r"[^A-Za-z0-9._-]", "_", value.replace("/", "-"))
+
+
+class OHLCVSeries:
+    """单个 交易所/交易对/周期 的K线列存储"""
+
+    def __init__(self, path, exchange_id, symbol, timeframe, timeframe_ms):
+        self.path = Path(path)
+        self.exchange_id = exchange_id
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.timeframe_ms = timeframe_ms
+        self.lock = threading.RLock()
+        self._views = None
+        self.meta = self._load_meta()
+
+    def _file(self, column, suffix, generation=None):
+        if generation is None:
+            generation = self.meta["generation"]
+        return self.path / f"{column}.{generation}.{suffix}"
+
+    def _load_meta(self):
+        meta_path = self.path / "meta.json"
+        if not meta_path.exists():
+            return {
+                "exchange": self.exchange_id,
+                "symbol": self.symbol,
+                "timeframe": self.timeframe,
+                "timeframe_ms": self.timeframe_ms,
+                "count": 0,
+                "generation": 0,
+                # 已向交易所请求过的时间范围 [start, end)，范围内缺失的K线不再重复请求
+                "start": None,
+                "end": None,
+            }
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        current = set()
+        # 追加过程中断时数据文件可能比记录的条数长，截断到一致状态
+        for column, dtype, suffix in COLUMNS:
+            file_path = self.path / f"{column}.{meta['generation']}.{suffix}"
+            current.add(file_path.name)
+            expected = meta["count"] * np.dtype(dtype).itemsize
+            if file_path.exists() and file_path.stat().st_size > expected:
+                with open(file_path, "r+b") as f:
+                    f.truncate(expected)
+        # 清理旧代文件（仍被映射时删除失败，下次启动再清理）
+        for file_path in self.path.iterdir():
+            if file_path.name != "meta.json" and file_path.name not in current:
+                try:
+                    file_path.unlink()
+                except OSError:
+                    pass
+        return meta
+
+    def _save_meta(self):
+        self.path.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path / "meta.json.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.meta, f)
+        os.replace(tmp_path, self.path / "meta.json")
+
+    @property
+    def count(self):
+        return self.meta["count"]
+
+    @property
+    def coverage(self):
+        """已覆盖的时间范围 (start, end)，未同步过时为 (None, None)"""
+        return self.meta["start"], self.meta["end"]
+
+    def _last_timestamp(self):
+        if not self.count:
+            return None
+        return int(self.columns()["timestamp"][-1])
+
+    def append(self, rows, start, end):
+        """在末尾追加K线
+
+        Args:
+            rows: 形如 [[timestamp, open, high, low, close, volume], ...] 的数组，按时间升序
+            start: 本次请求覆盖范围的起点（毫秒）
+            end: 本次请求覆盖范围的终点（毫秒，不含）
+
+        Returns:
+            int: 实际写入的条数
+        """
+        with self.lock:
+            rows = np.asarray(rows, dtype=np.float64).reshape(-1, len(COLUMNS))
+            last = self._last_timestamp()
+            if last is not None and len(rows):
+                rows = rows[rows[:, 0] > last]
+            self.path.mkdir(parents=True, exist_ok=True)
+            if len(rows):
+                for i, (column, dtype, suffix) in enumerate(COLUMNS):
+                    with open(self._file(column, suffix), "ab") as f:
+                        f.write(rows[:, i].astype(dtype).tobytes())
+                        f.flush()
+                        os.fsync(f.fileno())
+            self.meta["count"] += len(rows)
+            if self.meta["start"] is None:
+                self.meta["start"] = int(start)
+            self.meta["end"] = max(int(end), self.meta["end"] or 0)
+            self._save_meta()
+            self._views = None
+            return len(rows)
+
+    def prepend(self, rows, start):
+        """在开头补充更早的K线（写入新一代列文件，已有视图仍指向旧文件，保持有效）
+
+        Args:
+            rows: 早于现有数据的K线，按时间升序
+            start: 新的覆盖范围起点（毫秒）
+
+        Returns:
+            int: 实际写入的条数
+        """
+        with self.lock:
+            rows = np.asarray(rows, dtype=np.float64).reshape(-1, len(COLUMNS))
+            if self.count and len(rows):
+                first = int(self.columns()["timestamp"][0])
+                rows = rows[rows[:, 0] < first]
+            if len(rows):
+                current = self.columns()
+                generation = self.meta["generation"] + 1
+                for i, (column, dtype, suffix) in enumerate(COLUMNS):
+                    with open(self._file(column, suffix, generation), "wb") as f:
+                        f.write(rows[:, i].astype(dtype).tobytes())
+                        if self.count:
+                            f.write(np.ascontiguousarray(current[column]).tobytes())
+                        f.flush()
+                        os.fsync(f.fileno())
+                self.meta["generation"] = generation
+            self.meta["count"] += len(rows)
+            self.meta["start"] = int(start)
+            if self.meta["end"] is None:
+                self.meta["end"] = int(start)
+            self._save_meta()
+            self._views = None
+            if len(rows):
+                self._remove_generation(self.meta["generation"] - 1)
+            return len(rows)
+
+    def _remove_generation(self, generation):
+        """删除旧代文件（仍被映射时删除失败，下次加载时再清理）"""
+        for column, _, suffix in COLUMNS:
+            try:
+                self._file(column, suffix, generation).unlink()
+            except OSError:
+                pass
+
+    def columns(self):
+        """全部K线的只读内存映射视图
+
+        Returns:
+            dict: 列名 -> numpy数组（零拷贝）
+        """
+        views = self._views
+        if views is not None:
+            return views
+        with self.lock:
+            count = self.count
+            views = {}
+            for column, dtype, suffix in COLUMNS:
+                if count:
+                    views[column] = np.memmap(
+                        self._file(column, suffix), dtype=dtype, mode="r", shape=(count,)
+                    )
+                else:
+                    views[column] = np.empty(0, dtype=dtype)
+            self._views = views
+        return views
+
+    def read(self, since=None, until=None):
+        """读取时间范围内的K线
+
+        Args:
+            since: 起始时间（毫秒，含）
+            until: 结束时间（毫秒，不含）
+
+        Returns:
+            dict: 列名 -> numpy数组切片（零拷贝视图）
+        """
+        columns = self.columns()
+        timestamps = columns["timestamp"]
+        lo = 0 if since is None else int(np.searchsorted(timestamps, since, "left"))
+        hi = len(timestamps) if until is None else int(np.searchsorted(timestamps, until, "left"))
+        return {name: values[lo:hi] for name, values in columns.items()}
+
+    def describe(self):
+        return {
+            "exchange": self.exchange_id,
+            "symbol": self.symbol,
+            "timeframe": self.timeframe,
+            "count": self.count,
+            "start": self.meta["start"],
+            "end": self.meta["end"],
+        }
+
+
+class OHLCVStore:
+    """K线存储目录"""
+
+    def __init__(self, root=None):
+        """初始化存储
+
+        Args:
+            root: 存储根目录，默认为 data/ohlcv
+        """
+        self.root = Path(root) if root else DEFAULT_STORE_PATH
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def series(self, exchange_id, symbol, timeframe, timeframe_ms=None):
+        """获取（或创建）K线序列
+
+        Args:
+            exchange_id: 交易所ID
+            symbol: ccxt格式交易对
+            timeframe: K线周期（如 1m、1h）
+            timeframe_ms: 周期毫秒数，新建序列时必须提供
+
+        Returns:
+            OHLCVSeries: K线序列
+        """
+        key = (exchange_id, symbol, timeframe)
+        series = self._series.get(key)
+        if series is not None:
+            return series
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                path = self.root / exchange_id / _safe_name(symbol) / timeframe
+                if timeframe_ms is None and not (path / "meta.json").exists():
+                    raise KeyError(f"K线数据不存在: {exchange_id} {symbol} {timeframe}")
+                series = OHLCVSeries(path, exchange_id, symbol, timeframe, timeframe_ms)
+                if timeframe_ms is None:
+                    series.timeframe_ms = series.meta["timeframe_ms"]
+                self._series[key] = series
+        return series
+
+    def read(self, exchange_id, symbol, timeframe, since=None, until=None):
+        """读取K线（零拷贝视图），数据不存在时抛出 KeyError"""
+        return self.series(exchange_id, symbol, timeframe).read(since, until)
+
+    def list_series(self):
+        """列出所有已存储的K线序列"""
+        result = []
+        for meta_path in self.root.glob("*/*/*/meta.json"):
+            try:
+                with open(meta_path, "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+                result.append(
+                    {
+                        "exchange": meta["exchange"],
+                        "symbol": meta["symbol"],
+                        "timeframe": meta["timeframe"],
+                        "count": meta["count"],
+                        "start": meta["start"],
+                        "end": meta["end"],
+                    }
+                )
+            except Exception as e:
+                logger.warning(f"读取K线索引{meta_path}失败: {e}")
+        return result
+
+    def delete(self, exchange_id, symbol, timeframe):
+        """删除K线序列"""
+        with self._lock:
+            self._series.pop((exchange_id, symbol, timeframe), None)
+        shutil.rmtree(self.root / exchange_id / _safe_name(symbol) / timeframe, ignore_errors=True)
@@ -0,0 +1,384 @@
+# -*- coding: utf-8 -*-
+"""网格参数寻优
+
+把 上限 × 下限 × 网格数量 × 网格类型 × 交易对 的参数组合分批分发到进程池回测。
+K线数组只复制一次到 multiprocessing.shared_memory，工作进程按名称映射，
+不随任务序列化。结果按目标函数排序后持续推送，最优值连续若干批不再提升时提前结束。
+任务在后台线程中调度，不阻塞IPC请求处理。
+"""
+
+import itertools
+import multiprocessing
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+
+import numpy as np
+from loguru import logger
+
+from core.backtest import run_backtest
+from core.grid import TICK_SIZE, GridSpec
+
+CANDLE_COLUMNS = ("timestamp", "open", "high", "low", "close")
+
+OBJECTIVES = {
+    "return": lambda s: s["total_return_pct"],
+    "pnl": lambda s: s["realized_pnl"],
+    "calmar": lambda s: s["total_return_pct"] / max(s["max_drawdown_pct"], 0.01),
+    "round_trips": lambda s: s["round_trips"],
+}
+
+# 工作进程内已映射的共享内存
+_attached = {}
+
+
+class SharedCandles:
+    """共享内存中的K线列（5列 float64 连续存放）"""
+
+    def __init__(self, candles):
+        count = len(candles["timestamp"])
+        self.count = count
+        self.shm = shared_memory.SharedMemory(
+            create=True, size=max(count * len(CANDLE_COLUMNS) * 8, 8)
+        )
+        block = np.ndarray((len(CANDLE_COLUMNS), count), dtype=np.float64, buffer=self.shm.buf)
+        for i, column in enumerate(CANDLE_COLUMNS):
+            block[i] = candles[column]
+        del block
+
+    @property
+    def handle(self):
+        return self.shm.name, self.count
+
+    def release(self):
+        self.shm.close()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def _candles(handle):
+    """在工作进程中按名称映射共享K线（零拷贝）"""
+    name, count = handle
+    cached = _attached.get(name)
+    if cached is None:
+        shm = shared_memory.SharedMemory(name=name)
+        block = np.ndarray((len(CANDLE_COLUMNS), count), dtype=np.float64, buffer=shm.buf)
+        columns = dict(zip(CANDLE_COLUMNS, block))
+        columns["timestamp"] = columns["timestamp"].astype(np.int64)
+        cached = _attached[name] = (shm, columns)
+    return cached[1]
+
+
+def _run_batch(handle, market, precision_mode, fee_rate, slippage, combos):
+    """工作进程：回测一批参数组合
+
+    Returns:
+        list: [(组合, 汇总指标或错误信息)]
+    """
+    candles = _candles(handle)
+    results = []
+    for combo in combos:
+        grid_type, lower, upper, grid_count, amount = combo[1:]
+        try:
+            spec = GridSpec(grid_type, lower, upper, grid_count, amount)
+            summary = run_backtest(
+                candles, spec, fee_rate, slippage, market, precision_mode
+            ).summary()
+            results.append((combo, summary))
+        except Exception as e:
+            results.append((combo, {"error": str(e)}))
+    return results
+
+
+def _batches(combos, batch_size):
+    """按交易对分批：每批只含同一交易对的组合，一批对应一个进程池任务
+
+    批次顺序打乱，提前结束时结果不偏向某一交易对；组合在批内保持原有（已打乱的）顺序。
+    """
+    by_pair = {}
+    for combo in combos:
+        by_pair.setdefault(combo[0], []).append(combo)
+    batches = [
+        group[i : i + batch_size]
+        for group in by_pair.values()
+        for i in range(0, len(group), batch_size)
+    ]
+    random.shuffle(batches)
+    return batches
+
+
+def _values(spec, default=None):
+    """参数取值：列表原样使用，{min, max, steps} 生成等间距取值，单值视为一个取值"""
+    if spec is None:
+        return [] if default is None else [default]
+    if isinstance(spec, dict):
+        steps = int(spec.get("steps", 5))
+        return np.linspace(float(spec["min"]), float(spec["max"]), steps).tolist()
+    if isinstance(spec, (list, tuple)):
+        return list(spec)
+    return [spec]
+
+
+class OptimizeJob:
+    """一次参数寻优任务"""
+
+    def __init__(self, params, pairs, objective, top_k):
+        self.id = uuid.uuid4().hex[:8]
+        self.params = params
+        self.pairs = pairs
+        self.objective = objective
+        self.top_k = top_k
+        self.status = "running"
+        self.error = None
+        self.total = 0
+        self.evaluated = 0
+        self.failed = 0
+        self.stopped_early = False
+        self.results = []
+        self.started_at = time.time()
+        self.finished_at = None
+        self.cancel = threading.Event()
+        self.done = threading.Event()
+
+    def progress(self):
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "error": self.error,
+            "objective": self.objective,
+            "total": self.total,
+            "evaluated": self.evaluated,
+            "failed": self.failed,
+            "stopped_early": self.stopped_early,
+            "results": self.results,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class GridOptimizer:
+    """网格参数寻优任务管理"""
+
+    def __init__(self, workers=None, batch_size=16, notify=None):
+        """初始化
+
+        Args:
+            workers: 进程数，默认为CPU核数
+            batch_size: 每个任务包含的参数组合数
+            notify: 进度回调 (event, data)
+        """
+        self.workers = workers or multiprocessing.cpu_count()
+        self.batch_size = batch_size
+        self.notify = notify
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def combinations(self, params, start_prices):
+        """展开参数组合
+
+        上下限可以用绝对价格（upperPrice/lowerPrice），
+        也可以用相对回测起始价的百分比（upperPct/lowerPct，多交易对时使用）。
+
+        Returns:
+            list: [(交易对, 网格类型, 下限, 上限, 网格数量, 每格金额)]
+        """
+        grid_types = _values(params.get("gridType"), "arithmetic")
+        grid_counts = [int(v) for v in _values(params.get("gridCount"), 10)]
+        amount = float(params.get("amountPerGrid", 10))
+        combos = []
+        for pair, start_price in start_prices.items():
+            if params.get("upperPct") is not None:
+                uppers = [start_price * (1 + float(v) / 100) for v in _values(params["upperPct"])]
+                lowers = [start_price * (1 - float(v) / 100) for v in _values(params["lowerPct"])]
+            else:
+                uppers = [float(v) for v in _values(params.get("upperPrice"))]
+                lowers = [float(v) for v in _values(params.get("lowerPrice"))]
+            for grid_type, lower, upper, grid_count in itertools.product(
+                grid_types, lowers, uppers, grid_counts
+            ):
+                if 0 < lower < upper and grid_count > 1:
+                    combos.append((pair, grid_type, lower, upper, grid_count, amount))
+        return combos
+
+    def start(self, datasets, params, markets=None, fee_rates=None, precision_mode=TICK_SIZE):
+        """启动寻优任务
+
+        Args:
+            datasets: 交易对 -> K线列（OHLCVStore.read 的结果）
+            params: 寻优参数，包括参数取值范围以及
+                objective（return/pnl/calmar/round_trips）、topK、patience、slippage
+            markets: 交易对 -> ccxt市场信息（可选，用于精度取整）
+            fee_rates: 交易对 -> 手续费率（默认 0.001）
+            precision_mode: 交易所精度模式
+
+        Returns:
+            OptimizeJob: 寻优任务
+
+        Raises:
+            ValueError: 参数错误
+        """
+        objective = params.get("objective", "calmar")
+        if objective not in OBJECTIVES:
+            raise ValueError(f"不支持的优化目标: {objective}")
+        start_prices = {pair: float(c["open"][0]) for pair, c in datasets.items() if len(c["open"])}
+        if not start_prices:
+            raise ValueError("回测区间内没有K线数据")
+        combos = self.combinations(params, start_prices)
+        if not combos:
+            raise ValueError("没有有效的参数组合（下限必须小于上限）")
+        # 随机顺序评估，提前结束时结果不偏向某一参数区域
+        random.shuffle(combos)
+
+        job = OptimizeJob(params, list(start_prices), objective, int(params.get("topK", 20)))
+        job.total = len(combos)
+        with self._lock:
+            self._jobs[job.id] = job
+        threading.Thread(
+            target=self._run,
+            args=(job, datasets, combos, markets or {}, fee_rates or {}, precision_mode),
+            name=f"optimize-{job.id}",
+            daemon=True,
+        ).start()
+        return job
+
+    def _run(self, job, datasets, combos, markets, fee_rates, precision_mode):
+        params = job.params
+        slippage = float(params.get("slippage", 0))
+        patience = int(params.get("patience", 0))
+        score = OBJECTIVES[job.objective]
+
+        shared = {}
+        pool = None
+        try:
+            for pair in job.pairs:
+                shared[pair] = SharedCandles(datasets[pair])
+            # spawn 启动方式在各平台行为一致，且不会复制引擎的后台线程
+            pool = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+            batches = _batches(combos, self.batch_size)
+            pending = set()
+            best = None
+            stale = 0
+            queue = iter(batches)
+
+            def submit():
+                batch = next(queue, None)
+                if batch is None:
+                    return False
+                pair = batch[0][0]
+                pending.add(
+                    pool.submit(
+                        _run_batch,
+                        shared[pair].handle,
+                        markets.get(pair),
+                        precision_mode,
+                        fee_rates.get(pair, 0.001),
+                        slippage,
+                        batch,
+                    )
+                )
+                return True
+
+            # 保持队列中的任务数略多于进程数，便于提前结束时尽快停止
+            for _ in range(self.workers * 2):
+                if not submit():
+                    break
+
+            while pending:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                improved = False
+                for future in finished:
+                    for combo, summary in future.result():
+                        job.evaluated += 1
+                        if "error" in summary:
+                            job.failed += 1
+                            continue
+                        value = score(summary)
+                        if best is None or value > best + abs(best) * 1e-3:
+                            best = value
+                            improved = True
+                        self._record(job, combo, value, summary)
+                stale = 0 if improved else stale + len(finished)
+                self._notify(job)
+
+                if job.cancel.is_set():
+                    job.status = "cancelled"
+                    break
+                if patience and stale >= patience and job.evaluated >= job.total * 0.1:
+                    job.stopped_early = True
+                    logger.info(f"寻优任务{job.id}最优值连续{stale}批未提升，提前结束")
+                    break
+                while len(pending) < self.workers * 2 and submit():
+                    pass
+
+            for future in pending:
+                future.cancel()
+            if job.status == "running":
+                job.status = "done"
+        except Exception as e:
+            logger.error(f"寻优任务{job.id}失败: {e}")
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            if pool:
+                pool.shutdown(wait=True, cancel_futures=True)
+            for candles in shared.values():
+                candles.release()
+            job.finished_at = time.time()
+            job.done.set()
+            self._notify(job)
+
+    def _record(self, job, combo, value, summary):
+        """插入排序结果，只保留前 top_k 个"""
+        pair, grid_type, lower, upper, grid_count, amount = combo
+        job.results.append(
+            {
+                "pair": pair,
+                "gridType": grid_type,
+                "lowerPrice": lower,
+                "upperPrice": upper,
+                "gridCount": grid_count,
+                "amountPerGrid": amount,
+                "score": value,
+                **summary,
+            }
+        )
+        job.results.sort(key=lambda r: r["score"], reverse=True)
+        del job.results[job.top_k :]
+
+    def _notify(self, job):
+        if self.notify:
+            try:
+                self.notify("optimize_progress", job.progress())
+            except Exception as e:
+                logger.debug(f"推送寻优进度失败: {e}")
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def stop(self, job_id):
+        """请求停止任务，已提交的批次完成后结束"""
+        job = self._jobs.get(job_id)
+        if job is None:
+            return False
+        job.cancel.set()
+        return True
+
+    def get_jobs(self):
+        with self._lock:
+            return [job.progress() for job in self._jobs.values()]
+
+    def close(self):
+        """停止所有运行中的任务并等待进程池退出"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        for job in jobs:
+            job.cancel.set()
+        for job in jobs:
+            job.done.wait(timeout=30)
@@ -0,0 +1,377 @@
+# -*- coding: utf-8 -*-
+"""批量下单网关
+
+一次铺设上百个价位的网格，逐个下单需要同样多次 REST 往返。网关按交易所分组：
+
+- 能力目录中支持 createOrders / cancelOrders 的交易所，按交易所单批上限分块调用批量接口；
+- 不支持的交易所，用线程池并发发送单个请求，配额仍由全局限流调度器按
+  交易关键优先级统一放行，不会超出交易所限额。
+
+每个订单单独返回结果，部分失败不影响同批其他订单。交易所实例需经过
+RateLimitScheduler.attach（main.py 的 _create_exchange 创建的实例都已接入），
+也可以传入实现同样接口的模拟交易所。
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import ccxt
+from loguru import logger
+
+from core.rate_limiter import PRIORITY_CRITICAL
+
+# 各交易所批量下单接口单次最多订单数
+BATCH_LIMITS = {
+    "binance": 5,
+    "binanceus": 5,
+    "bitget": 50,
+    "bybit": 10,
+    "gate": 10,
+    "htx": 10,
+    "kucoin": 5,
+    "mexc": 20,
+    "okx": 20,
+}
+DEFAULT_BATCH_LIMIT = 10
+
+# 批量接口返回这些状态的订单视为失败
+FAILED_STATUSES = ("rejected", "canceled", "expired")
+# 批量撤单接口返回这些状态的订单视为撤单失败（closed 为撤单前已成交）
+CANCEL_FAILED_STATUSES = ("rejected", "expired", "closed")
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+def _error(e):
+    return f"{type(e).__name__}: {e}"
+
+
+class OrderGateway:
+    """按交易所批量或并发发送下单、撤单请求"""
+
+    def __init__(self, scheduler, catalog=None, workers=16, batch_limits=None):
+        """初始化
+
+        Args:
+            scheduler: RateLimitScheduler 实例
+            catalog: ExchangeCatalog 实例，用于判断批量接口，未收录的交易所使用实例的 has
+            workers: 并发发送单个请求的线程数
+            batch_limits: 交易所ID -> 单批订单数上限的覆盖
+        """
+        self.scheduler = scheduler
+        self.catalog = catalog
+        self.batch_limits = {**BATCH_LIMITS, **(batch_limits or {})}
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="order-gateway")
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _has(self, exchange, capability):
+        if self.catalog is not None and self.catalog.supports(exchange.id):
+            return self.catalog.has(exchange.id, capability)
+        return bool((exchange.has or {}).get(capability))
+
+    def _count(self, exchange_id, name, value=1):
+        with self._lock:
+            stats = self._stats.setdefault(
+                exchange_id, {"requests": 0, "batches": 0, "orders": 0, "failed": 0}
+            )
+            stats[name] += value
+
+    def _call(self, exchange, key, fn, *args):
+        """以交易关键优先级调用交易所接口（在线程池中执行，需要重新设置上下文）"""
+        self._count(exchange.id, "requests")
+        with self.scheduler.context(PRIORITY_CRITICAL, key):
+            return fn(*args)
+
+    def _pipeline(self, exchange, key, calls):
+        """并发发送单个请求，按顺序返回 (成功, 结果或异常)"""
+        futures = [self._pool.submit(self._call, exchange, key, fn, *args) for fn, args in calls]
+        results = []
+        for future in futures:
+            try:
+                results.append((True, future.result()))
+            except Exception as e:
+                results.append((False, e))
+        return results
+
+    def create_orders(self, exchange, orders, key=None):
+        """批量下单
+
+        Args:
+            exchange: ccxt 同步交易所实例（已接入限流调度器）
+            orders: 订单列表，每项包含 symbol、type、side、amount、price，可选 params
+            key: 公平队列键（通常为策略ID）
+
+        Returns:
+            dict: {success, placed, failed, results}，results 与 orders 一一对应，
+                每项为 {index, success, order} 或 {index, success, error}
+        """
+        results = [None] * len(orders)
+        indexed = list(enumerate(orders))
+        pending = indexed
+        if len(orders) > 1 and self._has(exchange, "createOrders"):
+            pending = []
+            limit = self.batch_limits.get(exchange.id, DEFAULT_BATCH_LIMIT)
+            chunks = list(_chunks(indexed, limit))
+            batches = self._pipeline(
+                exchange,
+                key,
+                [
+                    (exchange.create_orders, ([_request(order) for _, order in chunk],))
+                    for chunk in chunks
+                ],
+            )
+            self._count(exchange.id, "batches", len(chunks))
+            for chunk, (ok, response) in zip(chunks, batches):
+                if not ok:
+                    if isinstance(response, (ccxt.NotSupported, ccxt.BadRequest)):
+                        # 批量接口不接受这批参数时改为逐个下单，得到每个订单的结果；
+                        # 其他错误（如超时）时订单可能已提交，不重发以免重复下单
+                        logger.warning(f"{exchange.id}批量下单失败，改为逐个下单: {_error(response)}")
+                        pending.extend(chunk)
+                    else:
+                        for index, _ in chunk:
+                            results[index] = {
+                                "index": index,
+                                "success": False,
+                                "error": _error(response),
+                            }
+                    continue
+                response = list(response or [])
+                for position, (index, _) in enumerate(chunk):
+                    order = response[position] if position < len(response) else None
+                    results[index] = _order_result(index, order)
+
+        if pending:
+            singles = self._pipeline(
+                exchange,
+                key,
+                [
+                    (
+                        exchange.create_order,
+                        (
+                            order["symbol"],
+                            order.get("type", "limit"),
+                            order["side"],
+                            order["amount"],
+                            order.get("price"),
+                            order.get("params") or {},
+                        ),
+                    )
+                    for _, order in pending
+                ],
+            )
+            for (index, _), (ok, response) in zip(pending, singles):
+                results[index] = (
+                    _order_result(index, response)
+                    if ok
+                    else {"index": index, "success": False, "error": _error(response)}
+                )
+        return self._summary(exchange.id, results, "placed")
+
+    def cancel_orders(self, exchange, ids, symbol, key=None):
+        """批量撤单
+
+        Args:
+            exchange: ccxt 同步交易所实例
+            ids: 订单ID列表
+            symbol: ccxt格式交易对
+            key: 公平队列键
+
+        Returns:
+            dict: {success, canceled, failed, results}，results 与 ids 一一对应
+        """
+        results = [None] * len(ids)
+        indexed = list(enumerate(ids))
+        pending = indexed
+        if len(ids) > 1 and self._has(exchange, "cancelOrders"):
+            pending = []
+            limit = self.batch_limits.get(exchange.id, DEFAULT_BATCH_LIMIT)
+            chunks = list(_chunks(indexed, limit))
+            batches = self._pipeline(
+                exchange,
+                key,
+                [(exchange.cancel_orders, ([i for _, i in chunk], symbol)) for chunk in chunks],
+            )
+            self._count(exchange.id, "batches", len(chunks))
+            for chunk, (ok, response) in zip(chunks, batches):
+                if not ok:
+                    # 撤单可以安全重试，整批失败时逐个撤单得到每个订单的结果
+                    pending.extend(chunk)
+                    continue
+                response = [order for order in response or [] if isinstance(order, dict)]
+                by_id = {str(order["id"]): order for order in response if order.get("id")}
+                for position, (index, order_id) in enumerate(chunk):
+                    # 按订单ID对应返回结果，返回中没有ID时按顺序对应
+                    order = by_id.get(str(order_id))
+                    if order is None and not by_id and position < len(response):
+                        order = response[position]
+                    results[index] = _cancel_result(index, order_id, order)
+
+        if pending:
+            singles = self._pipeline(
+                exchange, key, [(exchange.cancel_order, (i, symbol)) for _, i in pending]
+            )
+            for (index, order_id), (ok, response) in zip(pending, singles):
+                results[index] = (
+                    {"index": index, "success": True, "id": order_id}
+                    if ok
+                    else {
+                        "index": index,
+                        "success": False,
+                        "id": order_id,
+                        "error": _error(response),
+                    }
+                )
+        return self._summary(exchange.id, results, "canceled")
+
+    def edit_orders(self, exchange, edits, key=None):
+        """并发修改订单
+
+        Args:
+            edits: 每项包含 id、symbol、type、side、amount、price
+
+        Returns:
+            dict: {success, edited, failed, results}
+        """
+        responses = self._pipeline(
+            exchange,
+            key,
+            [
+                (
+                    exchange.edit_order,
+                    (
+                        edit["id"],
+                        edit["symbol"],
+                        edit.get("type", "limit"),
+                        edit["side"],
+                        edit["amount"],
+                        edit.get("price"),
+                    ),
+                )
+                for edit in edits
+            ],
+        )
+        results = [
+            _order_result(index, response)
+            if ok
+            else {
+                "index": index,
+                "success": False,
+                "id": edits[index]["id"],
+                "error": _error(response),
+            }
+            for index, (ok, response) in enumerate(responses)
+        ]
+        return self._summary(exchange.id, results, "edited")
+
+    def apply(self, exchange, symbol, plan, key=None, client_id=None):
+        """执行对账结果（core.reconcile.ReconcilePlan）：先撤单和改单，再新增
+
+        Args:
+            client_id: 返回新订单 clientOrderId 的函数（可选）
+
+        Returns:
+            dict: {success, cancel, amend, place}，各部分为对应接口的结果
+        """
+        cancel = self.cancel_orders(exchange, [order["id"] for order in plan.cancel], symbol, key)
+        amend = self.edit_orders(
+            exchange,
+            [
+                {
+                    "id": order["id"],
+                    "symbol": symbol,
+                    "side": order["side"],
+                    "amount": amount,
+                    "price": price,
+                }
+                for order, _, price, amount in plan.amend
+            ],
+            key,
+        )
+        place = self.create_orders(
+            exchange,
+            [
+                {
+                    "symbol": symbol,
+                    "type": "limit",
+                    "side": "buy" if side > 0 else "sell",
+                    "amount": amount,
+                    "price": price,
+                    "params": {"clientOrderId": client_id()} if client_id else {},
+                }
+                for _, side, price, amount in plan.place
+            ],
+            key,
+        )
+        return {
+            "success": cancel["success"] and amend["success"] and place["success"],
+            "cancel": cancel,
+            "amend": amend,
+            "place": place,
+        }
+
+    def _summary(self, exchange_id, results, done_key):
+        failed = sum(1 for result in results if not result["success"])
+        self._count(exchange_id, "orders", len(results))
+        self._count(exchange_id, "failed", failed)
+        return {
+            "success": failed == 0,
+            done_key: len(results) - failed,
+            "failed": failed,
+            "results": results,
+        }
+
+    def stats(self):
+        """各交易所的请求、批次、订单和失败数"""
+        with self._lock:
+            return {exchange_id: dict(stats) for exchange_id, stats in self._stats.items()}
+
+    def close(self):
+        self._pool.shutdown(wait=False)
+
+
+def _request(order):
+    """转换为 ccxt createOrders 的订单格式"""
+    return {
+        "symbol": order["symbol"],
+        "type": order.get("type", "limit"),
+        "side": order["side"],
+        "amount": order["amount"],
+        "price": order.get("price"),
+        "params": order.get("params") or {},
+    }
+
+
+def _order_result(index, order):
+    if not order or not order.get("id") or order.get("status") in FAILED_STATUSES:
+        error = None
+        if order:
+            info = order.get("info")
+            error = (info.get("msg") or info.get("message")) if isinstance(info, dict) else None
+        return {
+            "index": index,
+            "success": False,
+            "order": order,
+            "error": error or "交易所未接受订单",
+        }
+    return {"index": index, "success": True, "order": order}
+
+
+def _cancel_result(index, order_id, order):
+    if not order or order.get("status") in CANCEL_FAILED_STATUSES:
+        error = None
+        if order:
+            info = order.get("info")
+            error = (info.get("msg") or info.get("message")) if isinstance(info, dict) else None
+            error = error or f"订单状态为{order.get('status')}"
+        return {
+            "index": index,
+            "success": False,
+            "id": order_id,
+            "error": error or "交易所未返回撤单结果",
+        }
+    return {"index": index, "success": True, "id": order_id}
@@ -0,0 +1,290 @@
+# -*- coding: utf-8 -*-
+"""交易对搜索索引
+
+基于市场信息服务的缓存为每个交易所建立内存索引：
+前缀字典树（base、symbol、交易所原始ID及无分隔符写法）加三元组模糊匹配，
+支持计价币种、现货/杠杆、是否活跃的筛选和计数，结果分页返回。
+市场信息更新后对应交易所的索引按需重建。
+"""
+
+import heapq
+import threading
+from collections import Counter, OrderedDict
+
+FUZZY_MIN_SCORE = 0.5
+RESULT_CACHE_SIZE = 64
+
+
+def _normalize(query):
+    """统一查询写法：小写，BTC-USDT / BTC_USDT 视为 BTC/USDT"""
+    return query.strip().lower().replace("-", "/").replace("_", "/")
+
+
+def _trigrams(token):
+    return {token[i : i + 3] for i in range(len(token) - 2)}
+
+
+class _TrieNode:
+    __slots__ = ("children", "ids")
+
+    def __init__(self):
+        self.children = {}
+        self.ids = []
+
+
+class _ExchangeIndex:
+    """单个交易所的列式记录、前缀树和三元组倒排表"""
+
+    def __init__(self, exchange_id, markets):
+        self.exchange_id = exchange_id
+        self.markets = markets
+        self.symbols = []
+        self.bases = []
+        self.quotes = []
+        self.types = []
+        self.margin = []
+        self.active = []
+        self.order_keys = []
+        self.root = _TrieNode()
+        self.grams = {}
+        # 模糊匹配的词：每条记录两个（基础币、无分隔符交易对），词ID = 记录ID * 2 + 序号
+        self.gram_sizes = []
+
+        for symbol, market in markets.items():
+            doc_id = len(self.symbols)
+            base = (market.get("base") or "").upper()
+            quote = (market.get("quote") or "").upper()
+            self.symbols.append(symbol)
+            self.bases.append(base)
+            self.quotes.append(quote)
+            self.types.append(market.get("type") or ("spot" if market.get("spot") else "other"))
+            self.margin.append(bool(market.get("margin")))
+            self.active.append(market.get("active") is not False)
+            # 同一匹配等级内：活跃优先，交易对越短越靠前
+            self.order_keys.append((not self.active[-1], len(symbol), symbol))
+
+            lowered = symbol.lower()
+            compact = lowered.replace("/", "").split(":")[0]
+            # 计价币种不进入前缀树（用筛选条件过滤），否则 btc 会匹配所有 */BTC 交易对
+            tokens = {lowered, compact, base.lower()}
+            if market.get("id"):
+                tokens.add(str(market["id"]).lower())
+            for token in tokens:
+                if token:
+                    self._insert(token, doc_id)
+            for offset, token in enumerate((base.lower(), compact)):
+                grams = _trigrams(token)
+                self.gram_sizes.append(len(grams))
+                for gram in grams:
+                    self.grams.setdefault(gram, []).append(doc_id * 2 + offset)
+
+        # 无查询条件时的浏览顺序
+        self.sorted_ids = sorted(range(len(self.symbols)), key=self.order_keys.__getitem__)
+
+    def _insert(self, token, doc_id):
+        node = self.root
+        for char in token:
+            node = node.children.setdefault(char, _TrieNode())
+            # 同一记录的多个词可能共享前缀，只记录一次
+            if not node.ids or node.ids[-1] != doc_id:
+                node.ids.append(doc_id)
+
+    def prefix(self, query):
+        """前缀匹配的记录ID列表"""
+        node = self.root
+        for char in query:
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return node.ids
+
+    def fuzzy(self, query, exclude):
+        """三元组相似度（Dice系数）达到阈值的记录 [(score, doc_id)]"""
+        query_grams = _trigrams(query.replace("/", ""))
+        if not query_grams:
+            return []
+        counts = Counter()
+        for gram in query_grams:
+            counts.update(self.grams.get(gram, ()))
+        best = {}
+        for token_id, count in counts.items():
+            doc_id = token_id >> 1
+            if doc_id in exclude:
+                continue
+            score = 2 * count / (len(query_grams) + self.gram_sizes[token_id])
+            if score >= FUZZY_MIN_SCORE and score > best.get(doc_id, 0):
+                best[doc_id] = score
+        return [(score, doc_id) for doc_id, score in best.items()]
+
+    def rank(self, doc_id, query):
+        """匹配等级：0完全匹配交易对，1完全匹配基础币，2基础币前缀，3其他前缀"""
+        symbol = self.symbols[doc_id].lower()
+        if query == symbol or query == symbol.replace("/", "").split(":")[0]:
+            return 0
+        base = self.bases[doc_id].lower()
+        if query == base:
+            return 1
+        if base.startswith(query):
+            return 2
+        return 3
+
+    def accepts(self, doc_id, quote, market_type, active):
+        if quote and self.quotes[doc_id] != quote:
+            return False
+        if market_type == "margin":
+            if not self.margin[doc_id]:
+                return False
+        elif market_type and self.types[doc_id] != market_type:
+            return False
+        if active is not None and self.active[doc_id] != active:
+            return False
+        return True
+
+    def item(self, doc_id):
+        return {
+            "exchange": self.exchange_id,
+            "symbol": self.symbols[doc_id],
+            "base": self.bases[doc_id],
+            "quote": self.quotes[doc_id],
+            "type": self.types[doc_id],
+            "margin": self.margin[doc_id],
+            "active": self.active[doc_id],
+        }
+
+
+class PairSearchIndex:
+    """跨交易所交易对搜索"""
+
+    def __init__(self, markets):
+        """初始化索引
+
+        Args:
+            markets: AsyncMarketService 实例，索引基于其缓存的市场信息
+        """
+        self.markets = markets
+        self._indexes = {}
+        self._version = 0
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+
+    def refresh(self, exchange_ids, testnet=False):
+        """为市场信息有变化的交易所重建索引
+
+        Returns:
+            list: 已建立索引的交易所索引对象
+        """
+        indexes = []
+        with self._lock:
+            for exchange_id in exchange_ids:
+                markets = self.markets.get_cached_markets(exchange_id, testnet)
+                if markets is None:
+                    continue
+                key = (exchange_id, testnet)
+                index = self._indexes.get(key)
+                if index is None or index.markets is not markets:
+                    index = self._indexes[key] = _ExchangeIndex(exchange_id, markets)
+                    self._version += 1
+                indexes.append(index)
+        return indexes
+
+    def _match(self, indexes, query, quote, market_type, active):
+        """返回排序后的全部匹配 [(index, doc_id)] 以及筛选计数"""
+        matches = []
+        if query:
+            for index in indexes:
+                for doc_id in index.prefix(query):
+                    matches.append(((index.rank(doc_id, query), 0.0), index, doc_id))
+            # 没有前缀匹配时使用模糊匹配（容错拼写）
+            if not matches and len(query) >= 3:
+                for index in indexes:
+                    for score, doc_id in index.fuzzy(query, ()):
+                        matches.append(((4, -score), index, doc_id))
+        else:
+            # 各交易所的记录已按浏览顺序排好，归并即可
+            matches = heapq.merge(
+                *(
+                    [((3, 0.0), index, doc_id) for doc_id in index.sorted_ids]
+                    for index in indexes
+                ),
+                key=lambda m: (m[1].order_keys[m[2]], m[1].exchange_id),
+            )
+
+        facets = {"quote": Counter(), "type": Counter(), "active": Counter()}
+        selected = []
+        for rank, index, doc_id in matches:
+            if not index.accepts(doc_id, quote, market_type, active):
+                continue
+            selected.append((rank, index, doc_id))
+            facets["quote"][index.quotes[doc_id]] += 1
+            facets["type"][index.types[doc_id]] += 1
+            if index.margin[doc_id]:
+                facets["type"]["margin"] += 1
+            facets["active"]["true" if index.active[doc_id] else "false"] += 1
+
+        if query:
+            selected.sort(key=lambda m: (m[0], m[1].order_keys[m[2]], m[1].exchange_id))
+        return [(index, doc_id) for _, index, doc_id in selected], {
+            "quote": dict(facets["quote"].most_common(20)),
+            "type": dict(facets["type"]),
+            "active": dict(facets["active"]),
+        }
+
+    def search(
+        self,
+        query,
+        exchange_ids,
+        limit=50,
+        cursor=None,
+        quote=None,
+        market_type=None,
+        active=None,
+        testnet=False,
+    ):
+        """搜索交易对
+
+        Args:
+            query: 查询字符串（支持 BTC、btc/usdt、BTC-USDT、btcusdt 及拼写容错）
+            exchange_ids: 交易所ID列表
+            limit: 每页数量
+            cursor: 上一页返回的 next_cursor
+            quote: 按计价币种筛选（如 USDT）
+            market_type: 按市场类型筛选（spot、margin 等）
+            active: 按是否活跃筛选
+            testnet: 是否为测试网市场
+
+        Returns:
+            dict: {items, total, next_cursor, facets}
+        """
+        query = _normalize(query or "")
+        quote = quote.upper() if quote else None
+        indexes = self.refresh(exchange_ids, testnet)
+        key = (
+            query,
+            tuple(index.exchange_id for index in indexes),
+            quote,
+            market_type,
+            active,
+            testnet,
+            self._version,
+        )
+        with self._lock:
+            cached = self._results.get(key)
+            if cached is not None:
+                self._results.move_to_end(key)
+        if cached is None:
+            cached = self._match(indexes, query, quote, market_type, active)
+            with self._lock:
+                self._results[key] = cached
+                while len(self._results) > RESULT_CACHE_SIZE:
+                    self._results.popitem(last=False)
+
+        matches, facets = cached
+        offset = int(cursor) if cursor else 0
+        page = matches[offset : offset + limit]
+        next_offset = offset + len(page)
+        return {
+            "items": [index.item(doc_id) for index, doc_id in page],
+            "total": len(matches),
+            "next_cursor": str(next_offset) if next_offset < len(matches) else None,
+            "facets": facets,
+        }
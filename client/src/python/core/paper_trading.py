@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""模拟盘
+
+mode 为 paper 的策略与 native 策略使用同一个进程内执行器和网格逻辑，
+订单发到本地撮合引擎（core.sim_exchange）而不是真实交易所：
+
+- 实时行情：每个真实交易所对应一个撮合场所，交易对的精度、最小下单额和手续费率取自真实市场，
+  行情缓存（MarketFeed）每次推送价格时撮合挂单；
+- 回放行情：策略配置 replayFile 指定逐笔价格文件（每行 时间戳,价格），每个策略使用独立的
+  撮合场所，按 replaySpeed 倍速回放，重新启动时从最后一笔成交之后继续。
+
+每个策略使用以策略ID命名的虚拟账户，有成交时立即唤醒对应策略处理，成交写入与实盘相同的
+trades 表。账户余额只保存在内存中，引擎重启后按网格所需资金重新注资。
+"""
+
+import threading
+
+import numpy as np
+from loguru import logger
+
+from core.sim_exchange import ReplayFeed, SimExchange, SimVenue
+
+PAPER_PREFIX = "paper"
+
+
+class PaperTrading:
+    """模拟盘撮合场所和行情来源"""
+
+    def __init__(self, feed, executor, replay_speed=1.0):
+        """初始化
+
+        Args:
+            feed: MarketFeed 实例，实时模式的价格来源
+            executor: NativeExecutor 实例，成交时唤醒对应策略
+            replay_speed: 策略未指定 replaySpeed 时的回放速度倍数，0 为不等待尽快回放
+        """
+        self.feed = feed
+        self.executor = executor
+        self.replay_speed = replay_speed
+        # 交易所ID -> 实时行情撮合场所
+        self._venues = {}
+        # 策略ID -> (交易所ID, 交易对)，实时模式的行情订阅
+        self._live = {}
+        # 策略ID -> ReplayFeed
+        self._replays = {}
+        self._lock = threading.Lock()
+        feed.add_listener(self._on_price)
+
+    def _new_venue(self, name):
+        venue = SimVenue(exchange_id=name)
+        venue.add_listener(self._on_fill)
+        return venue
+
+    def _on_fill(self, account, trade):
+        # 账户名即策略ID
+        self.executor.poke(account)
+
+    def _on_price(self, exchange_id, symbol, price, timestamp):
+        venue = self._venues.get(exchange_id)
+        if venue is not None and symbol in venue.markets:
+            venue.set_price(symbol, price, int(timestamp * 1000))
+
+    def open(
+        self,
+        strategy_id,
+        exchange_id,
+        market,
+        price_tick,
+        amount_step,
+        price=None,
+        replay_file=None,
+        replay_speed=None,
+        resume_after=None,
+    ):
+        """创建策略的模拟交易所实例（已有时沿用原来的撮合场所和账户）
+
+        Args:
+            strategy_id: 策略ID，同时作为账户名
+            exchange_id: 真实交易所ID
+            market: 真实市场信息（ccxt 市场字典）
+            price_tick: 价格最小变动单位
+            amount_step: 数量步长
+            price: 实时模式的初始价格
+            replay_file: 逐笔价格文件，为空时使用实时行情
+            replay_speed: 回放速度倍数
+            resume_after: 从该时间（毫秒）之后继续回放
+
+        Returns:
+            SimExchange: 已加载市场信息的模拟交易所实例
+        """
+        symbol = market["symbol"]
+        with self._lock:
+            if replay_file:
+                replay = self._replays.get(strategy_id)
+                if replay is None:
+                    venue = self._new_venue(f"{PAPER_PREFIX}-{strategy_id}")
+                    replay = ReplayFeed.from_csv(venue, symbol, replay_file)
+                    if resume_after is not None:
+                        # 成交时间精确到秒，跳过最后一笔成交所在的整秒
+                        replay.position = int(
+                            np.searchsorted(replay.timestamps, resume_after + 1000)
+                        )
+                    if replay.finished:
+                        raise ValueError(f"回放文件{replay_file}没有可回放的价格")
+                    price = float(replay.prices[replay.position])
+                    if replay_speed is None:
+                        replay_speed = self.replay_speed
+                    replay.speed = float(replay_speed)
+                    # 回放价格同时驱动策略的反弹/回调触发状态机
+                    replay.add_listener(self.executor.on_price)
+                    self._replays[strategy_id] = replay
+                venue = replay.venue
+            else:
+                venue = self._venues.get(exchange_id)
+                if venue is None:
+                    venue = self._new_venue(f"{PAPER_PREFIX}-{exchange_id}")
+                    self._venues[exchange_id] = venue
+                self._live[strategy_id] = (exchange_id, symbol)
+
+            if symbol not in venue.markets:
+                limits = market.get("limits") or {}
+                venue.add_market(
+                    symbol,
+                    price_tick=price_tick or 1e-8,
+                    amount_step=amount_step or 1e-8,
+                    min_cost=(limits.get("cost") or {}).get("min") or 0.0,
+                    min_amount=(limits.get("amount") or {}).get("min"),
+                    price=price,
+                )
+                with venue.lock:
+                    paper_market = venue.markets[symbol]
+                    paper_market["maker"] = market.get("maker") or venue.maker
+                    paper_market["taker"] = market.get("taker") or venue.taker
+            elif price and venue.last_price(symbol) is None:
+                venue.set_price(symbol, price)
+
+        self._sync_subscriptions()
+        exchange = SimExchange(venue, account=strategy_id)
+        # 本地撮合不需要客户端节流，也不占用真实交易所的限流配额
+        exchange.enableRateLimit = False
+        exchange.load_markets()
+        return exchange
+
+    def fund(self, strategy_id, exchange, balances):
+        """补足策略账户的虚拟资金（已有余额不足时才注资）
+
+        Args:
+            balances: 币种 -> 需要的总额（可用加冻结）
+        """
+        venue = exchange.venue
+        current = venue.balance(strategy_id)
+        for currency, amount in balances.items():
+            have = sum(current.get(currency, (0.0, 0.0)))
+            if amount > have:
+                venue.deposit(strategy_id, currency, amount - have)
+
+    def start(self, strategy_id):
+        """开始回放（策略已在执行器中启动后调用，实时模式无需调用）"""
+        replay = self._replays.get(strategy_id)
+        if replay is not None and not replay.running and not replay.finished:
+            replay.start()
+            logger.info(f"模拟盘策略{strategy_id}开始回放行情")
+
+    def release(self, strategy_id):
+        """停止策略的行情来源（停止或删除策略时调用）"""
+        with self._lock:
+            self._live.pop(strategy_id, None)
+            replay = self._replays.pop(strategy_id, None)
+        if replay is not None:
+            replay.stop()
+        self._sync_subscriptions()
+
+    def _sync_subscriptions(self):
+        with self._lock:
+            subscriptions = set(self._live.values())
+        self.feed.set_subscriptions(PAPER_PREFIX, subscriptions)
+
+    def describe(self, strategy_id):
+        """行情来源和回放进度"""
+        replay = self._replays.get(strategy_id)
+        if replay is not None:
+            position = replay.position
+            return {
+                "source": "replay",
+                "replay_progress": position / len(replay.prices),
+                "replay_finished": replay.finished,
+                "replay_time": int(replay.timestamps[position - 1]) if position else None,
+            }
+        if strategy_id in self._live:
+            return {"source": "live"}
+        return None
+
+    def balance(self, strategy_id, exchange_id=None):
+        """策略虚拟账户的余额 币种 -> (可用, 冻结)"""
+        replay = self._replays.get(strategy_id)
+        venue = replay.venue if replay is not None else self._venues.get(exchange_id)
+        return venue.balance(strategy_id) if venue is not None else {}
+
+    def close(self):
+        for strategy_id in list(self._replays):
+            self.release(strategy_id)
@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""网格区间建议
+
+根据本地K线的已实现波动率、ATR 和持有期收益分位数，给出网格上下限、
+网格数量以及预计的成交频率。
+
+每个 交易所/交易对/周期 缓存最近 lookback 根K线的对数收益和真实波幅，
+K线同步追加新数据后只计算新增部分；补充更早的历史（存储代数变化）时才重建。
+"""
+
+import threading
+
+import numpy as np
+
+from core.ohlcv_fetcher import timeframe_to_ms
+
+# 区间档位：网格间距 = ATR × 倍数
+PROFILES = (
+    ("conservative", 2.0),
+    ("balanced", 1.0),
+    ("aggressive", 0.5),
+)
+
+ATR_PERIOD = 14
+MIN_GRID_COUNT = 2
+MAX_GRID_COUNT = 200
+
+
+def _horizon_bars(horizon, timeframe_ms):
+    """持有期转换为K线根数，支持整数根数或 7d、12h 之类的周期字符串"""
+    if isinstance(horizon, str) and not horizon.isdigit():
+        return max(1, timeframe_to_ms(horizon) // timeframe_ms)
+    return max(1, int(horizon))
+
+
+class _SeriesStats:
+    """单个K线序列的缓存统计输入"""
+
+    __slots__ = ("generation", "count", "last_close", "returns", "true_range", "close")
+
+    def __init__(self):
+        self.generation = None
+        self.count = 0
+        self.last_close = None
+        self.returns = np.empty(0)
+        self.true_range = np.empty(0)
+        self.close = np.empty(0)
+
+
+class RangeAdvisor:
+    """基于波动率统计的网格区间建议"""
+
+    def __init__(self, store, lookback=2000):
+        """初始化
+
+        Args:
+            store: OHLCVStore 实例
+            lookback: 参与统计的最近K线根数
+        """
+        self.store = store
+        self.lookback = lookback
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _update(self, series):
+        """增量更新缓存，返回最新的统计输入"""
+        key = (series.exchange_id, series.symbol, series.timeframe)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None or stats.generation != series.meta["generation"]:
+                stats = self._stats[key] = _SeriesStats()
+                stats.generation = series.meta["generation"]
+            count = series.count
+            if count == stats.count:
+                return stats
+
+            columns = series.columns()
+            # 只读取新增的K线（首次只读取 lookback 范围）
+            start = max(stats.count, count - self.lookback - 1)
+            high = np.asarray(columns["high"][start:count], dtype=np.float64)
+            low = np.asarray(columns["low"][start:count], dtype=np.float64)
+            close = np.asarray(columns["close"][start:count], dtype=np.float64)
+            if start > stats.count or stats.last_close is None:
+                # 新增数据超过回看范围时重新开始；第一根K线只用于提供前收盘价
+                stats.returns = stats.true_range = stats.close = np.empty(0)
+                previous = close[:-1]
+                high, low, close = high[1:], low[1:], close[1:]
+            else:
+                previous = np.concatenate([[stats.last_close], close[:-1]])
+
+            returns = np.log(close / previous)
+            true_range = np.maximum(high, previous) - np.minimum(low, previous)
+            stats.returns = np.concatenate([stats.returns, returns])[-self.lookback :]
+            stats.true_range = np.concatenate([stats.true_range, true_range])[-self.lookback :]
+            stats.close = np.concatenate([stats.close, close])[-self.lookback :]
+            stats.last_close = float(columns["close"][count - 1])
+            stats.count = count
+            return stats
+
+    def suggest(
+        self,
+        exchange_id,
+        symbol,
+        timeframe,
+        horizon="7d",
+        coverage=0.9,
+        fee_rate=0.001,
+        current_price=None,
+    ):
+        """给出网格区间建议
+
+        Args:
+            exchange_id: 交易所ID
+            symbol: ccxt格式交易对
+            timeframe: K线周期
+            horizon: 预计运行时长（K线根数或 7d、24h 等周期字符串）
+            coverage: 区间覆盖持有期收益分布的比例（0.9 即 5%~95% 分位数）
+            fee_rate: 手续费率，网格间距至少覆盖一次往返手续费
+            current_price: 当前价格，默认为最新收盘价
+
+        Returns:
+            dict: 统计指标、建议的上下限和各档位的网格数量与预计成交频率
+
+        Raises:
+            KeyError: 本地没有该K线数据
+            ValueError: K线数据不足
+        """
+        series = self.store.series(exchange_id, symbol, timeframe)
+        stats = self._update(series)
+        timeframe_ms = series.timeframe_ms
+        bars = _horizon_bars(horizon, timeframe_ms)
+        returns = stats.returns
+        required = max(ATR_PERIOD, 2 * bars)
+        if len(returns) < required:
+            raise ValueError(f"本地K线不足，至少需要{required}根，请先同步更多历史")
+
+        price = float(current_price or stats.last_close)
+        bars_per_day = 86400000 / timeframe_ms
+
+        # 已实现波动率：整个回看窗口与最近 4 个持有期
+        sigma = float(returns.std())
+        window = min(len(returns), max(bars, ATR_PERIOD) * 4)
+        recent_sigma = float(returns[-window:].std())
+        # 滚动波动率序列，用于判断当前波动率所处的分位
+        cumsum = np.concatenate([[0.0], np.cumsum(returns)])
+        cumsq = np.concatenate([[0.0], np.cumsum(returns * returns)])
+        mean = (cumsum[window:] - cumsum[:-window]) / window
+        rolling = np.sqrt(np.maximum((cumsq[window:] - cumsq[:-window]) / window - mean * mean, 0))
+        vol_percentile = float((rolling <= recent_sigma).mean() * 100)
+
+        atr = float(stats.true_range[-ATR_PERIOD:].mean())
+        atr_pct = atr / stats.close[-1]
+
+        # 持有期收益分位数（重叠窗口），波动率上升时按比例放大
+        horizon_returns = cumsum[bars:] - cumsum[:-bars]
+        tail = (1 - coverage) / 2
+        q_low, q_high = np.quantile(horizon_returns, [tail, 1 - tail])
+        scale = recent_sigma / sigma if sigma > 0 else 1.0
+        scale = max(scale, 1.0)
+        # 趋势明显时分位数可能在当前价同侧，保证当前价两侧至少留出一个ATR
+        lower = min(price * float(np.exp(q_low * scale)), price * (1 - atr_pct))
+        upper = max(price * float(np.exp(q_high * scale)), price * (1 + atr_pct))
+
+        # 网格间距下限：单次往返利润扣除手续费后为正
+        min_spacing_pct = 2 * fee_rate * 1.5
+        # 平均每根K线的价格路程（按真实波幅估计），间距越小成交越频繁
+        travel_pct = float((stats.true_range[-window:] / stats.close[-window:]).mean())
+
+        profiles = []
+        for name, multiple in PROFILES:
+            spacing_pct = max(atr_pct * multiple, min_spacing_pct)
+            # 等比网格：价位数 = ln(上限/下限) / ln(1+间距) + 1
+            count = int(np.log(upper / lower) / np.log1p(spacing_pct)) + 1
+            count = int(np.clip(count, MIN_GRID_COUNT, MAX_GRID_COUNT))
+            spacing_pct = float((upper / lower) ** (1 / (count - 1)) - 1)
+            fills_per_day = travel_pct / spacing_pct * bars_per_day
+            profiles.append(
+                {
+                    "profile": name,
+                    "gridCount": count,
+                    "gridType": "geometric",
+                    "spacing_pct": spacing_pct * 100,
+                    "trip_profit_pct": (spacing_pct - 2 * fee_rate) * 100,
+                    "expected_fills_per_day": fills_per_day,
+                }
+            )
+
+        return {
+            "price": price,
+            "timeframe": timeframe,
+            "horizon_bars": bars,
+            "bars_used": int(len(returns)),
+            "volatility": sigma,
+            "recent_volatility": recent_sigma,
+            "volatility_percentile": vol_percentile,
+            "annualized_volatility_pct": float(recent_sigma * np.sqrt(bars_per_day * 365) * 100),
+            "atr": atr,
+            "atr_pct": float(atr_pct * 100),
+            "horizon_return_quantiles": {
+                "low": float(q_low),
+                "high": float(q_high),
+                "coverage": coverage,
+            },
+            "lowerPrice": lower,
+            "upperPrice": upper,
+            "profiles": profiles,
+        }
@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+"""全局交易所限流调度器
+
+进程内所有ccxt实例（同步和异步）的HTTP请求都经过同一个调度器：
+每个交易所一个令牌桶（速率取自ccxt的rateLimit），按优先级放行，
+同一优先级内按策略轮转，保证多个策略公平共享交易所配额。
+"""
+
+import asyncio
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from loguru import logger
+
+# 优先级，数值越小越优先
+PRIORITY_CRITICAL = 0  # 下单、撤单等交易关键请求
+PRIORITY_TRADING = 1  # 余额、挂单等交易相关查询
+PRIORITY_MARKET = 2  # 行情、K线
+PRIORITY_UI = 3  # 界面查询（交易对列表、连接验证）
+
+PRIORITY_NAMES = {
+    PRIORITY_CRITICAL: "critical",
+    PRIORITY_TRADING: "trading",
+    PRIORITY_MARKET: "market",
+    PRIORITY_UI: "ui",
+}
+
+# 当前调用上下文的优先级和公平队列键（策略ID）
+_current_priority = contextvars.ContextVar("rate_limit_priority", default=None)
+_current_key = contextvars.ContextVar("rate_limit_key", default=None)
+
+
+class _ExchangeQueue:
+    """单个交易所的令牌桶和多级公平队列"""
+
+    def __init__(self, exchange_id, rate, capacity):
+        self.exchange_id = exchange_id
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.cond = threading.Condition()
+        # 每个优先级: {key: deque(ticket)}，以及key的轮转顺序
+        self.queues = [dict() for _ in PRIORITY_NAMES]
+        self.rotation = [deque() for _ in PRIORITY_NAMES]
+        self.granted = [0 for _ in PRIORITY_NAMES]
+        self.wait_seconds = [0.0 for _ in PRIORITY_NAMES]
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _head(self):
+        """按优先级和轮转顺序选出下一个放行的请求"""
+        for priority, rotation in enumerate(self.rotation):
+            if rotation:
+                key = rotation[0]
+                return priority, key, self.queues[priority][key][0]
+        return None
+
+    def acquire(self, priority, key, cost, timeout=None):
+        """排队等待令牌
+
+        Raises:
+            TimeoutError: 超过等待时间
+        """
+        ticket = object()
+        started = time.monotonic()
+        deadline = None if timeout is None else started + timeout
+        with self.cond:
+            queue = self.queues[priority].get(key)
+            if queue is None:
+                queue = self.queues[priority][key] = deque()
+                self.rotation[priority].append(key)
+            queue.append(ticket)
+            try:
+                while True:
+                    head = self._head()
+                    wait = None
+                    if head[2] is ticket:
+                        self._refill()
+                        # 成本超过桶容量时只要求桶满，避免永远无法放行
+                        needed = min(cost, self.capacity)
+                        if self.tokens >= needed:
+                            self.tokens -= cost
+                            break
+                        wait = (needed - self.tokens) / self.rate
+                    if deadline is not None:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise TimeoutError(f"{self.exchange_id}限流排队超时")
+                        wait = remaining if wait is None else min(wait, remaining)
+                    self.cond.wait(wait)
+            finally:
+                self._dequeue(priority, key, ticket)
+                self.cond.notify_all()
+        self.granted[priority] += 1
+        self.wait_seconds[priority] += time.monotonic() - started
+
+    def _dequeue(self, priority, key, ticket):
+        queue = self.queues[priority][key]
+        was_head = queue and queue[0] is ticket
+        queue.remove(ticket)
+        rotation = self.rotation[priority]
+        if not queue:
+            del self.queues[priority][key]
+            rotation.remove(key)
+        elif was_head and rotation[0] == key:
+            # 已放行的键移到队尾，实现同一优先级内的公平轮转
+            rotation.rotate(-1)
+
+    def stats(self):
+        with self.cond:
+            self._refill()
+            return {
+                "rate_per_second": round(self.rate, 3),
+                "capacity": self.capacity,
+                "tokens": round(self.tokens, 3),
+                "queued": {
+                    PRIORITY_NAMES[p]: sum(len(q) for q in self.queues[p].values())
+                    for p in PRIORITY_NAMES
+                },
+                "granted": {PRIORITY_NAMES[p]: self.granted[p] for p in PRIORITY_NAMES},
+                "avg_wait_ms": {
+                    PRIORITY_NAMES[p]: round(
+                        self.wait_seconds[p] * 1000 / self.granted[p], 2
+                    )
+                    if self.granted[p]
+                    else 0.0
+                    for p in PRIORITY_NAMES
+                },
+            }
+
+
+class RateLimitScheduler:
+    """进程级交易所请求调度器"""
+
+    def __init__(self, headroom=1.0, burst_seconds=1.0, overrides=None, timeout=60):
+        """初始化调度器
+
+        Args:
+            headroom: 实际使用的速率比例（<1 时为交易所限额预留余量）
+            burst_seconds: 令牌桶容量，按多少秒的配额计算
+            overrides: 交易所ID -> rateLimit(毫秒) 的手动覆盖
+            timeout: 单个请求最长排队时间（秒）
+        """
+        self.headroom = headroom
+        self.burst_seconds = burst_seconds
+        self.overrides = overrides or {}
+        self.timeout = timeout
+        self._queues = {}
+        self._lock = threading.Lock()
+        self._waiters = ThreadPoolExecutor(
+            max_workers=64, thread_name_prefix="rate-limit-wait"
+        )
+
+    def _queue(self, exchange_id, rate_limit_ms=None):
+        """获取交易所队列，首次使用时按ccxt rateLimit元数据初始化"""
+        queue = self._queues.get(exchange_id)
+        if queue is not None:
+            return queue
+        with self._lock:
+            queue = self._queues.get(exchange_id)
+            if queue is None:
+                rate_limit_ms = self.overrides.get(exchange_id, rate_limit_ms) or 1000
+                rate = 1000.0 / rate_limit_ms * self.headroom
+                capacity = max(1.0, rate * self.burst_seconds)
+                queue = self._queues[exchange_id] = _ExchangeQueue(
+                    exchange_id, rate, capacity
+                )
+                logger.debug(
+                    f"{exchange_id}限流: {rate:.2f}次/秒，突发容量{capacity:.1f}"
+                )
+        return queue
+
+    def acquire(self, exchange_id, cost=1, priority=None, key=None, rate_limit_ms=None):
+        """阻塞直到获得一次请求配额
+
+        Args:
+            exchange_id: 交易所ID
+            cost: 请求成本（ccxt按接口计算的权重）
+            priority: 优先级，默认取当前上下文，否则为界面查询
+            key: 公平队列键（通常为策略ID），默认取当前上下文
+            rate_limit_ms: ccxt rateLimit，首次初始化交易所队列时使用
+        """
+        if priority is None:
+            priority = _current_priority.get()
+        if priority is None:
+            priority = PRIORITY_UI
+        if key is None:
+            key = _current_key.get()
+        self._queue(exchange_id, rate_limit_ms).acquire(
+            priority, key, 1 if cost is None else cost, self.timeout
+        )
+
+    @contextmanager
+    def context(self, priority=None, key=None):
+        """设置当前线程/协程内请求的优先级和公平队列键"""
+        priority_token = _current_priority.set(priority) if priority is not None else None
+        key_token = _current_key.set(key) if key is not None else None
+        try:
+            yield
+        finally:
+            if key_token is not None:
+                _current_key.reset(key_token)
+            if priority_token is not None:
+                _current_priority.reset(priority_token)
+
+    def call(self, exchange_id, fn, *args, priority=PRIORITY_UI, key=None, cost=1, **kwargs):
+        """获得配额后调用函数（用于非ccxt的交易所请求）"""
+        self.acquire(exchange_id, cost, priority, key)
+        return fn(*args, **kwargs)
+
+    def attach(self, exchange, priority=PRIORITY_UI, key=None):
+        """让ccxt实例的所有HTTP请求经过调度器
+
+        替换实例的 throttle 方法，保留ccxt按接口计算的请求成本。
+        同时支持同步和 ccxt.async_support 实例。
+
+        Args:
+            exchange: ccxt交易所实例
+            priority: 该实例请求的默认优先级，可被 context() 覆盖
+            key: 该实例请求的默认公平队列键，可被 context() 覆盖
+
+        Returns:
+            ccxt.Exchange: 传入的实例
+        """
+        exchange_id = exchange.id
+        rate_limit_ms = exchange.rateLimit
+        exchange.enableRateLimit = True
+        self._queue(exchange_id, rate_limit_ms)
+
+        def _resolve():
+            current_priority = _current_priority.get()
+            current_key = _current_key.get()
+            return (
+                priority if current_priority is None else current_priority,
+                key if current_key is None else current_key,
+            )
+
+        if asyncio.iscoroutinefunction(exchange.throttle):
+
+            async def throttle(cost=None):
+                request_priority, request_key = _resolve()
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(
+                    self._waiters,
+                    self.acquire,
+                    exchange_id,
+                    cost,
+                    request_priority,
+                    request_key,
+                )
+
+        else:
+
+            def throttle(cost=None):
+                request_priority, request_key = _resolve()
+                self.acquire(exchange_id, cost, request_priority, request_key)
+
+        exchange.throttle = throttle
+        return exchange
+
+    def stats(self):
+        """获取各交易所的限流统计"""
+        return {exchange_id: queue.stats() for exchange_id, queue in list(self._queues.items())}
@@ -0,0 +1,452 @@
+# -*- coding: utf-8 -*-
+"""网格自适应调整
+
+趋势行情中固定区间的网格很快失效。控制器把行情推送聚合为K线，维护每个交易对的
+ATR 和收盘价 EMA。策略配置中有 recenter（true 或参数字典）的运行中策略，
+满足以下条件之一并持续 confirm_seconds 后调整网格：
+
+- 价格偏移：EMA 偏离网格中心超过半宽的 drift_trigger 倍（接近或超出边界），
+  以当前价格为中心重新居中，宽度不变；
+- 波动扩大：按 ATR 估算需要的区间宽度超过当前宽度的 (1 + width_hysteresis) 倍，
+  以当前价格为中心放宽区间，并按比例增加网格数量保持间距。
+
+新区间由 plan_grid 按市场精度计算和校验，通过就地更新策略配置生效，不重建容器。
+两次调整之间至少间隔 cooldown_seconds，每天不超过 max_per_day 次，
+触发条件带确认时间和宽度滞回，避免在边界附近反复调整。
+"""
+
+import json
+import threading
+
+from loguru import logger
+
+from core.grid import GridSpec
+from core.indicators import ATR, EMA
+from core.market_feed import to_ccxt_symbol
+
+DEFAULT_OPTIONS = {
+    # EMA偏离网格中心超过半宽的该倍数时重新居中（1 为到达边界）
+    "drift_trigger": 0.8,
+    # 区间宽度至少为 ATR 占价格百分比的该倍数
+    "width_atr_multiple": 20.0,
+    # 需要的宽度超过当前宽度该比例时才放宽
+    "width_hysteresis": 0.25,
+    # 触发条件需持续的时间（秒）
+    "confirm_seconds": 300,
+    # 两次调整的最小间隔（秒）
+    "cooldown_seconds": 1800,
+    # 每天最多调整次数
+    "max_per_day": 6,
+    # 放宽区间时网格数量上限
+    "max_grid_count": 200,
+}
+
+
+def _options(base, overrides):
+    """合并调整参数，忽略未知参数"""
+    options = dict(base)
+    for key, value in (overrides or {}).items():
+        if key in DEFAULT_OPTIONS:
+            options[key] = type(DEFAULT_OPTIONS[key])(value)
+    return options
+
+
+class SymbolState:
+    """单个交易对的流式指标
+
+    行情推送按 bar_seconds 聚合为K线后更新 ATR 和收盘价 EMA，
+    指标的含义与推送间隔无关。
+    """
+
+    __slots__ = ("atr", "ema", "price", "bar_seconds", "_bar", "_high", "_low")
+
+    def __init__(self, atr_period, ema_period, bar_seconds):
+        self.atr = ATR(atr_period)
+        self.ema = EMA(ema_period)
+        self.price = None
+        self.bar_seconds = bar_seconds
+        self._bar = None
+        self._high = self._low = None
+
+    def update(self, price, timestamp):
+        bar = int(timestamp // self.bar_seconds)
+        if self._bar is not None and bar != self._bar:
+            # 上一根K线结束
+            self._close_bar(self._high, self._low, self.price)
+            self._bar = None
+        if self._bar is None:
+            self._bar = bar
+            self._high = self._low = price
+        else:
+            self._high = max(self._high, price)
+            self._low = min(self._low, price)
+        self.price = price
+
+    def _close_bar(self, high, low, close):
+        """用一根已结束的K线更新指标，子类可扩展"""
+        self.atr.update(high, low, close)
+        self.ema.update(close)
+
+
+class RecenterState:
+    """单个策略的调整状态"""
+
+    __slots__ = (
+        "exchange",
+        "pair",
+        "symbol",
+        "spec",
+        "options",
+        "pending_since",
+        "pending_reason",
+        "last_adjusted",
+        "history",
+        "busy",
+    )
+
+    def __init__(self, exchange, pair, spec, options):
+        self.exchange = exchange
+        self.pair = pair
+        self.symbol = to_ccxt_symbol(pair)
+        self.spec = spec
+        self.options = options
+        self.pending_since = None
+        self.pending_reason = None
+        self.last_adjusted = 0.0
+        self.history = []
+        self.busy = False
+
+
+def propose(spec, price, ema_price, atr, options):
+    """根据当前行情判断是否需要调整网格
+
+    Args:
+        spec: 当前 GridSpec
+        price: 最新价格
+        ema_price: 价格 EMA
+        atr: 价格 ATR
+        options: 调整参数
+
+    Returns:
+        (str, GridSpec): (原因 drift/widen, 新的网格参数)，不需要调整时返回 (None, None)
+    """
+    lower, upper = spec.lower_price, spec.upper_price
+    center = (lower + upper) / 2
+    half = (upper - lower) / 2
+    width_pct = (upper - lower) / center
+
+    required_pct = 0.0
+    if atr == atr and price:
+        required_pct = atr / price * options["width_atr_multiple"]
+    widen = required_pct > width_pct * (1 + options["width_hysteresis"])
+    drift = ema_price == ema_price and abs(ema_price - center) >= half * options["drift_trigger"]
+    if not (widen or drift):
+        return None, None
+
+    new_width_pct = required_pct if widen else width_pct
+    grid_count = spec.grid_count
+    if widen:
+        # 保持原有间距，网格数量随宽度增加
+        grid_count = min(
+            int(round(spec.grid_count * new_width_pct / width_pct)), options["max_grid_count"]
+        )
+        grid_count = max(grid_count, spec.grid_count)
+    new_half = price * new_width_pct / 2
+    new_spec = GridSpec(
+        spec.grid_type if spec.grid_type != "custom" else "arithmetic",
+        price - new_half,
+        price + new_half,
+        grid_count,
+        spec.amount_per_grid,
+    )
+    return ("widen" if widen else "drift"), new_spec
+
+
+class RecenterController:
+    """网格自适应调整控制器"""
+
+    def __init__(
+        self,
+        conn,
+        db_lock,
+        feed,
+        plan_fn,
+        apply_fn,
+        notify=None,
+        defaults=None,
+        atr_period=14,
+        ema_period=20,
+        bar_seconds=300,
+        sync_interval=30,
+    ):
+        """初始化
+
+        Args:
+            conn: SQLite连接
+            db_lock: 数据库锁
+            feed: MarketFeed 实例
+            plan_fn: 计算下单计划 (exchange, pair, spec, price) -> GridPlan
+            apply_fn: 就地更新策略网格参数 (strategy_id, spec) -> (bool, str)
+            notify: 事件回调 (event, data)
+            defaults: 默认调整参数（策略配置 recenter 中的参数优先）
+            atr_period, ema_period: 指标周期（K线根数）
+            bar_seconds: 行情推送聚合为K线的周期（秒）
+            sync_interval: 从数据库同步运行中策略的间隔（秒）
+        """
+        self.conn = conn
+        self.db_lock = db_lock
+        self.feed = feed
+        self.plan_fn = plan_fn
+        self.apply_fn = apply_fn
+        self.notify = notify
+        self.defaults = _options(DEFAULT_OPTIONS, defaults)
+        self.atr_period = atr_period
+        self.ema_period = ema_period
+        self.bar_seconds = bar_seconds
+        self.sync_interval = sync_interval
+        self._states = {}
+        self._symbols = {}
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._init_db()
+        feed.add_listener(self.on_price)
+
+    def _init_db(self):
+        """初始化网格调整记录表"""
+        with self.db_lock:
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS grid_adjustments (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    strategy_id TEXT,
+                    reason TEXT,
+                    price REAL,
+                    atr REAL,
+                    old_lower REAL,
+                    old_upper REAL,
+                    old_count INTEGER,
+                    new_lower REAL,
+                    new_upper REAL,
+                    new_count INTEGER,
+                    adjusted_at TIMESTAMP
+                )
+                """
+            )
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_grid_adjustments_strategy ON grid_adjustments (strategy_id)"
+            )
+            self.conn.commit()
+
+    def _recent_adjustments(self, strategy_id):
+        """最近一天的调整时间（用于重启后继续限流）"""
+        with self.db_lock:
+            rows = self.conn.execute(
+                """
+                SELECT strftime('%s', adjusted_at) FROM grid_adjustments
+                WHERE strategy_id = ? AND adjusted_at >= datetime('now', '-1 day')
+                ORDER BY id
+                """,
+                (strategy_id,),
+            ).fetchall()
+        return [float(row[0]) for row in rows]
+
+    def start(self):
+        threading.Thread(target=self._run, name="grid-recenter", daemon=True).start()
+
+    def stop(self):
+        self._stopping.set()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                self.sync()
+            except Exception as e:
+                logger.error(f"同步网格自适应策略列表失败: {e}")
+            self._stopping.wait(self.sync_interval)
+
+    def sync(self):
+        """根据数据库中运行中且启用了 recenter 的策略刷新监控列表"""
+        with self.db_lock:
+            rows = self.conn.execute(
+                "SELECT id, exchange, trading_pair, config FROM strategies WHERE status = 'running'"
+            ).fetchall()
+
+        states = {}
+        for strategy_id, exchange, pair, config_json in rows:
+            try:
+                config = json.loads(config_json) if config_json else {}
+                options = config.get("recenter")
+                if options is True:
+                    options = {}
+                elif not isinstance(options, dict) or not options.get("enabled", True):
+                    continue
+                spec = GridSpec.from_config(config)
+            except (KeyError, TypeError, ValueError):
+                continue
+            with self._lock:
+                state = self._states.get(strategy_id)
+            if state is None:
+                state = RecenterState(exchange, pair, spec, {})
+                state.history = self._recent_adjustments(strategy_id)
+                if state.history:
+                    state.last_adjusted = state.history[-1]
+            state.spec = spec
+            state.options = _options(self.defaults, options)
+            states[strategy_id] = state
+
+        with self._lock:
+            self._states = states
+        self.feed.set_subscriptions(
+            "recenter", {(s.exchange, s.symbol) for s in states.values()}
+        )
+
+    def on_price(self, exchange_id, symbol, price, timestamp):
+        """处理价格更新"""
+        key = (exchange_id, symbol)
+        with self._lock:
+            targets = [
+                (strategy_id, state)
+                for strategy_id, state in self._states.items()
+                if state.exchange == exchange_id and state.symbol == symbol
+            ]
+            if not targets:
+                return
+            indicators = self._symbols.get(key)
+            if indicators is None:
+                indicators = self._symbols[key] = SymbolState(
+                    self.atr_period, self.ema_period, self.bar_seconds
+                )
+        indicators.update(price, timestamp)
+        if not indicators.atr.ready:
+            return
+        for strategy_id, state in targets:
+            try:
+                self._evaluate(strategy_id, state, indicators, timestamp)
+            except Exception as e:
+                logger.error(f"评估策略{strategy_id}网格调整失败: {e}")
+
+    def _evaluate(self, strategy_id, state, indicators, now):
+        if state.busy:
+            return
+        options = state.options
+        reason, new_spec = propose(
+            state.spec, indicators.price, indicators.ema.value, indicators.atr.value, options
+        )
+        if reason is None:
+            state.pending_since = None
+            state.pending_reason = None
+            return
+        if state.pending_since is None or state.pending_reason != reason:
+            state.pending_since = now
+            state.pending_reason = reason
+            return
+        if now - state.pending_since < options["confirm_seconds"]:
+            return
+        if now - state.last_adjusted < options["cooldown_seconds"]:
+            return
+        state.history = [t for t in state.history if now - t < 86400]
+        if len(state.history) >= options["max_per_day"]:
+            return
+
+        # 调整涉及网络和文件操作，放到单独线程，不阻塞行情线程
+        state.busy = True
+        threading.Thread(
+            target=self._adjust,
+            args=(strategy_id, state, reason, new_spec, indicators.price, indicators.atr.value, now),
+            name=f"recenter-{strategy_id}",
+            daemon=True,
+        ).start()
+
+    def _adjust(self, strategy_id, state, reason, new_spec, price, atr, now):
+        old = state.spec
+        try:
+            plan = self.plan_fn(state.exchange, state.pair, new_spec, price)
+            if not plan.valid:
+                logger.warning(f"策略{strategy_id}网格调整方案无效: {'；'.join(plan.errors)}")
+                state.last_adjusted = now
+                return
+            # 按精度取整后的价位作为新的上下限
+            new_spec.lower_price = float(plan.prices[0])
+            new_spec.upper_price = float(plan.prices[-1])
+            success, message = self.apply_fn(strategy_id, new_spec)
+            if not success:
+                logger.error(f"策略{strategy_id}网格调整失败: {message}")
+                state.last_adjusted = now
+                return
+
+            state.spec = new_spec
+            state.last_adjusted = now
+            state.history.append(now)
+            state.pending_since = None
+            with self.db_lock:
+                self.conn.execute(
+                    """
+                    INSERT INTO grid_adjustments (
+                        strategy_id, reason, price, atr, old_lower, old_upper, old_count,
+                        new_lower, new_upper, new_count, adjusted_at
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                    """,
+                    (
+                        strategy_id,
+                        reason,
+                        price,
+                        atr,
+                        old.lower_price,
+                        old.upper_price,
+                        old.grid_count,
+                        new_spec.lower_price,
+                        new_spec.upper_price,
+                        new_spec.grid_count,
+                    ),
+                )
+                self.conn.commit()
+            logger.info(
+                f"策略{strategy_id}网格已调整（{reason}）: "
+                f"[{old.lower_price}, {old.upper_price}]×{old.grid_count} -> "
+                f"[{new_spec.lower_price}, {new_spec.upper_price}]×{new_spec.grid_count}"
+            )
+            if self.notify:
+                self.notify(
+                    "grid_recentered",
+                    {
+                        "strategy_id": strategy_id,
+                        "reason": reason,
+                        "price": price,
+                        "lower_price": new_spec.lower_price,
+                        "upper_price": new_spec.upper_price,
+                        "grid_count": new_spec.grid_count,
+                    },
+                )
+        except Exception as e:
+            logger.error(f"策略{strategy_id}网格调整失败: {e}")
+            state.last_adjusted = now
+        finally:
+            state.busy = False
+
+    def get_adjustments(self, strategy_id=None, limit=100):
+        """最近的网格调整记录"""
+        query = (
+            "SELECT strategy_id, reason, price, atr, old_lower, old_upper, old_count,"
+            " new_lower, new_upper, new_count, adjusted_at FROM grid_adjustments"
+        )
+        params = ()
+        if strategy_id:
+            query += " WHERE strategy_id = ?"
+            params = (strategy_id,)
+        query += " ORDER BY id DESC LIMIT ?"
+        with self.db_lock:
+            rows = self.conn.execute(query, params + (int(limit),)).fetchall()
+        keys = (
+            "strategy_id",
+            "reason",
+            "price",
+            "atr",
+            "old_lower",
+            "old_upper",
+            "old_count",
+            "new_lower",
+            "new_upper",
+            "new_count",
+            "adjusted_at",
+        )
+        return [dict(zip(keys, row)) for row in rows]
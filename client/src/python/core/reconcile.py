@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""挂单对账
+
+网格参数变化后，按价格和数量容差把交易所上的挂单与目标价位逐一对应，
+只撤销、修改和新增有差异的订单，而不是全部撤销后重新下单：
+省下限流额度，盘口也不会出现短暂的空档。
+
+买卖两侧分别按价格排序后双指针匹配，整体 O(n log n)：
+1. 价格在容差内的挂单与目标价位配对，数量也在容差内则保留，否则修改数量；
+2. 剩下未配对的挂单与目标价位按价格顺序两两改价（交易所支持修改订单时），
+   多余的挂单撤销，多余的目标价位新增。
+
+实盘的就地调整和进程内执行器共用这一结果。
+"""
+
+import numpy as np
+
+BUY = 1
+SELL = -1
+
+SIDE_NAMES = {BUY: "buy", SELL: "sell"}
+SIDE_VALUES = {"buy": BUY, "sell": SELL}
+
+
+class ReconcilePlan:
+    """对账结果"""
+
+    __slots__ = ("keep", "cancel", "amend", "place")
+
+    def __init__(self):
+        # keep: [(挂单, 目标序号)]
+        self.keep = []
+        # cancel: [挂单]
+        self.cancel = []
+        # amend: [(挂单, 目标序号, 价格, 数量)]
+        self.amend = []
+        # place: [(目标序号, 方向, 价格, 数量)]
+        self.place = []
+
+    @property
+    def operations(self):
+        """需要发送到交易所的请求数"""
+        return len(self.cancel) + len(self.amend) + len(self.place)
+
+    def summary(self):
+        return {
+            "keep": len(self.keep),
+            "cancel": len(self.cancel),
+            "amend": len(self.amend),
+            "place": len(self.place),
+            "operations": self.operations,
+        }
+
+    def to_dict(self):
+        return {
+            **self.summary(),
+            "cancel_ids": [order.get("id") for order in self.cancel],
+            "amends": [
+                {"id": order.get("id"), "level": level, "price": price, "amount": amount}
+                for order, level, price, amount in self.amend
+            ],
+            "places": [
+                {"level": level, "side": SIDE_NAMES[side], "price": price, "amount": amount}
+                for level, side, price, amount in self.place
+            ],
+        }
+
+
+def desired_orders(plan, skip_below_min=True):
+    """从 GridPlan 取出需要挂单的价位
+
+    Returns:
+        (numpy.ndarray, numpy.ndarray, numpy.ndarray, numpy.ndarray): (价位序号, 方向, 价格, 数量)
+    """
+    mask = plan.sides != 0
+    if skip_below_min:
+        mask &= ~plan.below_min
+    levels = np.flatnonzero(mask)
+    return levels, plan.sides[levels], plan.prices[levels], plan.quantities[levels]
+
+
+def _side(order):
+    side = order.get("side")
+    return SIDE_VALUES.get(side, side)
+
+
+def reconcile(
+    open_orders,
+    levels,
+    sides,
+    prices,
+    amounts,
+    price_tolerance=1e-6,
+    amount_tolerance=0.01,
+    allow_amend=True,
+):
+    """计算把挂单调整为目标价位所需的最少操作
+
+    Args:
+        open_orders: 当前挂单（ccxt 订单字典，需要 id、side、price、amount）
+        levels: 目标价位序号
+        sides: 目标方向（1 买 / -1 卖）
+        prices: 目标价格
+        amounts: 目标数量
+        price_tolerance: 价格相对容差，应小于网格间距的一半
+        amount_tolerance: 数量相对容差
+        allow_amend: 交易所是否支持修改订单，不支持时改价和改量拆成撤单加新增
+
+    Returns:
+        ReconcilePlan: 对账结果
+    """
+    result = ReconcilePlan()
+    levels = np.asarray(levels)
+    sides = np.asarray(sides)
+    prices = np.asarray(prices, dtype=np.float64)
+    amounts = np.asarray(amounts, dtype=np.float64)
+
+    for side in (BUY, SELL):
+        orders = sorted(
+            (order for order in open_orders if _side(order) == side),
+            key=lambda order: float(order["price"]),
+        )
+        index = np.flatnonzero(sides == side)
+        index = index[np.argsort(prices[index], kind="stable")]
+        target_prices = prices[index].tolist()
+        target_amounts = amounts[index].tolist()
+
+        spare_orders = []
+        spare_targets = []
+        i = j = 0
+        while i < len(orders) and j < len(index):
+            order = orders[i]
+            price = float(order["price"])
+            target = target_prices[j]
+            if abs(price - target) <= price_tolerance * target:
+                amount = float(order["amount"])
+                if abs(amount - target_amounts[j]) <= amount_tolerance * target_amounts[j]:
+                    result.keep.append((order, int(levels[index[j]])))
+                elif allow_amend:
+                    result.amend.append((order, int(levels[index[j]]), target, target_amounts[j]))
+                else:
+                    spare_orders.append(order)
+                    spare_targets.append(j)
+                i += 1
+                j += 1
+            elif price < target:
+                spare_orders.append(order)
+                i += 1
+            else:
+                spare_targets.append(j)
+                j += 1
+        spare_orders.extend(orders[i:])
+        spare_targets.extend(range(j, len(index)))
+
+        if allow_amend:
+            # 未配对的挂单按价格顺序直接改到未覆盖的目标价位，每对省一次请求
+            paired = min(len(spare_orders), len(spare_targets))
+            spare_orders.sort(key=lambda order: float(order["price"]))
+            spare_targets.sort()
+            for order, j in zip(spare_orders[:paired], spare_targets[:paired]):
+                result.amend.append((order, int(levels[index[j]]), target_prices[j], target_amounts[j]))
+            spare_orders = spare_orders[paired:]
+            spare_targets = spare_targets[paired:]
+
+        result.cancel.extend(spare_orders)
+        for j in spare_targets:
+            result.place.append((int(levels[index[j]]), side, target_prices[j], target_amounts[j]))
+
+    return result
+
+
+def reconcile_plan(open_orders, plan, price_tolerance=1e-6, amount_tolerance=0.01, allow_amend=True):
+    """按 GridPlan 对账，参数同 reconcile"""
+    levels, sides, prices, amounts = desired_orders(plan)
+    return reconcile(
+        open_orders,
+        levels,
+        sides,
+        prices,
+        amounts,
+        price_tolerance=price_tolerance,
+        amount_tolerance=amount_tolerance,
+        allow_amend=allow_amend,
+    )
+
+
+def plan_orders(plan):
+    """把 GridPlan 的目标价位转换为挂单形式（用于比较两个计划之间的差异）"""
+    levels, sides, prices, amounts = desired_orders(plan)
+    return [
+        {"id": f"level-{level}", "side": SIDE_NAMES[side], "price": price, "amount": amount}
+        for level, side, price, amount in zip(
+            levels.tolist(), sides.tolist(), prices.tolist(), amounts.tolist()
+        )
+    ]
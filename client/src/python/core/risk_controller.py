@@ -0,0 +1,884 @@
+# -*- coding: utf-8 -*-
+"""风控规则
+
+规则保存在策略配置的 risk_rules 中，每条规则包括：
+    name: 规则名称
+    scope: global 策略整体 / layer 单个网格层（区间）
+    layers: 只检查指定的网格层（可选，layer 规则使用）
+    condition: 条件表达式，如 "price < avg_price * 0.9 or drawdown_pct > 15"，
+        也可以是界面生成的结构 {"any"/"all": [...]} / {"metric", "op", "value"}
+    action: pause 暂停 / stop 停止 / alert 只记录和通知
+
+条件在保存时编译为闭包（只允许指标名、数值、四则运算、比较、and/or/not、
+abs/min/max），不使用 eval。layer 规则在所有网格层上用 NumPy 数组一次计算。
+
+行情更新时，同一交易对的指标只计算一次，再依次评估该交易对下所有策略的规则。
+持仓类指标：进程内执行的策略（native、paper）直接使用执行器的实际持仓和已实现收益；
+容器策略使用按网格模型运行的影子账本（core.triggers，与回测一致），影子账本定期保存到
+risk_books 表，引擎重启后继续使用；网格价位调整后按原持仓成本接续，收益和回撤不会清零。
+规则触发后立即记录并通知，暂停/停止动作交给单独的线程执行，不阻塞行情线程。
+"""
+
+import ast
+import json
+import operator
+import queue
+import re
+import threading
+import time
+
+import numpy as np
+from loguru import logger
+
+from core.grid import GridSpec
+from core.indicators import RSI, Bollinger
+from core.market_feed import to_ccxt_symbol
+from core.recenter import SymbolState
+from core.triggers import BUY, EXIT_ARMED, HOLDING, TriggerBook
+
+ACTIONS = ("pause", "stop", "alert")
+SCOPES = ("global", "layer")
+
+# 策略整体指标
+GLOBAL_METRICS = {
+    "price": "最新价格",
+    "upper_price": "网格上限",
+    "lower_price": "网格下限",
+    "position": "持仓数量",
+    "position_value": "持仓市值",
+    "avg_price": "持仓均价",
+    "unrealized_pnl": "浮动盈亏",
+    "realized_pnl": "已实现盈亏",
+    "pnl": "总盈亏",
+    "pnl_pct": "总盈亏占投入资金百分比",
+    "drawdown_pct": "权益从高点回撤百分比",
+    "holding_layers": "持仓层数",
+    "rsi": "RSI",
+    "atr": "ATR",
+    "atr_pct": "ATR占价格百分比",
+    "ema": "EMA",
+    "bb_upper": "布林带上轨",
+    "bb_middle": "布林带中轨",
+    "bb_lower": "布林带下轨",
+}
+
+# 网格层指标（layer 规则可同时使用整体指标）
+LAYER_METRICS = {
+    "layer": "层序号",
+    "layer_price": "层买入价位",
+    "layer_holding": "是否持仓（1/0）",
+    "layer_qty": "层持仓数量",
+    "layer_entry": "层开仓价",
+    "layer_pnl": "层浮动盈亏",
+    "layer_pnl_pct": "层浮动盈亏百分比",
+}
+
+_COMPARE = {
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+}
+_ARITHMETIC = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+}
+_FUNCTIONS = {
+    "abs": (abs, np.abs),
+    "min": (min, np.minimum),
+    "max": (max, np.maximum),
+}
+_OPERATORS = {"<", "<=", ">", ">=", "==", "!="}
+
+
+def _to_expression(condition):
+    """界面生成的结构化条件转换为表达式"""
+    if isinstance(condition, str):
+        # 兼容大写的 AND/OR/NOT
+        return re.sub(r"\b(AND|OR|NOT)\b", lambda m: m.group(1).lower(), condition)
+    if not isinstance(condition, dict):
+        raise ValueError(f"条件格式错误: {condition}")
+    for key, joiner in (("all", " and "), ("any", " or ")):
+        if key in condition:
+            parts = condition[key]
+            if not parts:
+                raise ValueError(f"条件组{key}不能为空")
+            return "(" + joiner.join(_to_expression(part) for part in parts) + ")"
+    if "not" in condition:
+        return f"(not {_to_expression(condition['not'])})"
+    op = condition.get("op")
+    if op not in _OPERATORS:
+        raise ValueError(f"不支持的比较运算: {op}")
+    return f"({condition.get('metric')} {op} {condition.get('value')})"
+
+
+def _compile(node, names, vector):
+    """AST 节点编译为闭包 env -> 值"""
+    if isinstance(node, ast.Expression):
+        return _compile(node.body, names, vector)
+
+    if isinstance(node, ast.BoolOp):
+        parts = [_compile(value, names, vector) for value in node.values]
+        if vector:
+            combine = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+
+            def boolean(env):
+                result = parts[0](env)
+                for part in parts[1:]:
+                    result = combine(result, part(env))
+                return result
+
+            return boolean
+        if isinstance(node.op, ast.And):
+            return lambda env: all(part(env) for part in parts)
+        return lambda env: any(part(env) for part in parts)
+
+    if isinstance(node, ast.UnaryOp):
+        operand = _compile(node.operand, names, vector)
+        if isinstance(node.op, ast.Not):
+            if vector:
+                return lambda env: np.logical_not(operand(env))
+            return lambda env: not operand(env)
+        if isinstance(node.op, ast.USub):
+            return lambda env: -operand(env)
+        if isinstance(node.op, ast.UAdd):
+            return operand
+
+    if isinstance(node, ast.Compare):
+        left = _compile(node.left, names, vector)
+        chain = []
+        for op, comparator in zip(node.ops, node.comparators):
+            if type(op) not in _COMPARE:
+                raise ValueError("不支持的比较运算")
+            chain.append((_COMPARE[type(op)], _compile(comparator, names, vector)))
+        if len(chain) == 1:
+            compare, right = chain[0]
+            return lambda env: compare(left(env), right(env))
+
+        def chained(env):
+            value = left(env)
+            result = True
+            for compare, right in chain:
+                other = right(env)
+                current = compare(value, other)
+                result = np.logical_and(result, current) if vector else result and current
+                value = other
+            return result
+
+        return chained
+
+    if isinstance(node, ast.BinOp) and type(node.op) in _ARITHMETIC:
+        apply = _ARITHMETIC[type(node.op)]
+        left = _compile(node.left, names, vector)
+        right = _compile(node.right, names, vector)
+        return lambda env: apply(left(env), right(env))
+
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+        function = _FUNCTIONS.get(node.func.id)
+        if function is None or node.keywords:
+            raise ValueError(f"不支持的函数: {node.func.id}")
+        args = [_compile(arg, names, vector) for arg in node.args]
+        if not args or (node.func.id == "abs" and len(args) != 1):
+            raise ValueError(f"函数{node.func.id}的参数数量错误")
+        apply = function[1] if vector else function[0]
+        if len(args) == 1:
+            return lambda env: apply(args[0](env))
+        return lambda env: apply(*(arg(env) for arg in args))
+
+    if isinstance(node, ast.Name):
+        name = node.id
+        if name not in names:
+            raise ValueError(f"未知的指标: {name}")
+        return lambda env: env[name]
+
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+        value = node.value
+        return lambda env: value
+
+    raise ValueError(f"条件中包含不支持的语法: {ast.dump(node)[:40]}")
+
+
+def compile_condition(condition, scope="global"):
+    """编译条件
+
+    Args:
+        condition: 条件表达式或结构化条件
+        scope: global / layer
+
+    Returns:
+        tuple: (闭包 env -> bool 或布尔数组, 表达式文本, 用到的指标)
+
+    Raises:
+        ValueError: 语法错误或使用了未知指标
+    """
+    expression = _to_expression(condition)
+    try:
+        tree = ast.parse(expression.strip(), mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"条件语法错误: {e.msg}")
+    names = dict(GLOBAL_METRICS)
+    if scope == "layer":
+        names.update(LAYER_METRICS)
+    used = sorted({n.id for n in ast.walk(tree) if isinstance(n, ast.Name)} - set(_FUNCTIONS))
+    return _compile(tree, names, scope == "layer"), expression, used
+
+
+class CompiledRule:
+    """编译后的风控规则"""
+
+    __slots__ = ("index", "name", "scope", "layers", "action", "expression", "metrics", "fn")
+
+    def __init__(self, index, name, scope, layers, action, expression, metrics, fn):
+        self.index = index
+        self.name = name
+        self.scope = scope
+        self.layers = layers
+        self.action = action
+        self.expression = expression
+        self.metrics = metrics
+        self.fn = fn
+
+
+def compile_rules(rules):
+    """校验并编译策略的风控规则列表
+
+    Returns:
+        list: CompiledRule 列表
+
+    Raises:
+        ValueError: 规则格式错误，消息指明第几条规则
+    """
+    if rules is None:
+        return []
+    if not isinstance(rules, list):
+        raise ValueError("风控规则必须为列表")
+    compiled = []
+    for index, rule in enumerate(rules):
+        try:
+            if not isinstance(rule, dict):
+                raise ValueError("规则格式错误")
+            scope = rule.get("scope", "global")
+            if scope not in SCOPES:
+                raise ValueError(f"不支持的作用范围: {scope}")
+            action = rule.get("action", "pause")
+            if action not in ACTIONS:
+                raise ValueError(f"不支持的动作: {action}")
+            if not rule.get("condition"):
+                raise ValueError("缺少条件")
+            layers = rule.get("layers")
+            if layers is not None:
+                if scope != "layer":
+                    raise ValueError("只有 layer 规则可以指定网格层")
+                layers = np.asarray([int(layer) for layer in layers], dtype=np.int64)
+            fn, expression, metrics = compile_condition(rule["condition"], scope)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"第{index + 1}条风控规则错误: {e}")
+        compiled.append(
+            CompiledRule(
+                index,
+                rule.get("name") or f"规则{index + 1}",
+                scope,
+                layers,
+                action,
+                expression,
+                metrics,
+                fn,
+            )
+        )
+    return compiled
+
+
+class SymbolIndicators(SymbolState):
+    """单个交易对的流式指标（同一交易对的所有策略共用）
+
+    与网格自适应调整相同，行情推送按 bar_seconds 聚合为K线，RSI、ATR、EMA 和布林带
+    按K线收盘更新，指标周期为K线根数；price 为最新价格。
+    """
+
+    __slots__ = ("rsi", "bollinger")
+
+    def __init__(
+        self, rsi_period=14, atr_period=14, ema_period=20, bb_period=20, bb_k=2.0, bar_seconds=300
+    ):
+        super().__init__(atr_period, ema_period, bar_seconds)
+        self.rsi = RSI(rsi_period)
+        self.bollinger = Bollinger(bb_period, bb_k)
+
+    def _close_bar(self, high, low, close):
+        super()._close_bar(high, low, close)
+        self.rsi.update(close)
+        self.bollinger.update(close)
+
+    def metrics(self):
+        atr = self.atr.value
+        return {
+            "price": self.price,
+            "rsi": self.rsi.value,
+            "atr": atr,
+            "atr_pct": atr / self.price * 100 if self.price else float("nan"),
+            "ema": self.ema.value,
+            "bb_upper": self.bollinger.upper,
+            "bb_middle": self.bollinger.middle,
+            "bb_lower": self.bollinger.lower,
+        }
+
+
+class StrategyRisk:
+    """单个策略的风控状态：编译后的规则和影子账本"""
+
+    __slots__ = (
+        "strategy_id",
+        "exchange",
+        "symbol",
+        "mode",
+        "lower",
+        "upper",
+        "rules",
+        "levels",
+        "book",
+        "quantities",
+        "entry",
+        "capital",
+        "realized",
+        "peak_equity",
+        "rebound_pct",
+        "pullback_pct",
+        "previous",
+        "triggered",
+        "alerts",
+        "last_metrics",
+    )
+
+    def __init__(self, strategy_id, exchange, symbol, config, rules):
+        spec = GridSpec.from_config(config)
+        self.strategy_id = strategy_id
+        self.exchange = exchange
+        self.symbol = symbol
+        self.mode = config.get("mode", "container")
+        self.lower = spec.lower_price
+        self.upper = spec.upper_price
+        self.rules = rules
+        self.levels = spec.levels()
+        self.quantities = spec.amount_per_grid / self.levels[:-1]
+        self.entry = np.full(len(self.levels) - 1, np.nan)
+        self.capital = spec.amount_per_grid * (len(self.levels) - 1)
+        self.realized = 0.0
+        self.peak_equity = self.capital
+        self.rebound_pct = float(config.get("reboundPct") or 0) / 100
+        self.pullback_pct = float(config.get("pullbackPct") or 0) / 100
+        # 影子账本在收到第一个价格时按网格模型初始化
+        self.book = None
+        # 调整前的账本（snapshot() 的结果），初始化时接续其持仓成本和收益
+        self.previous = None
+        self.triggered = None
+        # 当前处于触发状态的 alert 规则，条件从不满足变为满足时才通知
+        self.alerts = set()
+        self.last_metrics = None
+
+    def snapshot(self):
+        """可持久化的账本状态"""
+        if self.book is None and self.previous is not None:
+            return self.previous
+        return {
+            "levels": self.levels.tolist(),
+            "quantities": self.quantities.tolist(),
+            "capital": self.capital,
+            "entry": [None if e != e else e for e in self.entry.tolist()],
+            "realized": self.realized,
+            "peak_equity": self.peak_equity,
+            "book": self.book.snapshot() if self.book is not None else None,
+        }
+
+    def inherit(self, state):
+        """接续之前的账本（配置变化或引擎重启）
+
+        网格价位不变时原样恢复，否则在收到下一个价格时按原持仓成本接续。
+        """
+        if not state:
+            return
+        levels = np.asarray(state["levels"], dtype=np.float64)
+        if state.get("book") and len(levels) == len(self.levels) and np.allclose(levels, self.levels):
+            self.book = TriggerBook.from_snapshot(state["book"], self.rebound_pct, self.pullback_pct)
+            self.entry = np.array(
+                [np.nan if e is None else e for e in state["entry"]], dtype=np.float64
+            )
+            self.realized = state["realized"]
+            self.peak_equity = state["peak_equity"] + self.capital - state["capital"]
+        else:
+            self.previous = state
+
+    def update_book(self, price):
+        """用价格推进影子账本，记录每层开仓价和已实现盈亏"""
+        if self.book is None:
+            self._open_book(price)
+            return
+        for interval, side, fill_price in self.book.update(price):
+            if side == BUY:
+                self.entry[interval] = fill_price
+            else:
+                self.realized += self.quantities[interval] * (fill_price - self.entry[interval])
+                self.entry[interval] = np.nan
+
+    def _open_book(self, price):
+        self.book = TriggerBook(
+            self.levels, self.rebound_pct, self.pullback_pct, start_price=price
+        )
+        held = np.frombuffer(self.book.state, dtype=np.int8) == HOLDING
+        self.entry[held] = price
+        previous, self.previous = self.previous, None
+        if previous is None:
+            return
+        # 新网格的持仓沿用原持仓的平均成本，减少的部分按当前价计入已实现盈亏，
+        # 增加的部分按当前价计入成本
+        old_entry = np.array(
+            [np.nan if e is None else e for e in previous["entry"]], dtype=np.float64
+        )
+        old_held = ~np.isnan(old_entry)
+        old_qty = np.asarray(previous["quantities"], dtype=np.float64)[old_held]
+        old_position = float(old_qty.sum())
+        old_cost = float((old_qty * old_entry[old_held]).sum())
+        position = float(self.quantities[held].sum())
+        self.realized = previous["realized"]
+        if position <= old_position:
+            average = old_cost / old_position if old_position else price
+            self.realized += (old_position - position) * (price - average)
+        else:
+            average = (old_cost + (position - old_position) * price) / position
+        self.entry[held] = average
+        self.peak_equity = previous["peak_equity"] + self.capital - previous["capital"]
+
+    def metrics(self, shared, live=None):
+        """策略整体指标和网格层指标
+
+        Args:
+            shared: 交易对行情指标
+            live: 执行器的实际持仓（NativeExecutor.positions），为空时使用影子账本
+
+        Returns:
+            (dict, dict): (整体指标, 网格层指标数组)
+        """
+        price = shared["price"]
+        if live is None:
+            state = np.frombuffer(self.book.state, dtype=np.int8)
+            holding = (state == HOLDING) | (state == EXIT_ARMED)
+            layer_qty = np.where(holding, self.quantities, 0.0)
+            entry = self.entry
+            realized = self.realized
+            layer_price = self.levels[:-1]
+        else:
+            holding = live["holding"]
+            layer_qty = np.where(holding, live["size"], 0.0)
+            entry = np.where(holding, live["entry"], np.nan)
+            realized = live["realized"]
+            layer_price = live["levels"][:-1]
+        position = float(layer_qty.sum())
+        cost = float((layer_qty * np.nan_to_num(entry)).sum())
+        unrealized = position * price - cost
+        pnl = realized + unrealized
+        equity = self.capital + pnl
+        if equity > self.peak_equity:
+            self.peak_equity = equity
+        layer_pnl = np.where(holding, layer_qty * (price - entry), 0.0)
+
+        values = {
+            **shared,
+            "upper_price": self.upper,
+            "lower_price": self.lower,
+            "position": position,
+            "position_value": position * price,
+            "avg_price": cost / position if position else float("nan"),
+            "unrealized_pnl": unrealized,
+            "realized_pnl": realized,
+            "pnl": pnl,
+            "pnl_pct": pnl / self.capital * 100 if self.capital else 0.0,
+            "drawdown_pct": (1 - equity / self.peak_equity) * 100 if self.peak_equity else 0.0,
+            "holding_layers": int(holding.sum()),
+        }
+        layers = {
+            "layer": np.arange(len(holding)),
+            "layer_price": layer_price,
+            "layer_holding": holding.astype(np.float64),
+            "layer_qty": layer_qty,
+            "layer_entry": entry,
+            "layer_pnl": layer_pnl,
+            "layer_pnl_pct": np.divide(
+                layer_pnl,
+                layer_qty * entry,
+                out=np.zeros_like(layer_pnl),
+                where=holding,
+            )
+            * 100,
+        }
+        return values, layers
+
+
+class RiskController:
+    """风控规则评估"""
+
+    def __init__(
+        self,
+        conn,
+        db_lock,
+        feed,
+        actions,
+        positions=None,
+        notify=None,
+        sync_interval=30,
+        indicator_options=None,
+    ):
+        """初始化
+
+        Args:
+            conn: SQLite连接
+            db_lock: 数据库锁
+            feed: MarketFeed 实例
+            actions: 动作名 -> 回调 strategy_id -> bool（pause、stop）
+            positions: 进程内策略的实际持仓 strategy_id -> dict 或 None（NativeExecutor.positions）
+            notify: 事件回调 (event, data)
+            sync_interval: 从数据库同步运行中策略的间隔（秒）
+            indicator_options: SymbolIndicators 的周期参数
+        """
+        self.conn = conn
+        self.db_lock = db_lock
+        self.feed = feed
+        self.actions = actions
+        self.positions = positions
+        self.notify = notify
+        self.sync_interval = sync_interval
+        self.indicator_options = indicator_options or {}
+        self._strategies = {}
+        self._by_symbol = {}
+        self._indicators = {}
+        self._lock = threading.Lock()
+        self._actions = queue.Queue()
+        self._stopping = threading.Event()
+        self._init_db()
+        self._open_events = self._restore()
+        feed.add_listener(self.on_price)
+
+    def _init_db(self):
+        """初始化风控事件表"""
+        with self.db_lock:
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS risk_events (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    strategy_id TEXT,
+                    rule TEXT,
+                    expression TEXT,
+                    action TEXT,
+                    layers TEXT,
+                    metrics TEXT,
+                    triggered_at TIMESTAMP,
+                    resolved_at TIMESTAMP
+                )
+                """
+            )
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_risk_events_strategy ON risk_events (strategy_id)"
+            )
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS risk_books (
+                    strategy_id TEXT PRIMARY KEY,
+                    state TEXT,
+                    updated_at TIMESTAMP
+                )
+                """
+            )
+            self.conn.commit()
+
+    def _restore(self):
+        """上次运行时已触发且未解除的规则"""
+        with self.db_lock:
+            rows = self.conn.execute(
+                "SELECT strategy_id, rule FROM risk_events WHERE resolved_at IS NULL"
+            ).fetchall()
+        return {strategy_id: rule for strategy_id, rule in rows}
+
+    def start(self):
+        """启动同步线程和动作执行线程"""
+        threading.Thread(target=self._run, name="risk-sync", daemon=True).start()
+        threading.Thread(target=self._run_actions, name="risk-actions", daemon=True).start()
+
+    def stop(self):
+        self._stopping.set()
+        self._actions.put(None)
+        self.save_books()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                self.sync()
+            except Exception as e:
+                logger.error(f"同步风控策略列表失败: {e}")
+            self._stopping.wait(self.sync_interval)
+
+    def sync(self):
+        """根据数据库中运行中且配置了风控规则的策略刷新规则和行情订阅"""
+        with self.db_lock:
+            rows = self.conn.execute(
+                "SELECT id, exchange, trading_pair, config FROM strategies WHERE status = 'running'"
+            ).fetchall()
+
+        with self._lock:
+            current = dict(self._strategies)
+        strategies = {}
+        for strategy_id, exchange, pair, config_json in rows:
+            try:
+                config = json.loads(config_json) if config_json else {}
+                raw_rules = config.get("risk_rules")
+                if not raw_rules:
+                    continue
+                existing = current.get(strategy_id)
+                # 配置未变化时保留影子账本和触发状态
+                if existing and existing[1] == config_json:
+                    strategies[strategy_id] = existing
+                    continue
+                risk = StrategyRisk(
+                    strategy_id, exchange, to_ccxt_symbol(pair), config, compile_rules(raw_rules)
+                )
+                # 配置变化（如网格调整）时接续原账本，新加入时接续上次保存的账本
+                risk.inherit(existing[0].snapshot() if existing else self._load_book(strategy_id))
+                risk.triggered = self._open_events.get(strategy_id)
+                strategies[strategy_id] = (risk, config_json)
+            except Exception as e:
+                logger.warning(f"策略{strategy_id}的风控规则无效，已跳过: {e}")
+
+        by_symbol = {}
+        for risk, _ in strategies.values():
+            by_symbol.setdefault((risk.exchange, risk.symbol), []).append(risk)
+        with self._lock:
+            self._strategies = strategies
+            self._by_symbol = by_symbol
+        self.feed.set_subscriptions("risk", set(by_symbol))
+        self.save_books()
+
+    def _load_book(self, strategy_id):
+        with self.db_lock:
+            row = self.conn.execute(
+                "SELECT state FROM risk_books WHERE strategy_id = ?", (strategy_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row and row[0] else None
+
+    def save_books(self):
+        """保存所有策略的账本（影子持仓、已实现盈亏和权益高点）"""
+        with self._lock:
+            risks = [risk for risk, _ in self._strategies.values()]
+        rows = [(risk.strategy_id, json.dumps(risk.snapshot())) for risk in risks]
+        if not rows:
+            return
+        try:
+            with self.db_lock:
+                self.conn.executemany(
+                    """
+                    INSERT OR REPLACE INTO risk_books (strategy_id, state, updated_at)
+                    VALUES (?, ?, CURRENT_TIMESTAMP)
+                    """,
+                    rows,
+                )
+                self.conn.commit()
+        except Exception as e:
+            logger.error(f"保存风控账本失败: {e}")
+
+    def forget(self, strategy_id):
+        """删除策略的风控账本"""
+        with self._lock:
+            self._strategies.pop(strategy_id, None)
+        with self.db_lock:
+            self.conn.execute("DELETE FROM risk_books WHERE strategy_id = ?", (strategy_id,))
+            self.conn.commit()
+
+    def on_price(self, exchange_id, symbol, price, timestamp):
+        """处理价格更新：更新交易对指标，评估该交易对下所有策略的规则"""
+        key = (exchange_id, symbol)
+        with self._lock:
+            targets = self._by_symbol.get(key)
+            if not targets:
+                return
+            indicators = self._indicators.get(key)
+            if indicators is None:
+                indicators = self._indicators[key] = SymbolIndicators(**self.indicator_options)
+        started = time.perf_counter()
+        indicators.update(price, timestamp)
+        shared = indicators.metrics()
+        for risk in targets:
+            try:
+                live = None
+                if risk.mode != "container" and self.positions is not None:
+                    live = self.positions(risk.strategy_id)
+                    if live is None:
+                        # 进程内策略尚未启动（如引擎重启后正在恢复）
+                        continue
+                else:
+                    risk.update_book(price)
+                if risk.triggered is None:
+                    self._evaluate(risk, shared, live)
+            except Exception as e:
+                logger.error(f"评估策略{risk.strategy_id}风控规则失败: {e}")
+        elapsed = (time.perf_counter() - started) * 1000
+        if elapsed > 50:
+            logger.warning(f"{exchange_id} {symbol}风控评估耗时{elapsed:.1f}毫秒")
+
+    def _evaluate(self, risk, shared, live=None):
+        values, layers = risk.metrics(shared, live)
+        risk.last_metrics = values
+        layer_env = None
+        for rule in risk.rules:
+            if rule.scope == "global":
+                breached = None
+                hit = bool(rule.fn(values))
+            else:
+                if layer_env is None:
+                    layer_env = {**values, **layers}
+                mask = np.broadcast_to(rule.fn(layer_env), layers["layer"].shape)
+                if rule.layers is not None:
+                    selected = rule.layers[(rule.layers >= 0) & (rule.layers < len(mask))]
+                    breached = selected[mask[selected]]
+                else:
+                    breached = np.flatnonzero(mask)
+                hit = len(breached) > 0
+            if rule.action == "alert":
+                if not hit:
+                    risk.alerts.discard(rule.index)
+                elif rule.index not in risk.alerts:
+                    risk.alerts.add(rule.index)
+                    self._trigger(risk, rule, values, breached)
+                continue
+            if hit:
+                self._trigger(risk, rule, values, breached)
+                # 同一策略只执行第一条触发的暂停/停止规则，手动恢复前不再评估
+                return
+
+    def _trigger(self, risk, rule, values, breached):
+        layers = None if breached is None else [int(layer) for layer in breached]
+        snapshot = {k: v for k, v in values.items() if isinstance(v, (int, float)) and v == v}
+        if rule.action != "alert":
+            risk.triggered = rule.name
+        logger.warning(
+            f"策略{risk.strategy_id}触发风控规则[{rule.name}] {rule.expression}，动作: {rule.action}"
+            + (f"，网格层: {layers}" if layers else "")
+        )
+        with self.db_lock:
+            self.conn.execute(
+                """
+                INSERT INTO risk_events
+                    (strategy_id, rule, expression, action, layers, metrics, triggered_at, resolved_at)
+                VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP, ?)
+                """,
+                (
+                    risk.strategy_id,
+                    rule.name,
+                    rule.expression,
+                    rule.action,
+                    json.dumps(layers) if layers is not None else None,
+                    json.dumps(snapshot),
+                    # 只通知的规则不需要解除
+                    None if rule.action != "alert" else time.strftime("%Y-%m-%d %H:%M:%S"),
+                ),
+            )
+            self.conn.commit()
+        if rule.action != "alert":
+            self._open_events[risk.strategy_id] = rule.name
+            self._actions.put((rule.action, risk.strategy_id))
+        if self.notify:
+            try:
+                self.notify(
+                    "risk_triggered",
+                    {
+                        "strategy_id": risk.strategy_id,
+                        "rule": rule.name,
+                        "expression": rule.expression,
+                        "action": rule.action,
+                        "layers": layers,
+                        "metrics": snapshot,
+                    },
+                )
+            except Exception as e:
+                logger.debug(f"推送风控事件失败: {e}")
+
+    def _run_actions(self):
+        while True:
+            item = self._actions.get()
+            if item is None:
+                return
+            action, strategy_id = item
+            try:
+                if not self.actions[action](strategy_id):
+                    logger.error(f"策略{strategy_id}风控动作{action}执行失败")
+            except Exception as e:
+                logger.error(f"策略{strategy_id}风控动作{action}执行失败: {e}")
+
+    def reset(self, strategy_id):
+        """策略被手动恢复、启动或停止后解除已触发的规则"""
+        with self._lock:
+            entry = self._strategies.get(strategy_id)
+        if entry:
+            entry[0].triggered = None
+        if self._open_events.pop(strategy_id, None) is not None:
+            with self.db_lock:
+                self.conn.execute(
+                    """
+                    UPDATE risk_events SET resolved_at = CURRENT_TIMESTAMP
+                    WHERE strategy_id = ? AND resolved_at IS NULL
+                    """,
+                    (strategy_id,),
+                )
+                self.conn.commit()
+
+    def is_triggered(self, strategy_id):
+        """策略是否有未解除的暂停/停止规则触发"""
+        return strategy_id in self._open_events
+
+    def get_status(self, strategy_id):
+        """单个策略的风控状态和当前指标"""
+        with self._lock:
+            entry = self._strategies.get(strategy_id)
+        if entry is None:
+            return None
+        risk = entry[0]
+        metrics = risk.last_metrics or {}
+        return {
+            "rules": [
+                {"name": r.name, "scope": r.scope, "action": r.action, "expression": r.expression}
+                for r in risk.rules
+            ],
+            "triggered": risk.triggered,
+            "metrics": {k: v for k, v in metrics.items() if isinstance(v, (int, float)) and v == v},
+        }
+
+    def get_all_status(self):
+        with self._lock:
+            ids = list(self._strategies)
+        return {strategy_id: self.get_status(strategy_id) for strategy_id in ids}
+
+    def get_events(self, strategy_id=None, limit=100):
+        """最近的风控事件"""
+        query = (
+            "SELECT strategy_id, rule, expression, action, layers, metrics, triggered_at, resolved_at"
+            " FROM risk_events"
+        )
+        params = ()
+        if strategy_id:
+            query += " WHERE strategy_id = ?"
+            params = (strategy_id,)
+        query += " ORDER BY id DESC LIMIT ?"
+        with self.db_lock:
+            rows = self.conn.execute(query, params + (int(limit),)).fetchall()
+        return [
+            {
+                "strategy_id": row[0],
+                "rule": row[1],
+                "expression": row[2],
+                "action": row[3],
+                "layers": json.loads(row[4]) if row[4] else None,
+                "metrics": json.loads(row[5]) if row[5] else {},
+                "triggered_at": row[6],
+                "resolved_at": row[7],
+            }
+            for row in rows
+        ]
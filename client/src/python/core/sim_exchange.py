@@ -0,0 +1,1080 @@
+# -*- coding: utf-8 -*-
+"""本地模拟交易所
+
+用于离线压测和集成测试，不访问任何真实交易所：
+
+- SimVenue：撮合引擎和账户。每个交易对一个价格-时间优先的订单簿，
+  买卖两侧的价位保存在有序列表中（最优价在末尾，增删为 bisect），
+  同一价位的订单按到达顺序排在 deque 中。外部行情（set_price）穿过挂单价时，
+  挂单按挂单价作为 maker 成交；可按最新价成交的新订单与外部流动性成交。
+  没有外部行情时订单只在簿内撮合。手续费从收到的币种中扣除，与多数现货交易所一致。
+- SimExchange：ccxt 兼容的同步适配器（load_markets、fetch_ticker、fetch_ohlcv、
+  fetch_order_book、create_order(s)、cancel_order(s)、edit_order、fetch_balance 等），
+  可配置网络延迟、抖动和服务端限流（超限抛出 ccxt.RateLimitExceeded）。
+  请求前调用 throttle，可以和真实实例一样接入 RateLimitScheduler.attach。
+- ReplayFeed：把K线（展开为 开-低-高-收 路径）或逐笔价格文件按时间回放到撮合引擎，
+  并以 MarketFeed 监听者相同的签名推送价格。
+
+单线程直接调用撮合引擎每秒可处理数万个订单（见 benchmark）。
+"""
+
+import csv
+import itertools
+import math
+import random
+import threading
+import time
+from bisect import insort
+from collections import deque
+from datetime import datetime, timezone
+
+import ccxt
+import numpy as np
+
+from core.backtest import price_path
+from core.ohlcv_fetcher import timeframe_to_ms
+
+SIM_EXCHANGE_ID = "simulated"
+
+BUY = 1
+SELL = -1
+
+# 每个交易对保留的1分钟K线数量和每个账户保留的成交记录数量
+MAX_MINUTE_BARS = 100000
+MAX_TRADES = 10000
+
+# 由1分钟K线聚合提供的K线周期
+TIMEFRAMES = ("1m", "5m", "15m", "30m", "1h", "4h", "1d")
+
+
+def _iso(timestamp_ms):
+    return (
+        datetime.fromtimestamp(timestamp_ms / 1000, tz=timezone.utc)
+        .isoformat(timespec="milliseconds")
+        .replace("+00:00", "Z")
+    )
+
+
+class SimOrder:
+    """撮合引擎内部订单"""
+
+    __slots__ = (
+        "id",
+        "client_id",
+        "account",
+        "symbol",
+        "type",
+        "side",
+        "price",
+        "reserve",
+        "amount",
+        "filled",
+        "cost",
+        "fee",
+        "status",
+        "timestamp",
+        "trades",
+    )
+
+    def __init__(self, order_id, account, symbol, order_type, side, price, amount, timestamp):
+        self.id = order_id
+        self.client_id = None
+        self.account = account
+        self.symbol = symbol
+        self.type = order_type
+        self.side = side
+        self.price = price
+        # 买单冻结计价币时使用的价格（限价单为限价，市价单为下单时的最新价）
+        self.reserve = price
+        self.amount = amount
+        self.filled = 0.0
+        self.cost = 0.0
+        self.fee = 0.0
+        self.status = "open"
+        self.timestamp = timestamp
+        self.trades = 0
+
+    @property
+    def remaining(self):
+        return self.amount - self.filled
+
+
+class OrderBook:
+    """单个交易对的价格-时间优先订单簿"""
+
+    __slots__ = ("bid_keys", "ask_keys", "bids", "asks")
+
+    def __init__(self):
+        # 买盘键为价格、卖盘键为负价格，升序保存，最优价都在列表末尾
+        self.bid_keys = []
+        self.ask_keys = []
+        self.bids = {}
+        self.asks = {}
+
+    def add(self, order):
+        """挂单（调用方保证订单不会与对手盘立即成交）"""
+        if order.side == BUY:
+            levels, keys, key = self.bids, self.bid_keys, order.price
+        else:
+            levels, keys, key = self.asks, self.ask_keys, -order.price
+        level = levels.get(key)
+        if level is None:
+            level = levels[key] = deque()
+            insort(keys, key)
+        level.append(order)
+
+    def remove(self, order):
+        if order.side == BUY:
+            levels, keys, key = self.bids, self.bid_keys, order.price
+        else:
+            levels, keys, key = self.asks, self.ask_keys, -order.price
+        level = levels.get(key)
+        if level is None:
+            return False
+        try:
+            level.remove(order)
+        except ValueError:
+            return False
+        if not level:
+            del levels[key]
+            self._drop_key(keys, key)
+        return True
+
+    @staticmethod
+    def _drop_key(keys, key):
+        # 撤单多发生在最优价附近（列表末尾），从末尾查找
+        if keys[-1] == key:
+            keys.pop()
+            return
+        index = len(keys) - 1
+        while keys[index] != key:
+            index -= 1
+        del keys[index]
+
+    def best_bid(self):
+        return self.bid_keys[-1] if self.bid_keys else None
+
+    def best_ask(self):
+        return -self.ask_keys[-1] if self.ask_keys else None
+
+    def depth(self, limit=None):
+        """按价位汇总的盘口 ([[价格, 数量], ...], [[价格, 数量], ...])"""
+        bids = [
+            [key, sum(o.remaining for o in self.bids[key])]
+            for key in reversed(self.bid_keys[-limit:] if limit else self.bid_keys)
+        ]
+        asks = [
+            [-key, sum(o.remaining for o in self.asks[key])]
+            for key in reversed(self.ask_keys[-limit:] if limit else self.ask_keys)
+        ]
+        return bids, asks
+
+
+class SimVenue:
+    """模拟交易所的撮合引擎和账户（多个适配器实例共享）"""
+
+    def __init__(self, exchange_id=SIM_EXCHANGE_ID, maker=0.001, taker=0.001):
+        self.exchange_id = exchange_id
+        self.maker = maker
+        self.taker = taker
+        self.markets = {}
+        self.lock = threading.RLock()
+        self._books = {}
+        self._last = {}
+        self._bars = {}
+        self._orders = {}
+        self._open = {}
+        self._trades = {}
+        self._balances = {}
+        self._listeners = []
+        self._order_ids = itertools.count(1)
+        self._trade_ids = itertools.count(1)
+        self._clock = None
+
+    # ---- 市场和账户 ----
+
+    def add_market(
+        self,
+        symbol,
+        price_tick=0.01,
+        amount_step=0.0001,
+        min_cost=5.0,
+        min_amount=None,
+        price=None,
+    ):
+        """添加交易对（ccxt格式，如 BTC/USDT），精度按 TICK_SIZE 模式表示"""
+        base, quote = symbol.split("/")
+        with self.lock:
+            self.markets[symbol] = {
+                "id": symbol.replace("/", ""),
+                "symbol": symbol,
+                "base": base,
+                "quote": quote,
+                "type": "spot",
+                "spot": True,
+                "active": True,
+                "maker": self.maker,
+                "taker": self.taker,
+                "precision": {"price": price_tick, "amount": amount_step},
+                "limits": {
+                    "amount": {"min": min_amount or amount_step, "max": None},
+                    "price": {"min": price_tick, "max": None},
+                    "cost": {"min": min_cost, "max": None},
+                },
+                "info": {},
+            }
+            self._books[symbol] = OrderBook()
+            self._bars[symbol] = deque(maxlen=MAX_MINUTE_BARS)
+            if price:
+                self._last[symbol] = float(price)
+        return self.markets[symbol]
+
+    def market_snapshot(self):
+        """所有交易对的市场信息副本（ccxt load_markets 的格式）"""
+        with self.lock:
+            return {symbol: dict(market) for symbol, market in self.markets.items()}
+
+    def deposit(self, account, currency, amount):
+        with self.lock:
+            balance = self._balances.setdefault(account, {}).setdefault(currency, [0.0, 0.0])
+            balance[0] += amount
+
+    def balance(self, account):
+        """账户余额 币种 -> (可用, 冻结)"""
+        with self.lock:
+            return {c: (b[0], b[1]) for c, b in self._balances.get(account, {}).items()}
+
+    def add_listener(self, listener):
+        """添加成交监听者 listener(account, trade)，在撮合锁外调用"""
+        self._listeners.append(listener)
+
+    def now(self):
+        """当前时间（毫秒），回放行情时为行情时间"""
+        return self._clock if self._clock is not None else int(time.time() * 1000)
+
+    def last_price(self, symbol):
+        return self._last.get(symbol)
+
+    def book(self, symbol):
+        return self._books[symbol]
+
+    # ---- 下单和撤单 ----
+
+    def _market(self, symbol):
+        market = self.markets.get(symbol)
+        if market is None:
+            raise ccxt.BadSymbol(f"{self.exchange_id}不存在交易对{symbol}")
+        return market
+
+    def _wallet(self, account, currency):
+        return self._balances.setdefault(account, {}).setdefault(currency, [0.0, 0.0])
+
+    def place(self, account, symbol, order_type, side, amount, price=None, client_id=None):
+        """下单并立即撮合
+
+        Returns:
+            SimOrder: 订单（状态为 open、closed 或部分成交后仍为 open）
+
+        Raises:
+            ccxt.BadSymbol, ccxt.InvalidOrder, ccxt.InsufficientFunds
+        """
+        fills = []
+        with self.lock:
+            order = self._place(account, symbol, order_type, side, amount, price, client_id, fills)
+        self._dispatch(fills)
+        return order
+
+    def _place(self, account, symbol, order_type, side, amount, price, client_id, fills):
+        market = self._market(symbol)
+        side_value = BUY if side == "buy" else SELL if side == "sell" else None
+        if side_value is None:
+            raise ccxt.InvalidOrder(f"订单方向错误: {side}")
+        if order_type not in ("limit", "market"):
+            raise ccxt.InvalidOrder(f"不支持的订单类型: {order_type}")
+        precision = market["precision"]
+        amount = math.floor(float(amount) / precision["amount"] + 1e-9) * precision["amount"]
+        if amount < market["limits"]["amount"]["min"]:
+            raise ccxt.InvalidOrder(f"下单数量小于最小数量{market['limits']['amount']['min']}")
+        last = self._last.get(symbol)
+        if order_type == "limit":
+            if not price or price <= 0:
+                raise ccxt.InvalidOrder("限价单必须提供大于0的价格")
+            price = round(float(price) / precision["price"]) * precision["price"]
+            reference = price
+        else:
+            if last is None:
+                raise ccxt.InvalidOrder(f"{symbol}没有行情，无法下市价单")
+            price = None
+            reference = last
+        if amount * reference < market["limits"]["cost"]["min"]:
+            raise ccxt.InvalidOrder(f"下单金额小于最小下单额{market['limits']['cost']['min']}")
+
+        # 冻结资金：买单冻结计价币，卖单冻结基础币
+        if side_value == BUY:
+            wallet = self._wallet(account, market["quote"])
+            required = amount * reference
+        else:
+            wallet = self._wallet(account, market["base"])
+            required = amount
+        if wallet[0] < required - 1e-12:
+            raise ccxt.InsufficientFunds(
+                f"余额不足: 需要{required} {market['quote' if side_value == BUY else 'base']}，可用{wallet[0]}"
+            )
+        wallet[0] -= required
+        wallet[1] += required
+
+        order = SimOrder(
+            str(next(self._order_ids)), account, symbol, order_type, side_value, price, amount, self.now()
+        )
+        order.client_id = client_id
+        order.reserve = reference
+        self._orders[order.id] = order
+        self._match(order, market, fills)
+        if order.remaining > 1e-12:
+            if order_type == "limit":
+                self._books[symbol].add(order)
+                self._open.setdefault(account, {})[order.id] = order
+            else:
+                # 市价单没有对手盘的剩余部分撤销
+                self._finish(order, market, "canceled")
+        return order
+
+    def _match(self, order, market, fills):
+        """新订单作为 taker 成交
+
+        有外部行情时，可按最新价成交的订单直接与外部流动性成交（簿内挂单都在最新价之外，
+        价格不会更优）；没有外部行情时只与簿内挂单按价格-时间优先撮合。
+        """
+        limit = order.price
+        last = self._last.get(order.symbol)
+        if last is not None:
+            if limit is None or (last <= limit if order.side == BUY else last >= limit):
+                self._fill(order, market, last, order.remaining, False, fills)
+            return
+
+        book = self._books[order.symbol]
+        if order.side == BUY:
+            levels, keys, sign = book.asks, book.ask_keys, -1
+        else:
+            levels, keys, sign = book.bids, book.bid_keys, 1
+        while keys and order.remaining > 1e-12:
+            level_price = keys[-1] * sign
+            if limit is not None and (
+                level_price > limit if order.side == BUY else level_price < limit
+            ):
+                break
+            level = levels[keys[-1]]
+            while level and order.remaining > 1e-12:
+                maker = level[0]
+                quantity = min(order.remaining, maker.remaining)
+                self._fill(maker, market, level_price, quantity, True, fills)
+                self._fill(order, market, level_price, quantity, False, fills)
+                if maker.remaining <= 1e-12:
+                    level.popleft()
+                    self._close_resting(maker, market)
+            if not level:
+                del levels[keys[-1]]
+                keys.pop()
+
+    def _fill(self, order, market, price, quantity, is_maker, fills):
+        fee_rate = market["maker"] if is_maker else market["taker"]
+        base = self._wallet(order.account, market["base"])
+        quote = self._wallet(order.account, market["quote"])
+        cost = price * quantity
+        if order.side == BUY:
+            # 按冻结价格释放冻结的计价币，实际成交价更优时差额退回可用
+            reserved = quantity * order.reserve
+            quote[1] -= reserved
+            quote[0] += reserved - cost
+            fee = quantity * fee_rate
+            base[0] += quantity - fee
+            fee_currency = market["base"]
+        else:
+            base[1] -= quantity
+            fee = cost * fee_rate
+            quote[0] += cost - fee
+            fee_currency = market["quote"]
+        order.filled += quantity
+        order.cost += cost
+        order.fee += fee
+        order.trades += 1
+        if order.remaining <= 1e-12 and order.status == "open":
+            order.status = "closed"
+        timestamp = self.now()
+        trade = {
+            "id": str(next(self._trade_ids)),
+            "order": order.id,
+            "clientOrderId": order.client_id,
+            "symbol": order.symbol,
+            "type": order.type,
+            "side": "buy" if order.side == BUY else "sell",
+            "takerOrMaker": "maker" if is_maker else "taker",
+            "price": price,
+            "amount": quantity,
+            "cost": cost,
+            "fee": {"cost": fee, "currency": fee_currency, "rate": fee_rate},
+            "timestamp": timestamp,
+            "datetime": _iso(timestamp),
+            "info": {},
+        }
+        trades = self._trades.get(order.account)
+        if trades is None:
+            trades = self._trades[order.account] = deque(maxlen=MAX_TRADES)
+        trades.append(trade)
+        fills.append((order.account, trade))
+        self._record_volume(order.symbol, price, quantity, timestamp)
+
+    def _close_resting(self, order, market):
+        open_orders = self._open.get(order.account)
+        if open_orders:
+            open_orders.pop(order.id, None)
+
+    def _finish(self, order, market, status):
+        """结束订单并释放剩余冻结资金"""
+        remaining = order.remaining
+        if remaining > 1e-12:
+            if order.side == BUY:
+                wallet = self._wallet(order.account, market["quote"])
+                reserved = remaining * order.reserve
+            else:
+                wallet = self._wallet(order.account, market["base"])
+                reserved = remaining
+            wallet[0] += reserved
+            wallet[1] -= reserved
+        order.status = status
+
+    def cancel(self, account, order_id):
+        """撤单
+
+        Raises:
+            ccxt.OrderNotFound: 订单不存在或已结束
+        """
+        with self.lock:
+            order = self._orders.get(order_id)
+            if order is None or order.account != account or order.status != "open":
+                raise ccxt.OrderNotFound(f"订单{order_id}不存在或已结束")
+            self._books[order.symbol].remove(order)
+            self._close_resting(order, None)
+            self._finish(order, self.markets[order.symbol], "canceled")
+            return order
+
+    def amend(self, account, order_id, amount=None, price=None):
+        """修改订单（撤单后按新参数重新挂单，失去时间优先级），返回新订单"""
+        fills = []
+        with self.lock:
+            order = self.cancel(account, order_id)
+            replaced = self._place(
+                account,
+                order.symbol,
+                order.type,
+                "buy" if order.side == BUY else "sell",
+                amount if amount is not None else order.remaining,
+                price if price is not None else order.price,
+                order.client_id,
+                fills,
+            )
+        self._dispatch(fills)
+        return replaced
+
+    def get_order(self, account, order_id):
+        order = self._orders.get(order_id)
+        if order is None or order.account != account:
+            raise ccxt.OrderNotFound(f"订单{order_id}不存在")
+        return order
+
+    def open_orders(self, account, symbol=None):
+        with self.lock:
+            orders = list(self._open.get(account, {}).values())
+        if symbol:
+            orders = [o for o in orders if o.symbol == symbol]
+        return orders
+
+    def trades(self, account, symbol=None, since=None, limit=None):
+        with self.lock:
+            trades = list(self._trades.get(account, ()))
+        if symbol:
+            trades = [t for t in trades if t["symbol"] == symbol]
+        if since is not None:
+            trades = [t for t in trades if t["timestamp"] >= since]
+        return trades[-limit:] if limit else trades
+
+    # ---- 行情 ----
+
+    def set_price(self, symbol, price, timestamp=None, volume=0.0):
+        """外部成交价格：更新最新价和K线，穿过的挂单按挂单价成交
+
+        Args:
+            symbol: 交易对
+            price: 成交价格
+            timestamp: 行情时间（毫秒），回放时推进模拟时钟
+            volume: 外部成交量（只计入K线）
+        """
+        fills = []
+        with self.lock:
+            if timestamp is not None:
+                self._clock = int(timestamp)
+            market = self._market(symbol)
+            self._last[symbol] = price
+            self._record_volume(symbol, price, volume, self.now())
+            book = self._books[symbol]
+            while book.bid_keys and book.bid_keys[-1] >= price:
+                self._sweep(book.bids.pop(book.bid_keys.pop()), market, fills)
+            while book.ask_keys and -book.ask_keys[-1] <= price:
+                self._sweep(book.asks.pop(book.ask_keys.pop()), market, fills)
+        self._dispatch(fills)
+        return len(fills)
+
+    def _sweep(self, level, market, fills):
+        """价位上的挂单全部按挂单价与外部流动性成交"""
+        for order in level:
+            self._fill(order, market, order.price, order.remaining, True, fills)
+            self._close_resting(order, market)
+
+    def _record_volume(self, symbol, price, volume, timestamp):
+        bars = self._bars[symbol]
+        minute = timestamp - timestamp % 60000
+        if bars and bars[-1][0] == minute:
+            bar = bars[-1]
+            if price > bar[2]:
+                bar[2] = price
+            if price < bar[3]:
+                bar[3] = price
+            bar[4] = price
+            bar[5] += volume
+        elif not bars or bars[-1][0] < minute:
+            bars.append([minute, price, price, price, price, volume])
+
+    def ohlcv(self, symbol, timeframe="1m", since=None, limit=None):
+        """由1分钟K线聚合的K线 [[timestamp, open, high, low, close, volume], ...]"""
+        timeframe_ms = timeframe_to_ms(timeframe)
+        with self.lock:
+            self._market(symbol)
+            bars = [list(bar) for bar in self._bars[symbol]]
+        result = []
+        for bar in bars:
+            start = bar[0] - bar[0] % timeframe_ms
+            if since is not None and start < since - since % timeframe_ms:
+                continue
+            if result and result[-1][0] == start:
+                current = result[-1]
+                current[2] = max(current[2], bar[2])
+                current[3] = min(current[3], bar[3])
+                current[4] = bar[4]
+                current[5] += bar[5]
+            else:
+                result.append([start, *bar[1:]])
+        return result[:limit] if limit else result
+
+    def _dispatch(self, fills):
+        if not fills or not self._listeners:
+            return
+        for account, trade in fills:
+            for listener in self._listeners:
+                listener(account, trade)
+
+
+class SimExchange:
+    """ccxt 兼容的模拟交易所适配器（每个实例对应一个账户）"""
+
+    def __init__(
+        self,
+        venue,
+        account="default",
+        latency_ms=0.0,
+        jitter_ms=0.0,
+        max_requests_per_second=None,
+        rate_limit_ms=50,
+        batch=True,
+    ):
+        """初始化
+
+        Args:
+            venue: SimVenue 实例
+            account: 账户名
+            latency_ms: 每个请求的模拟网络延迟（毫秒）
+            jitter_ms: 延迟的随机抖动上限（毫秒）
+            max_requests_per_second: 服务端限流，超过时抛出 ccxt.RateLimitExceeded，None 为不限
+            rate_limit_ms: ccxt rateLimit 元数据（客户端按此节流）
+            batch: 是否提供 createOrders/cancelOrders 批量接口
+        """
+        self.venue = venue
+        self.account = account
+        self.id = venue.exchange_id
+        self.name = "Simulated"
+        # 交易所能力目录（ExchangeCatalog.register）读取的元数据
+        self.countries = []
+        self.certified = False
+        self.pro = False
+        self.urls = {}
+        self.precisionMode = ccxt.TICK_SIZE
+        self.timeframes = {timeframe: timeframe for timeframe in TIMEFRAMES}
+        self.fees = {"trading": {"maker": venue.maker, "taker": venue.taker, "percentage": True}}
+        self.requiredCredentials = {}
+        self.rateLimit = rate_limit_ms
+        self.enableRateLimit = True
+        self.latency = latency_ms / 1000.0
+        self.jitter = jitter_ms / 1000.0
+        self.max_requests_per_second = max_requests_per_second
+        self.has = {
+            "spot": True,
+            "fetchTicker": True,
+            "fetchTickers": True,
+            "fetchOHLCV": True,
+            "fetchOrderBook": True,
+            "createOrder": True,
+            "createOrders": batch,
+            "cancelOrder": True,
+            "cancelOrders": batch,
+            "editOrder": True,
+            "fetchOrder": True,
+            "fetchOpenOrders": True,
+            "fetchMyTrades": True,
+            "fetchBalance": True,
+        }
+        self.markets = None
+        self.symbols = []
+        self._tokens = float(max_requests_per_second or 0)
+        self._updated = time.monotonic()
+        self._next_request = 0.0
+        self._lock = threading.Lock()
+
+    # ---- 网络行为 ----
+
+    def throttle(self, cost=None):
+        """客户端节流（ccxt enableRateLimit 的行为），接入 RateLimitScheduler 时被替换"""
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next_request - now
+            self._next_request = max(now, self._next_request) + self.rateLimit / 1000.0 * (cost or 1)
+        if wait > 0:
+            time.sleep(wait)
+
+    def _request(self, cost=1):
+        if self.enableRateLimit:
+            self.throttle(cost)
+        if self.max_requests_per_second:
+            with self._lock:
+                now = time.monotonic()
+                rate = self.max_requests_per_second
+                self._tokens = min(rate, self._tokens + (now - self._updated) * rate)
+                self._updated = now
+                if self._tokens < cost:
+                    raise ccxt.RateLimitExceeded(f"{self.id} 请求过于频繁")
+                self._tokens -= cost
+        if self.latency or self.jitter:
+            time.sleep(self.latency + random.uniform(0, self.jitter))
+
+    # ---- 市场信息 ----
+
+    def load_markets(self, reload=False, params=None):
+        if self.markets is None or reload:
+            self._request()
+            self.set_markets(self.venue.market_snapshot())
+        return self.markets
+
+    def set_markets(self, markets, currencies=None):
+        """使用已加载的市场信息（与 ccxt 相同，不发起请求）"""
+        self.markets = dict(markets)
+        self.symbols = sorted(self.markets)
+        return self.markets
+
+    def fetch_markets(self, params=None):
+        return list(self.load_markets(True).values())
+
+    def market(self, symbol):
+        markets = self.load_markets()
+        if symbol not in markets:
+            raise ccxt.BadSymbol(f"{self.id}不存在交易对{symbol}")
+        return markets[symbol]
+
+    def amount_to_precision(self, symbol, amount):
+        step = self.market(symbol)["precision"]["amount"]
+        return str(math.floor(float(amount) / step + 1e-9) * step)
+
+    def price_to_precision(self, symbol, price):
+        tick = self.market(symbol)["precision"]["price"]
+        return str(round(float(price) / tick) * tick)
+
+    # ---- 行情 ----
+
+    def fetch_ticker(self, symbol, params=None):
+        self._request()
+        return self._ticker(symbol)
+
+    def _ticker(self, symbol):
+        venue = self.venue
+        with venue.lock:
+            venue._market(symbol)
+            book = venue.book(symbol)
+            last = venue.last_price(symbol)
+            bid, ask = book.best_bid(), book.best_ask()
+            now = venue.now()
+            day = [bar for bar in venue._bars[symbol] if bar[0] >= now - 86400000]
+        return {
+            "symbol": symbol,
+            "timestamp": now,
+            "datetime": _iso(now),
+            "last": last,
+            "close": last,
+            "bid": bid,
+            "ask": ask,
+            "open": day[0][1] if day else last,
+            "high": max(bar[2] for bar in day) if day else last,
+            "low": min(bar[3] for bar in day) if day else last,
+            "baseVolume": sum(bar[5] for bar in day),
+            "info": {},
+        }
+
+    def fetch_tickers(self, symbols=None, params=None):
+        self._request()
+        return {s: self._ticker(s) for s in (symbols or self.load_markets())}
+
+    def fetch_order_book(self, symbol, limit=None, params=None):
+        self._request()
+        with self.venue.lock:
+            self.venue._market(symbol)
+            bids, asks = self.venue.book(symbol).depth(limit)
+            now = self.venue.now()
+        return {
+            "symbol": symbol,
+            "bids": bids,
+            "asks": asks,
+            "timestamp": now,
+            "datetime": _iso(now),
+            "nonce": None,
+        }
+
+    def fetch_ohlcv(self, symbol, timeframe="1m", since=None, limit=None, params=None):
+        self._request()
+        return self.venue.ohlcv(symbol, timeframe, since, limit)
+
+    # ---- 交易 ----
+
+    def _order(self, order):
+        average = order.cost / order.filled if order.filled else None
+        market = self.venue.markets[order.symbol]
+        fee_currency = market["base"] if order.side == BUY else market["quote"]
+        return {
+            "id": order.id,
+            "clientOrderId": order.client_id,
+            "timestamp": order.timestamp,
+            "datetime": _iso(order.timestamp),
+            "symbol": order.symbol,
+            "type": order.type,
+            "side": "buy" if order.side == BUY else "sell",
+            "price": order.price if order.price is not None else average,
+            "amount": order.amount,
+            "filled": order.filled,
+            "remaining": max(order.remaining, 0.0),
+            "cost": order.cost,
+            "average": average,
+            "status": order.status,
+            "fee": {"cost": order.fee, "currency": fee_currency},
+            "trades": [],
+            "info": {},
+        }
+
+    def create_order(self, symbol, type, side, amount, price=None, params=None):
+        self._request()
+        client_id = (params or {}).get("clientOrderId")
+        return self._order(
+            self.venue.place(self.account, symbol, type, side, amount, price, client_id)
+        )
+
+    def create_orders(self, orders, params=None):
+        """批量下单，单个订单失败时返回 status 为 rejected 的订单（与交易所批量接口一致）"""
+        self._request()
+        results = []
+        for request in orders:
+            try:
+                order = self.venue.place(
+                    self.account,
+                    request["symbol"],
+                    request.get("type", "limit"),
+                    request["side"],
+                    request["amount"],
+                    request.get("price"),
+                    (request.get("params") or {}).get("clientOrderId"),
+                )
+                results.append(self._order(order))
+            except ccxt.BaseError as e:
+                results.append(
+                    {
+                        "id": None,
+                        "symbol": request.get("symbol"),
+                        "status": "rejected",
+                        "info": {"msg": str(e), "error": type(e).__name__},
+                    }
+                )
+        return results
+
+    def cancel_order(self, id, symbol=None, params=None):
+        self._request()
+        return self._order(self.venue.cancel(self.account, id))
+
+    def cancel_orders(self, ids, symbol=None, params=None):
+        self._request()
+        results = []
+        for order_id in ids:
+            try:
+                results.append(self._order(self.venue.cancel(self.account, order_id)))
+            except ccxt.OrderNotFound as e:
+                results.append({"id": order_id, "status": "rejected", "info": {"msg": str(e)}})
+        return results
+
+    def cancel_all_orders(self, symbol=None, params=None):
+        self._request()
+        return [
+            self._order(self.venue.cancel(self.account, order.id))
+            for order in self.venue.open_orders(self.account, symbol)
+        ]
+
+    def edit_order(self, id, symbol, type, side, amount=None, price=None, params=None):
+        self._request()
+        return self._order(self.venue.amend(self.account, id, amount, price))
+
+    def fetch_order(self, id, symbol=None, params=None):
+        self._request()
+        with self.venue.lock:
+            return self._order(self.venue.get_order(self.account, id))
+
+    def fetch_open_orders(self, symbol=None, since=None, limit=None, params=None):
+        self._request()
+        with self.venue.lock:
+            orders = [self._order(o) for o in self.venue.open_orders(self.account, symbol)]
+        return orders[-limit:] if limit else orders
+
+    def fetch_my_trades(self, symbol=None, since=None, limit=None, params=None):
+        self._request()
+        return self.venue.trades(self.account, symbol, since, limit)
+
+    def fetch_balance(self, params=None):
+        self._request()
+        balance = {"info": {}, "free": {}, "used": {}, "total": {}}
+        for currency, (free, used) in self.venue.balance(self.account).items():
+            balance[currency] = {"free": free, "used": used, "total": free + used}
+            balance["free"][currency] = free
+            balance["used"][currency] = used
+            balance["total"][currency] = free + used
+        return balance
+
+
+class ReplayFeed:
+    """按时间回放行情到模拟交易所"""
+
+    def __init__(self, venue, symbol, timestamps, prices, speed=0.0):
+        """初始化
+
+        Args:
+            venue: SimVenue 实例
+            symbol: 交易对
+            timestamps: 行情时间（毫秒，升序）
+            prices: 价格
+            speed: 回放速度倍数，0 为不等待尽快回放
+        """
+        self.venue = venue
+        self.symbol = symbol
+        self.timestamps = np.asarray(timestamps, dtype=np.int64)
+        self.prices = np.asarray(prices, dtype=np.float64)
+        self.speed = speed
+        self.position = 0
+        self._listeners = []
+        self._stopping = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def from_ohlcv(cls, venue, symbol, columns, timeframe_ms, speed=0.0):
+        """由K线列（OHLCVStore.read 的结果）构建，每根K线展开为 开-低-高-收 四个价格"""
+        path, bars = price_path(
+            np.asarray(columns["open"], dtype=np.float64),
+            np.asarray(columns["high"], dtype=np.float64),
+            np.asarray(columns["low"], dtype=np.float64),
+            np.asarray(columns["close"], dtype=np.float64),
+        )
+        offsets = np.tile(np.arange(4) * (timeframe_ms // 4), len(columns["open"]))
+        timestamps = np.asarray(columns["timestamp"], dtype=np.int64)[bars] + offsets
+        return cls(venue, symbol, timestamps, path, speed)
+
+    @classmethod
+    def from_csv(cls, venue, symbol, path, speed=0.0):
+        """由逐笔价格文件构建，每行为 时间戳,价格（时间戳为秒或毫秒，可带表头）"""
+        timestamps, prices = [], []
+        with open(path, "r", encoding="utf-8") as f:
+            for row in csv.reader(f):
+                try:
+                    timestamp, price = float(row[0]), float(row[1])
+                except (ValueError, IndexError):
+                    continue
+                timestamps.append(timestamp * 1000 if timestamp < 1e11 else timestamp)
+                prices.append(price)
+        return cls(venue, symbol, timestamps, prices, speed)
+
+    def add_listener(self, listener):
+        """添加价格监听者 listener(exchange_id, symbol, price, timestamp)，时间戳为秒"""
+        self._listeners.append(listener)
+
+    @property
+    def finished(self):
+        return self.position >= len(self.prices)
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def step(self, count=1):
+        """回放接下来的 count 个价格，返回实际回放数量"""
+        end = min(self.position + count, len(self.prices))
+        venue, symbol = self.venue, self.symbol
+        for index in range(self.position, end):
+            price = float(self.prices[index])
+            timestamp = int(self.timestamps[index])
+            venue.set_price(symbol, price, timestamp)
+            for listener in self._listeners:
+                listener(venue.exchange_id, symbol, price, timestamp / 1000.0)
+        count = end - self.position
+        self.position = end
+        return count
+
+    def run(self):
+        """阻塞回放到结束（或 stop）"""
+        started = time.monotonic()
+        origin = int(self.timestamps[self.position]) if not self.finished else 0
+        while not self.finished and not self._stopping.is_set():
+            if self.speed > 0:
+                due = (int(self.timestamps[self.position]) - origin) / 1000.0 / self.speed
+                wait = due - (time.monotonic() - started)
+                if wait > 0:
+                    self._stopping.wait(wait)
+            self.step()
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name=f"replay-{self.symbol}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+
+
+class BenchmarkJob:
+    """在后台运行的吞吐量测试（经过适配器和限流时耗时较长）"""
+
+    def __init__(self, orders, levels, notify=None):
+        self.orders = orders
+        self.levels = levels
+        self.notify = notify
+        self.status = "running"
+        self.error = None
+        self.placed = 0
+        self.result = None
+        self.started_at = time.time()
+        self.finished_at = None
+        self.cancel = threading.Event()
+        self.done = threading.Event()
+        self._reported = 0
+
+    def update(self, placed):
+        """记录进度，每完成1%推送一次"""
+        self.placed = placed
+        if self.notify and placed - self._reported >= max(self.orders // 100, 1):
+            self._reported = placed
+            self.notify("sim_benchmark_progress", self.progress())
+
+    def finish(self, status, result=None, error=None):
+        self.status = status
+        self.result = result
+        self.error = error
+        self.finished_at = time.time()
+        self.done.set()
+        if self.notify:
+            self.notify("sim_benchmark_progress", self.progress())
+
+    def progress(self):
+        return {
+            "status": self.status,
+            "error": self.error,
+            "orders": self.orders,
+            "levels": self.levels,
+            "placed": self.placed,
+            "progress": round(self.placed / self.orders, 4) if self.orders else 1.0,
+            "result": self.result,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+def benchmark(orders=20000, levels=200, symbol="BTC/USDT", price=100.0, exchange=None, job=None):
+    """模拟交易所吞吐量测试
+
+    在 price 附近铺设 levels 个价位的买卖挂单，循环下单、撤单并用行情穿过挂单成交。
+
+    Args:
+        orders: 下单总数
+        levels: 每侧价位数
+        exchange: 使用的适配器（测试延迟、限流和网关时传入），默认直接调用撮合引擎
+        job: BenchmarkJob，记录进度，设置 job.cancel 时提前结束
+
+    Returns:
+        dict: 下单、撤单、成交数量和每秒订单数
+    """
+    if exchange is None:
+        venue = SimVenue()
+        venue.add_market(symbol, price=price)
+        account = "benchmark"
+        venue.deposit(account, "USDT", 1e12)
+        venue.deposit(account, "BTC", 1e10)
+
+        def place(side, p):
+            return venue.place(account, symbol, "limit", side, 1.0, p).id
+
+        def cancel(order_id):
+            venue.cancel(account, order_id)
+
+    else:
+        venue = exchange.venue
+        if symbol not in venue.markets:
+            venue.add_market(symbol, price=price)
+        venue.deposit(exchange.account, "USDT", 1e12)
+        venue.deposit(exchange.account, "BTC", 1e10)
+        exchange.load_markets(True)
+
+        def place(side, p):
+            return exchange.create_order(symbol, "limit", side, 1.0, p)["id"]
+
+        def cancel(order_id):
+            exchange.cancel_order(order_id, symbol)
+
+    fills = []
+    venue.add_listener(lambda account, trade: fills.append(1))
+    venue.set_price(symbol, price)
+    tick = venue.markets[symbol]["precision"]["price"]
+    resting = deque()
+    placed = canceled = 0
+    started = time.perf_counter()
+    rng = random.Random(0)
+    while placed < orders:
+        side = "buy" if placed % 2 == 0 else "sell"
+        offset = (placed // 2 % levels + 1) * tick * 10
+        resting.append(place(side, price - offset if side == "buy" else price + offset))
+        placed += 1
+        if len(resting) > levels * 2:
+            try:
+                cancel(resting.popleft())
+                canceled += 1
+            except ccxt.OrderNotFound:
+                pass
+        if placed % 100 == 0:
+            # 行情在区间内随机穿越，成交部分挂单
+            venue.set_price(symbol, price + rng.uniform(-levels, levels) * tick * 10)
+            venue.set_price(symbol, price)
+            if job is not None:
+                job.update(placed)
+                if job.cancel.is_set():
+                    break
+    elapsed = time.perf_counter() - started
+    return {
+        "orders": placed,
+        "canceled": canceled,
+        "fills": len(fills),
+        "seconds": elapsed,
+        "orders_per_second": placed / elapsed if elapsed > 0 else None,
+    }
@@ -0,0 +1,401 @@
+# -*- coding: utf-8 -*-
+"""策略容器健康监督
+
+订阅各Docker端点的容器事件流，策略容器意外退出时按指数退避自动重启，
+短时间内反复崩溃则熔断停止重启。重启次数、最近退出原因、熔断状态和熔断窗口内的
+崩溃时间记录在SQLite中，引擎重启后沿用，熔断中的容器不会被重新拉起。
+"""
+
+import json
+import threading
+import time
+from collections import deque
+
+from loguru import logger
+
+from core.docker_endpoints import CONTAINER_PREFIX
+
+
+class StrategyHealth:
+    """单个策略的内存健康状态"""
+
+    __slots__ = ("consecutive", "crash_times", "circuit_open", "last_start", "timer")
+
+    def __init__(self, crash_times=(), circuit_open=False):
+        self.consecutive = 0
+        self.crash_times = deque(crash_times)
+        self.circuit_open = circuit_open
+        self.last_start = None
+        self.timer = None
+
+
+class ContainerSupervisor:
+    """基于Docker事件流的容器监督器"""
+
+    def __init__(
+        self,
+        endpoints,
+        conn,
+        db_lock,
+        backoff_base=5,
+        backoff_max=300,
+        stable_seconds=600,
+        circuit_threshold=5,
+        circuit_window=900,
+    ):
+        """初始化监督器
+
+        Args:
+            endpoints: DockerEndpointPool 实例
+            conn: SQLite连接
+            db_lock: 数据库锁
+            backoff_base: 首次重启延迟（秒）
+            backoff_max: 最大重启延迟（秒）
+            stable_seconds: 容器持续运行超过该时间后重置退避计数
+            circuit_threshold: 熔断窗口内允许的最大崩溃次数
+            circuit_window: 熔断统计窗口（秒）
+        """
+        self.endpoints = endpoints
+        self.conn = conn
+        self.db_lock = db_lock
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.stable_seconds = stable_seconds
+        self.circuit_threshold = circuit_threshold
+        self.circuit_window = circuit_window
+
+        self._state = {}
+        self._expected_stops = {}
+        self._lock = threading.Lock()
+        self._streams = {}
+        self._threads = []
+        self._stopping = threading.Event()
+        self._init_db()
+
+    def _init_db(self):
+        """初始化健康状态表"""
+        with self.db_lock:
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS strategy_health (
+                    strategy_id TEXT PRIMARY KEY,
+                    restart_count INTEGER DEFAULT 0,
+                    crash_count INTEGER DEFAULT 0,
+                    last_exit_code INTEGER,
+                    last_exit_reason TEXT,
+                    last_exit_at TIMESTAMP,
+                    circuit_open INTEGER DEFAULT 0,
+                    next_restart_at TIMESTAMP,
+                    crash_times TEXT
+                )
+                """
+            )
+            columns = {row[1] for row in self.conn.execute("PRAGMA table_info(strategy_health)")}
+            if "crash_times" not in columns:
+                # 旧版本的表没有崩溃时间列
+                self.conn.execute("ALTER TABLE strategy_health ADD COLUMN crash_times TEXT")
+            self.conn.commit()
+
+    def start(self):
+        """为每个可用端点启动事件监听线程，并处理启动前已退出的容器"""
+        for endpoint in self.endpoints.available_endpoints():
+            thread = threading.Thread(
+                target=self._watch,
+                args=(endpoint,),
+                name=f"supervisor-{endpoint.name}",
+                daemon=True,
+            )
+            thread.start()
+            self._threads.append(thread)
+        self._recover_exited()
+        logger.info(f"容器监督器已启动，监听{len(self._threads)}个Docker端点")
+
+    def stop(self):
+        """停止监听并取消所有待执行的重启"""
+        self._stopping.set()
+        for stream in list(self._streams.values()):
+            try:
+                stream.close()
+            except Exception:
+                pass
+        with self._lock:
+            for state in self._state.values():
+                if state.timer:
+                    state.timer.cancel()
+
+    def _watch(self, endpoint):
+        """消费端点的容器事件流，断开后自动重连"""
+        filters = {"type": "container", "event": ["start", "die"]}
+        while not self._stopping.is_set():
+            try:
+                stream = endpoint.client.events(decode=True, filters=filters)
+                self._streams[endpoint.name] = stream
+                for event in stream:
+                    if self._stopping.is_set():
+                        break
+                    self._handle_event(endpoint, event)
+            except Exception as e:
+                if self._stopping.is_set():
+                    break
+                logger.warning(f"Docker端点{endpoint.name}事件流中断: {e}")
+            self._stopping.wait(5)
+
+    def _handle_event(self, endpoint, event):
+        """处理单个容器事件"""
+        attributes = event.get("Actor", {}).get("Attributes", {})
+        name = attributes.get("name", "")
+        if not name.startswith(CONTAINER_PREFIX):
+            return
+        strategy_id = name[len(CONTAINER_PREFIX) :]
+        action = event.get("Action") or event.get("status")
+
+        if action == "start":
+            with self._lock:
+                self._get_state(strategy_id).last_start = time.time()
+        elif action == "die":
+            exit_code = int(attributes.get("exitCode", -1))
+            self._on_exit(endpoint, strategy_id, name, exit_code)
+
+    def _get_state(self, strategy_id):
+        """策略的内存健康状态，首次访问时从数据库载入熔断状态和崩溃时间"""
+        state = self._state.get(strategy_id)
+        if state is None:
+            with self.db_lock:
+                row = self.conn.execute(
+                    "SELECT circuit_open, crash_times FROM strategy_health WHERE strategy_id = ?",
+                    (strategy_id,),
+                ).fetchone()
+            if row:
+                crash_times = json.loads(row[1]) if row[1] else []
+                state = StrategyHealth(crash_times, bool(row[0]))
+            else:
+                state = StrategyHealth()
+            self._state[strategy_id] = state
+        return state
+
+    def _wants_running(self, strategy_id):
+        """策略在数据库中的期望状态是否为运行中"""
+        with self.db_lock:
+            row = self.conn.execute(
+                "SELECT status FROM strategies WHERE id = ?", (strategy_id,)
+            ).fetchone()
+        return bool(row) and row[0] == "running"
+
+    def _exit_reason(self, client, name, exit_code):
+        """从容器状态中提取退出原因"""
+        try:
+            container = client.containers.get(name)
+            state = container.attrs.get("State", {})
+            if state.get("OOMKilled"):
+                return "OOMKilled"
+            if state.get("Error"):
+                return state["Error"]
+            tail = container.logs(tail=1).decode("utf-8", errors="replace").strip()
+            if tail:
+                return f"退出码{exit_code}: {tail[-200:]}"
+        except Exception as e:
+            logger.debug(f"获取容器{name}退出原因失败: {e}")
+        return f"退出码{exit_code}"
+
+    def _on_exit(self, endpoint, strategy_id, name, exit_code):
+        """容器退出时记录崩溃并决定是否重启"""
+        now = time.time()
+        with self._lock:
+            expected = self._expected_stops.pop(strategy_id, None)
+        if expected and expected > now:
+            logger.info(f"容器{name}按预期停止")
+            return
+        if not self._wants_running(strategy_id):
+            return
+
+        reason = self._exit_reason(endpoint.client, name, exit_code)
+        with self._lock:
+            state = self._get_state(strategy_id)
+            if state.last_start and now - state.last_start >= self.stable_seconds:
+                state.consecutive = 0
+            state.consecutive += 1
+            state.crash_times.append(now)
+            while state.crash_times and now - state.crash_times[0] > self.circuit_window:
+                state.crash_times.popleft()
+            # 熔断只能由手动启动（reset）关闭
+            state.circuit_open = state.circuit_open or len(state.crash_times) >= self.circuit_threshold
+            circuit_open = state.circuit_open
+            crash_times = json.dumps(list(state.crash_times))
+            delay = min(
+                self.backoff_base * (2 ** (state.consecutive - 1)), self.backoff_max
+            )
+
+        with self.db_lock:
+            self.conn.execute(
+                """
+                INSERT INTO strategy_health (strategy_id, crash_count, last_exit_code,
+                    last_exit_reason, last_exit_at, circuit_open, next_restart_at, crash_times)
+                VALUES (?, 1, ?, ?, datetime(?, 'unixepoch'), ?, datetime(?, 'unixepoch'), ?)
+                ON CONFLICT(strategy_id) DO UPDATE SET
+                    crash_count = crash_count + 1,
+                    last_exit_code = excluded.last_exit_code,
+                    last_exit_reason = excluded.last_exit_reason,
+                    last_exit_at = excluded.last_exit_at,
+                    circuit_open = excluded.circuit_open,
+                    next_restart_at = excluded.next_restart_at,
+                    crash_times = excluded.crash_times
+                """,
+                (
+                    strategy_id,
+                    exit_code,
+                    reason,
+                    now,
+                    int(circuit_open),
+                    None if circuit_open else now + delay,
+                    crash_times,
+                ),
+            )
+            self.conn.commit()
+
+        if circuit_open:
+            logger.error(
+                f"容器{name}在{self.circuit_window}秒内崩溃{len(state.crash_times)}次，已熔断，停止自动重启"
+            )
+            return
+
+        logger.warning(f"容器{name}意外退出({reason})，{delay}秒后重启")
+        self._schedule_restart(state, strategy_id, name, delay)
+
+    def _schedule_restart(self, state, strategy_id, name, delay):
+        timer = threading.Timer(delay, self._restart, args=(strategy_id, name))
+        timer.daemon = True
+        with self._lock:
+            if state.timer:
+                state.timer.cancel()
+            state.timer = timer
+        timer.start()
+
+    def _restart(self, strategy_id, name):
+        """执行重启"""
+        if self._stopping.is_set() or not self._wants_running(strategy_id):
+            return
+        try:
+            client = self.endpoints.client_for(strategy_id)
+            client.containers.get(name).start()
+            with self.db_lock:
+                self.conn.execute(
+                    """
+                    UPDATE strategy_health
+                    SET restart_count = restart_count + 1, next_restart_at = NULL
+                    WHERE strategy_id = ?
+                    """,
+                    (strategy_id,),
+                )
+                self.conn.commit()
+            logger.info(f"容器{name}已自动重启")
+        except Exception as e:
+            logger.error(f"自动重启容器{name}失败: {e}")
+
+    def _recover_exited(self):
+        """处理监督器启动前已退出、但期望状态为运行中的容器
+
+        熔断中的容器保持停止；退出已记录、重启尚未执行（引擎在退避等待中被关闭）的容器
+        只重新安排重启，不重复计入崩溃次数；其余为引擎停止期间退出的容器，按新的崩溃处理。
+        """
+        try:
+            containers = self.endpoints.list_containers()
+        except Exception as e:
+            logger.error(f"检查已退出容器失败: {e}")
+            return
+        for name, (endpoint_name, container) in containers.items():
+            if container.status not in ("exited", "dead"):
+                continue
+            strategy_id = name[len(CONTAINER_PREFIX) :]
+            if not self._wants_running(strategy_id):
+                continue
+            with self._lock:
+                state = self._get_state(strategy_id)
+            if state.circuit_open:
+                logger.warning(f"容器{name}处于熔断状态，不自动重启")
+                continue
+            with self.db_lock:
+                row = self.conn.execute(
+                    """
+                    SELECT (julianday(next_restart_at) - julianday('now')) * 86400
+                    FROM strategy_health WHERE strategy_id = ? AND next_restart_at IS NOT NULL
+                    """,
+                    (strategy_id,),
+                ).fetchone()
+            if row:
+                delay = max(row[0] or 0.0, 0.0)
+                logger.info(f"容器{name}的退出已记录，{delay:.0f}秒后重启")
+                self._schedule_restart(state, strategy_id, name, delay)
+                continue
+            exit_code = container.attrs.get("State", {}).get("ExitCode", -1)
+            self._on_exit(
+                self.endpoints.endpoints[endpoint_name], strategy_id, name, exit_code
+            )
+
+    def expect_stop(self, strategy_id, grace=60):
+        """标记策略容器即将被主动停止，监督器不会重启它
+
+        Args:
+            strategy_id: 策略ID
+            grace: 标记有效期（秒）
+        """
+        with self._lock:
+            self._expected_stops[strategy_id] = time.time() + grace
+            state = self._state.get(strategy_id)
+            if state and state.timer:
+                state.timer.cancel()
+                state.timer = None
+
+    def reset(self, strategy_id):
+        """手动启动策略时重置退避计数并关闭熔断"""
+        with self._lock:
+            state = self._state.pop(strategy_id, None)
+            if state and state.timer:
+                state.timer.cancel()
+            self._expected_stops.pop(strategy_id, None)
+        with self.db_lock:
+            self.conn.execute(
+                """
+                UPDATE strategy_health SET circuit_open = 0, next_restart_at = NULL, crash_times = NULL
+                WHERE strategy_id = ?
+                """,
+                (strategy_id,),
+            )
+            self.conn.commit()
+
+    def forget(self, strategy_id):
+        """删除策略的健康记录"""
+        self.expect_stop(strategy_id)
+        with self._lock:
+            self._state.pop(strategy_id, None)
+        with self.db_lock:
+            self.conn.execute(
+                "DELETE FROM strategy_health WHERE strategy_id = ?", (strategy_id,)
+            )
+            self.conn.commit()
+
+    def get_all_health(self):
+        """获取所有策略的健康信息
+
+        Returns:
+            dict: 策略ID -> 健康信息
+        """
+        with self.db_lock:
+            rows = self.conn.execute(
+                """
+                SELECT strategy_id, restart_count, crash_count, last_exit_code,
+                       last_exit_reason, last_exit_at, circuit_open, next_restart_at
+                FROM strategy_health
+                """
+            ).fetchall()
+        return {
+            row[0]: {
+                "restart_count": row[1],
+                "crash_count": row[2],
+                "last_exit_code": row[3],
+                "last_exit_reason": row[4],
+                "last_exit_at": row[5],
+                "circuit_open": bool(row[6]),
+                "next_restart_at": row[7],
+            }
+            for row in rows
+        }
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""成交记录
+
+进程内执行的策略（native、paper）把每笔成交写入 trades 表，
+供界面按策略查询成交明细和汇总收益。
+"""
+
+from loguru import logger
+
+
+class TradeLedger:
+    """策略成交记录表"""
+
+    def __init__(self, conn, db_lock):
+        self.conn = conn
+        self.db_lock = db_lock
+        self._init_db()
+
+    def _init_db(self):
+        with self.db_lock:
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS trades (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    strategy_id TEXT,
+                    mode TEXT,
+                    order_id TEXT,
+                    symbol TEXT,
+                    side TEXT,
+                    price REAL,
+                    amount REAL,
+                    cost REAL,
+                    fee REAL,
+                    profit REAL,
+                    traded_at TIMESTAMP
+                )
+                """
+            )
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_trades_strategy ON trades (strategy_id, id)"
+            )
+            self.conn.commit()
+
+    def record(self, strategy_id, mode, trade):
+        """写入一笔成交
+
+        Args:
+            strategy_id: 策略ID
+            mode: 运行模式（native、paper）
+            trade: 成交信息，包含 order_id、symbol、side、price、amount、fee（计价币）、
+                profit（卖出时的已实现收益）、timestamp（毫秒）
+        """
+        try:
+            with self.db_lock:
+                self.conn.execute(
+                    """
+                    INSERT INTO trades (
+                        strategy_id, mode, order_id, symbol, side, price, amount, cost, fee,
+                        profit, traded_at
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, datetime(? / 1000.0, 'unixepoch'))
+                    """,
+                    (
+                        strategy_id,
+                        mode,
+                        trade["order_id"],
+                        trade["symbol"],
+                        trade["side"],
+                        trade["price"],
+                        trade["amount"],
+                        trade["price"] * trade["amount"],
+                        trade.get("fee", 0.0),
+                        trade.get("profit"),
+                        trade["timestamp"],
+                    ),
+                )
+                self.conn.commit()
+        except Exception as e:
+            logger.error(f"写入策略{strategy_id}成交记录失败: {e}")
+
+    def get_trades(self, strategy_id=None, limit=100):
+        """最近的成交记录"""
+        query = (
+            "SELECT id, strategy_id, mode, order_id, symbol, side, price, amount, cost, fee,"
+            " profit, traded_at FROM trades"
+        )
+        params = ()
+        if strategy_id:
+            query += " WHERE strategy_id = ?"
+            params = (strategy_id,)
+        query += " ORDER BY id DESC LIMIT ?"
+        with self.db_lock:
+            rows = self.conn.execute(query, params + (int(limit),)).fetchall()
+        keys = (
+            "id",
+            "strategy_id",
+            "mode",
+            "order_id",
+            "symbol",
+            "side",
+            "price",
+            "amount",
+            "cost",
+            "fee",
+            "profit",
+            "traded_at",
+        )
+        return [dict(zip(keys, row)) for row in rows]
+
+    def get_summary(self):
+        """各策略的成交次数、成交额、手续费和已实现收益"""
+        with self.db_lock:
+            rows = self.conn.execute(
+                """
+                SELECT strategy_id, COUNT(*), SUM(cost), SUM(fee), SUM(COALESCE(profit, 0)),
+                       MAX(traded_at)
+                FROM trades GROUP BY strategy_id
+                """
+            ).fetchall()
+        return {
+            row[0]: {
+                "trades": row[1],
+                "volume": row[2] or 0.0,
+                "fees": row[3] or 0.0,
+                "profit": row[4] or 0.0,
+                "last_trade_at": row[5],
+            }
+            for row in rows
+        }
+
+    def last_trade_time(self, strategy_id):
+        """策略最后一笔成交的时间（毫秒，精确到秒），没有成交时返回None"""
+        with self.db_lock:
+            row = self.conn.execute(
+                "SELECT CAST(strftime('%s', MAX(traded_at)) AS INTEGER) FROM trades"
+                " WHERE strategy_id = ?",
+                (strategy_id,),
+            ).fetchone()
+        return row[0] * 1000 if row and row[0] is not None else None
+
+    def delete(self, strategy_id):
+        with self.db_lock:
+            self.conn.execute("DELETE FROM trades WHERE strategy_id = ?", (strategy_id,))
+            self.conn.commit()
@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+"""反弹开仓 / 回调平仓触发引擎
+
+与回测的网格模型一致，每个网格区间 i（价位 i 到 i+1）是一个独立的状态机：
+
+    空仓 --价格向下触及价位 i--> 等待反弹（记录最低价）
+         --价格从最低价反弹 rebound 比例--> 开仓（买入），持仓
+    持仓 --价格向上触及价位 i+1--> 等待回调（记录最高价）
+         --价格从最高价回调 pullback 比例--> 平仓（卖出），空仓
+
+这样不会在单边下跌途中逐格接刀，也不会在单边上涨途中过早卖出。
+反弹和回调比例为0时退化为普通网格（触及价位即成交）。
+
+状态保存在 array 模块的紧凑数组中（每个区间约17字节），
+每个价格只处理本次穿越的价位和处于等待状态的区间，与网格总数无关。
+实盘按行情推送逐个调用，回测按K线展开的价格路径逐点调用，行为完全一致。
+"""
+
+import array
+from bisect import bisect_left, bisect_right
+
+BUY = 1
+SELL = -1
+
+# 区间状态
+EMPTY = 0
+ENTRY_ARMED = 1
+HOLDING = 2
+EXIT_ARMED = 3
+
+STATE_NAMES = {
+    EMPTY: "empty",
+    ENTRY_ARMED: "entry_armed",
+    HOLDING: "holding",
+    EXIT_ARMED: "exit_armed",
+}
+
+
+class TriggerBook:
+    """单个网格的触发状态"""
+
+    __slots__ = (
+        "levels",
+        "rebound",
+        "pullback",
+        "state",
+        "extreme",
+        "last_price",
+        "_entry_armed",
+        "_exit_armed",
+    )
+
+    def __init__(
+        self, levels, rebound_pct=0.0, pullback_pct=0.0, start_price=None, holding=None
+    ):
+        """初始化
+
+        Args:
+            levels: 升序网格价位
+            rebound_pct: 反弹开仓比例（0.005 即 0.5%）
+            pullback_pct: 回调平仓比例
+            start_price: 初始价格，价位不低于初始价格的区间视为已持仓（与回测一致）
+            holding: 每个区间初始是否持仓（可选，优先于 start_price）
+        """
+        self.levels = array.array("d", levels)
+        self.rebound = 1.0 + rebound_pct
+        self.pullback = 1.0 - pullback_pct
+        n_intervals = max(len(self.levels) - 1, 0)
+        if holding is None:
+            holding = [start_price is not None and lv >= start_price for lv in self.levels[:-1]]
+        self.state = array.array("b", (HOLDING if h else EMPTY for h in holding))
+        if len(self.state) != n_intervals:
+            raise ValueError("初始持仓状态数量与网格区间数量不一致")
+        self.extreme = array.array("d", bytes(8 * n_intervals))
+        self.last_price = start_price
+        self._entry_armed = set()
+        self._exit_armed = set()
+
+    @classmethod
+    def from_snapshot(cls, snapshot, rebound_pct=0.0, pullback_pct=0.0):
+        """从 snapshot() 的结果恢复"""
+        codes = {name: code for code, name in STATE_NAMES.items()}
+        state = [codes[name] for name in snapshot["state"]]
+        book = cls(snapshot["levels"], rebound_pct, pullback_pct, holding=[False] * len(state))
+        book.state = array.array("b", state)
+        book.extreme = array.array("d", (value or 0.0 for value in snapshot["extreme"]))
+        book.last_price = snapshot["last_price"]
+        book._entry_armed = {i for i, s in enumerate(state) if s == ENTRY_ARMED}
+        book._exit_armed = {i for i, s in enumerate(state) if s == EXIT_ARMED}
+        return book
+
+    def update(self, price):
+        """处理一个价格
+
+        Returns:
+            list: 本次触发的信号 [(区间序号, 方向, 价格)]，没有信号时为空列表
+        """
+        previous = self.last_price
+        self.last_price = price
+        levels = self.levels
+        state = self.state
+        extreme = self.extreme
+        n_intervals = len(state)
+
+        if previous is not None:
+            if price < previous:
+                # 向下触及价位 j（price <= L[j] < previous），区间 j 开始等待反弹
+                stop = min(bisect_left(levels, previous), n_intervals)
+                for j in range(bisect_left(levels, price), stop):
+                    if state[j] == EMPTY:
+                        state[j] = ENTRY_ARMED
+                        extreme[j] = price
+                        self._entry_armed.add(j)
+            elif price > previous:
+                # 向上触及价位 j（previous < L[j] <= price），区间 j-1 开始等待回调
+                start = max(bisect_right(levels, previous), 1)
+                for j in range(start, bisect_right(levels, price)):
+                    if state[j - 1] == HOLDING:
+                        state[j - 1] = EXIT_ARMED
+                        extreme[j - 1] = price
+                        self._exit_armed.add(j - 1)
+
+        signals = []
+        if self._entry_armed:
+            fired = None
+            for i in self._entry_armed:
+                low = extreme[i]
+                if price < low:
+                    extreme[i] = low = price
+                if price >= low * self.rebound:
+                    fired = fired or []
+                    fired.append(i)
+            if fired:
+                for i in sorted(fired):
+                    self._entry_armed.discard(i)
+                    state[i] = HOLDING
+                    signals.append((i, BUY, price))
+                    # 反弹幅度超过上一价位时直接开始等待回调
+                    if price >= levels[i + 1]:
+                        state[i] = EXIT_ARMED
+                        extreme[i] = price
+                        self._exit_armed.add(i)
+        if self._exit_armed:
+            fired = None
+            for i in self._exit_armed:
+                high = extreme[i]
+                if price > high:
+                    extreme[i] = high = price
+                if price <= high * self.pullback and not (signals and _fired_buy(signals, i)):
+                    fired = fired or []
+                    fired.append(i)
+            if fired:
+                for i in sorted(fired):
+                    self._exit_armed.discard(i)
+                    state[i] = EMPTY
+                    signals.append((i, SELL, price))
+                    if price <= levels[i]:
+                        state[i] = ENTRY_ARMED
+                        extreme[i] = price
+                        self._entry_armed.add(i)
+        return signals
+
+    def snapshot(self):
+        """各区间状态（用于界面展示和持久化）"""
+        return {
+            "levels": list(self.levels),
+            "state": [STATE_NAMES[s] for s in self.state],
+            "extreme": [
+                self.extreme[i] if s in (ENTRY_ARMED, EXIT_ARMED) else None
+                for i, s in enumerate(self.state)
+            ],
+            "last_price": self.last_price,
+        }
+
+
+def _fired_buy(signals, interval):
+    """同一价格刚开仓的区间不在该价格平仓"""
+    return any(i == interval and side == BUY for i, side, _ in signals)
+
+
+class TriggerEngine:
+    """多个策略的触发状态，按交易对分发行情"""
+
+    def __init__(self):
+        self._books = {}
+        self._by_symbol = {}
+
+    def add(self, strategy_id, exchange_id, symbol, book):
+        """注册策略的触发状态（已存在时替换）"""
+        self.remove(strategy_id)
+        self._books[strategy_id] = (exchange_id, symbol, book)
+        self._by_symbol.setdefault((exchange_id, symbol), {})[strategy_id] = book
+
+    def remove(self, strategy_id):
+        entry = self._books.pop(strategy_id, None)
+        if entry:
+            exchange_id, symbol, _ = entry
+            books = self._by_symbol.get((exchange_id, symbol), {})
+            books.pop(strategy_id, None)
+            if not books:
+                self._by_symbol.pop((exchange_id, symbol), None)
+
+    def get(self, strategy_id):
+        entry = self._books.get(strategy_id)
+        return entry[2] if entry else None
+
+    def symbols(self):
+        """需要行情的 (交易所, 交易对)"""
+        return list(self._by_symbol)
+
+    def on_price(self, exchange_id, symbol, price):
+        """处理一个行情价格
+
+        Returns:
+            dict: 策略ID -> 信号列表（只包含有信号的策略）
+        """
+        result = {}
+        for strategy_id, book in self._by_symbol.get((exchange_id, symbol), {}).items():
+            signals = book.update(price)
+            if signals:
+                result[strategy_id] = signals
+        return result
+
+
+def trigger_fills(path, levels, initial_holding, rebound_pct, pullback_pct):
+    """在价格路径上运行触发引擎（回测用）
+
+    Args:
+        path: 价格路径（core.backtest.price_path 的结果）
+        levels: 网格价位
+        initial_holding: 每个区间初始是否持仓
+        rebound_pct, pullback_pct: 反弹开仓和回调平仓比例
+
+    Returns:
+        tuple: (路径点序号, 区间序号, 方向, 成交价) 四个列表，按时间排序
+    """
+    book = TriggerBook(
+        levels,
+        rebound_pct,
+        pullback_pct,
+        start_price=float(path[0]),
+        holding=initial_holding,
+    )
+    points, intervals, sides, prices = [], [], [], []
+    update = book.update
+    for index, price in enumerate(path.tolist()):
+        signals = update(price)
+        if signals:
+            for interval, side, fill_price in signals:
+                points.append(index)
+                intervals.append(interval)
+                sides.append(side)
+                prices.append(fill_price)
+    return points, intervals, sides, prices
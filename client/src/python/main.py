@@ -10,9 +10,9 @@ import os
 import json
 import time
 import yaml
-import docker
 from docker import errors as docker_errors
 import sqlite3
+import shutil
 import requests
 import argparse
 from loguru import logger
@@ -21,6 +21,35 @@ import ccxt
 import threading
 import uuid
 
+from core.auto_pause import AutoPauseController
+from core.backtest import run_backtest
+from core.config import load_engine_config
+from core.credential_store import CREDENTIAL_KEYS, CredentialStore, split_credentials
+from core.docker_endpoints import DockerEndpointPool
+from core.exchange_catalog import ExchangeCatalog
+from core.grid import GridSpec, plan_grid
+from core.http_pool import HttpTransport
+from core.image_puller import ImagePuller
+from core.market_feed import MarketFeed, to_ccxt_symbol
+from core.market_service import AsyncMarketService
+from core.mirror_racer import MirrorRacer, build_mirror_list
+from core.monte_carlo import run_monte_carlo
+from core.native_executor import NativeExecutor, NativeGrid
+from core.ohlcv_fetcher import OHLCVFetcher
+from core.ohlcv_store import OHLCVStore
+from core.optimizer import GridOptimizer
+from core.order_gateway import OrderGateway
+from core.paper_trading import PaperTrading
+from core.pair_search import PairSearchIndex
+from core.range_advisor import RangeAdvisor
+from core.recenter import RecenterController
+from core.reconcile import plan_orders, reconcile_plan
+from core.risk_controller import GLOBAL_METRICS, LAYER_METRICS, RiskController, compile_rules
+from core.rate_limiter import PRIORITY_MARKET, PRIORITY_TRADING, PRIORITY_UI, RateLimitScheduler
+from core.sim_exchange import SIM_EXCHANGE_ID, BenchmarkJob, SimExchange, SimVenue, benchmark
+from core.supervisor import ContainerSupervisor
+from core.trade_ledger import TradeLedger
+
 # 配置日志
 log_path = Path("logs")
 log_path.mkdir(exist_ok=True)
@@ -30,27 +59,286 @@ logger.add(
     log_path / "crypto_grid_{time}.log", rotation="10 MB", level="DEBUG"
 )  # 添加文件处理器
 
+# 策略运行模式：container 为每个策略一个Hummingbot容器，native 为进程内执行，
+# paper 为进程内执行的模拟盘（本地撮合，不下真实订单）
+STRATEGY_MODES = ("container", "native", "paper")
+
+# 标准输出锁，保证响应和后台事件不会交错输出
+stdout_lock = threading.Lock()
+
+
+def emit_event(event, data):
+    """向Electron推送事件消息（不对应任何请求）
+
+    Args:
+        event: 事件名称
+        data: 事件数据
+    """
+    with stdout_lock:
+        print(json.dumps({"event": event, "data": data}))
+        sys.stdout.flush()
+
 
 class HummingbotManager:
-    def __init__(self):
-        """初始化Hummingbot管理器"""
+    def __init__(self, notify=None):
+        """初始化Hummingbot管理器
+
+        Args:
+            notify: 事件回调 (event, data)，IPC模式下用于向Electron推送进度
+        """
 
         # 确保目录存在
         Path("logs").mkdir(exist_ok=True)
         Path("data").mkdir(exist_ok=True)
         Path("strategy_files").mkdir(exist_ok=True)
 
+        self.config = load_engine_config()
+        self.notify = notify
+        self.db_lock = threading.RLock()
+
+        # 初始化数据库连接
+        self.init_db()
+
+        # 共享HTTP传输层（长连接会话和DNS缓存）
+        http_config = self.config["http"]
+        self.http = HttpTransport(
+            pool_connections=http_config["pool_connections"],
+            pool_maxsize=http_config["pool_maxsize"],
+            dns_ttl=http_config["dns_ttl"],
+        )
+
+        # 交易所能力目录（按ccxt版本缓存在磁盘上）
+        self.catalog = ExchangeCatalog()
+
+        # 全局交易所限流调度器，本进程所有ccxt请求共享
+        limiter_config = self.config["rate_limiter"]
+        self.rate_limiter = RateLimitScheduler(
+            headroom=limiter_config["headroom"],
+            burst_seconds=limiter_config["burst_seconds"],
+            overrides=limiter_config["overrides"],
+            timeout=limiter_config["timeout"],
+        )
+
+        # 批量下单网关，下单和撤单按交易所批量或并发发送，经过限流调度器
+        gateway_config = self.config["order_gateway"]
+        self.orders = OrderGateway(
+            self.rate_limiter,
+            self.catalog,
+            workers=gateway_config["workers"],
+            batch_limits=gateway_config["batch_limits"],
+        )
+
+        # 本地模拟交易所（交易所ID为 simulated），用于离线压测和集成测试
+        sim_config = self.config["simulated_exchange"]
+        self.sim_venue = SimVenue(maker=sim_config["maker"], taker=sim_config["taker"])
+        for symbol, market in sim_config["markets"].items():
+            self.sim_venue.add_market(symbol, **market)
+        for currency, amount in sim_config["balances"].items():
+            self.sim_venue.deposit("default", currency, amount)
+        self.catalog.register(
+            SimExchange(self.sim_venue, rate_limit_ms=sim_config["rate_limit_ms"])
+        )
+        # 后台运行的模拟交易所压测（经过适配器时）
+        self.sim_benchmark = None
+
+        # 行情缓存（自动暂停、风控、网格调整和进程内策略的触发状态机共用）
+        self.market_feed = MarketFeed(
+            lambda exchange_id: self._create_exchange(
+                exchange_id, priority=PRIORITY_MARKET, key="market_feed"
+            ),
+            interval=self.config["market_feed"]["interval"],
+        )
+
+        # 进程内网格执行器（mode 为 native 和 paper 的策略），所有策略共用一个事件循环
+        native_config = self.config["native_executor"]
+        self.ledger = TradeLedger(self.conn, self.db_lock)
+        # native 策略的API凭证，不保存在策略配置中
+        self.credentials = CredentialStore()
+        self._migrate_credentials()
+        self.native = NativeExecutor(
+            self.conn,
+            self.db_lock,
+            self.orders,
+            self.ledger,
+            feed=self.market_feed,
+            notify=notify,
+            poll_interval=native_config["poll_interval"],
+            workers=native_config["workers"],
+        )
+        self.native.start()
+
+        # 连接Docker端点（支持多个守护进程）
+        docker_config = self.config["docker"]
         try:
-            self.docker_client = docker.from_env()
-            # 验证Docker连接
-            self.docker_client.ping()
+            self.endpoints = DockerEndpointPool(
+                self.conn,
+                endpoints=docker_config["endpoints"],
+                placement=docker_config["placement"],
+                timeout=docker_config["timeout"],
+                db_lock=self.db_lock,
+            )
+            self.endpoints.connect()
+            # 默认端点客户端，兼容单端点调用
+            self.docker_client = self.endpoints.default_client
             logger.info("Docker连接成功")
         except Exception as e:
             logger.error(f"Docker连接失败: {e}")
             raise RuntimeError(f"Docker连接失败: {e}")
 
-        # 初始化数据库连接
-        self.init_db()
+        # 容器健康监督器（start_background 中启动）
+        supervisor_config = self.config["supervisor"]
+        self.supervisor = ContainerSupervisor(
+            self.endpoints,
+            self.conn,
+            self.db_lock,
+            backoff_base=supervisor_config["backoff_base"],
+            backoff_max=supervisor_config["backoff_max"],
+            stable_seconds=supervisor_config["stable_seconds"],
+            circuit_threshold=supervisor_config["circuit_threshold"],
+            circuit_window=supervisor_config["circuit_window"],
+        )
+
+        # 镜像拉取子系统，IPC模式下在后台预拉取配置的镜像标签
+        image_config = self.config["images"]
+        mirrors = build_mirror_list(image_config)
+        racer = None
+        if mirrors:
+            racer = MirrorRacer(
+                self.conn,
+                self.db_lock,
+                mirrors,
+                include_direct=image_config["include_direct"],
+                probe_timeout=image_config["probe_timeout"],
+                session=self.http.session("registry"),
+            )
+        self.images = ImagePuller(
+            self.endpoints,
+            self.conn,
+            self.db_lock,
+            notify=notify,
+            max_retries=image_config["max_retries"],
+            retry_delay=image_config["retry_delay"],
+            racer=racer,
+            stall_timeout=image_config["stall_timeout"],
+        )
+
+        # 区间外自动暂停
+        pause_config = self.config["auto_pause"]
+        self.auto_pause = AutoPauseController(
+            self.conn,
+            self.db_lock,
+            self.market_feed,
+            self._auto_pause_container,
+            self._resume_container,
+            threshold_seconds=pause_config["threshold_seconds"],
+            hysteresis_pct=pause_config["hysteresis_pct"],
+            sync_interval=pause_config["sync_interval"],
+            blocked_fn=lambda strategy_id: self.risk.is_triggered(strategy_id),
+        )
+
+        # 风控规则（策略配置中的 risk_rules）
+        risk_config = self.config["risk"]
+        self.risk = RiskController(
+            self.conn,
+            self.db_lock,
+            self.market_feed,
+            {
+                "pause": self._pause_container,
+                "stop": lambda strategy_id: self.stop_strategy(strategy_id)["success"],
+            },
+            positions=self.native.positions,
+            notify=notify,
+            sync_interval=risk_config["sync_interval"],
+            indicator_options={
+                "rsi_period": risk_config["rsi_period"],
+                "atr_period": risk_config["atr_period"],
+                "ema_period": risk_config["ema_period"],
+                "bb_period": risk_config["bollinger_period"],
+                "bb_k": risk_config["bollinger_k"],
+                # 与网格自适应调整使用相同的K线周期，指标含义一致
+                "bar_seconds": self.config["recenter"]["bar_seconds"],
+            },
+        )
+
+        # 网格自适应调整（策略配置中的 recenter），就地更新网格参数
+        recenter_config = self.config["recenter"]
+        self.recenter = RecenterController(
+            self.conn,
+            self.db_lock,
+            self.market_feed,
+            self._plan_grid,
+            self._apply_grid_spec,
+            notify=notify,
+            defaults=recenter_config,
+            atr_period=recenter_config["atr_period"],
+            ema_period=recenter_config["ema_period"],
+            bar_seconds=recenter_config["bar_seconds"],
+            sync_interval=recenter_config["sync_interval"],
+        )
+
+        # 模拟盘（mode 为 paper 的策略）的本地撮合场所，按实时或回放行情成交
+        self.paper = PaperTrading(
+            self.market_feed, self.native, replay_speed=self.config["paper"]["replay_speed"]
+        )
+        self.market_feed.start()
+
+        # 异步市场信息服务，启动后预加载常用交易所
+        market_config = self.config["market_service"]
+        self.markets = AsyncMarketService(
+            max_concurrency=market_config["max_concurrency"],
+            ttl=market_config["ttl"],
+            timeout=market_config["timeout"],
+            scheduler=self.rate_limiter,
+        )
+        self.markets.register_local(SIM_EXCHANGE_ID, self.sim_venue.market_snapshot)
+        self.markets.warm_up(self._warmup_exchanges(market_config["warmup_exchanges"]))
+        self.pair_search = PairSearchIndex(self.markets)
+
+        # 本地K线存储和增量同步
+        self.ohlcv = OHLCVStore()
+        self.ohlcv_fetcher = OHLCVFetcher(
+            self.ohlcv,
+            lambda exchange_id: self._create_exchange(
+                exchange_id, priority=PRIORITY_MARKET, key="ohlcv"
+            ),
+            self.catalog,
+            notify=notify,
+            page_limit=self.config["ohlcv"]["page_limit"],
+        )
+        self.range_advisor = RangeAdvisor(
+            self.ohlcv, lookback=self.config["range_advisor"]["lookback"]
+        )
+
+        # 网格参数寻优（进程池 + 共享内存K线）
+        optimizer_config = self.config["optimizer"]
+        self.optimizer = GridOptimizer(
+            workers=optimizer_config["workers"],
+            batch_size=optimizer_config["batch_size"],
+            notify=notify,
+        )
+
+    def start_background(self):
+        """启动后台服务：容器监督、镜像预拉取、自动暂停、风控、网格调整和进程内策略恢复
+
+        只在常驻的IPC模式下调用。命令行单次命令只需要管理器本身，
+        不应在执行命令的短暂进程中重启容器、暂停策略或恢复进程内策略。
+        """
+        if self.config["supervisor"]["enabled"]:
+            self.supervisor.start()
+        image_config = self.config["images"]
+        if image_config["prepull"]:
+            self.images.prepull(image_config["repository"], image_config["prepull_tags"])
+        if self.config["auto_pause"]["enabled"]:
+            self.auto_pause.start()
+        if self.config["risk"]["enabled"]:
+            self.risk.start()
+        if self.config["recenter"]["enabled"]:
+            self.recenter.start()
+
+        # 在后台恢复运行中的进程内策略（需要加载市场信息）
+        threading.Thread(
+            target=self._restore_native_strategies, name="native-restore", daemon=True
+        ).start()
 
     def init_db(self):
         """初始化SQLite数据库"""
@@ -93,6 +381,42 @@ class HummingbotManager:
             logger.error(f"数据库初始化失败: {e}")
             raise RuntimeError(f"数据库初始化失败: {e}")
 
+    def _warmup_exchanges(self, configured):
+        """需要预加载市场信息的交易所：配置列表加上已有策略使用的交易所"""
+        with self.db_lock:
+            rows = self.conn.execute("SELECT DISTINCT exchange FROM strategies").fetchall()
+        exchanges = list(configured) + [row[0] for row in rows]
+        return [exchange for exchange in exchanges if self.catalog.supports(exchange)]
+
+    def _create_exchange(self, exchange_id, priority=PRIORITY_UI, key=None, **options):
+        """创建ccxt交易所实例，复用共享长连接会话，请求经过全局限流调度器
+
+        Args:
+            exchange_id: 交易所ID
+            priority: 请求优先级
+            key: 公平队列键（通常为策略ID）
+            **options: ccxt配置项
+
+        Returns:
+            ccxt.Exchange: 交易所实例
+        """
+        if exchange_id == SIM_EXCHANGE_ID:
+            sim_config = self.config["simulated_exchange"]
+            exchange = SimExchange(
+                self.sim_venue,
+                account=options.get("account", "default"),
+                latency_ms=sim_config["latency_ms"],
+                jitter_ms=sim_config["jitter_ms"],
+                max_requests_per_second=sim_config["max_requests_per_second"],
+                rate_limit_ms=sim_config["rate_limit_ms"],
+            )
+            return self.rate_limiter.attach(exchange, priority, key)
+        exchange_class = getattr(ccxt, exchange_id)
+        exchange = exchange_class(
+            {"enableRateLimit": True, "session": self.http.session(exchange_id), **options}
+        )
+        return self.rate_limiter.attach(exchange, priority, key)
+
     def validate_exchange_connection(self, exchange_id, api_key=None, secret=None):
         """验证交易所API连接
 
@@ -105,14 +429,21 @@ class HummingbotManager:
             (bool, str): (是否成功, 消息)
         """
         try:
-            # 使用ccxt库验证交易所连接
-            if exchange_id not in ccxt.exchanges:
+            # 是否支持由能力目录判断，不创建交易所实例
+            if not self.catalog.supports(exchange_id):
                 return False, f"不支持的交易所: {exchange_id}"
 
+            # 无需认证时复用市场信息服务的缓存，已缓存则不发起网络请求
+            if not api_key:
+                markets = self.markets.get_cached_markets(exchange_id)
+                if markets is None:
+                    markets = self.markets.load_markets(exchange_id)
+                logger.info(f"成功连接到{exchange_id}交易所，获取到{len(markets)}个交易对")
+                return True, f"成功连接到{exchange_id}交易所"
+
             # 创建交易所实例
-            exchange_class = getattr(ccxt, exchange_id)
-            exchange_instance = exchange_class(
-                {"enableRateLimit": True, "apiKey": api_key, "secret": secret}
+            exchange_instance = self._create_exchange(
+                exchange_id, apiKey=api_key, secret=secret
             )
 
             # 测试公共API
@@ -143,7 +474,7 @@ class HummingbotManager:
                     return False, f"配置缺少必要字段: {field}"
 
             # 验证交易所是否支持
-            if config["exchange"] not in ccxt.exchanges:
+            if not self.catalog.supports(config["exchange"]):
                 return False, f"不支持的交易所: {config['exchange']}"
 
             # 验证交易对格式
@@ -164,11 +495,20 @@ class HummingbotManager:
                 - exchange: 交易所ID (必须)
                 - pair: 交易对 (必须)
                 - name: 策略名称 (可选)
-                - gridType: 网格类型，arithmetic 或 geometric (可选)
+                - gridType: 网格类型，arithmetic、geometric 或 custom (可选)
                 - upperPrice: 上限价格 (必须)
                 - lowerPrice: 下限价格 (必须)
                 - gridCount: 网格数量 (可选)
                 - amountPerGrid: 每格金额 (可选)
+                - customGridPrices: 自定义网格价格 (custom 时必须)
+                - riskRules: 风控规则列表 (可选，格式见 core.risk_controller)
+                - recenter: 网格自适应调整，true 或参数字典 (可选，参数见 core.recenter)
+                - mode: 运行模式，container（默认，Hummingbot容器）、native（进程内执行，
+                    需要提供 apiKey、secret，部分交易所还需要 password，启动时按市价买入
+                    当前价以上区间所需的基础币）或 paper（模拟盘）
+                - replayFile: paper 模式回放的逐笔价格文件，未提供时使用实时行情 (可选)
+                - replaySpeed: 回放速度倍数，0 为尽快回放 (可选)
+                - paperBalance: paper 模式的虚拟资金，币种 -> 数量，默认按网格所需资金 (可选)
 
         Returns:
             dict: 结果信息
@@ -187,30 +527,23 @@ class HummingbotManager:
             if not pair:
                 return {"success": False, "message": "缺少必要参数：交易对"}
 
-            # 验证价格参数
-            upper_price = strategy_data.get("upperPrice")
-            lower_price = strategy_data.get("lowerPrice")
-
-            if not upper_price:
-                return {"success": False, "message": "缺少必要参数：上限价格"}
-            if not lower_price:
-                return {"success": False, "message": "缺少必要参数：下限价格"}
-
+            # 验证价格和网格参数
             try:
-                upper_price = float(upper_price)
-                lower_price = float(lower_price)
-
-                if upper_price <= lower_price:
-                    return {"success": False, "message": "上限价格必须大于下限价格"}
-                if upper_price <= 0 or lower_price <= 0:
-                    return {"success": False, "message": "价格必须大于0"}
-            except ValueError:
-                return {"success": False, "message": "价格格式错误，必须为数值"}
+                spec = GridSpec.from_request(strategy_data)
+                risk_rules = strategy_data.get("riskRules")
+                compile_rules(risk_rules)
+            except ValueError as e:
+                return {"success": False, "message": str(e)}
+            mode = strategy_data.get("mode", "container")
+            if mode not in STRATEGY_MODES:
+                return {"success": False, "message": f"不支持的运行模式: {mode}"}
+            if exchange == SIM_EXCHANGE_ID and mode == "container":
+                return {"success": False, "message": "模拟交易所只支持 native 和 paper 模式"}
 
             # 进行简单的网络连通性检查
             try:
                 logger.info("检查网络连接...")
-                response = requests.get("https://www.google.com", timeout=5)
+                response = self.http.get("https://www.google.com", timeout=5)
                 if response.status_code >= 400:
                     logger.warning(f"网络连接测试返回状态码: {response.status_code}")
             except requests.exceptions.RequestException as e:
@@ -222,44 +555,26 @@ class HummingbotManager:
             if not conn_success:
                 return {"success": False, "message": conn_msg}
 
-            # 生成策略ID和配置目录
-            strategy_id = str(uuid.uuid4())[:8]
-            config_dir = Path("strategy_files") / strategy_id
-            config_dir.mkdir(parents=True, exist_ok=True)
-
-            # 创建配置文件
-            config_path = config_dir / "conf_grid.yml"
-
-            # 从策略数据中提取网格参数
-            grid_type = strategy_data.get("gridType", "arithmetic")
-            grid_count = strategy_data.get("gridCount", 10)
-            amount_per_grid = strategy_data.get("amountPerGrid", 10)
-
-            # 校验网格参数
-            try:
-                grid_count = int(grid_count)
-                if grid_count <= 1:
-                    return {"success": False, "message": "网格数量必须大于1"}
-            except ValueError:
-                return {"success": False, "message": "网格数量格式错误，必须为整数"}
+            # 按市场精度和最小下单额校验网格计划（与 preview_grid 相同）
+            plan = self._plan_grid(exchange, pair, spec, strategy_data.get("currentPrice"))
+            if not plan.valid:
+                return {
+                    "success": False,
+                    "message": "；".join(plan.errors),
+                    "preview": plan.to_dict(),
+                }
 
-            try:
-                amount_per_grid = float(amount_per_grid)
-                if amount_per_grid <= 0:
-                    return {"success": False, "message": "每格金额必须大于0"}
-            except ValueError:
-                return {"success": False, "message": "每格金额格式错误，必须为数值"}
+            # 生成策略ID
+            strategy_id = str(uuid.uuid4())[:8]
 
             config = {
                 "exchange": exchange,
                 "trading_pair": pair,
-                "grid_type": grid_type,
-                "upper_price": upper_price,
-                "lower_price": lower_price,
-                "grid_count": grid_count,
-                "amount_per_grid": amount_per_grid,
+                **spec.to_config(),
                 "name": name,
             }
+            if risk_rules:
+                config["risk_rules"] = risk_rules
 
             # 添加策略数据中的其他参数
             for key, value in strategy_data.items():
@@ -271,9 +586,23 @@ class HummingbotManager:
                     "gridType",
                     "gridCount",
                     "amountPerGrid",
+                    "customGridPrices",
+                    "riskRules",
                     "name",
+                    "mode",
                 ]:
                     config[key] = value
+            if mode != "container":
+                config["mode"] = mode
+                config, credentials = split_credentials(config)
+                return self._create_native(
+                    strategy_id, name, exchange, pair, config, credentials
+                )
+
+            # 创建配置目录和配置文件
+            config_dir = Path("strategy_files") / strategy_id
+            config_dir.mkdir(parents=True, exist_ok=True)
+            config_path = config_dir / "conf_grid.yml"
 
             logger.info(f"创建策略配置: {config}")
             with open(config_path, "w") as f:
@@ -284,9 +613,17 @@ class HummingbotManager:
             if not valid:
                 return {"success": False, "message": msg}
 
+            # 选择Docker端点
+            try:
+                endpoint = self.endpoints.place(strategy_id, exchange)
+            except RuntimeError as e:
+                shutil.rmtree(config_dir, ignore_errors=True)
+                return {"success": False, "message": str(e)}
+            docker_client = endpoint.client
+
             # 检查是否已存在同名容器
             container_name = f"hummingbot_{strategy_id}"
-            existing_containers = self.docker_client.containers.list(
+            existing_containers = docker_client.containers.list(
                 all=True, filters={"name": container_name}
             )
 
@@ -295,25 +632,29 @@ class HummingbotManager:
                 for container in existing_containers:
                     container.remove(force=True)
 
-            # 使用latest标签
-            hummingbot_image = "hummingbot/hummingbot:latest"
-
-            # 检查镜像是否存在，如果不存在则提示用户
+            # 使用固定摘要的镜像，镜像不存在时在后台拉取并立即返回，
+            # 进度通过 image_pull_progress 事件推送
+            image_config = self.config["images"]
+            image_tag = strategy_data.get("imageTag", "latest")
             try:
-                # 检查镜像是否存在
-                try:
-                    self.docker_client.images.get(hummingbot_image)
-                    logger.info(f"已找到镜像: {hummingbot_image}")
-                except docker_errors.ImageNotFound:
-                    # 如果镜像不存在，则提示用户
-                    logger.warning(f"镜像不存在: {hummingbot_image}")
-                    return {
-                        "success": False,
-                        "message": f"Hummingbot镜像不存在，请运行 'python src/python/main.py --pull-image' 拉取镜像",
-                    }
+                hummingbot_image, job = self.images.ensure(
+                    endpoint, image_config["repository"], image_tag
+                )
+                if not hummingbot_image:
+                    self.endpoints.release(strategy_id)
+                    shutil.rmtree(config_dir, ignore_errors=True)
+                    progress = job.progress()
+                    if job.status == "failed":
+                        message = f"拉取Hummingbot镜像失败: {progress['error']}"
+                    else:
+                        percent = progress["percent"] or 0
+                        message = f"Hummingbot镜像正在拉取中（{percent}%），请稍后重试"
+                    logger.warning(message)
+                    return {"success": False, "message": message, "image_pull": progress}
+                logger.info(f"使用镜像: {hummingbot_image}")
 
                 # 创建容器
-                container = self.docker_client.containers.run(
+                container = docker_client.containers.run(
                     hummingbot_image,
                     name=container_name,
                     detach=True,
@@ -344,13 +685,13 @@ class HummingbotManager:
                     "name": name,
                     "exchange": exchange,
                     "pair": pair,
-                    "config": config,
+                    "config": split_credentials(config)[0],
+                    "endpoint": endpoint.name,
                 }
             except docker_errors.APIError as api_error:
                 logger.error(f"Docker API错误: {api_error}")
                 # 清理配置目录
-                import shutil
-
+                self.endpoints.release(strategy_id)
                 shutil.rmtree(config_dir, ignore_errors=True)
                 return {
                     "success": False,
@@ -359,14 +700,607 @@ class HummingbotManager:
             except Exception as e:
                 logger.error(f"创建Hummingbot容器失败: {e}")
                 # 清理配置目录
-                import shutil
-
+                self.endpoints.release(strategy_id)
                 shutil.rmtree(config_dir, ignore_errors=True)
                 return {"success": False, "message": f"创建Hummingbot容器失败: {e}"}
         except Exception as e:
             logger.error(f"创建Hummingbot容器失败: {e}")
             return {"success": False, "message": f"创建Hummingbot容器失败: {e}"}
 
+    def _create_native(self, strategy_id, name, exchange, pair, config, credentials=None):
+        """创建进程内执行的策略（不创建容器和配置目录）
+
+        Args:
+            config: 不含凭证的策略配置
+            credentials: native 模式的API凭证，保存到凭证存储
+
+        Returns:
+            dict: 结果信息
+        """
+        self.credentials.put(strategy_id, credentials)
+        with self.db_lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO strategies VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)",
+                (strategy_id, name, exchange, pair, "running", json.dumps(config)),
+            )
+            self.conn.commit()
+        try:
+            self._launch_native(strategy_id, exchange, pair, config)
+        except Exception as e:
+            logger.error(f"启动进程内策略失败: {e}")
+            with self.db_lock:
+                self.conn.execute("DELETE FROM strategies WHERE id = ?", (strategy_id,))
+                self.conn.commit()
+            self.native.forget(strategy_id)
+            self.credentials.delete(strategy_id)
+            return {"success": False, "message": f"启动进程内策略失败: {e}"}
+
+        logger.info(f"策略{strategy_id}已在进程内启动")
+        return {
+            "success": True,
+            "message": f"策略{name}已在进程内启动",
+            "strategy_id": strategy_id,
+            "name": name,
+            "exchange": exchange,
+            "pair": pair,
+            "config": config,
+            "mode": config["mode"],
+        }
+
+    def _precision_steps(self, exchange_id, market):
+        """交易对的价格最小变动单位和数量步长（按交易所精度模式换算）"""
+        decimal = self.catalog.get(exchange_id)["precision_mode"] != ccxt.TICK_SIZE
+        steps = []
+        for key in ("price", "amount"):
+            precision = market["precision"].get(key)
+            if precision is None:
+                steps.append(None)
+            elif decimal:
+                steps.append(10.0 ** -int(precision))
+            else:
+                steps.append(float(precision))
+        return tuple(steps)
+
+    def _live_price(self, exchange_id, symbol, exchange=None):
+        """当前价，优先使用行情缓存"""
+        cached = self.market_feed.get_price(exchange_id, symbol, max_age=60)
+        if cached:
+            return cached[0]
+        if exchange is None:
+            exchange = self._create_exchange(exchange_id, priority=PRIORITY_MARKET, key="paper")
+        return exchange.fetch_ticker(symbol)["last"]
+
+    def _launch_native(self, strategy_id, exchange_id, pair, config, reset=False):
+        """按策略配置在进程内执行器中启动网格（mode 为 native 或 paper）
+
+        Args:
+            strategy_id: 策略ID
+            exchange_id: 交易所ID
+            pair: 交易对
+            config: 策略配置，paper 可指定 replayFile、replaySpeed 和 paperBalance
+                （native 的API凭证从凭证存储读取）
+            reset: 网格价位已调整，按当前价重新计算各区间是否持仓
+
+        Raises:
+            ValueError: 网格参数未通过精度校验
+        """
+        symbol = to_ccxt_symbol(pair)
+        mode = config.get("mode", "native")
+        market = self._market(exchange_id, pair)
+        price_tick, amount_step = self._precision_steps(exchange_id, market)
+        if mode == "paper":
+            replay_file = config.get("replayFile")
+            exchange = self.paper.open(
+                strategy_id,
+                exchange_id,
+                market,
+                price_tick,
+                amount_step,
+                price=None if replay_file else self._live_price(exchange_id, symbol),
+                replay_file=replay_file,
+                replay_speed=config.get("replaySpeed"),
+                resume_after=self.ledger.last_trade_time(strategy_id),
+            )
+            price = exchange.venue.last_price(symbol)
+        else:
+            credentials = self.credentials.get(strategy_id)
+            exchange = self._create_exchange(
+                exchange_id, priority=PRIORITY_TRADING, key=strategy_id, **credentials
+            )
+            # 复用市场信息服务的缓存，不为每个策略重新加载
+            exchange.set_markets(self.markets.get_cached_markets(exchange_id))
+            price = self._live_price(exchange_id, symbol, exchange)
+
+        plan = self._plan_grid(exchange_id, pair, GridSpec.from_config(config), price)
+        if not plan.valid:
+            if mode == "paper" and not self.native.has(strategy_id):
+                self.paper.release(strategy_id)
+            raise ValueError("；".join(plan.errors))
+
+        grid = NativeGrid(
+            strategy_id,
+            mode,
+            exchange,
+            symbol,
+            plan.prices,
+            plan.quantities,
+            plan.reference_price,
+            rebound_pct=float(config.get("reboundPct") or 0) / 100,
+            pullback_pct=float(config.get("pullbackPct") or 0) / 100,
+            # 回放行情的价格来自策略独立的撮合场所
+            price_source=exchange.venue.exchange_id
+            if mode == "paper" and config.get("replayFile")
+            else exchange_id,
+        )
+        if mode == "paper":
+            # 默认按网格各区间所需资金注资（持仓区间的基础币、其余区间买单的计价币），留出少量余量
+            buffer = 1 + self.config["paper"]["funding_buffer"]
+            quote_required, base_required = grid.required_balances()
+            balances = config.get("paperBalance") or {
+                market["quote"]: quote_required * buffer,
+                market["base"]: base_required * buffer,
+            }
+            self.paper.fund(strategy_id, exchange, balances)
+        self.native.launch(grid, amount_step, reset=reset)
+        if mode == "paper":
+            self.paper.start(strategy_id)
+
+    def _migrate_credentials(self):
+        """把旧版本写在进程内策略配置中的API凭证移到凭证存储"""
+        with self.db_lock:
+            rows = self.conn.execute("SELECT id, config FROM strategies").fetchall()
+            for strategy_id, config_json in rows:
+                config = json.loads(config_json) if config_json else {}
+                if config.get("mode", "container") == "container" or not any(
+                    key in config for key in CREDENTIAL_KEYS
+                ):
+                    continue
+                config, credentials = split_credentials(config)
+                self.credentials.put(strategy_id, credentials)
+                self.conn.execute(
+                    "UPDATE strategies SET config = ? WHERE id = ?",
+                    (json.dumps(config), strategy_id),
+                )
+                self.conn.commit()
+                logger.info(f"已把策略{strategy_id}的API凭证移到凭证存储")
+
+    def _restore_native_strategies(self):
+        """恢复数据库中运行中的进程内策略（引擎重启后）"""
+        with self.db_lock:
+            rows = self.conn.execute(
+                "SELECT id, exchange, trading_pair, config FROM strategies WHERE status = 'running'"
+            ).fetchall()
+        for strategy_id, exchange, pair, config_json in rows:
+            config = json.loads(config_json) if config_json else {}
+            if config.get("mode", "container") == "container":
+                continue
+            with self.db_lock:
+                row = self.conn.execute(
+                    "SELECT status FROM strategies WHERE id = ?", (strategy_id,)
+                ).fetchone()
+            if not row or row[0] != "running":
+                # 恢复过程中策略已被停止或删除
+                continue
+            try:
+                self._launch_native(strategy_id, exchange, pair, config)
+                logger.info(f"已恢复进程内策略{strategy_id}")
+            except Exception as e:
+                logger.error(f"恢复进程内策略{strategy_id}失败: {e}")
+
+    def _strategy_mode(self, strategy_id):
+        """策略的运行模式，策略不存在时返回None"""
+        with self.db_lock:
+            row = self.conn.execute(
+                "SELECT config FROM strategies WHERE id = ?", (strategy_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        config = json.loads(row[0]) if row[0] else {}
+        return config.get("mode", "container")
+
+    def _market(self, exchange, pair, testnet=False):
+        """获取交易对的市场信息（优先使用缓存）
+
+        Raises:
+            ValueError: 交易所或交易对不存在
+        """
+        if not self.catalog.supports(exchange):
+            raise ValueError(f"不支持的交易所: {exchange}")
+        markets = self.markets.get_cached_markets(exchange, testnet)
+        if markets is None:
+            markets = self.markets.load_markets(exchange, testnet)
+        market = markets.get(to_ccxt_symbol(pair))
+        if market is None:
+            raise ValueError(f"{exchange}不存在交易对{pair}")
+        return market
+
+    def _plan_grid(self, exchange, pair, spec, current_price=None, testnet=False):
+        """按交易对的精度、最小下单额和手续费计算网格下单计划
+
+        Args:
+            exchange: 交易所ID
+            pair: 交易对
+            spec: GridSpec
+            current_price: 当前价，未提供时使用行情缓存，都没有时按区间中点计算
+
+        Returns:
+            GridPlan: 下单计划
+        """
+        market = self._market(exchange, pair, testnet)
+        entry = self.catalog.get(exchange)
+        if not current_price:
+            cached = self.market_feed.get_price(exchange, to_ccxt_symbol(pair), max_age=300)
+            current_price = cached[0] if cached else None
+        return plan_grid(
+            spec,
+            market,
+            precision_mode=entry["precision_mode"],
+            fee_rate=market.get("maker") or entry["fees"]["maker"],
+            reference_price=float(current_price) if current_price else None,
+        )
+
+    def preview_grid(self, strategy_data):
+        """预览网格价位和下单计划（不创建策略）
+
+        Args:
+            strategy_data: 与 create_strategy 相同的策略数据，可额外提供 currentPrice
+
+        Returns:
+            dict: {success, valid, errors, warnings, levels, trips, capital_required, ...}
+        """
+        try:
+            exchange = strategy_data.get("exchange")
+            pair = strategy_data.get("pair")
+            if not exchange:
+                return {"success": False, "message": "缺少必要参数：交易所"}
+            if not pair:
+                return {"success": False, "message": "缺少必要参数：交易对"}
+            spec = GridSpec.from_request(strategy_data)
+            plan = self._plan_grid(
+                exchange,
+                pair,
+                spec,
+                strategy_data.get("currentPrice"),
+                strategy_data.get("testnet", False),
+            )
+            return {"success": True, **plan.to_dict()}
+        except ValueError as e:
+            return {"success": False, "message": str(e)}
+        except Exception as e:
+            logger.error(f"预览网格失败: {e}")
+            return {"success": False, "message": f"预览网格失败: {e}"}
+
+    def _backtest_market(self, exchange, pair, fee_rate=None):
+        """回测使用的市场信息、手续费率和精度模式
+
+        已缓存市场信息时按精度取整，不为回测发起网络请求。
+
+        Returns:
+            tuple: (市场信息或None, 手续费率, 精度模式)
+        """
+        entry = self.catalog.get(exchange) or {}
+        markets = self.markets.get_cached_markets(exchange) or {}
+        market = markets.get(to_ccxt_symbol(pair))
+        if fee_rate is None:
+            fee_rate = (market or {}).get("maker") or entry.get("fees", {}).get("maker") or 0.001
+        return market, float(fee_rate), entry.get("precision_mode", ccxt.TICK_SIZE)
+
+    def backtest_grid(self, params):
+        """用本地K线回测网格策略
+
+        Args:
+            params: 与 create_strategy 相同的网格参数，另外包括
+                - timeframe: K线周期 (默认 1h)
+                - since / until: 回测时间范围（毫秒，可选）
+                - feeRate: 手续费率 (默认取交易所 maker 费率)
+                - slippage: 滑点比例 (默认 0)
+                - reboundPct / pullbackPct: 反弹开仓 / 回调平仓百分比 (默认 0，即触及价位成交)
+
+        Returns:
+            dict: {success, 汇总指标, equity_curve, fills}
+        """
+        try:
+            exchange = params.get("exchange")
+            pair = params.get("pair")
+            if not exchange or not pair:
+                return {"success": False, "message": "缺少必要参数：交易所或交易对"}
+            spec = GridSpec.from_request(params)
+            timeframe = params.get("timeframe", "1h")
+            try:
+                candles = self.ohlcv.read(
+                    exchange,
+                    to_ccxt_symbol(pair),
+                    timeframe,
+                    params.get("since"),
+                    params.get("until"),
+                )
+            except KeyError:
+                return {"success": False, "message": "本地没有该K线数据，请先同步"}
+
+            market, fee_rate, precision_mode = self._backtest_market(
+                exchange, pair, params.get("feeRate")
+            )
+            started = time.perf_counter()
+            result = run_backtest(
+                candles,
+                spec,
+                fee_rate=fee_rate,
+                slippage=float(params.get("slippage", 0)),
+                market=market,
+                precision_mode=precision_mode,
+                rebound_pct=float(params.get("reboundPct") or 0) / 100,
+                pullback_pct=float(params.get("pullbackPct") or 0) / 100,
+            )
+            logger.info(
+                f"回测{exchange} {pair} {timeframe} {result.bars}根K线，"
+                f"耗时{time.perf_counter() - started:.3f}秒"
+            )
+            return {"success": True, **result.to_dict()}
+        except ValueError as e:
+            return {"success": False, "message": str(e)}
+        except Exception as e:
+            logger.error(f"回测失败: {e}")
+            return {"success": False, "message": f"回测失败: {e}"}
+
+    def suggest_grid_range(self, exchange, pair, horizon="7d", timeframe="1h", coverage=None):
+        """根据本地K线的波动率统计建议网格上下限和网格数量
+
+        Args:
+            exchange: 交易所ID
+            pair: 交易对
+            horizon: 预计运行时长（K线根数或 7d、24h 等）
+            timeframe: 统计使用的K线周期
+            coverage: 区间覆盖持有期收益分布的比例，默认取配置
+
+        Returns:
+            dict: {success, lowerPrice, upperPrice, profiles, 波动率统计...}
+        """
+        try:
+            if not exchange or not pair:
+                return {"success": False, "message": "缺少必要参数：交易所或交易对"}
+            symbol = to_ccxt_symbol(pair)
+            _, fee_rate, _ = self._backtest_market(exchange, pair)
+            cached = self.market_feed.get_price(exchange, symbol, max_age=300)
+            result = self.range_advisor.suggest(
+                exchange,
+                symbol,
+                timeframe,
+                horizon=horizon,
+                coverage=float(coverage or self.config["range_advisor"]["coverage"]),
+                fee_rate=fee_rate,
+                current_price=cached[0] if cached else None,
+            )
+            return {"success": True, **result}
+        except KeyError:
+            return {"success": False, "message": "本地没有该K线数据，请先同步"}
+        except ValueError as e:
+            return {"success": False, "message": str(e)}
+        except Exception as e:
+            logger.error(f"计算网格区间建议失败: {e}")
+            return {"success": False, "message": f"计算网格区间建议失败: {e}"}
+
+    def monte_carlo_grid(self, params):
+        """用模拟价格路径对网格策略做压力测试
+
+        Args:
+            params: 与 backtest_grid 相同的参数，另外包括
+                - paths: 路径数 (默认取配置)
+                - horizon: 每条路径的K线根数 (默认取配置)
+                - method: bootstrap 按块重采样历史收益 / gbm 几何布朗运动
+                - blockSize: 重采样块长度 (默认 24)
+                - startPrice: 起始价格 (默认最新收盘价)
+                - seed: 随机种子
+
+        Returns:
+            dict: {success, probability_of_loss, pnl, return_pct, max_drawdown_pct,
+                out_of_range_pct, round_trips}，各指标为分布统计
+        """
+        try:
+            exchange = params.get("exchange")
+            pair = params.get("pair")
+            if not exchange or not pair:
+                return {"success": False, "message": "缺少必要参数：交易所或交易对"}
+            spec = GridSpec.from_request(params)
+            mc_config = self.config["monte_carlo"]
+            n_paths = int(params.get("paths") or mc_config["paths"])
+            if n_paths > mc_config["max_paths"]:
+                return {"success": False, "message": f"路径数不能超过{mc_config['max_paths']}"}
+            # 同步执行，限制计算量以免阻塞IPC
+            horizon = int(params.get("horizon") or mc_config["horizon"])
+            if horizon <= 0:
+                return {"success": False, "message": "路径步数必须大于0"}
+            if n_paths * horizon > mc_config["max_cells"]:
+                return {
+                    "success": False,
+                    "message": f"路径数×步数不能超过{mc_config['max_cells']}，请减少路径数或步数",
+                }
+            timeframe = params.get("timeframe", "1h")
+            try:
+                candles = self.ohlcv.read(
+                    exchange,
+                    to_ccxt_symbol(pair),
+                    timeframe,
+                    params.get("since"),
+                    params.get("until"),
+                )
+            except KeyError:
+                return {"success": False, "message": "本地没有该K线数据，请先同步"}
+
+            market, fee_rate, precision_mode = self._backtest_market(
+                exchange, pair, params.get("feeRate")
+            )
+            started = time.perf_counter()
+            result = run_monte_carlo(
+                candles,
+                spec,
+                n_paths=n_paths,
+                horizon=horizon,
+                method=params.get("method", "bootstrap"),
+                block=int(params.get("blockSize", 24)),
+                fee_rate=fee_rate,
+                slippage=float(params.get("slippage", 0)),
+                market=market,
+                precision_mode=precision_mode,
+                start_price=params.get("startPrice"),
+                seed=params.get("seed"),
+                chunk_cells=mc_config["chunk_cells"],
+            )
+            logger.info(
+                f"蒙特卡洛测试{exchange} {pair} {n_paths}条路径×{result['steps']}步，"
+                f"耗时{time.perf_counter() - started:.3f}秒"
+            )
+            return {"success": True, **result}
+        except ValueError as e:
+            return {"success": False, "message": str(e)}
+        except Exception as e:
+            logger.error(f"蒙特卡洛测试失败: {e}")
+            return {"success": False, "message": f"蒙特卡洛测试失败: {e}"}
+
+    def optimize_grid(self, params):
+        """在后台并行回测参数组合，寻找最优网格参数
+
+        进度和当前排名通过 optimize_progress 事件推送。
+
+        Args:
+            params: 寻优参数
+                - exchange: 交易所ID
+                - pair / pairs: 交易对（多个交易对时使用 upperPct/lowerPct）
+                - timeframe / since / until: 回测K线范围
+                - upperPrice / lowerPrice / upperPct / lowerPct / gridCount / gridType:
+                  取值列表或 {min, max, steps}
+                - amountPerGrid: 每格金额
+                - objective: return / pnl / calmar / round_trips (默认 calmar)
+                - topK: 保留的结果数量 (默认 20)
+                - patience: 最优值连续多少批未提升时提前结束 (默认取配置)
+                - feeRate / slippage: 手续费率和滑点
+
+        Returns:
+            dict: {success, job_id, total}
+        """
+        try:
+            exchange = params.get("exchange")
+            pairs = params.get("pairs") or ([params["pair"]] if params.get("pair") else [])
+            if not exchange or not pairs:
+                return {"success": False, "message": "缺少必要参数：交易所或交易对"}
+            timeframe = params.get("timeframe", "1h")
+
+            datasets, markets, fee_rates = {}, {}, {}
+            precision_mode = ccxt.TICK_SIZE
+            for pair in pairs:
+                try:
+                    datasets[pair] = self.ohlcv.read(
+                        exchange,
+                        to_ccxt_symbol(pair),
+                        timeframe,
+                        params.get("since"),
+                        params.get("until"),
+                    )
+                except KeyError:
+                    return {"success": False, "message": f"本地没有{pair}的K线数据，请先同步"}
+                markets[pair], fee_rates[pair], precision_mode = self._backtest_market(
+                    exchange, pair, params.get("feeRate")
+                )
+
+            params = {"patience": self.config["optimizer"]["patience"], **params}
+            job = self.optimizer.start(datasets, params, markets, fee_rates, precision_mode)
+            logger.info(f"已启动寻优任务{job.id}，共{job.total}个参数组合")
+            return {"success": True, "job_id": job.id, "total": job.total}
+        except ValueError as e:
+            return {"success": False, "message": str(e)}
+        except Exception as e:
+            logger.error(f"启动参数寻优失败: {e}")
+            return {"success": False, "message": f"启动参数寻优失败: {e}"}
+
+    def get_optimize_status(self, job_id=None):
+        """获取寻优任务进度和当前排名，未指定任务时返回所有任务"""
+        if job_id is None:
+            return {"success": True, "jobs": self.optimizer.get_jobs()}
+        job = self.optimizer.get(job_id)
+        if job is None:
+            return {"success": False, "message": f"寻优任务不存在: {job_id}"}
+        return {"success": True, **job.progress()}
+
+    def stop_optimize(self, job_id):
+        """停止寻优任务，保留已得到的结果"""
+        if not self.optimizer.stop(job_id):
+            return {"success": False, "message": f"寻优任务不存在: {job_id}"}
+        return {"success": True, "message": "寻优任务正在停止"}
+
+    def _find_container(self, strategy_id):
+        """在策略所在的Docker端点上查找容器
+
+        Args:
+            strategy_id: 策略ID
+
+        Returns:
+            Container: 容器对象，不存在时返回None
+        """
+        container_name = f"hummingbot_{strategy_id}"
+        docker_client = self.endpoints.client_for(strategy_id)
+        containers = docker_client.containers.list(
+            all=True, filters={"name": container_name}
+        )
+        return containers[0] if containers else None
+
+    def _pause_container(self, strategy_id):
+        """暂停策略容器（风控规则暂停回调），进程内策略保留挂单并暂停执行
+
+        Returns:
+            bool: 是否已暂停
+        """
+        try:
+            if self.native.has(strategy_id):
+                return self.native.pause(strategy_id)
+            container = self._find_container(strategy_id)
+            if not container:
+                return False
+            if container.status == "running":
+                container.pause()
+            return True
+        except Exception as e:
+            logger.error(f"暂停策略容器失败: {e}")
+            return False
+
+    def _auto_pause_container(self, strategy_id):
+        """区间外自动暂停回调，只暂停运行中的策略
+
+        Returns:
+            bool: 本次是否暂停了策略，已处于暂停状态时返回 False，由暂停它的一方负责恢复
+        """
+        try:
+            if self.native.has(strategy_id):
+                status = self.native.get_status(strategy_id)
+                if status is None or status["status"] != "running":
+                    return False
+                return self.native.pause(strategy_id)
+            container = self._find_container(strategy_id)
+            if not container or container.status != "running":
+                return False
+            container.pause()
+            return True
+        except Exception as e:
+            logger.error(f"暂停策略容器失败: {e}")
+            return False
+
+    def _resume_container(self, strategy_id):
+        """恢复被暂停的策略容器或进程内策略
+
+        Returns:
+            bool: 是否已恢复
+        """
+        try:
+            if self.native.has(strategy_id):
+                return self.native.resume(strategy_id)
+            container = self._find_container(strategy_id)
+            if not container:
+                return False
+            if container.status == "paused":
+                container.unpause()
+            return True
+        except Exception as e:
+            logger.error(f"恢复策略容器失败: {e}")
+            return False
+
     def get_container_status(self, strategy_id):
         """获取容器状态
 
@@ -378,14 +1312,11 @@ class HummingbotManager:
         """
         try:
             container_name = f"hummingbot_{strategy_id}"
-            containers = self.docker_client.containers.list(
-                all=True, filters={"name": container_name}
-            )
+            container = self._find_container(strategy_id)
 
-            if not containers:
+            if not container:
                 return {"status": "not_found", "message": f"容器{container_name}不存在"}
 
-            container = containers[0]
             logs = container.logs(tail=10).decode("utf-8")
 
             return {
@@ -409,6 +1340,14 @@ class HummingbotManager:
             cursor.execute("SELECT * FROM strategies")
             rows = cursor.fetchall()
 
+            # 并发获取所有端点上的容器，避免逐个策略查询Docker
+            containers = self.endpoints.list_containers()
+            health = self.supervisor.get_all_health()
+            pauses = self.auto_pause.get_all_pauses()
+            risk = self.risk.get_all_status()
+            native = self.native.get_all_status()
+            trades = self.ledger.get_summary()
+
             strategies = []
             for row in rows:
                 strategy = {
@@ -417,13 +1356,40 @@ class HummingbotManager:
                     "exchange": row[2],
                     "pair": row[3],
                     "status": row[4],
-                    "config": json.loads(row[5]) if row[5] else {},
+                    "config": split_credentials(json.loads(row[5]) if row[5] else {})[0],
                     "created_at": row[6],
                 }
 
+                strategy["mode"] = strategy["config"].get("mode", "container")
+                if strategy["mode"] != "container":
+                    # 进程内策略没有容器，容器状态取执行器中的状态
+                    status = native.get(row[0])
+                    strategy["endpoint"] = None
+                    strategy["container_status"] = status["status"] if status else "exited"
+                    strategy["native"] = status
+                    strategy["trades"] = trades.get(row[0])
+                    if strategy["mode"] == "paper":
+                        paper = self.paper.describe(row[0])
+                        if paper is not None:
+                            paper["balance"] = self.paper.balance(row[0], row[2])
+                        strategy["paper"] = paper
+                    strategy["health"] = None
+                    strategy["auto_pause"] = pauses.get(row[0])
+                    strategy["risk"] = risk.get(row[0])
+                    strategies.append(strategy)
+                    continue
+
                 # 获取容器状态
-                container_status = self.get_container_status(row[0])
-                strategy["container_status"] = container_status.get("status", "unknown")
+                found = containers.get(f"hummingbot_{row[0]}")
+                if found:
+                    strategy["endpoint"] = found[0]
+                    strategy["container_status"] = found[1].status
+                else:
+                    strategy["endpoint"] = self.endpoints.endpoint_for(row[0]).name
+                    strategy["container_status"] = "not_found"
+                strategy["health"] = health.get(row[0])
+                strategy["auto_pause"] = pauses.get(row[0])
+                strategy["risk"] = risk.get(row[0])
 
                 strategies.append(strategy)
 
@@ -442,19 +1408,29 @@ class HummingbotManager:
             dict: 结果信息
         """
         try:
+            mode = self._strategy_mode(strategy_id)
+            if mode is not None and mode != "container":
+                return self._start_native(strategy_id)
+
             container_name = f"hummingbot_{strategy_id}"
-            containers = self.docker_client.containers.list(
-                all=True, filters={"name": container_name}
-            )
+            container = self._find_container(strategy_id)
 
-            if not containers:
+            if not container:
                 return {"success": False, "message": f"容器{container_name}不存在"}
 
-            container = containers[0]
-
             if container.status == "running":
                 return {"success": True, "message": f"容器{container_name}已经在运行中"}
 
+            if container.status == "paused":
+                # 手动启动被自动暂停的策略
+                container.unpause()
+                self.auto_pause.release(strategy_id)
+                self.risk.reset(strategy_id)
+                return {"success": True, "message": f"容器{container_name}已恢复运行"}
+
+            # 手动启动时重置退避计数并关闭熔断
+            self.supervisor.reset(strategy_id)
+            self.risk.reset(strategy_id)
             container.start()
 
             # 更新数据库状态
@@ -480,34 +1456,119 @@ class HummingbotManager:
             dict: 结果信息
         """
         try:
+            mode = self._strategy_mode(strategy_id)
+            if mode is not None and mode != "container":
+                return self._stop_native(strategy_id)
+
             container_name = f"hummingbot_{strategy_id}"
-            containers = self.docker_client.containers.list(
-                all=True, filters={"name": container_name}
-            )
+            container = self._find_container(strategy_id)
 
-            if not containers:
+            if not container:
                 return {"success": False, "message": f"容器{container_name}不存在"}
 
-            container = containers[0]
+            # 先取消等待中的自动重启并更新期望状态，已退出（退避等待或熔断中）的容器
+            # 也不会再被监督器或下次启动时的恢复拉起
+            self.supervisor.expect_stop(strategy_id)
+            self.auto_pause.release(strategy_id)
+            self.risk.reset(strategy_id)
+            with self.db_lock:
+                self.conn.execute(
+                    "UPDATE strategies SET status = ? WHERE id = ?", ("stopped", strategy_id)
+                )
+                self.conn.commit()
 
-            if container.status != "running":
+            if container.status not in ("running", "paused"):
                 return {"success": True, "message": f"容器{container_name}已经停止"}
 
+            if container.status == "paused":
+                container.unpause()
             container.stop()
 
-            # 更新数据库状态
-            cursor = self.conn.cursor()
-            cursor.execute(
-                "UPDATE strategies SET status = ? WHERE id = ?",
-                ("stopped", strategy_id),
-            )
-            self.conn.commit()
-
             return {"success": True, "message": f"容器{container_name}已停止"}
         except Exception as e:
             logger.error(f"停止策略容器失败: {e}")
             return {"success": False, "message": f"停止策略容器失败: {e}"}
 
+    def _start_native(self, strategy_id):
+        """启动或恢复进程内策略"""
+        if self.native.has(strategy_id):
+            status = self.native.get_status(strategy_id)["status"]
+            self.native.resume(strategy_id)
+            self.auto_pause.release(strategy_id)
+            self.risk.reset(strategy_id)
+            if status == "paused":
+                return {"success": True, "message": f"策略{strategy_id}已恢复运行"}
+            return {"success": True, "message": f"策略{strategy_id}已经在运行中"}
+
+        with self.db_lock:
+            exchange, pair, config_json = self.conn.execute(
+                "SELECT exchange, trading_pair, config FROM strategies WHERE id = ?",
+                (strategy_id,),
+            ).fetchone()
+        self.risk.reset(strategy_id)
+        self._launch_native(strategy_id, exchange, pair, json.loads(config_json))
+        with self.db_lock:
+            self.conn.execute(
+                "UPDATE strategies SET status = ? WHERE id = ?", ("running", strategy_id)
+            )
+            self.conn.commit()
+        return {"success": True, "message": f"策略{strategy_id}已启动"}
+
+    def _stop_native(self, strategy_id):
+        """停止进程内策略并撤销挂单
+
+        策略不在执行器中（恢复失败、恢复尚未完成或从命令行执行）时也更新期望状态，
+        并按 clientOrderId 前缀撤销 native 策略留在交易所上的挂单，
+        避免下次启动时被重新恢复。
+        """
+        with self.db_lock:
+            self.conn.execute(
+                "UPDATE strategies SET status = ? WHERE id = ?", ("stopped", strategy_id)
+            )
+            self.conn.commit()
+        self.auto_pause.release(strategy_id)
+        self.risk.reset(strategy_id)
+        if self.native.has(strategy_id):
+            result = self.native.stop(strategy_id)
+        else:
+            result = self._cancel_native_orders(strategy_id)
+        self.paper.release(strategy_id)
+        if result and not result["success"]:
+            failed = result.get("failed") or result.get("message")
+            return {
+                "success": True,
+                "message": f"策略{strategy_id}已停止，部分挂单撤销失败: {failed}",
+            }
+        return {"success": True, "message": f"策略{strategy_id}已停止"}
+
+    def _cancel_native_orders(self, strategy_id):
+        """撤销未加载到执行器中的 native 策略在交易所上的挂单
+
+        Returns:
+            dict: 撤单结果，模拟盘（挂单只在内存中）返回None
+        """
+        with self.db_lock:
+            exchange_id, pair, config_json = self.conn.execute(
+                "SELECT exchange, trading_pair, config FROM strategies WHERE id = ?",
+                (strategy_id,),
+            ).fetchone()
+        config = json.loads(config_json) if config_json else {}
+        if config.get("mode", "container") != "native":
+            return None
+        try:
+            exchange = self._create_exchange(
+                exchange_id,
+                priority=PRIORITY_TRADING,
+                key=strategy_id,
+                **self.credentials.get(strategy_id),
+            )
+            self._market(exchange_id, pair)
+            exchange.set_markets(self.markets.get_cached_markets(exchange_id))
+            return self.native.cancel_orders(strategy_id, exchange, to_ccxt_symbol(pair))
+        except Exception as e:
+            logger.error(f"撤销策略{strategy_id}挂单失败: {e}")
+            return {"success": False, "message": str(e)}
+
     def delete_strategy(self, strategy_id):
         """删除策略
 
@@ -519,47 +1580,295 @@ class HummingbotManager:
         """
         try:
             # 先尝试停止并删除容器
-            container_name = f"hummingbot_{strategy_id}"
-            containers = self.docker_client.containers.list(
-                all=True, filters={"name": container_name}
-            )
-
-            if containers:
-                container = containers[0]
+            self.supervisor.forget(strategy_id)
+            self.auto_pause.release(strategy_id)
+            self.risk.reset(strategy_id)
+            if self.native.has(strategy_id):
+                self.native.stop(strategy_id)
+            self.paper.release(strategy_id)
+            self.native.forget(strategy_id)
+            self.ledger.delete(strategy_id)
+            container = self._find_container(strategy_id)
+            if container:
                 container.remove(force=True)
 
             # 删除策略目录
             config_dir = Path("strategy_files") / strategy_id
             if config_dir.exists():
-                import shutil
-
                 shutil.rmtree(config_dir)
 
             # 删除数据库记录
             cursor = self.conn.cursor()
             cursor.execute("DELETE FROM strategies WHERE id = ?", (strategy_id,))
             self.conn.commit()
+            self.endpoints.release(strategy_id)
+            self.risk.forget(strategy_id)
+            self.credentials.delete(strategy_id)
 
             return {"success": True, "message": f"策略{strategy_id}已删除"}
         except Exception as e:
             logger.error(f"删除策略失败: {e}")
             return {"success": False, "message": f"删除策略失败: {e}"}
 
+    def validate_risk_rules(self, rules):
+        """校验风控规则
+
+        Returns:
+            dict: {success, message, metrics}，metrics 为可用指标及说明
+        """
+        metrics = {"global": GLOBAL_METRICS, "layer": LAYER_METRICS}
+        try:
+            compiled = compile_rules(rules)
+            return {
+                "success": True,
+                "metrics": metrics,
+                "rules": [
+                    {"name": r.name, "expression": r.expression, "metrics": r.metrics}
+                    for r in compiled
+                ],
+            }
+        except ValueError as e:
+            return {"success": False, "message": str(e), "metrics": metrics}
+
+    def set_risk_rules(self, strategy_id, rules):
+        """更新策略的风控规则（保存到策略配置，运行中的策略立即生效）
+
+        Args:
+            strategy_id: 策略ID
+            rules: 风控规则列表，空列表为清除
+
+        Returns:
+            dict: 结果信息
+        """
+        try:
+            compile_rules(rules)
+            with self.db_lock:
+                row = self.conn.execute(
+                    "SELECT config FROM strategies WHERE id = ?", (strategy_id,)
+                ).fetchone()
+                if row is None:
+                    return {"success": False, "message": f"策略{strategy_id}不存在"}
+                config = json.loads(row[0]) if row[0] else {}
+                if rules:
+                    config["risk_rules"] = rules
+                else:
+                    config.pop("risk_rules", None)
+                self.conn.execute(
+                    "UPDATE strategies SET config = ? WHERE id = ?",
+                    (json.dumps(config), strategy_id),
+                )
+                self.conn.commit()
+            self.risk.sync()
+            return {"success": True, "message": "风控规则已更新"}
+        except ValueError as e:
+            return {"success": False, "message": str(e)}
+        except Exception as e:
+            logger.error(f"更新风控规则失败: {e}")
+            return {"success": False, "message": f"更新风控规则失败: {e}"}
+
+    def _apply_grid_spec(self, strategy_id, spec):
+        """就地更新策略的网格参数（配置文件和数据库），不重建容器
+
+        配置文件先写临时文件再替换，容器内读取到的始终是完整的配置。
+        运行中（或已暂停）的策略容器重启后按新配置运行，
+        运行中的进程内策略按新价位重新启动，已有挂单经对账后尽量沿用。
+
+        Returns:
+            (bool, str): (是否成功, 消息)
+        """
+        with self.db_lock:
+            row = self.conn.execute(
+                "SELECT exchange, trading_pair, config FROM strategies WHERE id = ?",
+                (strategy_id,),
+            ).fetchone()
+            if row is None:
+                return False, f"策略{strategy_id}不存在"
+            exchange, pair, config_json = row
+            config = json.loads(config_json) if config_json else {}
+            config.pop("custom_grid_prices", None)
+            config.update(spec.to_config())
+
+            config_path = Path("strategy_files") / strategy_id / "conf_grid.yml"
+            if config_path.parent.exists():
+                tmp_path = config_path.with_suffix(".yml.tmp")
+                with open(tmp_path, "w") as f:
+                    yaml.dump(config, f)
+                os.replace(tmp_path, config_path)
+
+            self.conn.execute(
+                "UPDATE strategies SET config = ? WHERE id = ?",
+                (json.dumps(config), strategy_id),
+            )
+            self.conn.commit()
+        if self.native.has(strategy_id):
+            try:
+                self._launch_native(strategy_id, exchange, pair, config, reset=True)
+            except Exception as e:
+                logger.error(f"重新启动进程内策略{strategy_id}失败: {e}")
+                return False, f"网格参数已保存，但重新启动进程内策略失败: {e}"
+            return True, "网格参数已更新"
+        return self._reload_container(strategy_id)
+
+    def _reload_container(self, strategy_id):
+        """重启策略容器，使容器内的策略读取新的网格配置（不重建容器）
+
+        已暂停的容器重启后恢复暂停状态，未运行的容器在下次启动时读取新配置。
+
+        Returns:
+            (bool, str): (是否成功, 消息)
+        """
+        try:
+            container = self._find_container(strategy_id)
+            if container is None or container.status not in ("running", "paused"):
+                return True, "网格参数已更新"
+            paused = container.status == "paused"
+            # 重启产生的退出事件不计入崩溃
+            self.supervisor.expect_stop(strategy_id)
+            if paused:
+                container.unpause()
+            container.restart()
+            if paused:
+                container.pause()
+        except Exception as e:
+            logger.error(f"重启策略{strategy_id}容器失败: {e}")
+            return False, f"网格参数已保存，但重启策略容器失败，容器仍按原参数运行: {e}"
+        logger.info(f"策略{strategy_id}容器已重启并加载新的网格参数")
+        return True, "网格参数已更新，策略容器已重启"
+
+    def update_grid(self, strategy_id, strategy_data):
+        """调整策略的网格参数（运行中的策略就地生效，不重建容器）
+
+        Args:
+            strategy_id: 策略ID
+            strategy_data: 网格参数，字段同 create_hummingbot（gridType、upperPrice、
+                lowerPrice、gridCount、amountPerGrid、customGridPrices），未提供的沿用原值；
+                可同时提供 recenter 修改自适应调整参数，false 为关闭
+
+        Returns:
+            dict: 结果信息，附带 preview 和 orders（相对原参数需要撤单、改单、新增的数量），
+                参数未通过精度校验时只附带 preview
+        """
+        try:
+            with self.db_lock:
+                row = self.conn.execute(
+                    "SELECT exchange, trading_pair, config FROM strategies WHERE id = ?",
+                    (strategy_id,),
+                ).fetchone()
+            if row is None:
+                return {"success": False, "message": f"策略{strategy_id}不存在"}
+            exchange, pair, config_json = row
+            config = json.loads(config_json) if config_json else {}
+
+            current = GridSpec.from_config(config)
+            merged = {
+                "gridType": current.grid_type,
+                "upperPrice": current.upper_price,
+                "lowerPrice": current.lower_price,
+                "gridCount": current.grid_count,
+                "amountPerGrid": current.amount_per_grid,
+                "customGridPrices": current.custom_prices,
+            }
+            merged.update(strategy_data)
+            try:
+                spec = GridSpec.from_request(merged)
+            except ValueError as e:
+                return {"success": False, "message": str(e)}
+
+            plan = self._plan_grid(exchange, pair, spec, strategy_data.get("currentPrice"))
+            if not plan.valid:
+                return {
+                    "success": False,
+                    "message": "；".join(plan.errors),
+                    "preview": plan.to_dict(),
+                }
+
+            if "recenter" in strategy_data:
+                with self.db_lock:
+                    row = self.conn.execute(
+                        "SELECT config FROM strategies WHERE id = ?", (strategy_id,)
+                    ).fetchone()
+                    config = json.loads(row[0]) if row[0] else {}
+                    if strategy_data["recenter"]:
+                        config["recenter"] = strategy_data["recenter"]
+                    else:
+                        config.pop("recenter", None)
+                    self.conn.execute(
+                        "UPDATE strategies SET config = ? WHERE id = ?",
+                        (json.dumps(config), strategy_id),
+                    )
+                    self.conn.commit()
+
+            # 与原参数下的挂单对比，只有差异部分需要撤单、改单或新增
+            current_plan = self._plan_grid(exchange, pair, current, plan.reference_price)
+            changes = reconcile_plan(
+                plan_orders(current_plan),
+                plan,
+                allow_amend=self.catalog.has(exchange, "editOrder"),
+            )
+
+            success, message = self._apply_grid_spec(strategy_id, spec)
+            if not success:
+                return {"success": False, "message": message}
+            self.recenter.sync()
+            self.risk.sync()
+            return {
+                "success": True,
+                "message": message,
+                "preview": plan.to_dict(),
+                "orders": changes.summary(),
+            }
+        except Exception as e:
+            logger.error(f"调整网格参数失败: {e}")
+            return {"success": False, "message": f"调整网格参数失败: {e}"}
+
+    def get_grid_adjustments(self, strategy_id=None, limit=100):
+        """获取最近的网格自适应调整记录"""
+        try:
+            return self.recenter.get_adjustments(strategy_id, limit)
+        except Exception as e:
+            logger.error(f"获取网格调整记录失败: {e}")
+            return []
+
+    def get_trades(self, strategy_id=None, limit=100):
+        """获取进程内策略最近的成交记录"""
+        try:
+            return self.ledger.get_trades(strategy_id, limit)
+        except Exception as e:
+            logger.error(f"获取成交记录失败: {e}")
+            return []
+
+    def get_risk_events(self, strategy_id=None, limit=100):
+        """获取最近的风控触发记录"""
+        try:
+            return self.risk.get_events(strategy_id, limit)
+        except Exception as e:
+            logger.error(f"获取风控记录失败: {e}")
+            return []
+
     def get_exchanges(self):
-        """获取支持的交易所列表
+        """获取支持的交易所列表及能力信息
 
         Returns:
-            list: 交易所列表
+            list: 交易所列表，每项包含 id、name 以及测试网、现货、限速、
+                K线/批量下单支持、K线周期和手续费等能力信息
         """
         try:
-            exchanges = []
-            for exchange_id in ccxt.exchanges:
-                exchanges.append({"id": exchange_id, "name": exchange_id.capitalize()})
-            return exchanges
+            return self.catalog.all()
         except Exception as e:
             logger.error(f"获取交易所列表失败: {e}")
             return []
 
+    def get_exchange_info(self, exchange_id):
+        """获取单个交易所的能力信息
+
+        Returns:
+            dict: {success, exchange} 或 {success, message}
+        """
+        entry = self.catalog.get(exchange_id)
+        if entry is None:
+            return {"success": False, "message": f"不支持的交易所: {exchange_id}"}
+        return {"success": True, "exchange": entry}
+
     def get_trading_pairs(self, exchange, testnet=False):
         """获取交易所的交易对
 
@@ -571,18 +1880,13 @@ class HummingbotManager:
             list: 交易对列表
         """
         try:
-            if exchange not in ccxt.exchanges:
+            if not self.catalog.supports(exchange):
+                return []
+            if testnet and not self.catalog.get(exchange)["sandbox"]:
+                logger.warning(f"{exchange}不支持测试网")
                 return []
 
-            exchange_class = getattr(ccxt, exchange)
-            exchange_instance = exchange_class(
-                {"enableRateLimit": True, "options": {"defaultType": "spot"}}
-            )
-
-            if testnet and hasattr(exchange_instance, "set_sandbox_mode"):
-                exchange_instance.set_sandbox_mode(True)
-
-            markets = exchange_instance.load_markets()
+            markets = self.markets.load_markets(exchange, testnet)
 
             pairs = []
             for symbol in markets:
@@ -594,6 +1898,143 @@ class HummingbotManager:
             logger.error(f"获取交易对失败: {e}")
             return []
 
+    def get_trading_pairs_multi(self, exchanges, testnet=False):
+        """并发获取多个交易所的交易对
+
+        总耗时约等于最慢的交易所，而不是各交易所耗时之和。
+
+        Args:
+            exchanges: 交易所ID列表
+            testnet: 是否使用测试网
+
+        Returns:
+            dict: 交易所ID -> {success, pairs, message}
+        """
+        result = {}
+        supported = []
+        for exchange in exchanges:
+            if self.catalog.supports(exchange):
+                supported.append(exchange)
+            else:
+                result[exchange] = {"success": False, "message": f"不支持的交易所: {exchange}"}
+
+        try:
+            loaded = self.markets.load_markets_multi(supported, testnet)
+        except Exception as e:
+            logger.error(f"批量获取交易对失败: {e}")
+            loaded = {exchange: e for exchange in supported}
+
+        for exchange, markets in loaded.items():
+            if isinstance(markets, Exception):
+                logger.error(f"获取{exchange}交易对失败: {markets}")
+                result[exchange] = {"success": False, "message": f"获取交易对失败: {markets}"}
+            else:
+                result[exchange] = {"success": True, "pairs": list(markets)}
+        return result
+
+    def search_pairs(self, query, exchanges=None, limit=50, cursor=None, filters=None):
+        """跨交易所搜索交易对（分页）
+
+        Args:
+            query: 查询字符串，如 BTC、BTC-USDT、eth/usdt
+            exchanges: 交易所ID列表，为空时搜索所有已缓存市场信息的交易所
+            limit: 每页数量
+            cursor: 上一页返回的 next_cursor
+            filters: 筛选条件 {quote, market_type, active, testnet}
+
+        Returns:
+            dict: {success, items, total, next_cursor, facets}
+        """
+        filters = filters or {}
+        testnet = filters.get("testnet", False)
+        try:
+            if exchanges:
+                exchanges = [exchange for exchange in exchanges if self.catalog.supports(exchange)]
+                missing = [
+                    exchange
+                    for exchange in exchanges
+                    if self.markets.get_cached_markets(exchange, testnet) is None
+                ]
+                if missing:
+                    self.markets.load_markets_multi(missing, testnet)
+            else:
+                exchanges = self.markets.cached_exchanges(testnet)
+
+            result = self.pair_search.search(
+                query,
+                exchanges,
+                limit=min(int(limit or 50), 500),
+                cursor=cursor,
+                quote=filters.get("quote"),
+                market_type=filters.get("market_type"),
+                active=filters.get("active"),
+                testnet=testnet,
+            )
+            return {"success": True, **result}
+        except Exception as e:
+            logger.error(f"搜索交易对失败: {e}")
+            return {"success": False, "message": f"搜索交易对失败: {e}"}
+
+    def sync_ohlcv(self, exchange, pair, timeframe="1h", since=None, until=None, wait=False):
+        """同步K线到本地存储（只请求缺失的时间范围）
+
+        Args:
+            exchange: 交易所ID
+            pair: 交易对（BTC-USDT 或 BTC/USDT）
+            timeframe: K线周期
+            since: 起始时间（毫秒），默认为配置的回溯天数之前
+            until: 结束时间（毫秒），默认为当前时间
+            wait: 是否等待同步完成，为False时在后台同步并通过 ohlcv_progress 事件推送进度
+
+        Returns:
+            dict: {success, message, job}
+        """
+        try:
+            if since is None:
+                since = int((time.time() - self.config["ohlcv"]["default_days"] * 86400) * 1000)
+            job = self.ohlcv_fetcher.start_sync(
+                exchange, to_ccxt_symbol(pair), timeframe, since, until
+            )
+            if wait:
+                job.done.wait()
+                if job.status != "done":
+                    return {"success": False, "message": f"同步K线失败: {job.error}", "job": job.progress()}
+                return {"success": True, "message": f"已同步K线，新增{job.added}条", "job": job.progress()}
+            return {"success": True, "message": "K线正在后台同步", "job": job.progress()}
+        except Exception as e:
+            logger.error(f"同步K线失败: {e}")
+            return {"success": False, "message": f"同步K线失败: {e}"}
+
+    def get_ohlcv(self, exchange, pair, timeframe="1h", since=None, until=None, limit=1000):
+        """读取本地K线（按列返回，最多返回最近 limit 条）
+
+        Returns:
+            dict: {success, timestamp, open, high, low, close, volume, total}
+        """
+        try:
+            candles = self.ohlcv.read(exchange, to_ccxt_symbol(pair), timeframe, since, until)
+            total = len(candles["timestamp"])
+            start = max(total - int(limit), 0) if limit else 0
+            result = {name: values[start:].tolist() for name, values in candles.items()}
+            return {"success": True, "total": total, **result}
+        except KeyError:
+            return {"success": False, "message": "本地没有该K线数据，请先同步"}
+        except Exception as e:
+            logger.error(f"读取K线失败: {e}")
+            return {"success": False, "message": f"读取K线失败: {e}"}
+
+    def get_ohlcv_status(self):
+        """获取本地K线序列和同步任务进度
+
+        Returns:
+            dict: {series, jobs}
+        """
+        try:
+            return {"series": self.ohlcv.list_series(), "jobs": self.ohlcv_fetcher.get_jobs()}
+        except Exception as e:
+            logger.error(f"获取K线状态失败: {e}")
+            return {"series": [], "jobs": []}
+
     def get_monitor_data(self):
         """获取监控数据
 
@@ -748,130 +2189,222 @@ class HummingbotManager:
             logger.error(f"获取首页数据失败: {e}")
             return {"stats": {}, "recentTrades": []}
 
+    def get_docker_endpoints(self):
+        """获取Docker端点列表及负载
+
+        Returns:
+            list: 端点信息列表
+        """
+        try:
+            return self.endpoints.describe()
+        except Exception as e:
+            logger.error(f"获取Docker端点失败: {e}")
+            return []
+
     def close(self):
         """关闭资源"""
+        if hasattr(self, "supervisor") and self.supervisor:
+            self.supervisor.stop()
+        if hasattr(self, "auto_pause") and self.auto_pause:
+            self.auto_pause.stop()
+        if hasattr(self, "risk") and self.risk:
+            self.risk.stop()
+        if hasattr(self, "recenter") and self.recenter:
+            self.recenter.stop()
+        if hasattr(self, "market_feed") and self.market_feed:
+            self.market_feed.stop()
+        if hasattr(self, "paper") and self.paper:
+            self.paper.close()
+        if hasattr(self, "native") and self.native:
+            self.native.close()
+        if hasattr(self, "orders") and self.orders:
+            self.orders.close()
+        if hasattr(self, "markets") and self.markets:
+            self.markets.close()
+        if hasattr(self, "endpoints") and self.endpoints:
+            self.endpoints.close()
+        if hasattr(self, "optimizer") and self.optimizer:
+            self.optimizer.close()
+        if hasattr(self, "http") and self.http:
+            self.http.close()
         if hasattr(self, "conn") and self.conn:
             self.conn.close()
             logger.info("数据库连接已关闭")
 
-    def check_or_pull_hummingbot_image(self, image_tag="latest"):
-        """检查Hummingbot镜像是否存在，如果不存在则拉取
+    def check_or_pull_hummingbot_image(self, image_tag="latest", wait=True):
+        """检查所有Docker端点上的Hummingbot镜像，不存在则拉取
 
         Args:
             image_tag: 镜像标签，默认为latest
+            wait: 是否等待拉取完成，为False时在后台拉取并立即返回
 
         Returns:
             tuple: (bool, str) - (镜像是否可用, 消息)
         """
-        hummingbot_image = f"hummingbot/hummingbot:{image_tag}"
+        repository = self.config["images"]["repository"]
+        hummingbot_image = f"{repository}:{image_tag}"
 
         try:
-            # 检查镜像是否存在
-            self.docker_client.images.get(hummingbot_image)
-            logger.info(f"镜像{hummingbot_image}已存在")
-            return True, f"镜像{hummingbot_image}已存在"
-        except docker_errors.ImageNotFound:
-            logger.warning(f"镜像{hummingbot_image}不存在，尝试拉取...")
-
-            # 检查是否指定了拉取镜像
-            if "--pull-image" not in sys.argv:
-                logger.info("未指定--pull-image参数，跳过拉取")
-                return (
-                    False,
-                    f"镜像{hummingbot_image}不存在，请使用 --pull-image 参数拉取",
+            jobs = []
+            for endpoint in self.endpoints.available_endpoints():
+                if self.images.resolve(endpoint.client, repository, image_tag):
+                    continue
+                logger.warning(
+                    f"端点{endpoint.name}上镜像{hummingbot_image}不存在，开始拉取..."
                 )
+                jobs.append(self.images.start_pull(endpoint, repository, image_tag))
 
-            # 拉取镜像，添加重试逻辑
-            max_retries = 3
-            retry_delay = 2  # 初始重试延迟（秒）
+            if not jobs:
+                logger.info(f"镜像{hummingbot_image}已存在")
+                return True, f"镜像{hummingbot_image}已存在"
 
-            for attempt in range(max_retries):
-                try:
-                    logger.info(
-                        f"正在拉取镜像 {hummingbot_image}，尝试 {attempt + 1}/{max_retries}"
-                    )
-                    # 检查网络连接
-                    try:
-                        response = requests.get("https://hub.docker.com", timeout=5)
-                        if response.status_code >= 400:
-                            logger.warning(
-                                f"访问Docker Hub返回状态码: {response.status_code}"
-                            )
-                    except requests.exceptions.RequestException as e:
-                        logger.warning(f"网络连接测试失败: {e}")
-                        if (
-                            "forcibly closed" in str(e).lower()
-                            or "timeout" in str(e).lower()
-                        ):
-                            logger.error(
-                                "网络连接被强制关闭或超时，可能需要检查网络设置或代理配置"
-                            )
-                            if attempt < max_retries - 1:
-                                logger.info(f"等待 {retry_delay} 秒后重试...")
-                                time.sleep(retry_delay)
-                                retry_delay *= 2  # 指数退避
-                                continue
-                            else:
-                                return False, f"网络连接问题，无法拉取镜像: {e}"
-
-                    # 尝试拉取镜像
-                    pull_result = self.docker_client.images.pull(
-                        "hummingbot/hummingbot", tag=image_tag
-                    )
-                    if pull_result:
-                        logger.info(f"成功拉取镜像{hummingbot_image}")
-                        return True, f"成功拉取镜像{hummingbot_image}"
-                    else:
-                        logger.warning(f"镜像拉取结果为空，可能出现问题")
-                        if attempt < max_retries - 1:
-                            logger.info(f"等待 {retry_delay} 秒后重试...")
-                            time.sleep(retry_delay)
-                            retry_delay *= 2  # 指数退避
-                            continue
-                        else:
-                            return False, "镜像拉取结果为空，请检查Docker服务状态"
-                except docker_errors.APIError as api_error:
-                    error_msg = str(api_error).lower()
-                    if (
-                        "connection" in error_msg
-                        or "timeout" in error_msg
-                        or "forcibly closed" in error_msg
-                    ):
-                        logger.warning(f"Docker API网络错误: {api_error}")
-                        if attempt < max_retries - 1:
-                            logger.info(f"等待 {retry_delay} 秒后重试...")
-                            time.sleep(retry_delay)
-                            retry_delay *= 2
-                            continue
-                        else:
-                            return (
-                                False,
-                                f"Docker API网络错误，达到最大重试次数: {api_error}",
-                            )
-                    else:
-                        logger.error(f"Docker API错误: {api_error}")
-                        return False, f"Docker API错误: {api_error}"
-                except requests.exceptions.ConnectionError as conn_error:
-                    logger.warning(f"网络连接错误: {conn_error}")
-                    if attempt < max_retries - 1:
-                        logger.info(f"等待 {retry_delay} 秒后重试...")
-                        time.sleep(retry_delay)
-                        retry_delay *= 2
-                        continue
-                    else:
-                        return False, f"网络连接错误，达到最大重试次数: {conn_error}"
-                except Exception as pull_error:
-                    logger.error(f"拉取镜像{hummingbot_image}失败: {pull_error}")
-                    return False, f"拉取镜像失败: {pull_error}"
-
-            return (
-                False,
-                f"拉取镜像{hummingbot_image}失败，达到最大重试次数，请检查网络连接",
-            )
+            if not wait:
+                return False, f"镜像{hummingbot_image}正在后台拉取"
+
+            for job in jobs:
+                job.done.wait()
+            failed = [job for job in jobs if job.status != "done"]
+            if failed:
+                return False, f"拉取镜像{hummingbot_image}失败: {failed[0].error}"
+            return True, f"成功拉取镜像{hummingbot_image}"
         except Exception as e:
             logger.error(f"检查Hummingbot镜像失败: {e}")
             return False, f"检查Hummingbot镜像失败: {e}"
 
+    def get_mirror_stats(self):
+        """获取镜像源历史表现
+
+        Returns:
+            dict: 镜像源 -> 历史统计
+        """
+        try:
+            return self.images.racer.history() if self.images.racer else {}
+        except Exception as e:
+            logger.error(f"获取镜像源统计失败: {e}")
+            return {}
+
+    def get_rate_limit_stats(self):
+        """获取各交易所的限流队列统计
+
+        Returns:
+            dict: 交易所ID -> 速率、剩余令牌、各优先级排队数和平均等待时间
+        """
+        try:
+            return self.rate_limiter.stats()
+        except Exception as e:
+            logger.error(f"获取限流统计失败: {e}")
+            return {}
+
+    def benchmark_sim_exchange(self, params=None):
+        """模拟交易所吞吐量测试
+
+        直接调用撮合引擎时同步返回结果；经过适配器时受限流和延迟影响耗时较长，
+        在后台运行，进度通过 sim_benchmark_progress 事件推送，也可用
+        get_sim_benchmark_status 查询。
+
+        Args:
+            params: 可选参数
+                - orders: 下单总数（默认20000，最多200000）
+                - levels: 每侧价位数（默认200）
+                - adapter: 是否经过 ccxt 适配器、网络延迟和限流调度器（默认 false，直接调用撮合引擎）
+
+        Returns:
+            dict: 下单、撤单、成交数量和每秒订单数；后台运行时为 {success, message, job}
+        """
+        params = params or {}
+        try:
+            orders = min(int(params.get("orders", 20000)), 200000)
+            levels = int(params.get("levels", 200))
+            if not params.get("adapter"):
+                return {"success": True, **benchmark(orders, levels)}
+
+            if self.sim_benchmark is not None and self.sim_benchmark.status == "running":
+                return {
+                    "success": False,
+                    "message": "已有压测正在运行",
+                    "job": self.sim_benchmark.progress(),
+                }
+            # 独立的撮合引擎，不影响 simulated 交易所上的账户
+            sim_config = self.config["simulated_exchange"]
+            exchange = self.rate_limiter.attach(
+                SimExchange(
+                    SimVenue("simulated_benchmark"),
+                    account="benchmark",
+                    latency_ms=sim_config["latency_ms"],
+                    jitter_ms=sim_config["jitter_ms"],
+                    rate_limit_ms=sim_config["rate_limit_ms"],
+                ),
+                PRIORITY_UI,
+            )
+            job = self.sim_benchmark = BenchmarkJob(orders, levels, notify=self.notify)
+            threading.Thread(
+                target=self._run_sim_benchmark,
+                args=(job, exchange),
+                name="sim-benchmark",
+                daemon=True,
+            ).start()
+            return {"success": True, "message": "压测正在后台运行", "job": job.progress()}
+        except Exception as e:
+            logger.error(f"模拟交易所压测失败: {e}")
+            return {"success": False, "message": f"模拟交易所压测失败: {e}"}
+
+    def _run_sim_benchmark(self, job, exchange):
+        try:
+            result = benchmark(job.orders, job.levels, exchange=exchange, job=job)
+            job.finish("cancelled" if job.cancel.is_set() else "done", result)
+        except Exception as e:
+            logger.error(f"模拟交易所压测失败: {e}")
+            job.finish("failed", error=str(e))
+
+    def get_sim_benchmark_status(self):
+        """最近一次后台压测的进度和结果"""
+        if self.sim_benchmark is None:
+            return {"success": False, "message": "没有压测任务"}
+        return {"success": True, "job": self.sim_benchmark.progress()}
+
+    def stop_sim_benchmark(self):
+        """提前结束后台压测"""
+        if self.sim_benchmark is None or self.sim_benchmark.status != "running":
+            return {"success": False, "message": "没有正在运行的压测"}
+        self.sim_benchmark.cancel.set()
+        return {"success": True, "message": "压测将在当前批次后结束"}
+
+    def get_order_gateway_stats(self):
+        """获取批量下单网关的统计
+
+        Returns:
+            dict: 交易所ID -> 请求数、批次数、订单数和失败数
+        """
+        try:
+            return self.orders.stats()
+        except Exception as e:
+            logger.error(f"获取下单网关统计失败: {e}")
+            return {}
+
+    def get_http_stats(self):
+        """获取共享HTTP连接的复用率、建连耗时和DNS缓存统计
+
+        Returns:
+            dict: {sessions, dns}
+        """
+        try:
+            return self.http.stats()
+        except Exception as e:
+            logger.error(f"获取HTTP连接统计失败: {e}")
+            return {}
+
+    def get_image_pull_status(self):
+        """获取镜像拉取任务进度
+
+        Returns:
+            list: 各端点的拉取进度
+        """
+        try:
+            return self.images.get_jobs()
+        except Exception as e:
+            logger.error(f"获取镜像拉取进度失败: {e}")
+            return []
+
 
 class IPCHandler:
     """IPC通信处理类，用于与Electron通信"""
@@ -881,11 +2414,16 @@ class IPCHandler:
         self.manager = None
         logger.info("IPCHandler 初始化")
 
+    def _create_manager(self):
+        """创建管理器并启动后台服务"""
+        self.manager = HummingbotManager(notify=emit_event)
+        self.manager.start_background()
+
     def start_manager(self):
         """启动Hummingbot管理器"""
         try:
             logger.info("开始初始化 HummingbotManager")
-            self.manager = HummingbotManager()
+            self._create_manager()
             logger.info("HummingbotManager 初始化成功")
             return {"success": True, "message": "管理器启动成功"}
         except Exception as e:
@@ -910,7 +2448,7 @@ class IPCHandler:
 
             if not self.manager and method != "init":
                 logger.info("管理器未初始化，正在自动初始化...")
-                self.manager = HummingbotManager()
+                self._create_manager()
 
             logger.info(f"处理方法调用: {method}, 参数: {args}")
             result = self.dispatch_method(method, args)
@@ -963,6 +2501,45 @@ class IPCHandler:
         elif method == "create_strategy":
             logger.info(f"调用create_strategy方法，参数: {args[0]}")
             return self.manager.create_hummingbot(args[0])
+        elif method == "preview_grid":
+            logger.info(f"调用preview_grid方法，参数: {args[0]}")
+            return self.manager.preview_grid(args[0])
+        elif method == "backtest_grid":
+            logger.info(f"调用backtest_grid方法，参数: {args[0]}")
+            return self.manager.backtest_grid(args[0])
+        elif method == "validate_risk_rules":
+            logger.info("调用validate_risk_rules方法")
+            return self.manager.validate_risk_rules(args[0])
+        elif method == "set_risk_rules":
+            logger.info(f"调用set_risk_rules方法，策略ID: {args[0]}")
+            return self.manager.set_risk_rules(args[0], args[1])
+        elif method == "get_risk_events":
+            logger.info("调用get_risk_events方法")
+            return self.manager.get_risk_events(*args[:2])
+        elif method == "update_grid":
+            logger.info(f"调用update_grid方法，策略ID: {args[0]}")
+            return self.manager.update_grid(args[0], args[1])
+        elif method == "get_grid_adjustments":
+            logger.info("调用get_grid_adjustments方法")
+            return self.manager.get_grid_adjustments(*args[:2])
+        elif method == "get_trades":
+            logger.info("调用get_trades方法")
+            return self.manager.get_trades(*args[:2])
+        elif method == "suggest_grid_range":
+            logger.info(f"调用suggest_grid_range方法，参数: {args}")
+            return self.manager.suggest_grid_range(*args[:5])
+        elif method == "monte_carlo_grid":
+            logger.info(f"调用monte_carlo_grid方法，参数: {args[0]}")
+            return self.manager.monte_carlo_grid(args[0])
+        elif method == "optimize_grid":
+            logger.info(f"调用optimize_grid方法，参数: {args[0]}")
+            return self.manager.optimize_grid(args[0])
+        elif method == "get_optimize_status":
+            logger.info("调用get_optimize_status方法")
+            return self.manager.get_optimize_status(args[0] if args else None)
+        elif method == "stop_optimize":
+            logger.info(f"调用stop_optimize方法，任务ID: {args[0]}")
+            return self.manager.stop_optimize(args[0])
         elif method == "start_strategy":
             logger.info(f"调用start_strategy方法，策略ID: {args[0]}")
             return self.manager.start_strategy(args[0])
@@ -972,6 +2549,9 @@ class IPCHandler:
         elif method == "delete_strategy":
             logger.info(f"调用delete_strategy方法，策略ID: {args[0]}")
             return self.manager.delete_strategy(args[0])
+        elif method == "get_exchange_info":
+            logger.info(f"调用get_exchange_info方法，交易所: {args[0]}")
+            return self.manager.get_exchange_info(args[0])
         elif method == "get_exchanges":
             logger.info("调用get_exchanges方法")
             return self.manager.get_exchanges()
@@ -981,6 +2561,30 @@ class IPCHandler:
                 f"调用get_trading_pairs方法，交易所: {args[0]}, 测试网: {testnet}"
             )
             return self.manager.get_trading_pairs(args[0], testnet)
+        elif method == "get_trading_pairs_multi":
+            testnet = args[1] if len(args) > 1 else False
+            logger.info(
+                f"调用get_trading_pairs_multi方法，交易所: {args[0]}, 测试网: {testnet}"
+            )
+            return self.manager.get_trading_pairs_multi(args[0], testnet)
+        elif method == "search_pairs":
+            logger.info(f"调用search_pairs方法，查询: {args[0]}")
+            return self.manager.search_pairs(
+                args[0],
+                args[1] if len(args) > 1 else None,
+                args[2] if len(args) > 2 else 50,
+                args[3] if len(args) > 3 else None,
+                args[4] if len(args) > 4 else None,
+            )
+        elif method == "sync_ohlcv":
+            logger.info(f"调用sync_ohlcv方法，交易所: {args[0]}, 交易对: {args[1]}")
+            return self.manager.sync_ohlcv(*args[:5])
+        elif method == "get_ohlcv":
+            logger.info(f"调用get_ohlcv方法，交易所: {args[0]}, 交易对: {args[1]}")
+            return self.manager.get_ohlcv(*args[:6])
+        elif method == "get_ohlcv_status":
+            logger.info("调用get_ohlcv_status方法")
+            return self.manager.get_ohlcv_status()
         elif method == "get_monitor_data":
             logger.info("调用get_monitor_data方法")
             return self.manager.get_monitor_data()
@@ -992,11 +2596,39 @@ class IPCHandler:
             api_key = args[1] if len(args) > 1 else None
             secret = args[2] if len(args) > 2 else None
             return self.manager.validate_exchange_connection(args[0], api_key, secret)
+        elif method == "get_docker_endpoints":
+            logger.info("调用get_docker_endpoints方法")
+            return self.manager.get_docker_endpoints()
         elif method == "check_or_pull_hummingbot_image":
             logger.info("调用check_or_pull_hummingbot_image方法")
             tag = args[0] if args else "latest"
-            success, msg = self.manager.check_or_pull_hummingbot_image(tag)
+            # IPC请求有超时限制，拉取在后台进行，进度通过image_pull_progress事件推送
+            success, msg = self.manager.check_or_pull_hummingbot_image(tag, wait=False)
             return {"success": success, "message": msg}
+        elif method == "get_mirror_stats":
+            logger.info("调用get_mirror_stats方法")
+            return self.manager.get_mirror_stats()
+        elif method == "get_rate_limit_stats":
+            logger.info("调用get_rate_limit_stats方法")
+            return self.manager.get_rate_limit_stats()
+        elif method == "benchmark_sim_exchange":
+            logger.info("调用benchmark_sim_exchange方法")
+            return self.manager.benchmark_sim_exchange(args[0] if args else None)
+        elif method == "get_sim_benchmark_status":
+            logger.info("调用get_sim_benchmark_status方法")
+            return self.manager.get_sim_benchmark_status()
+        elif method == "stop_sim_benchmark":
+            logger.info("调用stop_sim_benchmark方法")
+            return self.manager.stop_sim_benchmark()
+        elif method == "get_order_gateway_stats":
+            logger.info("调用get_order_gateway_stats方法")
+            return self.manager.get_order_gateway_stats()
+        elif method == "get_http_stats":
+            logger.info("调用get_http_stats方法")
+            return self.manager.get_http_stats()
+        elif method == "get_image_pull_status":
+            logger.info("调用get_image_pull_status方法")
+            return self.manager.get_image_pull_status()
         else:
             logger.error(f"未知方法: {method}")
             raise ValueError(f"未知方法: {method}")
@@ -1015,8 +2647,9 @@ def start_ipc_server():
 
     # 通知Electron进程Python已准备就绪
     logger.info("向Electron发送就绪信号")
-    print("IPC_READY")
-    sys.stdout.flush()
+    with stdout_lock:
+        print("IPC_READY")
+        sys.stdout.flush()
 
     logger.info("开始监听来自Electron的请求...")
     # 从标准输入读取请求
@@ -1032,13 +2665,15 @@ def start_ipc_server():
 
             # 发送响应
             logger.debug(f"发送响应: {response[:100]}...")  # 只记录响应的前100个字符
-            print(response)
-            sys.stdout.flush()
+            with stdout_lock:
+                print(response)
+                sys.stdout.flush()
         except Exception as e:
             logger.error(f"处理IPC请求失败: {e}")
             error_response = {"error": str(e)}
-            print(json.dumps(error_response))
-            sys.stdout.flush()
+            with stdout_lock:
+                print(json.dumps(error_response))
+                sys.stdout.flush()
 
         logger.debug("请求处理完成，等待下一个请求...")
 
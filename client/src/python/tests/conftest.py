@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""测试共用的本地HTTP桩服务"""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+class StubServer:
+    """在后台线程运行的HTTP服务，请求交给 handler(request) 处理
+
+    handler 可以调用 request.send_response/send_header/end_headers 并写入 request.wfile，
+    等待 stopping 事件的处理函数会在测试结束时被唤醒。
+    """
+
+    def __init__(self, handler):
+        stub = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.requests.append(self.path)
+                handler(self)
+
+            do_POST = do_GET
+
+            def log_message(self, *args):
+                pass
+
+        self.requests = []
+        self.stopping = threading.Event()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.stopping.set()
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def http_stub():
+    """创建本地HTTP桩服务的工厂，测试结束时全部关闭"""
+    servers = []
+
+    def make(handler):
+        server = StubServer(handler)
+        servers.append(server)
+        return server
+
+    yield make
+    for server in servers:
+        server.close()
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""区间外自动暂停的暂停归属测试"""
+
+import json
+import sqlite3
+import threading
+
+import pytest
+
+from core.auto_pause import AutoPauseController
+
+SYMBOL = "BTC/USDT"
+
+
+class FakeFeed:
+    def add_listener(self, listener):
+        self.listener = listener
+
+    def set_subscriptions(self, owner, keys):
+        self.keys = keys
+
+
+class FakeStrategy:
+    """记录暂停/恢复调用，模拟容器的运行状态"""
+
+    def __init__(self):
+        self.status = "running"
+        self.calls = []
+
+    def pause(self, strategy_id):
+        self.calls.append("pause")
+        if self.status != "running":
+            return False
+        self.status = "paused"
+        return True
+
+    def resume(self, strategy_id):
+        self.calls.append("resume")
+        self.status = "running"
+        return True
+
+
+@pytest.fixture
+def make_controller():
+    conn = sqlite3.connect(":memory:", check_same_thread=False, isolation_level=None)
+    conn.execute(
+        "CREATE TABLE strategies (id TEXT, exchange TEXT, trading_pair TEXT, status TEXT, config TEXT)"
+    )
+    conn.execute(
+        "INSERT INTO strategies VALUES (?, ?, ?, ?, ?)",
+        ("s1", "binance", "BTC-USDT", "running", json.dumps({"lower_price": 90, "upper_price": 110})),
+    )
+
+    def make(strategy, blocked=lambda strategy_id: False):
+        controller = AutoPauseController(
+            conn,
+            threading.RLock(),
+            FakeFeed(),
+            strategy.pause,
+            strategy.resume,
+            threshold_seconds=10,
+            hysteresis_pct=0.0,
+            blocked_fn=blocked,
+        )
+        controller.sync()
+        return controller
+
+    return make
+
+
+def _feed(controller, *ticks):
+    for price, timestamp in ticks:
+        controller.on_price("binance", SYMBOL, price, timestamp)
+
+
+def test_pauses_after_threshold_and_resumes_in_band(make_controller):
+    strategy = FakeStrategy()
+    controller = make_controller(strategy)
+    _feed(controller, (120.0, 0), (120.0, 5))
+    assert strategy.status == "running"
+    _feed(controller, (120.0, 10))
+    assert strategy.status == "paused"
+    assert controller.get_all_pauses()["s1"]["paused"]
+
+    _feed(controller, (100.0, 20))
+    assert strategy.status == "running"
+    assert not controller.get_all_pauses()["s1"]["paused"]
+
+
+def test_does_not_resume_pause_it_did_not_make(make_controller):
+    strategy = FakeStrategy()
+    strategy.status = "paused"
+    controller = make_controller(strategy)
+    _feed(controller, (120.0, 0), (120.0, 10), (100.0, 20))
+
+    assert strategy.status == "paused"
+    assert "resume" not in strategy.calls
+    assert controller.get_all_pauses() == {}
+
+
+def test_risk_trigger_blocks_pause_and_resume(make_controller):
+    strategy = FakeStrategy()
+    blocked = set()
+    controller = make_controller(strategy, blocked=lambda strategy_id: strategy_id in blocked)
+    _feed(controller, (120.0, 0), (120.0, 10))
+    assert strategy.status == "paused"
+
+    # 风控规则触发后由风控负责，价格回到区间也不自动恢复
+    blocked.add("s1")
+    _feed(controller, (100.0, 20))
+    assert strategy.status == "paused"
+
+    strategy.status = "running"
+    _feed(controller, (120.0, 30), (120.0, 50))
+    assert strategy.calls.count("pause") == 1
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""向量化回测与逐点模拟的一致性测试"""
+
+import numpy as np
+import pytest
+
+from core.backtest import BUY, SELL, price_path, run_backtest
+from core.grid import GridSpec, plan_grid
+
+
+def _candles(bars=3000, seed=1):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.004, bars)))
+    open_ = np.r_[100.0, close[:-1]]
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.002, bars)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.002, bars)))
+    return {
+        "timestamp": np.arange(bars, dtype=np.int64) * 60000,
+        "open": open_,
+        "high": high,
+        "low": low,
+        "close": close,
+    }
+
+
+def _spec(grid_type="arithmetic"):
+    return GridSpec.from_config(
+        {
+            "lower_price": 80,
+            "upper_price": 120,
+            "grid_count": 41,
+            "amount_per_grid": 10,
+            "grid_type": grid_type,
+        }
+    )
+
+
+def _brute_force(candles, spec):
+    """逐个路径点、逐个区间检查挂单是否被穿过"""
+    start_price = float(candles["open"][0])
+    plan = plan_grid(spec, None, reference_price=start_price)
+    levels = plan.prices
+    quantities = plan.quantities[:-1]
+    path, _ = price_path(candles["open"], candles["high"], candles["low"], candles["close"])
+    holding = levels[:-1] >= start_price
+    entry = np.where(holding, start_price, 0.0)
+    fills = {i: [] for i in range(len(levels) - 1)}
+    realized = 0.0
+    for k in range(1, len(path)):
+        a, b = path[k - 1], path[k]
+        for i in range(len(levels) - 1):
+            if not holding[i] and b <= levels[i] < a:
+                holding[i] = True
+                entry[i] = levels[i]
+                fills[i].append(BUY)
+            elif holding[i] and a < levels[i + 1] <= b:
+                holding[i] = False
+                realized += quantities[i] * (levels[i + 1] - entry[i])
+                fills[i].append(SELL)
+    return fills, realized
+
+
+@pytest.mark.parametrize("grid_type", ["arithmetic", "geometric"])
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_backtest_matches_brute_force(grid_type, seed):
+    candles = _candles(seed=seed)
+    spec = _spec(grid_type)
+    result = run_backtest(candles, spec, fee_rate=0.0)
+    expected, realized = _brute_force(candles, spec)
+
+    actual = {i: [] for i in expected}
+    for interval, side in zip(result.fill_interval.tolist(), result.fill_side.tolist()):
+        actual[interval].append(side)
+
+    assert actual == expected
+    assert result.buys == sum(side == BUY for sides in expected.values() for side in sides)
+    assert result.sells == sum(side == SELL for sides in expected.values() for side in sides)
+    assert result.realized_pnl == pytest.approx(realized, rel=1e-9, abs=1e-9)
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""多Docker端点的放置和负载统计测试"""
+
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+
+from core.docker_endpoints import CONTAINER_PREFIX, DockerEndpointPool
+
+
+class FakeDockerClient:
+    """只实现端点池用到的接口，容器按名称前缀过滤"""
+
+    def __init__(self, names=(), reachable=True):
+        self.names = list(names)
+        self.reachable = reachable
+        self.filters = []
+
+    @property
+    def containers(self):
+        return self
+
+    def ping(self):
+        if not self.reachable:
+            raise ConnectionError("connection refused")
+        return True
+
+    def list(self, all=False, filters=None):
+        self.filters.append(filters)
+        prefix = (filters or {}).get("name", "")
+        return [SimpleNamespace(name=name) for name in self.names if name.startswith(prefix)]
+
+    def close(self):
+        pass
+
+
+def _pool(clients, endpoints, placement="least_loaded"):
+    conn = sqlite3.connect(":memory:", check_same_thread=False, isolation_level=None)
+    pool = DockerEndpointPool(
+        conn,
+        endpoints,
+        placement=placement,
+        client_factory=lambda endpoint, timeout: clients[endpoint.name],
+    )
+    pool.connect()
+    return pool
+
+
+def _containers(count):
+    return [f"{CONTAINER_PREFIX}{i}" for i in range(count)]
+
+
+def test_load_counts_only_strategy_containers():
+    client = FakeDockerClient(_containers(3) + ["postgres", "redis"])
+    pool = _pool({"a": client}, [{"name": "a"}])
+    assert pool.describe()[0]["containers"] == 3
+    assert client.filters[-1] == {"name": CONTAINER_PREFIX}
+
+
+def test_least_loaded_uses_capacity_ratio():
+    clients = {"a": FakeDockerClient(_containers(2)), "b": FakeDockerClient(_containers(5))}
+    # a: 2/4，b: 5/20，按比例 b 更空闲
+    pool = _pool(clients, [{"name": "a", "max_containers": 4}, {"name": "b", "max_containers": 20}])
+    assert pool.place("s1").name == "b"
+    assert pool.endpoint_for("s1").name == "b"
+    assert pool.client_for("s1") is clients["b"]
+
+
+def test_full_and_unreachable_endpoints_are_skipped():
+    clients = {
+        "a": FakeDockerClient(_containers(2)),
+        "b": FakeDockerClient(reachable=False),
+        "c": FakeDockerClient(_containers(7)),
+    }
+    pool = _pool(
+        clients,
+        [{"name": "a", "max_containers": 2}, {"name": "b"}, {"name": "c", "max_containers": 8}],
+    )
+    assert [ep.name for ep in pool.available_endpoints()] == ["a", "c"]
+    assert pool.place("s1").name == "c"
+
+    clients["c"].names = _containers(8)
+    with pytest.raises(RuntimeError):
+        pool.place("s2")
+
+
+def test_exchange_affinity_prefers_matching_endpoints():
+    clients = {
+        "a": FakeDockerClient(),
+        "b": FakeDockerClient(_containers(3)),
+        "c": FakeDockerClient(_containers(1)),
+    }
+    endpoints = [
+        {"name": "a"},
+        {"name": "b", "exchanges": ["binance"]},
+        {"name": "c", "exchanges": ["binance", "okx"]},
+    ]
+    pool = _pool(clients, endpoints, placement="exchange_affinity")
+    # 亲和端点中选负载最低的，即使非亲和端点更空闲
+    assert pool.place("s1", "binance").name == "c"
+    # 没有亲和端点时回退到全部端点
+    assert pool.place("s2", "kraken").name == "a"
+
+    clients["c"].names = _containers(5)
+    assert pool.place("s3", "binance").name == "b"
+
+
+def test_unassigned_strategy_uses_default_endpoint():
+    clients = {"a": FakeDockerClient(), "b": FakeDockerClient()}
+    pool = _pool(clients, [{"name": "a"}, {"name": "b"}])
+    assert pool.place("s1").name == "a"
+    pool.release("s1")
+    assert pool.endpoint_for("s1").name == "a"
+    assert pool.endpoint_for("unknown").name == "a"
+
+
+def test_connect_fails_when_no_endpoint_is_reachable():
+    conn = sqlite3.connect(":memory:", check_same_thread=False, isolation_level=None)
+    pool = DockerEndpointPool(
+        conn, [{"name": "a"}], client_factory=lambda endpoint, timeout: FakeDockerClient(reachable=False)
+    )
+    with pytest.raises(RuntimeError):
+        pool.connect()
+    assert pool.endpoints["a"].last_error == "connection refused"
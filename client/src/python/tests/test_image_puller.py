@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""镜像拉取的停滞切换和重试次数测试（本地拉取事件流桩服务）"""
+
+import json
+import sqlite3
+import threading
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+import requests
+
+from core.image_puller import ImagePuller
+
+REPOSITORY = "hummingbot/hummingbot"
+STALLED = "http://stalled.example"
+HEALTHY = "http://healthy.example"
+
+
+def pull_daemon(server_holder):
+    """/images/create 桩：停滞镜像源只发一条进度后不再响应，其余镜像源正常完成"""
+
+    def handler(request):
+        reference = parse_qs(urlparse(request.path).query)["fromImage"][0]
+        request.send_response(200)
+        request.send_header("Content-Type", "application/json")
+        request.end_headers()
+        events = [{"id": "layer1", "status": "Pulling fs layer"}]
+        if not reference.startswith("stalled.example/"):
+            events += [
+                {"id": "layer1", "status": "Downloading", "progressDetail": {"current": 512, "total": 1024}},
+                {"id": "layer1", "status": "Pull complete"},
+                {"status": f"Status: Downloaded newer image for {reference}:latest"},
+            ]
+        for event in events:
+            request.wfile.write(json.dumps(event).encode() + b"\r\n")
+            request.wfile.flush()
+        if reference.startswith("stalled.example/"):
+            server_holder[0].stopping.wait(10)
+
+    return handler
+
+
+class FakeImages:
+    def __init__(self):
+        self.tags = []
+
+    def get(self, name):
+        return SimpleNamespace(
+            attrs={"RepoDigests": [f"{REPOSITORY}@sha256:{'b' * 64}"], "Id": "sha256:image"},
+            tag=lambda repository, tag: self.tags.append((name, repository, tag)),
+        )
+
+
+class FakeRacer:
+    def __init__(self, ranked):
+        self.ranked = ranked
+        self.pulls = []
+        self.failures = []
+
+    def rank(self, repository, tag):
+        return list(self.ranked)
+
+    def record_pull(self, mirror, throughput_bps):
+        self.pulls.append(mirror)
+
+    def record_failure(self, mirror, stalled=False):
+        self.failures.append((mirror, stalled))
+
+
+@pytest.fixture
+def make_puller(monkeypatch):
+    conn = sqlite3.connect(":memory:", check_same_thread=False, isolation_level=None)
+
+    def make(open_stream, **kwargs):
+        monkeypatch.setattr(ImagePuller, "_open_stream", staticmethod(open_stream))
+        options = {"retry_delay": 0, "progress_interval": 0, "stall_timeout": 0.5, **kwargs}
+        return ImagePuller(None, conn, threading.RLock(), **options)
+
+    return make
+
+
+def _endpoint(client=None):
+    return SimpleNamespace(name="local", client=client or SimpleNamespace(images=FakeImages()))
+
+
+def test_stalled_mirror_is_abandoned_for_the_next_one(http_stub, make_puller):
+    holder = []
+    daemon = http_stub(pull_daemon(holder))
+    holder.append(daemon)
+
+    def open_stream(client, reference, tag):
+        response = requests.post(
+            f"{daemon.url}/images/create", params={"fromImage": reference, "tag": tag}, stream=True
+        )
+        return response, (json.loads(line) for line in response.iter_lines() if line)
+
+    racer = FakeRacer([STALLED, HEALTHY])
+    puller = make_puller(open_stream, racer=racer, max_retries=3)
+    endpoint = _endpoint()
+    job = puller.start_pull(endpoint, REPOSITORY, "latest")
+    # 停滞连接被立即中断，不等待服务端超时
+    assert job.done.wait(5)
+
+    assert job.status == "done"
+    assert job.attempt == 2
+    assert job.mirror == HEALTHY
+    assert racer.failures == [(STALLED, True)]
+    assert racer.pulls == [HEALTHY]
+    # 从镜像源拉取的镜像打上原始仓库标签
+    assert endpoint.client.images.tags == [(f"healthy.example/{REPOSITORY}:latest", REPOSITORY, "latest")]
+    assert puller.get_pin(REPOSITORY, "latest")[0] == "sha256:" + "b" * 64
+
+
+def test_retries_are_bounded_by_max_retries(make_puller):
+    calls = []
+
+    def open_stream(client, reference, tag):
+        calls.append(reference)
+        raise requests.ConnectionError("connection reset by peer")
+
+    racer = FakeRacer([STALLED, HEALTHY])
+    puller = make_puller(open_stream, racer=racer, max_retries=3)
+    job = puller.start_pull(_endpoint(), REPOSITORY, "latest")
+    assert job.done.wait(5)
+
+    assert job.status == "failed"
+    assert job.attempt == 3
+    # 依次轮换镜像源
+    assert calls == [f"stalled.example/{REPOSITORY}", f"healthy.example/{REPOSITORY}", f"stalled.example/{REPOSITORY}"]
+    assert racer.failures == [(STALLED, False), (HEALTHY, False), (STALLED, False)]
+
+
+def test_non_retryable_error_fails_immediately(make_puller):
+    calls = []
+
+    def open_stream(client, reference, tag):
+        calls.append(reference)
+        raise RuntimeError("manifest unknown")
+
+    puller = make_puller(open_stream, max_retries=3)
+    job = puller.start_pull(_endpoint(), REPOSITORY, "latest")
+    assert job.done.wait(5)
+    assert job.status == "failed"
+    assert calls == [REPOSITORY]
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""流式指标与批量指标的一致性测试"""
+
+import numpy as np
+import pytest
+
+from core.indicators import ATR, EMA, RSI, Bollinger, atr, bollinger, ema, rsi
+
+
+@pytest.fixture
+def series():
+    rng = np.random.default_rng(7)
+    close = 30000 * np.exp(np.cumsum(rng.normal(0, 0.01, 2000)))
+    high = close * (1 + np.abs(rng.normal(0, 0.005, len(close))))
+    low = close * (1 - np.abs(rng.normal(0, 0.005, len(close))))
+    return high, low, close
+
+
+def _assert_same(stream, batch):
+    stream = np.asarray(stream, dtype=np.float64)
+    assert np.array_equal(np.isnan(stream), np.isnan(batch))
+    mask = ~np.isnan(batch)
+    np.testing.assert_allclose(stream[mask], batch[mask], rtol=1e-9)
+
+
+@pytest.mark.parametrize("period", [1, 5, 20])
+def test_ema(series, period):
+    _, _, close = series
+    indicator = EMA(period)
+    _assert_same([indicator.update(x) for x in close.tolist()], ema(close, period))
+    assert indicator.ready
+
+
+@pytest.mark.parametrize("period", [5, 14])
+def test_atr(series, period):
+    high, low, close = series
+    indicator = ATR(period)
+    stream = [indicator.update(h, l, c) for h, l, c in zip(high.tolist(), low.tolist(), close.tolist())]
+    _assert_same(stream, atr(high, low, close, period))
+
+
+@pytest.mark.parametrize("period", [5, 14])
+def test_rsi(series, period):
+    _, _, close = series
+    indicator = RSI(period)
+    _assert_same([indicator.update(x) for x in close.tolist()], rsi(close, period))
+
+
+def test_rsi_flat_prices():
+    close = np.full(30, 100.0)
+    indicator = RSI(14)
+    stream = [indicator.update(x) for x in close.tolist()]
+    _assert_same(stream, rsi(close, 14))
+    assert stream[-1] == 50.0
+
+
+@pytest.mark.parametrize("period,k", [(20, 2.0), (7, 1.5)])
+def test_bollinger(series, period, k):
+    _, _, close = series
+    indicator = Bollinger(period, k)
+    stream = np.array([indicator.update(x) for x in close.tolist()])
+    for column, batch in enumerate(bollinger(close, period, k)):
+        _assert_same(stream[:, column], batch)
+
+
+def test_warm_up_is_nan():
+    values = np.arange(1.0, 10.0)
+    assert np.isnan(ema(values, 5)[:4]).all()
+    assert ema(values, 5)[4] == pytest.approx(3.0)
+    assert np.isnan(ema(values[:3], 5)).all()
+
+
+def test_risk_indicators_aggregate_ticks_into_bars(series):
+    from core.risk_controller import SymbolIndicators
+
+    high, low, close = series
+    n = 200
+    indicators = SymbolIndicators(rsi_period=14, atr_period=14, ema_period=20, bb_period=20, bar_seconds=60)
+    # 每根K线展开为 开-低-高-收 四个推送，同一K线内的推送不更新指标
+    for bar in range(n + 1):
+        previous = close[bar - 1] if bar else close[0]
+        for offset, price in enumerate((previous, low[bar], high[bar], close[bar])):
+            indicators.update(float(price), bar * 60 + offset * 10)
+
+    # 已结束 n 根K线，最后一根仍在进行中
+    assert indicators.price == close[n]
+    metrics = indicators.metrics()
+    opens = np.concatenate([[close[0]], close[: n - 1]])
+    bar_high = np.maximum(high[:n], opens)
+    bar_low = np.minimum(low[:n], opens)
+    assert metrics["atr"] == pytest.approx(atr(bar_high, bar_low, close[:n], 14)[-1], rel=1e-9)
+    assert metrics["rsi"] == pytest.approx(rsi(close[:n], 14)[-1], rel=1e-9)
+    assert metrics["ema"] == pytest.approx(ema(close[:n], 20)[-1], rel=1e-9)
+    assert metrics["bb_middle"] == pytest.approx(bollinger(close[:n], 20, 2.0)[0][-1], rel=1e-9)
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""镜像源探测和排序测试（本地registry桩服务）"""
+
+import json
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from core.mirror_racer import MirrorRacer
+
+REPOSITORY = "hummingbot/hummingbot"
+LAYER = "sha256:" + "a" * 64
+BLOB = b"x" * (256 << 10)
+
+
+def registry(chunk_delay=0.0, fail=False, token=None):
+    """registry v2 桩：manifest 和一个层，chunk_delay 控制 blob 下载速度"""
+
+    def handler(request):
+        if fail:
+            request.send_response(500)
+            request.end_headers()
+            return
+        if request.path.startswith("/token"):
+            body = json.dumps({"token": token}).encode()
+        elif token and request.headers.get("Authorization") != f"Bearer {token}":
+            request.send_response(401)
+            realm = f"http://{request.headers['Host']}/token"
+            request.send_header("WWW-Authenticate", f'Bearer realm="{realm}",service="stub"')
+            request.end_headers()
+            return
+        elif "/manifests/" in request.path:
+            body = json.dumps({"layers": [{"digest": LAYER, "size": len(BLOB)}]}).encode()
+        elif request.path.endswith(f"/blobs/{LAYER}"):
+            request.send_response(206)
+            request.send_header("Content-Length", str(len(BLOB)))
+            request.end_headers()
+            for offset in range(0, len(BLOB), 32 << 10):
+                request.wfile.write(BLOB[offset : offset + (32 << 10)])
+                request.wfile.flush()
+                time.sleep(chunk_delay)
+            return
+        else:
+            request.send_response(404)
+            request.end_headers()
+            return
+        request.send_response(200)
+        request.send_header("Content-Type", "application/json")
+        request.send_header("Content-Length", str(len(body)))
+        request.end_headers()
+        request.wfile.write(body)
+
+    return handler
+
+
+@pytest.fixture
+def make_racer():
+    conn = sqlite3.connect(":memory:", check_same_thread=False, isolation_level=None)
+
+    def make(mirrors):
+        return MirrorRacer(
+            conn, threading.RLock(), mirrors, include_direct=False, probe_timeout=5, probe_bytes=len(BLOB)
+        )
+
+    return make
+
+
+def test_probe_measures_latency_and_throughput(http_stub, make_racer):
+    mirror = http_stub(registry(token="secret"))
+    result = make_racer([mirror.url]).probe(mirror.url, "hummingbot/hummingbot", "latest")
+    assert result["error"] is None
+    assert result["latency_ms"] > 0
+    assert result["throughput_bps"] > 0
+    # 先被质询，再带匿名令牌重新请求 manifest
+    assert any(path.startswith("/token?scope=repository") for path in mirror.requests)
+
+
+def test_rank_orders_by_throughput_and_keeps_failed_mirrors_last(http_stub, make_racer):
+    slow = http_stub(registry(chunk_delay=0.02))
+    broken = http_stub(registry(fail=True))
+    fast = http_stub(registry())
+    racer = make_racer([slow.url, broken.url, fast.url])
+
+    assert racer.rank(REPOSITORY, "latest") == [fast.url, slow.url, broken.url]
+    history = racer.history()
+    assert history[broken.url]["failures"] == 1
+    assert history[fast.url]["throughput_bps"] > history[slow.url]["throughput_bps"]
+
+
+def test_stall_history_demotes_a_mirror(http_stub, make_racer):
+    # 两个镜像源都限速，吞吐差距有界，停滞惩罚足以改变排序
+    slow = http_stub(registry(chunk_delay=0.004))
+    fast = http_stub(registry(chunk_delay=0.001))
+    racer = make_racer([slow.url, fast.url])
+    assert racer.rank(REPOSITORY, "latest")[0] == fast.url
+
+    for _ in range(50):
+        racer.record_failure(fast.url, stalled=True)
+    assert racer.history()[fast.url]["stalls"] == 50
+    assert racer.rank(REPOSITORY, "latest")[0] == slow.url
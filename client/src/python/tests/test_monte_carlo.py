@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+"""蒙特卡洛压力测试的路径评估测试"""
+
+import numpy as np
+import pytest
+
+from core.grid import GridSpec, plan_grid
+from core.monte_carlo import evaluate_paths, run_monte_carlo
+
+
+def test_paths_without_fills():
+    # 价格始终在网格下方，没有任何成交
+    close = np.linspace(100.0, 110.0, 50)
+    result = run_monte_carlo(
+        {"close": close}, GridSpec("arithmetic", 200, 300, 5, 10), n_paths=10, horizon=10, seed=1
+    )
+    assert result["paths"] == 10
+    assert result["probability_of_loss"] == 0.0
+
+    paths = np.full((3, 11), 100.0)
+    plan = plan_grid(GridSpec("arithmetic", 200, 300, 5, 10), None, reference_price=100.0)
+    metrics = evaluate_paths(paths, plan, 0.0)
+    assert metrics["pnl"] == pytest.approx([0.0] * 3)
+    assert list(metrics["round_trips"]) == [0, 0, 0]
+
+
+def test_single_round_trip_matches_hand_calculation():
+    plan = plan_grid(GridSpec("arithmetic", 90, 110, 3, 100), None, reference_price=95.0)
+    # 95 -> 89（在 90 买入区间0）-> 101（在 100 卖出）
+    paths = np.array([[95.0, 89.0, 101.0]])
+    metrics = evaluate_paths(paths, plan, 0.0)
+    quantity = plan.quantities[0]
+    assert list(metrics["round_trips"]) == [1]
+    # 区间1（100-110）起始持仓，价格 101 时仍持有
+    held = plan.quantities[1]
+    expected = quantity * (100.0 - 90.0) + held * (101.0 - 95.0)
+    assert metrics["pnl"][0] == pytest.approx(expected)
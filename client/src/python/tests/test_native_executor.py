@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""进程内执行器的初始持仓和订单归属测试"""
+
+import sqlite3
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from core.grid import GridSpec, plan_grid
+from core.native_executor import NativeExecutor, NativeGrid
+from core.order_gateway import OrderGateway
+from core.rate_limiter import PRIORITY_TRADING, RateLimitScheduler
+from core.sim_exchange import SimExchange, SimVenue
+from core.trade_ledger import TradeLedger
+
+SYMBOL = "BTC/USDT"
+LEVELS = np.arange(90.0, 111.0, 2.0)
+
+
+@pytest.fixture
+def venue():
+    venue = SimVenue(maker=0.0, taker=0.0)
+    venue.add_market(SYMBOL, price_tick=0.01, amount_step=0.001, min_cost=1.0, price=100.0)
+    venue.deposit("shared", "USDT", 10_000.0)
+    return venue
+
+
+@pytest.fixture
+def setup(venue):
+    conn = sqlite3.connect(":memory:", check_same_thread=False, isolation_level=None)
+    lock = threading.RLock()
+    scheduler = RateLimitScheduler()
+    gateway = OrderGateway(scheduler)
+    ledger = TradeLedger(conn, lock)
+    executor = NativeExecutor(conn, lock, gateway, ledger, poll_interval=0.05, workers=4)
+    executor.start()
+
+    def exchange(account="shared"):
+        instance = SimExchange(venue, account=account, rate_limit_ms=1)
+        scheduler.attach(instance, PRIORITY_TRADING)
+        instance.load_markets()
+        return instance
+
+    yield executor, ledger, exchange
+    executor.close()
+    gateway.close()
+
+
+def _wait(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def _grid(strategy_id, exchange, quantity=0.1, levels=LEVELS, price=100.0):
+    return NativeGrid(strategy_id, "native", exchange, SYMBOL, levels, [quantity] * len(levels), price)
+
+
+def test_launch_buys_base_for_held_intervals(venue, setup):
+    executor, ledger, exchange = setup
+    grid = _grid("s1", exchange())
+    executor.launch(grid, amount_step=0.001)
+
+    trades = ledger.get_trades("s1")
+    assert [(t["side"], t["amount"]) for t in trades] == [("buy", pytest.approx(0.5))]
+    assert venue.balance("shared")["BTC"][0] == pytest.approx(0.5)
+    held = [i for i, h in enumerate(grid.holding) if h]
+    assert [grid.entry[i] for i in held] == pytest.approx([100.0] * 5)
+    assert sum(grid.size) == pytest.approx(0.5)
+
+
+def test_reset_carries_positions_and_sells_excess(venue, setup):
+    executor, ledger, exchange = setup
+    executor.launch(_grid("s1", exchange()), amount_step=0.001)
+    assert _wait(lambda: len(venue.open_orders("shared")) == 10)
+
+    venue.set_price(SYMBOL, 101.0)
+    grid = _grid("s1", exchange(), quantity=0.05, levels=np.arange(80.0, 121.0, 4.0), price=101.0)
+    executor.launch(grid, amount_step=0.001, reset=True)
+
+    trades = ledger.get_trades("s1")
+    # 新网格4个持仓区间共需 0.2，原持仓 0.5 中多出的 0.3 按市价卖出
+    assert [(t["side"], t["amount"]) for t in trades] == [
+        ("sell", pytest.approx(0.3)),
+        ("buy", pytest.approx(0.5)),
+    ]
+    assert trades[0]["profit"] == pytest.approx(0.3)
+    held = [i for i, h in enumerate(grid.holding) if h]
+    assert [grid.entry[i] for i in held] == pytest.approx([100.0] * 4)
+    assert sum(grid.size) == pytest.approx(0.2)
+
+
+def test_strategies_sharing_an_account_only_touch_their_own_orders(venue, setup):
+    executor, _, exchange = setup
+    manual = venue.place("shared", SYMBOL, "limit", "buy", 0.1, 50.0)
+    first = _grid("s1", exchange())
+    second = _grid("s2", exchange())
+    executor.launch(first, amount_step=0.001)
+    executor.launch(second, amount_step=0.001)
+
+    assert _wait(lambda: len(venue.open_orders("shared")) == 21)
+    time.sleep(0.3)
+    assert len(venue.open_orders("shared")) == 21
+    assert manual.status == "open"
+    prefixes = {o.client_id[:4] for o in venue.open_orders("shared") if o.client_id}
+    assert prefixes == {"cgs1", "cgs2"}
+
+    result = executor.stop("s1")
+    assert result["canceled"] == 10
+    remaining = venue.open_orders("shared")
+    assert len(remaining) == 11
+    assert all(o.id == manual.id or o.client_id.startswith("cgs2") for o in remaining)
+
+
+def test_cancel_orders_of_unloaded_strategy(venue, setup):
+    executor, _, exchange = setup
+    manual = venue.place("shared", SYMBOL, "limit", "buy", 0.1, 50.0)
+    executor.launch(_grid("s1", exchange()), amount_step=0.001)
+    assert _wait(lambda: len(venue.open_orders("shared")) == 11)
+    # 模拟引擎重启后策略未恢复：执行器中没有该策略，挂单仍在交易所上
+    executor.stop("s1", cancel_orders=False)
+    assert not executor.has("s1")
+
+    result = executor.cancel_orders("s1", exchange(), SYMBOL)
+    assert result["canceled"] == 10
+    assert [o.id for o in venue.open_orders("shared")] == [manual.id]
+
+
+def test_required_balances_fund_every_grid_order(venue, setup):
+    executor, _, exchange = setup
+    market = venue.market_snapshot()[SYMBOL]
+    plan = plan_grid(GridSpec("arithmetic", 50, 150, 11, 100), market, reference_price=100.0)
+    grid = NativeGrid("s1", "paper", exchange("paper"), SYMBOL, plan.prices, plan.quantities, 100.0)
+    quote, base = grid.required_balances()
+    # 持仓区间在上沿卖出本区间的数量，所需基础币多于按价位计算的 base_required
+    assert base == pytest.approx(sum(plan.quantities[5:10]))
+    assert base > plan.base_required
+    venue.deposit("paper", "USDT", quote * (1 + 1e-9))
+    venue.deposit("paper", "BTC", base * (1 + 1e-9))
+
+    executor.launch(grid, amount_step=0.001)
+    assert _wait(lambda: len(venue.open_orders("paper")) == 10)
+    assert grid.error is None
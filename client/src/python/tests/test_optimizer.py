@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+"""参数寻优的分批测试"""
+
+import random
+
+from core.optimizer import _batches
+
+
+def _combos(pairs, count):
+    combos = [
+        (pair, "arithmetic", 100.0 - i, 200.0 + i, 10, 10.0) for pair in pairs for i in range(count)
+    ]
+    random.shuffle(combos)
+    return combos
+
+
+def test_batches_never_mix_pairs():
+    combos = _combos(["BTC-USDT", "ETH-USDT", "SOL-USDT"], 45)
+    batches = _batches(combos, 20)
+    # 每个交易对 45 个组合分为 3 批，一批对应一次提交
+    assert len(batches) == 9
+    assert all(len({combo[0] for combo in batch}) == 1 for batch in batches)
+    assert sorted(combo for batch in batches for combo in batch) == sorted(combos)
+
+
+def test_batches_respect_batch_size():
+    batches = _batches(_combos(["BTC-USDT"], 50), 16)
+    assert [len(batch) for batch in sorted(batches, key=len, reverse=True)] == [16, 16, 16, 2]
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""OrderGateway 对模拟交易所的批量、降级和部分失败测试"""
+
+import ccxt
+import pytest
+
+from core.order_gateway import OrderGateway
+from core.rate_limiter import RateLimitScheduler
+from core.reconcile import reconcile
+from core.sim_exchange import SimExchange, SimVenue
+
+SYMBOL = "BTC/USDT"
+
+
+class NoBatchExchange(SimExchange):
+    """声明支持批量接口，但批量下单返回 NotSupported 的交易所"""
+
+    def create_orders(self, orders, params=None):
+        self._request()
+        raise ccxt.NotSupported("createOrders 不接受这批参数")
+
+
+@pytest.fixture
+def scheduler():
+    return RateLimitScheduler()
+
+
+@pytest.fixture
+def venue():
+    venue = SimVenue(maker=0.0, taker=0.0)
+    venue.add_market(SYMBOL, price_tick=0.01, amount_step=0.0001, min_cost=5.0)
+    venue.deposit("default", "USDT", 1_000_000.0)
+    venue.deposit("default", "BTC", 100.0)
+    return venue
+
+
+def _exchange(venue, scheduler, cls=SimExchange, **kwargs):
+    exchange = cls(venue, rate_limit_ms=1, **kwargs)
+    scheduler.attach(exchange)
+    return exchange
+
+
+def _buys(count, start=90.0, amount=0.1):
+    return [
+        {"symbol": SYMBOL, "type": "limit", "side": "buy", "amount": amount, "price": start - i}
+        for i in range(count)
+    ]
+
+
+def test_create_orders_batches_by_limit(venue, scheduler):
+    exchange = _exchange(venue, scheduler)
+    gateway = OrderGateway(scheduler, batch_limits={exchange.id: 5})
+    try:
+        result = gateway.create_orders(exchange, _buys(12))
+    finally:
+        gateway.close()
+
+    assert result["success"]
+    assert result["placed"] == 12
+    assert [r["index"] for r in result["results"]] == list(range(12))
+    assert [r["order"]["price"] for r in result["results"]] == [90.0 - i for i in range(12)]
+    stats = gateway.stats()[exchange.id]
+    assert stats["batches"] == 3
+    assert stats["requests"] == 3
+    assert len(venue.open_orders("default", SYMBOL)) == 12
+
+
+def test_create_orders_without_batch_support_sends_singles(venue, scheduler):
+    exchange = _exchange(venue, scheduler, batch=False)
+    gateway = OrderGateway(scheduler)
+    try:
+        result = gateway.create_orders(exchange, _buys(4))
+    finally:
+        gateway.close()
+
+    assert result["placed"] == 4
+    stats = gateway.stats()[exchange.id]
+    assert stats["batches"] == 0
+    assert stats["requests"] == 4
+
+
+def test_create_orders_falls_back_to_singles_on_not_supported(venue, scheduler):
+    exchange = _exchange(venue, scheduler, cls=NoBatchExchange)
+    gateway = OrderGateway(scheduler, batch_limits={exchange.id: 5})
+    try:
+        result = gateway.create_orders(exchange, _buys(7))
+    finally:
+        gateway.close()
+
+    assert result["success"]
+    assert result["placed"] == 7
+    stats = gateway.stats()[exchange.id]
+    # 2 次批量请求失败后逐个下单
+    assert stats["requests"] == 2 + 7
+    assert len(venue.open_orders("default", SYMBOL)) == 7
+
+
+def test_create_orders_reports_partial_failure(venue, scheduler):
+    exchange = _exchange(venue, scheduler)
+    gateway = OrderGateway(scheduler)
+    orders = _buys(3)
+    # 金额低于最小下单额
+    orders[1]["amount"] = 0.001
+    try:
+        result = gateway.create_orders(exchange, orders)
+    finally:
+        gateway.close()
+
+    assert not result["success"]
+    assert result["placed"] == 2
+    assert result["failed"] == 1
+    assert [r["success"] for r in result["results"]] == [True, False, True]
+    assert result["results"][1]["error"]
+    assert len(venue.open_orders("default", SYMBOL)) == 2
+
+
+def test_cancel_orders_reports_unknown_ids(venue, scheduler):
+    exchange = _exchange(venue, scheduler)
+    gateway = OrderGateway(scheduler)
+    try:
+        placed = gateway.create_orders(exchange, _buys(3))
+        ids = [r["order"]["id"] for r in placed["results"]]
+        result = gateway.cancel_orders(exchange, [ids[0], "nope", ids[2]], SYMBOL)
+    finally:
+        gateway.close()
+
+    assert [r["success"] for r in result["results"]] == [True, False, True]
+    assert result["canceled"] == 2
+    assert [o.id for o in venue.open_orders("default", SYMBOL)] == [ids[1]]
+
+
+def test_apply_reaches_target_orders(venue, scheduler):
+    exchange = _exchange(venue, scheduler)
+    gateway = OrderGateway(scheduler)
+    try:
+        gateway.create_orders(exchange, _buys(3))
+        open_orders = exchange.fetch_open_orders(SYMBOL)
+        # 保留 90，修改 89 为 88.5，撤销 88，新增卖单 110
+        plan = reconcile(
+            open_orders,
+            [0, 1, 2],
+            [1, 1, -1],
+            [88.5, 90.0, 110.0],
+            [0.1, 0.1, 0.1],
+        )
+        result = gateway.apply(exchange, SYMBOL, plan)
+    finally:
+        gateway.close()
+
+    assert result["success"]
+    prices = sorted((o.price, o.side) for o in venue.open_orders("default", SYMBOL))
+    assert [p for p, _ in prices] == pytest.approx([88.5, 90.0, 110.0])
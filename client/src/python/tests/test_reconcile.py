@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""挂单对账的最少操作测试"""
+
+from core.reconcile import BUY, SELL, reconcile
+
+
+def _order(order_id, side, price, amount=1.0):
+    return {"id": order_id, "side": side, "price": price, "amount": amount}
+
+
+def _targets(*items):
+    """(价位序号, 方向, 价格, 数量) -> reconcile 的四个数组参数"""
+    return [list(column) for column in zip(*items)] if items else ([], [], [], [])
+
+
+def test_matching_orders_are_kept():
+    orders = [_order("1", "buy", 99.0), _order("2", "sell", 101.0)]
+    plan = reconcile(orders, *_targets((0, BUY, 99.0, 1.0), (2, SELL, 101.0, 1.0)))
+    assert plan.operations == 0
+    assert sorted(level for _, level in plan.keep) == [0, 2]
+
+
+def test_price_within_tolerance_is_kept():
+    orders = [_order("1", "buy", 99.0000001)]
+    plan = reconcile(orders, *_targets((0, BUY, 99.0, 1.0)))
+    assert plan.operations == 0
+
+
+def test_empty_book_places_everything():
+    plan = reconcile([], *_targets((0, BUY, 98.0, 1.0), (1, BUY, 99.0, 1.0), (3, SELL, 101.0, 1.0)))
+    assert plan.summary() == {"keep": 0, "cancel": 0, "amend": 0, "place": 3, "operations": 3}
+
+
+def test_no_targets_cancels_everything():
+    orders = [_order("1", "buy", 99.0), _order("2", "sell", 101.0)]
+    plan = reconcile(orders, *_targets())
+    assert [order["id"] for order in plan.cancel] == ["1", "2"]
+    assert plan.operations == 2
+
+
+def test_amount_change_is_amended():
+    plan = reconcile([_order("1", "buy", 99.0, 1.0)], *_targets((0, BUY, 99.0, 2.0)))
+    assert [(order["id"], level, price, amount) for order, level, price, amount in plan.amend] == [
+        ("1", 0, 99.0, 2.0)
+    ]
+    assert plan.operations == 1
+
+
+def test_amount_change_without_amend_is_cancel_and_place():
+    plan = reconcile(
+        [_order("1", "buy", 99.0, 1.0)], *_targets((0, BUY, 99.0, 2.0)), allow_amend=False
+    )
+    assert [order["id"] for order in plan.cancel] == ["1"]
+    assert plan.place == [(0, BUY, 99.0, 2.0)]
+
+
+def test_shifted_grid_moves_only_the_edge_order():
+    # 网格整体上移一格：三个买单中两个价位不变，只需把最低的挂单改到新价位
+    orders = [_order("1", "buy", 97.0), _order("2", "buy", 98.0), _order("3", "buy", 99.0)]
+    plan = reconcile(orders, *_targets((1, BUY, 98.0, 1.0), (2, BUY, 99.0, 1.0), (3, BUY, 100.0, 1.0)))
+    assert sorted(order["id"] for order, _ in plan.keep) == ["2", "3"]
+    assert [(order["id"], price) for order, _, price, _ in plan.amend] == [("1", 100.0)]
+    assert plan.operations == 1
+
+    plan = reconcile(
+        orders,
+        *_targets((1, BUY, 98.0, 1.0), (2, BUY, 99.0, 1.0), (3, BUY, 100.0, 1.0)),
+        allow_amend=False,
+    )
+    assert [order["id"] for order in plan.cancel] == ["1"]
+    assert plan.place == [(3, BUY, 100.0, 1.0)]
+    assert plan.operations == 2
+
+
+def test_sides_are_reconciled_separately():
+    # 价格相同但方向不同的挂单不能保留
+    plan = reconcile([_order("1", "sell", 99.0)], *_targets((0, BUY, 99.0, 1.0)))
+    assert [order["id"] for order in plan.cancel] == ["1"]
+    assert plan.place == [(0, BUY, 99.0, 1.0)]
+    assert plan.keep == [] and plan.amend == []
+
+
+def test_extra_orders_are_amended_before_cancel():
+    orders = [_order("1", "buy", 90.0), _order("2", "buy", 91.0), _order("3", "buy", 99.0)]
+    plan = reconcile(orders, *_targets((0, BUY, 95.0, 1.0), (1, BUY, 99.0, 1.0)))
+    assert [order["id"] for order, _ in plan.keep] == ["3"]
+    assert len(plan.amend) == 1 and len(plan.cancel) == 1
+    assert plan.operations == 2
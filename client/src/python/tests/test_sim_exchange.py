@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""SimVenue 撮合引擎测试"""
+
+import ccxt
+import pytest
+
+from core.sim_exchange import SimVenue
+
+SYMBOL = "BTC/USDT"
+
+
+@pytest.fixture
+def venue():
+    venue = SimVenue(maker=0.0, taker=0.0)
+    venue.add_market(SYMBOL, price_tick=0.01, amount_step=0.0001, min_cost=1.0)
+    for account in ("a", "b", "c", "taker"):
+        venue.deposit(account, "USDT", 100_000.0)
+        venue.deposit(account, "BTC", 10.0)
+    return venue
+
+
+def test_price_priority(venue):
+    venue.place("a", SYMBOL, "limit", "sell", 1.0, 101.0)
+    venue.place("b", SYMBOL, "limit", "sell", 1.0, 100.0)
+    order = venue.place("taker", SYMBOL, "limit", "buy", 1.5, 101.0)
+
+    trades = venue.trades("taker", SYMBOL)
+    assert [(t["price"], t["amount"]) for t in trades] == [(100.0, 1.0), (101.0, 0.5)]
+    assert order.status == "closed"
+    assert venue.book(SYMBOL).best_ask() == 101.0
+
+
+def test_time_priority_within_level(venue):
+    first = venue.place("a", SYMBOL, "limit", "buy", 1.0, 99.0)
+    second = venue.place("b", SYMBOL, "limit", "buy", 1.0, 99.0)
+    venue.place("taker", SYMBOL, "limit", "sell", 1.5, 99.0)
+
+    assert first.status == "closed"
+    assert second.status == "open"
+    assert second.remaining == pytest.approx(0.5)
+    assert [t["takerOrMaker"] for t in venue.trades("a")] == ["maker"]
+
+
+def test_amend_loses_time_priority(venue):
+    first = venue.place("a", SYMBOL, "limit", "buy", 1.0, 99.0)
+    venue.place("b", SYMBOL, "limit", "buy", 1.0, 99.0)
+    replaced = venue.amend("a", first.id, amount=2.0)
+    venue.place("taker", SYMBOL, "limit", "sell", 1.0, 99.0)
+
+    assert [o.remaining for o in venue.open_orders("b")] == []
+    assert replaced.status == "open"
+    assert replaced.remaining == pytest.approx(2.0)
+
+
+def test_limit_does_not_cross_beyond_price(venue):
+    venue.place("a", SYMBOL, "limit", "sell", 1.0, 102.0)
+    order = venue.place("taker", SYMBOL, "limit", "buy", 1.0, 101.0)
+
+    assert order.status == "open"
+    assert venue.book(SYMBOL).best_bid() == 101.0
+    assert venue.book(SYMBOL).best_ask() == 102.0
+
+
+def test_external_price_sweeps_crossed_levels_at_order_price(venue):
+    venue.place("a", SYMBOL, "limit", "buy", 1.0, 99.0)
+    venue.place("b", SYMBOL, "limit", "buy", 1.0, 98.0)
+    venue.place("c", SYMBOL, "limit", "buy", 1.0, 97.0)
+
+    assert venue.set_price(SYMBOL, 97.5) == 2
+    assert [t["price"] for t in venue.trades("a") + venue.trades("b")] == [99.0, 98.0]
+    assert venue.book(SYMBOL).best_bid() == 97.0
+
+
+def test_balances_are_reserved_and_released(venue):
+    order = venue.place("a", SYMBOL, "limit", "buy", 1.0, 90.0)
+    assert venue.balance("a")["USDT"] == pytest.approx((100_000.0 - 90.0, 90.0))
+    venue.cancel("a", order.id)
+    assert venue.balance("a")["USDT"] == pytest.approx((100_000.0, 0.0))
+
+    with pytest.raises(ccxt.OrderNotFound):
+        venue.cancel("a", order.id)
+    with pytest.raises(ccxt.InsufficientFunds):
+        venue.place("a", SYMBOL, "limit", "sell", 11.0, 110.0)
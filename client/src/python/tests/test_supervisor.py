@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""容器监督器的熔断持久化测试"""
+
+import sqlite3
+import threading
+
+import pytest
+
+from core.supervisor import ContainerSupervisor
+
+NAME = "hummingbot_s1"
+
+
+class FakeContainer:
+    def __init__(self, status="exited"):
+        self.status = status
+        self.attrs = {"State": {"ExitCode": 1}}
+        self.starts = 0
+
+    def logs(self, tail=1):
+        return b""
+
+    def start(self):
+        self.starts += 1
+
+
+class FakeEndpoint:
+    def __init__(self, container):
+        self.name = "local"
+        self.client = self
+        self.containers = self
+        self.container = container
+
+    def get(self, name):
+        return self.container
+
+
+class FakeEndpoints:
+    def __init__(self, container):
+        self.endpoint = FakeEndpoint(container)
+        self.endpoints = {"local": self.endpoint}
+
+    def list_containers(self):
+        return {NAME: ("local", self.endpoint.container)}
+
+    def client_for(self, strategy_id):
+        return self.endpoint.client
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:", check_same_thread=False, isolation_level=None)
+    conn.execute("CREATE TABLE strategies (id TEXT, status TEXT)")
+    conn.execute("INSERT INTO strategies VALUES ('s1', 'running')")
+    return conn
+
+
+def _supervisor(conn, container, **kwargs):
+    options = {"backoff_base": 60, "circuit_threshold": 2, "circuit_window": 900, **kwargs}
+    return ContainerSupervisor(FakeEndpoints(container), conn, threading.RLock(), **options)
+
+
+def _health(conn):
+    return conn.execute(
+        "SELECT crash_count, circuit_open, next_restart_at IS NOT NULL FROM strategy_health"
+    ).fetchone()
+
+
+def test_circuit_survives_engine_restart(conn):
+    container = FakeContainer()
+    supervisor = _supervisor(conn, container)
+    endpoint = supervisor.endpoints.endpoint
+    supervisor._on_exit(endpoint, "s1", NAME, 1)
+    supervisor._on_exit(endpoint, "s1", NAME, 1)
+    supervisor.stop()
+    assert _health(conn) == (2, 1, 0)
+
+    # 引擎重启：熔断状态从数据库载入，不重启也不重新计入崩溃
+    restarted = _supervisor(conn, container)
+    restarted._recover_exited()
+    assert _health(conn) == (2, 1, 0)
+    assert restarted._state["s1"].timer is None
+
+    # 外部启动后再次崩溃也保持熔断
+    restarted._on_exit(restarted.endpoints.endpoint, "s1", NAME, 1)
+    assert _health(conn) == (3, 1, 0)
+    assert restarted._state["s1"].timer is None
+
+
+def test_recorded_exit_is_not_counted_again(conn):
+    container = FakeContainer()
+    supervisor = _supervisor(conn, container, circuit_threshold=3)
+    supervisor._on_exit(supervisor.endpoints.endpoint, "s1", NAME, 1)
+    supervisor.stop()
+    assert _health(conn) == (1, 0, 1)
+
+    for _ in range(3):
+        restarted = _supervisor(conn, container, circuit_threshold=3)
+        restarted._recover_exited()
+        assert restarted._state["s1"].timer is not None
+        restarted.stop()
+    assert _health(conn) == (1, 0, 1)
+
+
+def test_crash_times_are_restored_into_the_window(conn):
+    container = FakeContainer()
+    supervisor = _supervisor(conn, container)
+    supervisor._on_exit(supervisor.endpoints.endpoint, "s1", NAME, 1)
+    supervisor.stop()
+    # 重启已执行后，引擎停止期间容器再次退出
+    conn.execute("UPDATE strategy_health SET next_restart_at = NULL")
+
+    restarted = _supervisor(conn, container)
+    restarted._recover_exited()
+    assert _health(conn) == (2, 1, 0)
+
+
+def test_reset_closes_the_circuit(conn):
+    container = FakeContainer()
+    supervisor = _supervisor(conn, container)
+    endpoint = supervisor.endpoints.endpoint
+    supervisor._on_exit(endpoint, "s1", NAME, 1)
+    supervisor._on_exit(endpoint, "s1", NAME, 1)
+    supervisor.reset("s1")
+    assert _health(conn) == (2, 0, 0)
+
+    restarted = _supervisor(conn, container)
+    restarted._on_exit(restarted.endpoints.endpoint, "s1", NAME, 1)
+    assert _health(conn) == (3, 0, 1)
+    restarted.stop()